@@ -0,0 +1,59 @@
+"""Add chat_sessions and chat_messages for conversation history
+
+Revision ID: 3e9a6c0d51f7
+Revises: 8c4f1d7e2b60
+Create Date: 2026-10-16 16:42:37.108254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e9a6c0d51f7'
+down_revision: Union[str, None] = '8c4f1d7e2b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'chat_sessions',
+        sa.Column('id', sa.String(length=100), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=True),
+        sa.Column('model', sa.String(length=50), nullable=True),
+        sa.Column('message_count', sa.Integer(), nullable=False),
+        sa.Column('summary', sa.Text(), nullable=True),
+        sa.Column('summarized_through', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'idx_chat_session_user_updated', 'chat_sessions', ['user_id', 'updated_at']
+    )
+    op.create_table(
+        'chat_messages',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('session_id', sa.String(length=100), nullable=False),
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('role', sa.String(length=20), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('tokens', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'idx_chat_message_session_seq', 'chat_messages', ['session_id', 'seq'], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_chat_message_session_seq', table_name='chat_messages')
+    op.drop_table('chat_messages')
+    op.drop_index('idx_chat_session_user_updated', table_name='chat_sessions')
+    op.drop_table('chat_sessions')
@@ -0,0 +1,100 @@
+"""Promote job search fields out of projects.meta_data
+
+Revision ID: 5b8e2c41a9d3
+Revises: d27367f12902
+Create Date: 2026-10-16 09:12:40.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8e2c41a9d3'
+down_revision: Union[str, None] = 'd27367f12902'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _backfill_postgresql() -> None:
+    op.execute(
+        """
+        UPDATE projects SET
+            phase = meta_data->>'phase',
+            assigned_foreman_id = meta_data->>'assigned_foreman_id',
+            customer_name = meta_data->'customer'->>'name',
+            property_address = meta_data->>'property_address'
+        WHERE meta_data IS NOT NULL
+        """
+    )
+    op.execute(
+        """
+        UPDATE projects SET search_text = NULLIF(
+            lower(concat_ws(E'\\n', name, customer_name, property_address)), ''
+        )
+        """
+    )
+
+
+def _backfill_generic() -> None:
+    from apps.backend.db.business_models import project_search_text
+
+    bind = op.get_bind()
+    projects = sa.table(
+        'projects',
+        sa.column('id'), sa.column('name'), sa.column('meta_data', sa.JSON),
+        sa.column('phase'), sa.column('assigned_foreman_id'), sa.column('customer_name'),
+        sa.column('property_address'), sa.column('search_text')
+    )
+    rows = bind.execute(sa.select(projects.c.id, projects.c.name, projects.c.meta_data)).all()
+    for row in rows:
+        meta = row.meta_data or {}
+        customer = meta.get('customer')
+        customer_name = customer.get('name') if isinstance(customer, dict) else None
+        foreman_id = meta.get('assigned_foreman_id')
+        bind.execute(
+            projects.update().where(projects.c.id == row.id).values(
+                phase=meta.get('phase'),
+                assigned_foreman_id=str(foreman_id) if foreman_id else None,
+                customer_name=customer_name,
+                property_address=meta.get('property_address'),
+                search_text=project_search_text(row.name, customer_name, meta.get('property_address'))
+            )
+        )
+
+
+def upgrade() -> None:
+    op.add_column('projects', sa.Column('phase', sa.String(length=50), nullable=True))
+    op.add_column('projects', sa.Column('assigned_foreman_id', sa.String(length=36), nullable=True))
+    op.add_column('projects', sa.Column('customer_name', sa.String(length=200), nullable=True))
+    op.add_column('projects', sa.Column('property_address', sa.String(length=500), nullable=True))
+    op.add_column('projects', sa.Column('search_text', sa.Text(), nullable=True))
+
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+    if is_postgresql:
+        _backfill_postgresql()
+    else:
+        _backfill_generic()
+
+    op.create_index('idx_project_type_phase', 'projects', ['project_type', 'phase'])
+    op.create_index('idx_project_foreman', 'projects', ['assigned_foreman_id'])
+    if is_postgresql:
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index(
+            'idx_project_search_trgm', 'projects', ['search_text'],
+            postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'}
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('idx_project_search_trgm', table_name='projects')
+    op.drop_index('idx_project_foreman', table_name='projects')
+    op.drop_index('idx_project_type_phase', table_name='projects')
+    op.drop_column('projects', 'search_text')
+    op.drop_column('projects', 'property_address')
+    op.drop_column('projects', 'customer_name')
+    op.drop_column('projects', 'assigned_foreman_id')
+    op.drop_column('projects', 'phase')
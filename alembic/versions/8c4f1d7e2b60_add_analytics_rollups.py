@@ -0,0 +1,44 @@
+"""Add analytics_rollups for financial and CRM dashboards
+
+Revision ID: 8c4f1d7e2b60
+Revises: 5b8e2c41a9d3
+Create Date: 2026-10-16 14:05:11.472930
+
+The table starts empty; populate it from existing invoices, payments,
+expenses and opportunities with ``make rebuild-rollups`` after upgrading.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4f1d7e2b60'
+down_revision: Union[str, None] = '5b8e2c41a9d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'analytics_rollups',
+        sa.Column('grain', sa.String(length=10), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('metric', sa.String(length=50), nullable=False),
+        sa.Column('dimension', sa.String(length=100), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('amount_cents', sa.BigInteger(), nullable=False),
+        sa.Column('weighted_cents', sa.BigInteger(), nullable=False),
+        sa.Column('duration_days', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('grain', 'period_start', 'metric', 'dimension')
+    )
+    op.create_index(
+        'idx_rollup_metric_period', 'analytics_rollups', ['metric', 'grain', 'period_start']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_rollup_metric_period', table_name='analytics_rollups')
+    op.drop_table('analytics_rollups')
@@ -0,0 +1,45 @@
+"""Add audit_events for the batched audit sink
+
+Revision ID: a4d18e93c7b2
+Revises: 3e9a6c0d51f7
+Create Date: 2026-10-16 22:18:40.553127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d18e93c7b2'
+down_revision: Union[str, None] = '3e9a6c0d51f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'audit_events',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('occurred_at', sa.DateTime(), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('action', sa.String(length=100), nullable=False),
+        sa.Column('resource_type', sa.String(length=50), nullable=False),
+        sa.Column('resource_id', sa.String(length=100), nullable=True),
+        sa.Column('details', sa.JSON(), nullable=True),
+        sa.Column('ip_address', sa.String(length=45), nullable=True),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_audit_user_time', 'audit_events', ['user_id', 'occurred_at'])
+    op.create_index('idx_audit_action_time', 'audit_events', ['action', 'occurred_at'])
+    op.create_index('idx_audit_resource', 'audit_events', ['resource_type', 'resource_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_audit_resource', table_name='audit_events')
+    op.drop_index('idx_audit_action_time', table_name='audit_events')
+    op.drop_index('idx_audit_user_time', table_name='audit_events')
+    op.drop_table('audit_events')
@@ -0,0 +1,30 @@
+"""Index task_dependencies on both ends
+
+Revision ID: c91f5a2d6e38
+Revises: a4d18e93c7b2
+Create Date: 2026-10-16 22:31:05.914382
+
+The task graph loads every dependency touching a project's tasks from
+either end; create_all does not add indexes to an existing table.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c91f5a2d6e38'
+down_revision: Union[str, None] = 'a4d18e93c7b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_task_dependency_task', 'task_dependencies', ['task_id'])
+    op.create_index('idx_task_dependency_predecessor', 'task_dependencies', ['predecessor_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_task_dependency_predecessor', table_name='task_dependencies')
+    op.drop_index('idx_task_dependency_task', table_name='task_dependencies')
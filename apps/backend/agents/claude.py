@@ -7,12 +7,12 @@ high-quality written content with strong contextual understanding.
 """
 
 from typing import Dict, Any, List, Optional
-import asyncio
 from datetime import datetime
 import anthropic
 import logging
 
 from .base import AgentNode, AgentResponse, ExecutionContext, AgentType
+from ..core.llm_gateway import estimate_tokens, llm_gateway
 from ..core.settings import settings
 from ..memory.memory_store import get_prompt_template
 
@@ -176,36 +176,23 @@ class ClaudeAgent(AgentNode):
         self,
         system_prompt: str,
         user_prompt: str,
-        max_retries: int = 3,
         **kwargs
     ) -> Any:
-        """Call Claude API with exponential backoff retry logic."""
-        for attempt in range(max_retries):
-            try:
-                response = await self.client.messages.create(
-                    model=self.model,
-                    system=system_prompt,
-                    messages=[{"role": "user", "content": user_prompt}],
-                    temperature=self.temperature,
-                    max_tokens=self.max_tokens,
-                    **kwargs
-                )
-                return response
-                
-            except anthropic.RateLimitError as e:
-                if attempt < max_retries - 1:
-                    wait_time = (2 ** attempt) * 5  # Exponential backoff
-                    logger.warning(f"Rate limit hit, waiting {wait_time}s...")
-                    await asyncio.sleep(wait_time)
-                else:
-                    raise
-                    
-            except anthropic.APIConnectionError as e:
-                if attempt < max_retries - 1:
-                    logger.warning(f"Connection error, retrying... ({attempt + 1}/{max_retries})")
-                    await asyncio.sleep(2)
-                else:
-                    raise
+        """Call Claude API through the LLM gateway (rate limits, retries, fallback)."""
+        return await llm_gateway.call(
+            self.model,
+            lambda model: self.client.messages.create(
+                model=model,
+                system=system_prompt,
+                messages=[{"role": "user", "content": user_prompt}],
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                **kwargs
+            ),
+            provider="anthropic",
+            estimated_tokens=estimate_tokens(system_prompt + user_prompt) + self.max_tokens,
+            usage=lambda response: response.usage.input_tokens + response.usage.output_tokens
+        )
     
     def _check_approval_requirements(self, content: str, context: ExecutionContext) -> bool:
         """
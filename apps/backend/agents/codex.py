@@ -7,7 +7,6 @@ creating functional code, system designs, and technical implementations.
 """
 
 from typing import Dict, Any, List, Optional, Tuple
-import asyncio
 from datetime import datetime
 import openai
 from openai import AsyncOpenAI
@@ -15,6 +14,7 @@ import json
 import logging
 
 from .base import AgentNode, AgentResponse, ExecutionContext, AgentType
+from ..core.llm_gateway import estimate_tokens, llm_gateway
 from ..core.settings import settings
 from ..memory.memory_store import get_prompt_template
 
@@ -353,10 +353,9 @@ class CodexAgent(AgentNode):
     async def _call_openai_with_retry(
         self,
         prompt: str,
-        max_retries: int = 3,
         **kwargs
     ) -> Any:
-        """Call OpenAI API with retry logic."""
+        """Call OpenAI API through the LLM gateway (rate limits, retries, fallback)."""
         # Load system prompt
         system_prompt = await self._load_system_prompt()
         
@@ -364,34 +363,23 @@ class CodexAgent(AgentNode):
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": prompt}
         ]
-        
-        for attempt in range(max_retries):
-            try:
-                response = await self.client.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    temperature=kwargs.get("temperature", self.temperature),
-                    max_tokens=kwargs.get("max_tokens", self.max_tokens),
-                    functions=kwargs.get("functions"),
-                    function_call=kwargs.get("function_call"),
-                    **{k: v for k, v in kwargs.items() if k not in ["temperature", "max_tokens", "functions", "function_call"]}
-                )
-                return response
-                
-            except openai.RateLimitError as e:
-                if attempt < max_retries - 1:
-                    wait_time = (2 ** attempt) * 5
-                    logger.warning(f"Rate limit hit, waiting {wait_time}s...")
-                    await asyncio.sleep(wait_time)
-                else:
-                    raise
-                    
-            except openai.APIConnectionError as e:
-                if attempt < max_retries - 1:
-                    logger.warning(f"Connection error, retrying... ({attempt + 1}/{max_retries})")
-                    await asyncio.sleep(2)
-                else:
-                    raise
+        max_tokens = kwargs.get("max_tokens", self.max_tokens)
+        
+        return await llm_gateway.call(
+            self.model,
+            lambda model: self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=kwargs.get("temperature", self.temperature),
+                max_tokens=max_tokens,
+                functions=kwargs.get("functions"),
+                function_call=kwargs.get("function_call"),
+                **{k: v for k, v in kwargs.items() if k not in ["temperature", "max_tokens", "functions", "function_call"]}
+            ),
+            provider="openai",
+            estimated_tokens=estimate_tokens(system_prompt + prompt) + max_tokens,
+            usage=lambda response: response.usage.total_tokens
+        )
     
     async def _load_system_prompt(self) -> str:
         """Load system prompt for technical tasks."""
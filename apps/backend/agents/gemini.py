@@ -14,6 +14,7 @@ from google.generativeai.types import HarmCategory, HarmBlockThreshold
 import logging
 
 from .base import AgentNode, AgentResponse, ExecutionContext, AgentType
+from ..core.llm_gateway import estimate_tokens, llm_gateway
 from ..core.settings import settings
 from ..memory.memory_store import get_prompt_template
 
@@ -419,32 +420,26 @@ class GeminiAgent(AgentNode):
     
     async def _call_gemini_with_retry(
         self,
-        prompt: str,
-        max_retries: int = 3
+        prompt: str
     ) -> Any:
-        """Call Gemini API with retry logic."""
-        for attempt in range(max_retries):
-            try:
-                # Generate content with Gemini
-                response = await asyncio.to_thread(
-                    self.model.generate_content,
-                    prompt
-                )
-                
-                # Check if response was blocked
-                if not response.text:
-                    logger.warning("Gemini response was blocked by safety filters")
-                    raise Exception("Response blocked by safety filters")
-                
-                return response
-                
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    wait_time = (2 ** attempt) * 2
-                    logger.warning(f"Gemini API error, retrying in {wait_time}s: {str(e)}")
-                    await asyncio.sleep(wait_time)
-                else:
-                    raise
+        """Call Gemini API through the LLM gateway (rate limits, retries, fallback)."""
+        async def generate(model: str):
+            # The configured model object is bound to self.model_name
+            response = await asyncio.to_thread(self.model.generate_content, prompt)
+            
+            # Check if response was blocked
+            if not response.text:
+                logger.warning("Gemini response was blocked by safety filters")
+                raise Exception("Response blocked by safety filters")
+            
+            return response
+        
+        return await llm_gateway.call(
+            self.model_name,
+            generate,
+            provider="google",
+            estimated_tokens=estimate_tokens(prompt) + self.max_tokens
+        )
     
     def _parse_market_insights(self, response_text: str) -> Dict[str, Any]:
         """Parse market analysis response into structured insights."""
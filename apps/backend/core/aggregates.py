@@ -0,0 +1,109 @@
+"""
+Single-pass aggregate queries for dashboards.
+
+Dashboards used to issue one ``count()`` per status, priority or type and
+average durations in Python. The helpers here build aggregate expressions
+(counts and sums restricted with ``FILTER (WHERE ...)``, per-value
+breakdowns, durations computed in SQL) and ``aggregate`` evaluates a
+whole nested mapping of them with a single SELECT.
+"""
+
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import and_, func, literal_column
+from sqlalchemy.orm import Query
+
+
+def count_where(*conditions):
+    """``COUNT(*) FILTER (WHERE ...)``; counts every row without conditions."""
+    if not conditions:
+        return func.count()
+    return func.count().filter(and_(*conditions))
+
+
+def sum_where(expression, *conditions):
+    """Sum of ``expression`` over the rows matching ``conditions``, 0 when none do."""
+    total = func.sum(expression)
+    if conditions:
+        total = total.filter(and_(*conditions))
+    return func.coalesce(total, 0)
+
+
+def avg_where(expression, *conditions):
+    """Average of ``expression`` over the rows matching ``conditions`` (NULL when none do)."""
+    average = func.avg(expression)
+    return average.filter(and_(*conditions)) if conditions else average
+
+
+def count_by(column, values: Iterable[Any], *conditions) -> Dict[str, Any]:
+    """
+    One filtered count per value of ``column``.
+
+    ``values`` may be enum members; their ``value`` is used both for the
+    comparison and as the result key, so a breakdown lists every value,
+    including the ones with no rows.
+    """
+    breakdown = {}
+    for value in values:
+        value = getattr(value, "value", value)
+        breakdown[value] = count_where(column == value, *conditions)
+    return breakdown
+
+
+def seconds_between(start, end, dialect: str):
+    """SQL expression for the seconds from ``start`` to ``end`` on ``dialect``."""
+    if dialect == "postgresql":
+        return func.extract("epoch", end - start)
+    if dialect == "sqlite":
+        return (func.julianday(end) - func.julianday(start)) * 86400
+    if dialect in ("mysql", "mariadb"):
+        return func.timestampdiff(literal_column("SECOND"), start, end)
+    raise ValueError(f"Durations are not supported on {dialect}")
+
+
+def _flatten(
+    expressions: Dict[str, Any], path: Tuple[str, ...] = ()
+) -> List[Tuple[Tuple[str, ...], Any]]:
+    flat = []
+    for key, expression in expressions.items():
+        if isinstance(expression, dict):
+            flat.extend(_flatten(expression, path + (key,)))
+        else:
+            flat.append((path + (key,), expression))
+    return flat
+
+
+def aggregate(query: Query, expressions: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Evaluate a nested mapping of aggregate expressions in one SELECT.
+
+    Args:
+        query: ORM query over a single entity; its filters restrict every
+            expression
+        expressions: Aggregate expressions, optionally nested in dicts
+
+    Returns:
+        The same mapping with each expression replaced by its value
+
+    Example:
+        aggregate(db.query(Task).filter(Task.created_at >= start), {
+            "total": count_where(),
+            "by_status": count_by(Task.status, TaskStatus),
+        })
+    """
+    flat = _flatten(expressions)
+    if not flat:
+        return {}
+
+    # Name the entity explicitly: expressions like count(*) carry no FROM
+    entity = query.column_descriptions[0]["entity"]
+    statement = query.with_entities(*(expression for _, expression in flat)).statement
+    row = query.session.execute(statement.select_from(entity)).one()
+
+    result: Dict[str, Any] = {}
+    for (path, _), value in zip(flat, row):
+        target = result
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        target[path[-1]] = value
+    return result
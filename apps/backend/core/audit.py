@@ -1,15 +1,272 @@
 """
 Audit logging functionality for tracking user actions.
+
+``audit_log`` never touches the database on the request path. Events are
+put on a bounded queue and a background task writes them in batches to an
+append-only sink: the ``audit_events`` table or rotating JSONL files.
+High-volume actions (``access_granted``) are aggregated into one row per
+user, action and details per flush window. When the queue is full, events
+are counted as dropped rather than blocking the request; ``stats()``
+reports the queue depth, high-water mark and drops.
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 from datetime import datetime
-import uuid
+from pathlib import Path
+import asyncio
 import json
+import time
+import uuid
+
+from sqlalchemy import insert
+
 from ..core.logging import get_logger
+from .database import SessionLocal
+from .settings import settings
 
 logger = get_logger(__name__)
 
+# Actions recorded as per-window counts instead of one row per event
+AGGREGATED_ACTIONS = frozenset({"access_granted"})
+
+
+def _json_safe(value: Any) -> Any:
+    """Round-trip through JSON so details fit a JSON column."""
+    return json.loads(json.dumps(value, default=str))
+
+
+class AuditSink:
+    """Destination for batches of audit entries; ``write`` runs in a thread."""
+
+    def write(self, entries: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+
+class DatabaseAuditSink(AuditSink):
+    """Insert batches into the ``audit_events`` table with one statement."""
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    def write(self, entries: List[Dict[str, Any]]):
+        from ..db.models import AuditEvent
+
+        rows = [
+            {
+                **entry,
+                "id": uuid.UUID(entry["id"]),
+                "user_id": uuid.UUID(entry["user_id"]) if entry["user_id"] else None,
+                "occurred_at": datetime.fromisoformat(entry["occurred_at"]),
+            }
+            for entry in entries
+        ]
+        db = self.session_factory()
+        try:
+            db.execute(insert(AuditEvent.__table__), rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+class JsonlAuditSink(AuditSink):
+    """
+    Append batches to ``audit-YYYYMMDD.jsonl`` files in ``directory``.
+
+    A file that grows past ``max_bytes`` is rotated to
+    ``audit-YYYYMMDD.N.jsonl``.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 100 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def _current_path(self) -> Path:
+        path = self.directory / f"audit-{datetime.utcnow():%Y%m%d}.jsonl"
+        if path.exists() and path.stat().st_size >= self.max_bytes:
+            rotation = 1
+            while path.with_suffix(f".{rotation}.jsonl").exists():
+                rotation += 1
+            path.rename(path.with_suffix(f".{rotation}.jsonl"))
+        return path
+
+    def write(self, entries: List[Dict[str, Any]]):
+        lines = "".join(json.dumps(entry, default=str) + "\n" for entry in entries)
+        with open(self._current_path(), "a", encoding="utf-8") as handle:
+            handle.write(lines)
+
+
+class AuditPipeline:
+    """Bounded queue of audit entries drained in batches by a background task."""
+
+    def __init__(
+        self,
+        sink: Optional[AuditSink],
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        aggregated_actions: Iterable[str] = AGGREGATED_ACTIONS
+    ):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.aggregated_actions = frozenset(aggregated_actions)
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=max_queue)
+        # (user, action, resource type, details) -> [count, first entry, last timestamp]
+        self._aggregates: Dict[Tuple[str, ...], List[Any]] = {}
+        self._writer: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._batch_ready = asyncio.Event()
+
+        self.high_water = 0
+        self.dropped = 0
+        self.written = 0
+        self.aggregated = 0
+        self.batches = 0
+        self.write_errors = 0
+
+    def submit(self, entry: Dict[str, Any]):
+        """Queue an entry without waiting; counts a drop if the queue is full."""
+        if self.sink is None:
+            return
+
+        if entry["action"] in self.aggregated_actions:
+            key = (
+                entry["user_id"], entry["action"], entry["resource_type"],
+                json.dumps(entry["details"], sort_keys=True, default=str)
+            )
+            aggregate = self._aggregates.get(key)
+            if aggregate is None:
+                self._aggregates[key] = [1, entry, entry["occurred_at"]]
+            else:
+                aggregate[0] += 1
+                aggregate[2] = entry["occurred_at"]
+            self.aggregated += 1
+            return
+
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"Audit queue full; {self.dropped} events dropped so far")
+            return
+        queued = self._queue.qsize()
+        self.high_water = max(self.high_water, queued)
+        if queued >= self.batch_size:
+            self._batch_ready.set()
+
+    def _take_aggregates(self) -> List[Dict[str, Any]]:
+        aggregates, self._aggregates = self._aggregates, {}
+        entries = []
+        for count, first, last_seen in aggregates.values():
+            entries.append({
+                **first,
+                "count": count,
+                "details": {**first["details"], "last_seen": last_seen},
+            })
+        return entries
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        batch = []
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _write(self, entries: List[Dict[str, Any]]):
+        if not entries:
+            return
+        try:
+            await asyncio.to_thread(self.sink.write, entries)
+        except Exception as e:
+            self.write_errors += 1
+            self.dropped += len(entries)
+            logger.error(f"Failed to write {len(entries)} audit events: {e}")
+            return
+        self.written += len(entries)
+        self.batches += 1
+
+    async def flush(self):
+        """Write everything queued or aggregated so far."""
+        if self.sink is None:
+            return
+        async with self._flush_lock:
+            await self._write(self._take_aggregates())
+            while not self._queue.empty():
+                await self._write(self._take_batch())
+
+    async def _run(self):
+        next_flush = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                # Wake early once a full batch is waiting
+                await asyncio.wait_for(
+                    self._batch_ready.wait(), max(next_flush - time.monotonic(), 0)
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+
+            async with self._flush_lock:
+                while self._queue.qsize() >= self.batch_size:
+                    await self._write(self._take_batch())
+                if time.monotonic() >= next_flush:
+                    await self._write(self._take_aggregates())
+                    while not self._queue.empty():
+                        await self._write(self._take_batch())
+                    next_flush = time.monotonic() + self.flush_interval
+
+    def start(self):
+        """Start the background writer."""
+        if self.sink is None or (self._writer is not None and not self._writer.done()):
+            return
+        self._writer = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background writer and flush what is buffered."""
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sink": type(self.sink).__name__ if self.sink is not None else None,
+            "queued": self._queue.qsize(),
+            "capacity": self._queue.maxsize,
+            "high_water": self.high_water,
+            "pending_aggregates": len(self._aggregates),
+            "dropped": self.dropped,
+            "written": self.written,
+            "aggregated": self.aggregated,
+            "batches": self.batches,
+            "write_errors": self.write_errors,
+        }
+
+
+def _create_sink() -> Optional[AuditSink]:
+    """Create the audit sink from settings."""
+    if settings.AUDIT_SINK == "database":
+        return DatabaseAuditSink()
+    if settings.AUDIT_SINK == "jsonl":
+        return JsonlAuditSink(settings.AUDIT_LOG_DIR, settings.AUDIT_LOG_MAX_BYTES)
+    return None
+
+
+audit_pipeline = AuditPipeline(
+    _create_sink(),
+    max_queue=settings.AUDIT_QUEUE_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL_SECONDS
+)
+
 
 async def audit_log(
     user_id: uuid.UUID,
@@ -21,7 +278,7 @@ async def audit_log(
 ) -> None:
     """
     Log an audit event for compliance and security tracking.
-    
+
     Args:
         user_id: ID of the user performing the action
         action: Action being performed (e.g., 'task_created', 'task_updated')
@@ -32,19 +289,20 @@ async def audit_log(
     """
     audit_entry = {
         "id": str(uuid.uuid4()),
-        "timestamp": datetime.utcnow().isoformat(),
-        "user_id": str(user_id),
+        "occurred_at": datetime.utcnow().isoformat(),
+        "user_id": str(user_id) if user_id else None,
         "action": action,
         "resource_type": resource_type,
         "resource_id": str(resource_id) if resource_id else None,
-        "details": details or {},
-        "ip_address": ip_address
+        "details": _json_safe(details) if details else {},
+        "ip_address": ip_address,
+        "count": 1
     }
-    
-    # Log to structured logger
-    logger.info("audit_event", **audit_entry)
-    
-    # In production, would also:
-    # 1. Write to audit database table
-    # 2. Send to SIEM system
-    # 3. Trigger alerts for sensitive actions
\ No newline at end of file
+
+    # Log to structured logger; aggregated actions are too frequent for info
+    if action in audit_pipeline.aggregated_actions:
+        logger.debug("audit_event", **audit_entry)
+    else:
+        logger.info("audit_event", **audit_entry)
+
+    audit_pipeline.submit(audit_entry)
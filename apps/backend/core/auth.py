@@ -1,19 +1,35 @@
 """
 Authentication utilities for BrainOps backend.
+
+Verified principals are cached for a few seconds per token (keyed by a
+SHA-256 digest, never the token itself), so repeated requests skip the user
+query and, for API keys, the bcrypt check. Updates to a user, API key or
+session evict its entries; the TTL bounds staleness on other workers.
+Session activity and API key usage are buffered and written in batches.
 """
 
+import asyncio
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 import jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, event, update
+from sqlalchemy.orm import Session, make_transient_to_detached
 
 from .settings import settings
-from .database import get_db
+from .database import get_db, SessionLocal
+from .logging import get_logger
 from ..db.business_models import User, APIKey, UserSession, UserRole
 
+logger = get_logger(__name__)
+
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -119,6 +135,268 @@ def decode_token(token: str) -> Dict[str, Any]:
         )
 
 
+class Principal:
+    """A verified identity: a snapshot of the user plus what vouched for it."""
+
+    __slots__ = ("user_values", "session_id", "api_key_id", "api_key_expires_at", "expires_at")
+
+    def __init__(
+        self,
+        user: User,
+        session_id: Optional[str] = None,
+        api_key_id: Optional[Any] = None,
+        api_key_expires_at: Optional[datetime] = None
+    ):
+        self.user_values = {
+            column.key: copy.deepcopy(getattr(user, column.key))
+            for column in User.__mapper__.column_attrs
+        }
+        self.session_id = session_id
+        self.api_key_id = api_key_id
+        self.api_key_expires_at = api_key_expires_at
+        # Set by PrincipalCache.put
+        self.expires_at = 0.0
+
+    @property
+    def user_id(self) -> Any:
+        return self.user_values["id"]
+
+    def attach(self, db: Session) -> User:
+        """Return the user bound to ``db`` without querying the database."""
+        user = User(**copy.deepcopy(self.user_values))
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+
+class PrincipalCache:
+    """
+    Short-lived LRU of verified principals keyed by token digest.
+
+    Entries expire after ``ttl`` seconds or when their token does, whichever
+    comes first, and can be revoked by user, API key or session.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Principal]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[Principal]:
+        if self.ttl <= 0:
+            return None
+        key = self.digest(token)
+        with self._lock:
+            principal = self._entries.get(key)
+            if principal is None or principal.expires_at <= time.time():
+                if principal is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return principal
+
+    def put(self, token: str, principal: Principal, token_expires_at: Optional[float] = None):
+        if self.ttl <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        principal.expires_at = expires_at
+        with self._lock:
+            key = self.digest(token)
+            self._entries[key] = principal
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _revoke_where(self, predicate) -> int:
+        with self._lock:
+            stale = [key for key, principal in self._entries.items() if predicate(principal)]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def revoke_token(self, token: str) -> bool:
+        with self._lock:
+            return self._entries.pop(self.digest(token), None) is not None
+
+    def revoke_user(self, user_id: Any) -> int:
+        user_id = str(user_id)
+        return self._revoke_where(lambda principal: str(principal.user_id) == user_id)
+
+    def revoke_api_key(self, key_id: Any) -> int:
+        key_id = str(key_id)
+        return self._revoke_where(lambda principal: str(principal.api_key_id) == key_id)
+
+    def revoke_session(self, session_id: Any) -> int:
+        session_id = str(session_id)
+        return self._revoke_where(lambda principal: str(principal.session_id) == session_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class ActivityRecorder:
+    """
+    Buffers session activity and API key usage and writes them in batches.
+
+    ``flush`` runs on its own database session so it never commits a
+    request's pending changes. Usage counts from a failed flush are kept for
+    the next one; activity timestamps are simply superseded.
+    """
+
+    def __init__(self, interval: float = 30.0, session_factory=SessionLocal):
+        self.interval = interval
+        self.session_factory = session_factory
+        # session id -> (user id, last activity)
+        self._sessions: Dict[str, Tuple[Any, datetime]] = {}
+        # API key id -> (uses, last used)
+        self._api_keys: Dict[Any, Tuple[int, datetime]] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._flusher: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._sessions) + len(self._api_keys)
+
+    def touch_session(self, session_id: str, user_id: Any):
+        with self._lock:
+            self._sessions[str(session_id)] = (user_id, datetime.utcnow())
+        self._maybe_flush()
+
+    def record_api_key_use(self, key_id: Any):
+        with self._lock:
+            uses, _ = self._api_keys.get(key_id, (0, None))
+            self._api_keys[key_id] = (uses + 1, datetime.utcnow())
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        # Without a background flusher, flush inline once per interval
+        if self._flusher is not None and not self._flusher.done():
+            return
+        if time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write buffered activity; returns the number of rows targeted."""
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+            api_keys, self._api_keys = self._api_keys, {}
+            self._last_flush = time.monotonic()
+        if not sessions and not api_keys:
+            return 0
+
+        sessions_table = UserSession.__table__
+        api_keys_table = APIKey.__table__
+        db = self.session_factory()
+        try:
+            if sessions:
+                db.execute(
+                    update(sessions_table)
+                    .where(
+                        sessions_table.c.id == bindparam("session_id"),
+                        sessions_table.c.user_id == bindparam("owner_id"),
+                        sessions_table.c.is_active == True
+                    )
+                    .values(last_activity=bindparam("seen_at")),
+                    [
+                        {"session_id": session_id, "owner_id": user_id, "seen_at": seen_at}
+                        for session_id, (user_id, seen_at) in sessions.items()
+                    ]
+                )
+            if api_keys:
+                db.execute(
+                    update(api_keys_table)
+                    .where(api_keys_table.c.id == bindparam("key_id"))
+                    .values(
+                        usage_count=api_keys_table.c.usage_count + bindparam("uses"),
+                        last_used_at=bindparam("used_at")
+                    ),
+                    [
+                        {"key_id": key_id, "uses": uses, "used_at": used_at}
+                        for key_id, (uses, used_at) in api_keys.items()
+                    ]
+                )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to record auth activity: {e}")
+            with self._lock:
+                for key_id, (uses, used_at) in api_keys.items():
+                    pending_uses, _ = self._api_keys.get(key_id, (0, None))
+                    self._api_keys[key_id] = (pending_uses + uses, used_at)
+            return 0
+        finally:
+            db.close()
+        return len(sessions) + len(api_keys)
+
+    def start(self, interval: Optional[float] = None):
+        """Start flushing in the background every ``interval`` seconds."""
+        if self._flusher is not None and not self._flusher.done():
+            return
+        interval = interval or self.interval
+
+        async def _flush_periodically():
+            while True:
+                await asyncio.sleep(interval)
+                await asyncio.to_thread(self.flush)
+
+        self._flusher = asyncio.create_task(_flush_periodically())
+
+    async def stop(self):
+        """Stop the background flusher and write what is buffered."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await asyncio.to_thread(self.flush)
+
+
+principal_cache = PrincipalCache(
+    ttl=settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS,
+    max_entries=settings.AUTH_PRINCIPAL_CACHE_MAX_ENTRIES
+)
+activity_recorder = ActivityRecorder(interval=settings.AUTH_ACTIVITY_FLUSH_SECONDS)
+
+
+# Any ORM change to a user, key or session drops the principals it vouched for
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _revoke_user_principals(mapper, connection, target):
+    principal_cache.revoke_user(target.id)
+
+
+@event.listens_for(APIKey, "after_update")
+@event.listens_for(APIKey, "after_delete")
+def _revoke_api_key_principals(mapper, connection, target):
+    principal_cache.revoke_api_key(target.id)
+
+
+@event.listens_for(UserSession, "after_update")
+@event.listens_for(UserSession, "after_delete")
+def _revoke_session_principals(mapper, connection, target):
+    principal_cache.revoke_session(target.id)
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -141,6 +419,12 @@ async def get_current_user(
     # Check if it's an API key
     if token.startswith("brainops_"):
         return await authenticate_api_key(token, db)
+
+    principal = principal_cache.get(token)
+    if principal is not None:
+        if principal.session_id:
+            activity_recorder.touch_session(principal.session_id, principal.user_id)
+        return principal.attach(db)
     
     # Otherwise, treat as JWT token
     try:
@@ -194,15 +478,11 @@ async def get_current_user(
     # Update last activity if session tracking
     session_id = payload.get("session_id")
     if session_id:
-        session = db.query(UserSession).filter(
-            UserSession.id == session_id,
-            UserSession.user_id == user.id,
-            UserSession.is_active == True
-        ).first()
-        
-        if session:
-            session.last_activity = datetime.utcnow()
-            db.commit()
+        activity_recorder.touch_session(session_id, user.id)
+
+    principal_cache.put(
+        token, Principal(user, session_id=session_id), token_expires_at=payload.get("exp")
+    )
     
     return user
 
@@ -221,6 +501,17 @@ async def authenticate_api_key(api_key: str, db: Session) -> User:
     Raises:
         HTTPException: If authentication fails
     """
+    principal = principal_cache.get(api_key)
+    if principal is not None:
+        if principal.api_key_expires_at and principal.api_key_expires_at < datetime.utcnow():
+            principal_cache.revoke_token(api_key)
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="API key has expired"
+            )
+        activity_recorder.record_api_key_use(principal.api_key_id)
+        return principal.attach(db)
+
     # Find API key in database
     key_record = db.query(APIKey).filter(
         APIKey.prefix == api_key[:12],
@@ -247,11 +538,6 @@ async def authenticate_api_key(api_key: str, db: Session) -> User:
             detail="API key has expired"
         )
     
-    # Update usage
-    key_record.last_used_at = datetime.utcnow()
-    key_record.usage_count += 1
-    db.commit()
-    
     # Get user
     user = db.query(User).filter(User.id == key_record.user_id).first()
     
@@ -260,6 +546,12 @@ async def authenticate_api_key(api_key: str, db: Session) -> User:
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User account is disabled"
         )
+
+    # Update usage
+    activity_recorder.record_api_key_use(key_record.id)
+    principal_cache.put(api_key, Principal(
+        user, api_key_id=key_record.id, api_key_expires_at=key_record.expires_at
+    ))
     
     return user
 
@@ -381,6 +673,8 @@ def invalidate_user_tokens(user: User, db: Session):
     ).update({"is_active": False})
     
     db.commit()
+    # Bulk updates skip ORM events, so evict cached principals explicitly
+    principal_cache.revoke_user(user.id)
 
 
 def require_admin(current_user: User = Depends(get_current_user)) -> User:
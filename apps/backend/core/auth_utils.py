@@ -6,6 +6,7 @@ from typing import Optional
 from datetime import datetime
 from sqlalchemy.orm import Session
 from ..db.business_models import User
+from .auth import principal_cache
 import uuid
 
 async def get_user_by_email(email: str, db: Session) -> Optional[User]:
@@ -51,7 +52,8 @@ async def update_user_last_login(user_id: str, db: Session):
 async def invalidate_refresh_token(refresh_token: str, user_id: str, db: Session):
     """Invalidate a refresh token (stub for now)."""
     # TODO: Implement token blacklist table
-    pass
+    # Make the user's next request re-verify instead of using a cached principal
+    principal_cache.revoke_user(user_id)
 
 
 async def validate_refresh_token(refresh_token: str, user_id: str, db: Session) -> bool:
@@ -85,7 +87,7 @@ async def update_user_password(user_id: str, new_hashed_password: str, db: Sessi
 async def invalidate_all_user_tokens(user_id: str, db: Session):
     """Invalidate all tokens for a user (stub for now)."""
     # TODO: Implement token blacklist
-    pass
+    principal_cache.revoke_user(user_id)
 
 
 async def verify_email_token(token: str, db: Session) -> Optional[User]:
@@ -1,125 +1,851 @@
 """
 Caching utilities for performance optimization.
+
+Cached values live in a bounded, in-process LRU tier. When ``REDIS_URL`` is
+configured a shared Redis tier sits behind it so that every uvicorn worker
+sees the same entries; local misses fall through to Redis and are promoted
+back into the LRU.
 """
 
-from functools import wraps
-from typing import Any, Callable, Optional
+import asyncio
+import fnmatch
 import hashlib
-import json
-from datetime import datetime, timedelta
+import pickle
+import sys
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+from uuid import UUID
+
+from fastapi import BackgroundTasks
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from starlette.responses import Response
+
 from ..core.logging import get_logger
+from .database import SessionLocal
+from .settings import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - redis is an optional dependency
+    aioredis = None
 
 logger = get_logger(__name__)
 
-# In-memory cache for development
-# In production, would use Redis
-_cache_store = {}
 
-def cache_key_builder(*args, **kwargs) -> str:
-    """Build a cache key from function arguments."""
-    key_parts = [str(arg) for arg in args]
-    key_parts.extend([f"{k}:{v}" for k, v in sorted(kwargs.items())])
-    return hashlib.md5(":".join(key_parts).encode()).hexdigest()
+class CacheEntry:
+    """
+    A cached value with its expiry times (``time.time()`` based).
+
+    The value is fresh until ``expires_at``. Between ``expires_at`` and
+    ``stale_until`` it may still be served while a refresh runs in the
+    background; after ``stale_until`` the entry is gone.
+
+    ``tags`` records the version of every tag the entry depends on at the
+    time it was computed; bumping any of those versions invalidates it.
+    """
+
+    __slots__ = ("value", "expires_at", "stale_until", "size", "tags")
+
+    def __init__(
+        self,
+        value: Any,
+        expires_at: float,
+        stale_until: Optional[float] = None,
+        size: int = 0,
+        tags: Optional[Dict[str, int]] = None
+    ):
+        self.value = value
+        self.expires_at = expires_at
+        self.stale_until = max(expires_at, stale_until or expires_at)
+        self.size = size
+        self.tags = tags
+
+    def is_stale(self, now: Optional[float] = None) -> bool:
+        return (now if now is not None else time.time()) >= self.expires_at
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        return (now if now is not None else time.time()) >= self.stale_until
+
+    def remaining_ttl(self, now: Optional[float] = None) -> float:
+        return self.stale_until - (now if now is not None else time.time())
+
+    def __getstate__(self):
+        return (self.value, self.expires_at, self.stale_until, self.size, self.tags)
+
+    def __setstate__(self, state):
+        self.value, self.expires_at, self.stale_until, self.size, self.tags = state
+
+
+def _estimate_size(value: Any) -> int:
+    """Approximate the memory footprint of a value in bytes."""
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class CacheBackend:
+    """Interface implemented by every cache tier."""
+
+    async def get_entry(self, key: str) -> Optional[CacheEntry]:
+        raise NotImplementedError
+
+    async def set_entry(self, key: str, entry: CacheEntry):
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> bool:
+        raise NotImplementedError
+
+    async def keys(self, pattern: str = "*") -> List[str]:
+        raise NotImplementedError
+
+    async def clear(self):
+        raise NotImplementedError
+
+    async def get_tag_versions(self, tags: Iterable[str]) -> Dict[str, int]:
+        raise NotImplementedError
+
+    async def bump_tags(self, tags: Iterable[str]) -> Dict[str, int]:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Bounded in-process LRU cache.
+
+    Entries are evicted least-recently-used first once either ``max_entries``
+    or ``max_bytes`` is exceeded. Expired entries are dropped on read and by
+    ``sweep_expired``, which the owning ``Cache`` runs periodically.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._tag_versions: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def _remove(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+        return entry
+
+    async def get_entry(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.is_expired():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    async def set_entry(self, key: str, entry: CacheEntry):
+        if not entry.size:
+            entry.size = _estimate_size(entry.value)
+
+        self._remove(key)
+        if entry.size > self.max_bytes:
+            logger.debug(f"Not caching {key}: {entry.size} bytes exceeds tier limit")
+            return
+
+        self._entries[key] = entry
+        self._bytes += entry.size
+
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    async def delete(self, key: str) -> bool:
+        return self._remove(key) is not None
+
+    async def keys(self, pattern: str = "*") -> List[str]:
+        if pattern == "*":
+            return list(self._entries.keys())
+        return [key for key in self._entries if fnmatch.fnmatchcase(key, pattern)]
+
+    async def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    async def get_tag_versions(self, tags: Iterable[str]) -> Dict[str, int]:
+        return {tag: self._tag_versions.get(tag, 0) for tag in tags}
+
+    async def bump_tags(self, tags: Iterable[str]) -> Dict[str, int]:
+        for tag in tags:
+            self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+        return await self.get_tag_versions(tags)
+
+    def sweep_expired(self) -> int:
+        """Drop every expired entry and return how many were removed."""
+        now = time.time()
+        expired = [key for key, entry in self._entries.items() if entry.is_expired(now)]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Shared cache tier speaking the Redis protocol.
+
+    Works with a ``redis.asyncio`` client or with ``LocalRedis``. Entries are
+    pickled and stored with a Redis-side TTL matching their expiry. Tag
+    versions are plain counters under ``tag_prefix`` so every worker sees
+    the same invalidations.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        prefix: str = "brainops:cache:",
+        tag_prefix: str = "brainops:cache-tag:"
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.tag_prefix = tag_prefix
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.tag_prefix}{tag}"
+
+    async def get_entry(self, key: str) -> Optional[CacheEntry]:
+        raw = await self.client.get(self._key(key))
+        if raw is None:
+            return None
+
+        try:
+            entry = pickle.loads(raw)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry {key}: {e}")
+            await self.client.delete(self._key(key))
+            return None
+
+        if not isinstance(entry, CacheEntry) or entry.is_expired():
+            return None
+        return entry
+
+    async def set_entry(self, key: str, entry: CacheEntry):
+        ttl_ms = int(entry.remaining_ttl() * 1000)
+        if ttl_ms <= 0:
+            return
+        payload = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        await self.client.set(self._key(key), payload, px=ttl_ms)
+
+    async def delete(self, key: str) -> bool:
+        return bool(await self.client.delete(self._key(key)))
+
+    async def keys(self, pattern: str = "*") -> List[str]:
+        keys = []
+        async for name in self.client.scan_iter(match=self._key(pattern)):
+            if isinstance(name, bytes):
+                name = name.decode("utf-8")
+            keys.append(name[len(self.prefix):])
+        return keys
+
+    async def clear(self):
+        for key in await self.keys():
+            await self.client.delete(self._key(key))
+
+    async def get_tag_versions(self, tags: Iterable[str]) -> Dict[str, int]:
+        tags = list(tags)
+        if not tags:
+            return {}
+        raw = await self.client.mget([self._tag_key(tag) for tag in tags])
+        return {tag: int(value) if value is not None else 0 for tag, value in zip(tags, raw)}
+
+    async def bump_tags(self, tags: Iterable[str]) -> Dict[str, int]:
+        return {tag: int(await self.client.incr(self._tag_key(tag))) for tag in tags}
+
+
+def _is_cacheable(value: Any) -> bool:
+    """Streaming/file responses are single-use and must not be cached."""
+    return value is not None and not isinstance(value, Response)
+
+
+def _consume_task_exception(task: asyncio.Task):
+    """Log failures of cache computations nobody is awaiting any more."""
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.debug(f"Cache computation failed: {exc}")
+
+
+class Cache:
+    """
+    Two-tier cache: a local LRU in front of an optional shared backend.
+
+    Failures in the shared tier are logged and treated as misses so the
+    application keeps working (just slower) when Redis is unavailable.
+
+    Entries can be tagged (``entity:invoice``, ``user:<id>``...). Tags are
+    versioned rather than indexed, so ``invalidate_tags`` costs O(tags)
+    regardless of how many entries carry them; stale entries are detected
+    and dropped on their next read.
+    """
+
+    def __init__(
+        self,
+        local: Optional[MemoryCacheBackend] = None,
+        shared: Optional[CacheBackend] = None,
+        default_ttl: int = 300
+    ):
+        self.local = local or MemoryCacheBackend(
+            max_entries=settings.CACHE_MAX_ENTRIES,
+            max_bytes=settings.CACHE_MAX_BYTES
+        )
+        self.shared = shared
+        self.default_ttl = default_ttl
+        self.shared_errors = 0
+        self.coalesced = 0
+        self.stale_served = 0
+        self.refreshes = 0
+        self.tag_invalidations = 0
+        # In-flight computations per key (single-flight)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+
+    async def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """Look a key up locally, then in the shared tier."""
+        entry = await self.local.get_entry(key)
+        if entry is None and self.shared is not None:
+            try:
+                entry = await self.shared.get_entry(key)
+            except Exception as e:
+                self.shared_errors += 1
+                logger.warning(f"Shared cache read failed for {key}: {e}")
+                return None
+
+            if entry is not None:
+                await self.local.set_entry(key, entry)
 
+        if entry is not None and entry.tags:
+            if await self.tag_versions(entry.tags) != entry.tags:
+                self.tag_invalidations += 1
+                await self.local.delete(key)
+                return None
+        return entry
 
-def cache_result(ttl: int = 300, key_builder: Optional[Callable] = None):
+    async def tag_versions(self, tags: Iterable[str]) -> Dict[str, int]:
+        """Return the current version of each tag."""
+        tags = list(tags)
+        if not tags:
+            return {}
+        if self.shared is not None:
+            try:
+                return await self.shared.get_tag_versions(tags)
+            except Exception as e:
+                self.shared_errors += 1
+                logger.warning(f"Shared cache tag lookup failed: {e}")
+        return await self.local.get_tag_versions(tags)
+
+    async def invalidate_tags(self, *tags: str):
+        """Invalidate every entry carrying any of the given tags."""
+        if not tags:
+            return
+        await self.local.bump_tags(tags)
+        if self.shared is not None:
+            try:
+                await self.shared.bump_tags(tags)
+            except Exception as e:
+                self.shared_errors += 1
+                logger.warning(f"Shared cache tag invalidation failed for {tags}: {e}")
+        logger.debug(f"Invalidated cache tags {tags}")
+
+    async def set_entry(self, key: str, entry: CacheEntry):
+        """Write an entry to every tier."""
+        await self.local.set_entry(key, entry)
+        if self.shared is None:
+            return
+
+        try:
+            await self.shared.set_entry(key, entry)
+        except Exception as e:
+            self.shared_errors += 1
+            logger.warning(f"Shared cache write failed for {key}: {e}")
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        """Return the value for a key if it is present and fresh."""
+        entry = await self.get_entry(key)
+        if entry is None or entry.is_stale():
+            return default
+        return entry.value
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        stale_ttl: int = 0,
+        tags: Optional[Iterable[str]] = None
+    ):
+        """
+        Store a value.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Seconds the value stays fresh (default: ``default_ttl``)
+            stale_ttl: Extra seconds a stale value may be served by
+                ``get_or_compute`` while it is refreshed
+            tags: Tags whose invalidation should evict this entry
+        """
+        versions = await self.tag_versions(tags or ())
+        await self._store(key, value, ttl, stale_ttl, versions)
+
+    async def _store(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int],
+        stale_ttl: int,
+        versions: Dict[str, int]
+    ):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.time() + ttl
+        await self.set_entry(
+            key, CacheEntry(value, expires_at, expires_at + stale_ttl, tags=versions or None)
+        )
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None,
+        stale_ttl: int = 0,
+        refresh: Optional[Callable[[], Awaitable[Any]]] = None,
+        tags: Optional[Iterable[str]] = None
+    ) -> Any:
+        """
+        Return a cached value, computing it at most once per key at a time.
+
+        Concurrent misses for the same key share a single call to
+        ``compute``. When the entry is stale but still inside its
+        ``stale_ttl`` window the old value is returned immediately and a
+        refresh runs in the background.
+
+        Args:
+            key: Cache key
+            compute: Coroutine factory producing the value on a miss
+            ttl: Seconds the value stays fresh
+            stale_ttl: Stale-while-revalidate window in seconds (0 disables)
+            refresh: Coroutine factory used for background refreshes
+                (defaults to ``compute``)
+            tags: Tags whose invalidation should evict the entry
+
+        Returns:
+            The cached or freshly computed value
+        """
+        entry = await self.get_entry(key)
+        if entry is not None:
+            if not entry.is_stale():
+                return entry.value
+
+            self.stale_served += 1
+            if key not in self._inflight:
+                self.refreshes += 1
+                self._start_flight(key, refresh or compute, ttl, stale_ttl, tags)
+            return entry.value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = self._start_flight(key, compute, ttl, stale_ttl, tags)
+
+        # Shield so one cancelled caller does not abort the shared computation
+        return await asyncio.shield(task)
+
+    def _start_flight(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: Optional[int],
+        stale_ttl: int,
+        tags: Optional[Iterable[str]] = None
+    ) -> asyncio.Task:
+        """Run ``compute`` for a key and register it as in flight."""
+        async def _run():
+            try:
+                # Snapshot tag versions first so an invalidation that lands
+                # while computing marks the result as already stale
+                versions = await self.tag_versions(tags or ())
+                value = await compute()
+                if _is_cacheable(value):
+                    await self._store(key, value, ttl, stale_ttl, versions)
+                return value
+            finally:
+                self._inflight.pop(key, None)
+
+        task = asyncio.create_task(_run())
+        task.add_done_callback(_consume_task_exception)
+        self._inflight[key] = task
+        return task
+
+    async def delete(self, key: str) -> bool:
+        removed = await self.local.delete(key)
+        if self.shared is not None:
+            try:
+                removed = await self.shared.delete(key) or removed
+            except Exception as e:
+                self.shared_errors += 1
+                logger.warning(f"Shared cache delete failed for {key}: {e}")
+        return removed
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        return {key: await self.get(key) for key in keys}
+
+    async def set_many(self, mapping: Dict[str, Any], ttl: Optional[int] = None):
+        for key, value in mapping.items():
+            await self.set(key, value, ttl=ttl)
+
+    async def invalidate_pattern(self, pattern: str) -> int:
+        """Delete every key matching a glob pattern (e.g. ``user:123:*``)."""
+        keys = set(await self.local.keys(pattern))
+        if self.shared is not None:
+            try:
+                keys.update(await self.shared.keys(pattern))
+            except Exception as e:
+                self.shared_errors += 1
+                logger.warning(f"Shared cache scan failed for {pattern}: {e}")
+
+        for key in keys:
+            await self.delete(key)
+        return len(keys)
+
+    async def clear(self):
+        await self.local.clear()
+        if self.shared is not None:
+            try:
+                await self.shared.clear()
+            except Exception as e:
+                self.shared_errors += 1
+                logger.warning(f"Shared cache clear failed: {e}")
+
+    def start_sweeper(self, interval: Optional[float] = None):
+        """Start the background task that evicts expired local entries."""
+        if self._sweeper is not None and not self._sweeper.done():
+            return
+
+        interval = interval or settings.CACHE_SWEEP_INTERVAL_SECONDS
+
+        async def _sweep():
+            while True:
+                await asyncio.sleep(interval)
+                removed = self.local.sweep_expired()
+                if removed:
+                    logger.debug(f"Cache sweeper removed {removed} expired entries")
+
+        self._sweeper = asyncio.create_task(_sweep())
+
+    async def stop_sweeper(self):
+        """Cancel the background sweeper, if running."""
+        if self._sweeper is None:
+            return
+        self._sweeper.cancel()
+        try:
+            await self._sweeper
+        except asyncio.CancelledError:
+            pass
+        self._sweeper = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "local": self.local.stats(),
+            "shared": type(self.shared).__name__ if self.shared is not None else None,
+            "shared_errors": self.shared_errors,
+            "coalesced": self.coalesced,
+            "stale_served": self.stale_served,
+            "refreshes": self.refreshes,
+            "tag_invalidations": self.tag_invalidations,
+            "in_flight": len(self._inflight),
+        }
+
+
+def _create_redis_client() -> Optional[Any]:
+    """Create the shared Redis client from settings, if configured."""
+    if not settings.REDIS_URL:
+        return None
+    if aioredis is None:
+        logger.warning("REDIS_URL is set but the redis package is not installed")
+        return None
+    return aioredis.from_url(settings.REDIS_URL)
+
+
+redis_client = _create_redis_client()
+
+default_cache = Cache(
+    shared=RedisCacheBackend(redis_client) if redis_client is not None else None
+)
+
+
+class _Uncacheable(Exception):
+    """Raised when a call argument cannot be turned into a safe cache key."""
+
+
+# Arguments that never influence a cached result
+_IGNORED_ARG_TYPES = (Session, BackgroundTasks)
+
+
+def _key_part(value: Any) -> str:
+    """Render one argument as a deterministic cache key component."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return str(value)
+    if isinstance(value, Enum):
+        return str(value.value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump_json()
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(_key_part(item) for item in value) + "]"
+    if isinstance(value, (set, frozenset)):
+        return "{" + ",".join(sorted(_key_part(item) for item in value)) + "}"
+    if isinstance(value, dict):
+        return "{" + ",".join(
+            f"{k}={_key_part(v)}" for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))
+        ) + "}"
+    if getattr(value, "id", None) is not None:
+        # Model objects such as current_user scope the key to their identity
+        return f"{type(value).__name__}:{value.id}"
+    raise _Uncacheable(type(value).__name__)
+
+
+def cache_key_builder(
+    *args,
+    namespace: Optional[str] = None,
+    request: Any = None,
+    **kwargs
+) -> str:
+    """
+    Build a readable cache key from function arguments.
+
+    Database sessions and background task queues are ignored; model objects
+    contribute their id so results are scoped per user. When a request is
+    given, its path and query parameters are included.
+    """
+    key_parts = [namespace] if namespace else []
+    key_parts.extend(
+        _key_part(arg) for arg in args if not isinstance(arg, _IGNORED_ARG_TYPES)
+    )
+    if request is not None:
+        key_parts.append(str(request.url.path))
+        key_parts.extend(f"{k}={v}" for k, v in sorted(request.query_params.items()))
+    key_parts.extend(
+        f"{k}={_key_part(v)}" for k, v in sorted(kwargs.items())
+        if not isinstance(v, _IGNORED_ARG_TYPES)
+    )
+    return ":".join(key_parts)
+
+
+def cache_result(
+    ttl: int = 300,
+    key_builder: Optional[Callable] = None,
+    stale_ttl: int = 0,
+    tags: Optional[Union[Iterable[str], Callable[..., Iterable[str]]]] = None
+):
     """
     Decorator to cache function results.
-    
+
+    Concurrent calls that miss on the same key are coalesced into a single
+    execution of the wrapped function. Keys include every argument (model
+    objects such as ``current_user`` by id), so results are never shared
+    between users; calls with arguments that cannot be keyed bypass the
+    cache.
+
     Args:
         ttl: Time to live in seconds (default: 5 minutes)
-        key_builder: Optional custom key builder function
+        key_builder: Optional custom key builder, called with the function
+            name followed by the call's arguments
+        stale_ttl: Seconds after ``ttl`` during which the previous result is
+            served while a background refresh recomputes it (default: off).
+            Refreshes run on their own database sessions.
+        tags: Tags for targeted invalidation via ``invalidate_tags``. Either
+            templates formatted with the call's keyword arguments (e.g.
+            ``"invoice:{invoice_id}"``) or a callable returning tags. The
+            caller's ``user:<id>`` tag is always added.
     """
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            # Generate cache key
-            cache_key = _generate_cache_key(func.__name__, args, kwargs)
-            
-            # Check cache
-            cached = _get_from_cache(cache_key)
-            if cached is not None:
-                logger.debug(f"Cache hit for {func.__name__}")
-                return cached
-            
-            # Execute function
-            result = await func(*args, **kwargs)
-            
-            # Store in cache
-            _store_in_cache(cache_key, result, ttl)
-            
-            return result
-        
+            try:
+                # Generate cache key
+                if key_builder is not None:
+                    cache_key = key_builder(func.__name__, *args, **kwargs)
+                else:
+                    cache_key = _generate_cache_key(func.__name__, args, kwargs)
+                cache_tags = _resolve_tags(tags, args, kwargs)
+            except _Uncacheable as e:
+                logger.debug(f"Not caching {func.__name__}: {e}")
+                return await func(*args, **kwargs)
+
+            return await default_cache.get_or_compute(
+                cache_key,
+                lambda: func(*args, **kwargs),
+                ttl=ttl,
+                stale_ttl=stale_ttl,
+                refresh=_refresh_with_own_sessions(func, args, kwargs),
+                tags=cache_tags
+            )
+
         return wrapper
     return decorator
 
 
-def invalidate_cache(pattern: Optional[str] = None):
+def _resolve_tags(tags: Any, args: tuple, kwargs: dict) -> List[str]:
+    """Expand a ``cache_result`` tags spec for one call."""
+    resolved = []
+    if callable(tags):
+        resolved.extend(tags(*args, **kwargs))
+    else:
+        for template in tags or ():
+            try:
+                resolved.append(template.format(**kwargs))
+            except (KeyError, AttributeError, IndexError) as e:
+                # A tag we cannot build is an invalidation we would miss
+                raise _Uncacheable(f"cannot resolve tag {template!r}: {e}")
+
+    resolved.extend(scope_tags(kwargs.get("current_user")))
+    return resolved
+
+
+def scope_tags(user: Any) -> List[str]:
+    """Return the tenant/user scope tags for a principal."""
+    if user is None or getattr(user, "id", None) is None:
+        return []
+    scope = [f"user:{user.id}"]
+    tenant_id = getattr(user, "tenant_id", None)
+    if tenant_id is not None:
+        scope.append(f"tenant:{tenant_id}")
+    return scope
+
+
+def entity_tags(entity_type: str, entity_id: Any = None) -> List[str]:
+    """
+    Return the tags describing an entity.
+
+    ``entity:<type>`` covers lists, dashboards and analytics over that
+    entity type; ``<type>:<id>`` covers views of one record.
+    """
+    entity = [f"entity:{entity_type}"]
+    if entity_id is not None:
+        entity.append(f"{entity_type}:{entity_id}")
+    return entity
+
+
+async def invalidate_tags(*tags: str):
+    """Invalidate every cached entry carrying any of the given tags."""
+    await default_cache.invalidate_tags(*tags)
+
+
+def _refresh_with_own_sessions(func: Callable, args: tuple, kwargs: dict) -> Callable:
+    """
+    Build a background refresh for a cached call.
+
+    The request that triggered the refresh may already have closed its
+    database session, so any ``Session`` argument is swapped for a new one
+    that lives only as long as the refresh.
+    """
+    async def _refresh():
+        sessions = []
+
+        def _swap(value):
+            if isinstance(value, Session):
+                session = SessionLocal()
+                sessions.append(session)
+                return session
+            return value
+
+        try:
+            return await func(
+                *[_swap(arg) for arg in args],
+                **{k: _swap(v) for k, v in kwargs.items()}
+            )
+        finally:
+            for session in sessions:
+                session.close()
+
+    return _refresh
+
+
+async def invalidate_cache(pattern: Optional[str] = None) -> int:
     """
     Invalidate cached entries.
-    
+
     Args:
-        pattern: Optional pattern to match cache keys
+        pattern: Optional substring to match cache keys
+
+    Returns:
+        Number of entries removed (0 when the whole cache is cleared)
     """
     if pattern is None:
         # Clear all cache
-        _cache_store.clear()
+        await default_cache.clear()
         logger.info("Cleared entire cache")
-    else:
-        # Clear matching keys
-        keys_to_remove = [
-            key for key in _cache_store.keys()
-            if pattern in key
-        ]
-        for key in keys_to_remove:
-            del _cache_store[key]
-        logger.info(f"Cleared {len(keys_to_remove)} cache entries matching {pattern}")
+        return 0
 
+    removed = await default_cache.invalidate_pattern(f"*{pattern}*")
+    logger.info(f"Cleared {removed} cache entries matching {pattern}")
+    return removed
 
-def _generate_cache_key(func_name: str, args: tuple, kwargs: dict) -> str:
-    """Generate a unique cache key."""
-    # Create a string representation of arguments
-    key_parts = [func_name]
-    
-    # Add positional arguments
-    for arg in args:
-        if hasattr(arg, 'id'):  # Handle model objects
-            key_parts.append(f"id:{arg.id}")
-        elif isinstance(arg, (str, int, float, bool)):
-            key_parts.append(str(arg))
-        else:
-            # Skip complex objects that can't be easily serialized
-            continue
-    
-    # Add keyword arguments
-    for k, v in sorted(kwargs.items()):
-        if isinstance(v, (str, int, float, bool)):
-            key_parts.append(f"{k}:{v}")
-    
-    # Generate hash
-    key_string = "|".join(key_parts)
-    return hashlib.md5(key_string.encode()).hexdigest()
-
-
-def _get_from_cache(key: str) -> Optional[Any]:
-    """Get value from cache if not expired."""
-    if key in _cache_store:
-        entry = _cache_store[key]
-        if entry['expires_at'] > datetime.utcnow():
-            return entry['value']
-        else:
-            # Remove expired entry
-            del _cache_store[key]
-    return None
 
+def _generate_cache_key(func_name: str, args: tuple, kwargs: dict) -> str:
+    """
+    Generate a unique cache key.
 
-def _store_in_cache(key: str, value: Any, ttl: int):
-    """Store value in cache with expiration."""
-    _cache_store[key] = {
-        'value': value,
-        'expires_at': datetime.utcnow() + timedelta(seconds=ttl)
-    }
+    The function name stays readable so ``invalidate_cache`` can match it;
+    the arguments are hashed.
+    """
+    key_string = cache_key_builder(*args, **kwargs)
+    return f"{func_name}:{hashlib.md5(key_string.encode()).hexdigest()}"
 
 
 # Alias for backward compatibility
-cache = cache_result
\ No newline at end of file
+cache = cache_result
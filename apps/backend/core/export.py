@@ -0,0 +1,105 @@
+"""
+Streaming CSV and JSON Lines exports.
+
+Exports are written row by row while the client downloads them: rows
+come from a server-side cursor in batches of ``batch_size`` and each one
+is encoded and sent before the next is read, so memory stays bounded by
+one batch however large the export is.
+
+FastAPI closes request-scoped sessions before a streaming body runs, so
+``stream_rows`` opens its own session on the same engine for the length
+of the download.
+"""
+
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Union
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+
+
+def stream_rows(
+    bind: Union[Engine, Connection],
+    statement: Select,
+    batch_size: int = 1000
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the rows of ``statement`` as dicts from a server-side cursor.
+
+    Nothing is executed until the first row is requested. The session
+    opened here is closed when the iterator is exhausted or closed.
+    """
+    session = Session(bind=bind)
+    try:
+        result = session.execute(
+            statement.execution_options(stream_results=True, yield_per=batch_size)
+        )
+        for row in result:
+            yield dict(row._mapping)
+    finally:
+        session.close()
+
+
+def csv_stream(rows: Iterable[Dict[str, Any]], fieldnames: Optional[Sequence[str]] = None) -> Iterator[bytes]:
+    """
+    Encode rows as CSV, one chunk per row.
+
+    Without ``fieldnames`` the first row's keys are used; an empty export
+    is then an empty body.
+    """
+    buffer = io.StringIO()
+    writer = None
+
+    def flush() -> bytes:
+        chunk = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(fieldnames or row.keys()), extrasaction="ignore")
+            writer.writeheader()
+        writer.writerow(row)
+        yield flush()
+
+    if writer is None and fieldnames:
+        csv.DictWriter(buffer, fieldnames=list(fieldnames)).writeheader()
+        yield flush()
+
+
+def jsonl_stream(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Encode rows as JSON Lines; dates, UUIDs and decimals become strings."""
+    for row in rows:
+        yield (json.dumps(row, default=str) + "\n").encode()
+
+
+def export_response(
+    rows: Iterable[Dict[str, Any]],
+    format: str,
+    filename: str,
+    fieldnames: Optional[Sequence[str]] = None
+) -> StreamingResponse:
+    """Stream ``rows`` as a ``csv`` or ``jsonl`` attachment named ``filename.<format>``."""
+    if format == "csv":
+        body = csv_stream(rows, fieldnames)
+    elif format == "jsonl":
+        body = jsonl_stream(rows)
+    else:
+        raise ValueError(f"Unsupported export format: {format}")
+
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename={filename}.{format}"}
+    )
@@ -0,0 +1,600 @@
+"""
+One gateway for every LLM call.
+
+Agents, integration clients and routes hand the gateway a coroutine
+factory that makes the actual SDK call for a given model name; the
+gateway decides when (and on which model) it runs:
+
+* concurrency is capped per provider and per model with semaphores;
+* token buckets hold each model to its requests/minute and
+  tokens/minute. A caller reserves up front and waits out its own debt,
+  so a burst queues in order instead of stampeding;
+* a 429 pauses the model for ``retry-after`` (or the backoff delay) and
+  every retry sleeps with full jitter, so throttled requests do not wake
+  up in lockstep;
+* a circuit breaker per provider stops calls after repeated server or
+  connection failures and lets one trial through after
+  ``reset_timeout``;
+* a model can name a ``fallback`` used when it is saturated (breaker
+  open, paused by a 429, or out of concurrency) or still rate limited
+  after the last retry, and a ``hedge_after`` delay after which a
+  second request is raced against a slow first one.
+
+Errors are classified from ``status_code``/``response`` attributes and
+exception names, so the gateway works with any SDK (and with fakes in
+tests) without importing one. Non-retryable errors are re-raised
+unchanged.
+"""
+
+import asyncio
+import random
+import time
+from collections import defaultdict
+from contextlib import aclosing, asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, fields, replace
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+from .logging import get_logger
+from .settings import settings
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+RATE_LIMITED = "rate_limited"
+TRANSIENT = "transient"
+FATAL = "fatal"
+
+RATE_LIMIT_STATUSES = frozenset({429, 529})
+TRANSIENT_STATUSES = frozenset({408, 409})
+RATE_LIMIT_ERRORS = frozenset({"RateLimitError", "ResourceExhausted", "TooManyRequests"})
+TRANSIENT_ERRORS = frozenset({
+    "APIConnectionError", "APITimeoutError", "InternalServerError",
+    "ServiceUnavailable", "DeadlineExceeded",
+})
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """The delay a provider asked for in ``retry-after-ms``/``retry-after``, if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    for header, scale in (("retry-after-ms", 1000.0), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) / scale)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def classify_error(error: BaseException) -> str:
+    """``RATE_LIMITED``, ``TRANSIENT`` (worth a retry) or ``FATAL``."""
+    status = _status_code(error)
+    name = type(error).__name__
+    if status in RATE_LIMIT_STATUSES or name in RATE_LIMIT_ERRORS:
+        return RATE_LIMITED
+    if status is not None:
+        return TRANSIENT if status >= 500 or status in TRANSIENT_STATUSES else FATAL
+    if name in TRANSIENT_ERRORS or isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return TRANSIENT
+    return FATAL
+
+
+class CircuitOpenError(Exception):
+    """The provider's circuit breaker is open and no fallback model is available."""
+
+    def __init__(self, provider: str, retry_in: float):
+        super().__init__(f"LLM provider {provider} is unavailable; retry in {retry_in:.1f}s")
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+class TokenBucket:
+    """
+    Rate limiter refilled continuously at ``per_minute / 60`` per second.
+
+    ``reserve`` takes tokens immediately, letting the balance go
+    negative, and returns how long the caller must wait for its share.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float = 1.0) -> float:
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self.tokens) / self.rate)
+
+    def reserve(self, amount: float = 1.0) -> float:
+        wait = self.wait_time(amount)
+        self.tokens -= min(amount, self.capacity)
+        return wait
+
+    def refund(self, amount: float):
+        """Return tokens that were reserved but not used (or charge extra when negative)."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    async def acquire(self, amount: float = 1.0):
+        wait = self.reserve(amount)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` failures in a row -> half-open trial."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    @property
+    def is_open(self) -> bool:
+        return self.state != self.CLOSED and self.retry_in() > 0
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go ahead. Once the timeout passes one trial call
+        goes through; if it never reports back, another follows a timeout later.
+        """
+        if self.state == self.CLOSED:
+            return True
+        if self.retry_in() == 0:
+            self.state = self.HALF_OPEN
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"LLM circuit opened after {self.failures} failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+@dataclass
+class ModelLimits:
+    """Per-model limits; 0 disables a rate limit."""
+    max_concurrency: int = 8
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+    fallback: Optional[str] = None
+    hedge_after: Optional[float] = None
+
+
+class _ModelState:
+    def __init__(self, model: str, provider: str, limits: ModelLimits):
+        self.model = model
+        self.provider = provider
+        self.limits = limits
+        self.semaphore = asyncio.Semaphore(limits.max_concurrency)
+        self.requests = TokenBucket(limits.requests_per_minute) if limits.requests_per_minute else None
+        self.tokens = TokenBucket(limits.tokens_per_minute) if limits.tokens_per_minute else None
+        self.paused_until = 0.0
+        self.in_flight = 0
+        self.stats: Dict[str, int] = defaultdict(int)
+
+    @property
+    def saturated(self) -> bool:
+        return self.paused_until > time.monotonic() or self.semaphore.locked()
+
+
+class LLMGateway:
+    """Admission control, retries and fallback for LLM calls (see module docstring)."""
+
+    def __init__(
+        self,
+        provider_concurrency: int = 32,
+        default_limits: Optional[ModelLimits] = None,
+        max_retries: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0
+    ):
+        self.provider_concurrency = provider_concurrency
+        self.default_limits = default_limits or ModelLimits()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._routes: Dict[str, tuple] = {}
+        self._models: Dict[str, _ModelState] = {}
+        self._providers: Dict[str, asyncio.Semaphore] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    @classmethod
+    def from_settings(cls) -> "LLMGateway":
+        gateway = cls(
+            provider_concurrency=settings.LLM_PROVIDER_CONCURRENCY,
+            default_limits=ModelLimits(
+                max_concurrency=settings.LLM_MODEL_CONCURRENCY,
+                requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+                tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+            ),
+            max_retries=settings.LLM_MAX_RETRIES,
+        )
+        for model, overrides in (settings.LLM_MODEL_LIMITS or {}).items():
+            gateway.configure(model, **overrides)
+        return gateway
+
+    def configure(self, model: str, provider: Optional[str] = None, **limits):
+        """
+        Set ``model``'s provider and override any ``ModelLimits`` field.
+
+        Takes effect for state created afterwards, so configure models at
+        import time, before their first call.
+        """
+        unknown = set(limits) - {f.name for f in fields(ModelLimits)}
+        if unknown:
+            raise ValueError(f"Unknown model limits: {', '.join(sorted(unknown))}")
+        current_provider, current = self._routes.get(model, (None, self.default_limits))
+        self._routes[model] = (provider or current_provider, replace(current, **limits))
+        self._models.pop(model, None)
+
+    def _state(self, model: str, provider: Optional[str]) -> _ModelState:
+        state = self._models.get(model)
+        if state is None:
+            routed_provider, limits = self._routes.get(model, (None, self.default_limits))
+            state = _ModelState(model, routed_provider or provider or model, limits)
+            self._models[model] = state
+        return state
+
+    def _breaker(self, provider: str) -> CircuitBreaker:
+        breaker = self._breakers.get(provider)
+        if breaker is None:
+            breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            self._breakers[provider] = breaker
+        return breaker
+
+    def _provider_slots(self, provider: str) -> asyncio.Semaphore:
+        semaphore = self._providers.get(provider)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.provider_concurrency)
+            self._providers[provider] = semaphore
+        return semaphore
+
+    def _route(self, model: str, provider: Optional[str], allow_fallback: bool) -> _ModelState:
+        """The model's state, or its fallback's when the model is saturated."""
+        state = self._state(model, provider)
+        fallback = state.limits.fallback
+        if allow_fallback and fallback and (state.saturated or self._breaker(state.provider).is_open):
+            state.stats["fallbacks"] += 1
+            logger.info(f"LLM model {model} is saturated; using {fallback}")
+            return self._state(fallback, provider)
+        return state
+
+    def _backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full jitter, never sooner than the provider asked for."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = retry_after + delay * 0.5
+        return delay
+
+    @asynccontextmanager
+    async def _admit(self, state: _ModelState, estimated_tokens: int):
+        pause = state.paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause + random.uniform(0, self.base_delay))
+        if state.requests:
+            await state.requests.acquire(1)
+        if state.tokens and estimated_tokens:
+            await state.tokens.acquire(estimated_tokens)
+
+        async with self._provider_slots(state.provider), state.semaphore:
+            state.in_flight += 1
+            state.stats["requests"] += 1
+            try:
+                yield
+            finally:
+                state.in_flight -= 1
+
+    def _failed(self, state: _ModelState, error: Exception, attempt: int) -> Optional[float]:
+        """
+        Record a failed attempt; returns the delay before retrying, or None
+        when the error should be raised.
+        """
+        kind = classify_error(error)
+        breaker = self._breaker(state.provider)
+        if kind == FATAL:
+            # The provider answered; the request itself was bad
+            breaker.record_success()
+            return None
+
+        retry_after = retry_after_seconds(error)
+        if kind == RATE_LIMITED:
+            state.stats["rate_limited"] += 1
+            pause = retry_after if retry_after is not None else self._backoff(attempt)
+            state.paused_until = max(state.paused_until, time.monotonic() + pause)
+        else:
+            state.stats["failures"] += 1
+            breaker.record_failure()
+
+        if attempt >= self.max_retries:
+            return None
+        state.stats["retries"] += 1
+        return self._backoff(attempt, retry_after)
+
+    def _can_admit_now(self, state: _ModelState, estimated_tokens: int) -> bool:
+        """Whether ``_admit`` would let another request through without waiting."""
+        return (
+            state.paused_until <= time.monotonic()
+            and not state.semaphore.locked()
+            and not self._provider_slots(state.provider).locked()
+            and (state.requests is None or state.requests.wait_time(1) == 0)
+            and (not state.tokens or not estimated_tokens or state.tokens.wait_time(estimated_tokens) == 0)
+        )
+
+    async def _hedged(self, state: _ModelState, call: Callable[[str], Awaitable[T]], estimated_tokens: int) -> T:
+        """
+        Run ``call``; if it is slower than ``hedge_after``, race a second copy.
+
+        The second copy is admitted like any other request, so hedging
+        never goes past the model's or provider's limits; it is only
+        started when a slot and budget are free right away.
+        """
+        hedge_after = state.limits.hedge_after
+        first = asyncio.ensure_future(call(state.model))
+        if not hedge_after:
+            return await first
+
+        done, _ = await asyncio.wait({first}, timeout=hedge_after)
+        if done or not self._can_admit_now(state, estimated_tokens):
+            return await first
+
+        async def hedge() -> T:
+            async with self._admit(state, estimated_tokens):
+                return await call(state.model)
+
+        state.stats["hedged"] += 1
+        second = asyncio.ensure_future(hedge())
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            return first.result()
+        finally:
+            for task in (first, second):
+                task.cancel()
+            # Let the loser release its slot before returning
+            await asyncio.gather(first, second, return_exceptions=True)
+
+    async def call(
+        self,
+        model: str,
+        call: Callable[[str], Awaitable[T]],
+        provider: Optional[str] = None,
+        estimated_tokens: int = 0,
+        usage: Optional[Callable[[T], int]] = None,
+        allow_fallback: bool = True
+    ) -> T:
+        """
+        Run ``call(model_name)`` under the model's limits, with retries.
+
+        ``estimated_tokens`` (prompt plus expected output) is reserved from
+        the tokens/minute bucket; ``usage(result)`` gives the real total so
+        the difference is settled afterwards.
+        """
+        state = self._route(model, provider, allow_fallback)
+        fallback = state.limits.fallback if allow_fallback and state.model == model else None
+        breaker = self._breaker(state.provider)
+        attempt = 0
+
+        while True:
+            if not breaker.allow():
+                if fallback:
+                    return await self.call(fallback, call, provider, estimated_tokens, usage, allow_fallback=False)
+                raise CircuitOpenError(state.provider, breaker.retry_in())
+
+            try:
+                async with self._admit(state, estimated_tokens):
+                    result = await self._hedged(state, call, estimated_tokens)
+            except Exception as e:
+                delay = self._failed(state, e, attempt)
+                if delay is None:
+                    if fallback and classify_error(e) == RATE_LIMITED:
+                        state.stats["fallbacks"] += 1
+                        return await self.call(fallback, call, provider, estimated_tokens, usage, allow_fallback=False)
+                    raise
+                logger.warning(f"LLM call to {state.model} failed ({e}); retrying in {delay:.2f}s")
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+
+            breaker.record_success()
+            if usage is not None:
+                try:
+                    used = usage(result)
+                except Exception:
+                    used = None
+                if used is not None:
+                    meter = _usage_meter.get()
+                    if meter is not None:
+                        meter.add(used)
+                    if state.tokens:
+                        state.tokens.refund(estimated_tokens - used)
+            return result
+
+    async def stream(
+        self,
+        model: str,
+        open_stream: Callable[[str], AsyncIterator[T]],
+        provider: Optional[str] = None,
+        estimated_tokens: int = 0,
+        allow_fallback: bool = True
+    ) -> AsyncIterator[T]:
+        """
+        Yield from ``open_stream(model_name)`` under the model's limits.
+
+        Failures before the first chunk are retried like ``call``; once
+        output has been sent a failure is raised. The concurrency slot is
+        held until the stream ends or is closed, and closing this iterator
+        closes the provider stream.
+        """
+        state = self._route(model, provider, allow_fallback)
+        breaker = self._breaker(state.provider)
+        attempt = 0
+
+        while True:
+            if not breaker.allow():
+                raise CircuitOpenError(state.provider, breaker.retry_in())
+
+            started = False
+            try:
+                async with self._admit(state, estimated_tokens):
+                    async with aclosing(open_stream(state.model)) as chunks:
+                        async for chunk in chunks:
+                            started = True
+                            yield chunk
+            except Exception as e:
+                delay = self._failed(state, e, attempt)
+                if started or delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+
+            breaker.record_success()
+            return
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "models": {
+                model: dict(state.stats, in_flight=state.in_flight, provider=state.provider)
+                for model, state in self._models.items()
+            },
+            "circuits": {provider: breaker.state for provider, breaker in self._breakers.items()},
+        }
+
+
+class UsageMeter:
+    """Provider-reported token totals of the gateway calls made under ``metered()``."""
+
+    def __init__(self, parent: Optional["UsageMeter"] = None):
+        self.parent = parent
+        self.tokens = 0
+        self.calls = 0
+
+    def add(self, tokens: int):
+        self.tokens += tokens
+        self.calls += 1
+        if self.parent is not None:
+            self.parent.add(tokens)
+
+    @property
+    def total(self) -> Optional[int]:
+        """Reported tokens, or None if no call reported usage."""
+        return self.tokens if self.calls else None
+
+
+_usage_meter: ContextVar[Optional[UsageMeter]] = ContextVar("llm_usage_meter", default=None)
+
+
+@contextmanager
+def metered() -> Iterator[UsageMeter]:
+    """Collect the usage reported by gateway calls in this block, including nested ones."""
+    meter = UsageMeter(_usage_meter.get())
+    token = _usage_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _usage_meter.reset(token)
+
+
+class GatewayModel:
+    """
+    A chat agent (anything with ``generate``/``stream``) called through the gateway.
+
+    ``agents`` maps gateway model names to agents so a fallback can
+    switch agent; ``name`` and ``served_model`` follow the agent that
+    actually answered. ``reported_tokens`` is the provider-reported usage
+    of the last ``generate``, when the agent's calls report it.
+    """
+
+    def __init__(self, model: str, agents: Dict[str, Any], gateway: Optional[LLMGateway] = None):
+        self.model = model
+        self.agents = agents
+        self.gateway = gateway or llm_gateway
+        self.name = agents[model].name
+        self.served_model = model
+        self.reported_tokens: Optional[int] = None
+
+    def _agent(self, model: str) -> Any:
+        self.served_model = model if model in self.agents else self.model
+        agent = self.agents[self.served_model]
+        self.name = agent.name
+        return agent
+
+    async def generate(self, prompt: str, temperature: float = 0.7, max_tokens: Optional[int] = None) -> str:
+        with metered() as meter:
+            try:
+                return await self.gateway.call(
+                    self.model,
+                    lambda model: self._agent(model).generate(prompt, temperature=temperature, max_tokens=max_tokens),
+                    estimated_tokens=estimate_tokens(prompt) + (max_tokens or 0)
+                )
+            finally:
+                self.reported_tokens = meter.total
+
+    async def stream(
+        self, prompt: str, temperature: float = 0.7, max_tokens: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        # Closing this stream closes the gateway's, and with it the provider's
+        async with aclosing(self.gateway.stream(
+            self.model,
+            lambda model: self._agent(model).stream(prompt, temperature=temperature, max_tokens=max_tokens),
+            estimated_tokens=estimate_tokens(prompt) + (max_tokens or 0)
+        )) as chunks:
+            async for chunk in chunks:
+                yield chunk
+
+    async def analyze_image(self, image_data: bytes, prompt: str) -> str:
+        # Only vision-capable agents have analyze_image, so no fallback
+        return await self.gateway.call(
+            self.model, lambda model: self._agent(model).analyze_image(image_data, prompt), allow_fallback=False
+        )
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) for rate-limit reservations."""
+    return len(text or "") // 4 + 1
+
+
+llm_gateway = LLMGateway.from_settings()
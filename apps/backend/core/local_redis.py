@@ -0,0 +1,216 @@
+"""
+In-process stand-in for the subset of the ``redis.asyncio`` client API used
+by the backend.
+
+Used in tests, so code written against the Redis protocol (the shared cache
+tier, the WebSocket message bus) runs without a server. It is not a runtime
+fallback: without ``REDIS_URL`` the cache and the WebSocket manager use their
+in-process backends instead. Values are stored as bytes exactly as a real
+Redis connection would return them.
+"""
+
+import asyncio
+import fnmatch
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Union
+
+
+def _to_bytes(value: Union[str, bytes, int, float]) -> bytes:
+    """Encode a value the way redis-py does before sending it."""
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode("utf-8")
+
+
+class LocalRedis:
+    """Minimal asyncio Redis client backed by a dictionary."""
+
+    def __init__(self):
+        self._data: Dict[str, bytes] = {}
+        # Absolute expiry (time.monotonic) per key
+        self._expires: Dict[str, float] = {}
+        self._pubsubs: Set["LocalPubSub"] = set()
+
+    def _alive(self, name: str) -> bool:
+        """Return True if the key exists and has not expired."""
+        expires_at = self._expires.get(name)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(name, None)
+            self._expires.pop(name, None)
+            return False
+        return name in self._data
+
+    async def ping(self) -> bool:
+        return True
+
+    async def get(self, name: str) -> Optional[bytes]:
+        if not self._alive(name):
+            return None
+        return self._data[name]
+
+    async def set(
+        self,
+        name: str,
+        value: Any,
+        ex: Optional[int] = None,
+        px: Optional[int] = None,
+        nx: bool = False
+    ) -> Optional[bool]:
+        if nx and self._alive(name):
+            return None
+
+        self._data[name] = _to_bytes(value)
+        self._expires.pop(name, None)
+        if px is not None:
+            self._expires[name] = time.monotonic() + px / 1000
+        elif ex is not None:
+            self._expires[name] = time.monotonic() + ex
+        return True
+
+    async def mget(self, names: List[str]) -> List[Optional[bytes]]:
+        return [await self.get(name) for name in names]
+
+    async def incr(self, name: str, amount: int = 1) -> int:
+        current = int(await self.get(name) or 0) + amount
+        self._data[name] = _to_bytes(current)
+        return current
+
+    async def delete(self, *names: str) -> int:
+        removed = 0
+        for name in names:
+            if self._alive(name):
+                removed += 1
+            self._data.pop(name, None)
+            self._expires.pop(name, None)
+        return removed
+
+    async def exists(self, *names: str) -> int:
+        return sum(1 for name in names if self._alive(name))
+
+    async def pttl(self, name: str) -> int:
+        if not self._alive(name):
+            return -2
+        expires_at = self._expires.get(name)
+        if expires_at is None:
+            return -1
+        return int((expires_at - time.monotonic()) * 1000)
+
+    async def scan_iter(self, match: Optional[str] = None) -> AsyncIterator[str]:
+        for name in list(self._data.keys()):
+            if not self._alive(name):
+                continue
+            if match is None or fnmatch.fnmatchcase(name, match):
+                yield name
+
+    async def flushdb(self) -> bool:
+        self._data.clear()
+        self._expires.clear()
+        return True
+
+    async def publish(self, channel: str, message: Any) -> int:
+        data = _to_bytes(message)
+        return sum(1 for pubsub in list(self._pubsubs) if pubsub._deliver(channel, data))
+
+    def pubsub(self) -> "LocalPubSub":
+        return LocalPubSub(self)
+
+    async def close(self):
+        return None
+
+
+class LocalPubSub:
+    """
+    Subscription handle mirroring ``redis.asyncio.client.PubSub``.
+
+    Messages are dictionaries with ``type``, ``pattern``, ``channel`` and
+    ``data`` keys; channel names and payloads are bytes.
+    """
+
+    def __init__(self, client: LocalRedis):
+        self._client = client
+        self._channels: Set[str] = set()
+        self._patterns: Set[str] = set()
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+
+    @property
+    def subscribed(self) -> bool:
+        return bool(self._channels or self._patterns)
+
+    def _confirm(self, kind: str, name: str):
+        self._queue.put_nowait({
+            "type": kind,
+            "pattern": None,
+            "channel": name.encode("utf-8"),
+            "data": len(self._channels) + len(self._patterns)
+        })
+
+    def _deliver(self, channel: str, data: bytes) -> bool:
+        if channel in self._channels:
+            self._queue.put_nowait({
+                "type": "message", "pattern": None,
+                "channel": channel.encode("utf-8"), "data": data
+            })
+            return True
+        for pattern in self._patterns:
+            if fnmatch.fnmatchcase(channel, pattern):
+                self._queue.put_nowait({
+                    "type": "pmessage", "pattern": pattern.encode("utf-8"),
+                    "channel": channel.encode("utf-8"), "data": data
+                })
+                return True
+        return False
+
+    async def subscribe(self, *channels: str):
+        for channel in channels:
+            self._channels.add(channel)
+            self._confirm("subscribe", channel)
+        self._client._pubsubs.add(self)
+
+    async def psubscribe(self, *patterns: str):
+        for pattern in patterns:
+            self._patterns.add(pattern)
+            self._confirm("psubscribe", pattern)
+        self._client._pubsubs.add(self)
+
+    async def unsubscribe(self, *channels: str):
+        for channel in channels or list(self._channels):
+            self._channels.discard(channel)
+            self._confirm("unsubscribe", channel)
+        if not self.subscribed:
+            self._client._pubsubs.discard(self)
+
+    async def punsubscribe(self, *patterns: str):
+        for pattern in patterns or list(self._patterns):
+            self._patterns.discard(pattern)
+            self._confirm("punsubscribe", pattern)
+        if not self.subscribed:
+            self._client._pubsubs.discard(self)
+
+    async def get_message(
+        self, ignore_subscribe_messages: bool = False, timeout: Optional[float] = 0.0
+    ) -> Optional[Dict[str, Any]]:
+        if not self._queue.empty():
+            message = self._queue.get_nowait()
+        elif timeout is None:
+            message = await self._queue.get()
+        elif timeout <= 0:
+            return None
+        else:
+            try:
+                message = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if ignore_subscribe_messages and message["type"] not in ("message", "pmessage"):
+            return None
+        return message
+
+    async def listen(self) -> AsyncIterator[Dict[str, Any]]:
+        while self.subscribed or not self._queue.empty():
+            yield await self._queue.get()
+
+    async def close(self):
+        self._channels.clear()
+        self._patterns.clear()
+        self._client._pubsubs.discard(self)
+
+    aclose = close
@@ -0,0 +1,160 @@
+"""
+Publish/subscribe buses for fanning messages out across workers.
+
+``InProcessBus`` delivers to subscribers in the same process and is the
+default for a single worker. ``RedisMessageBus`` uses Redis pub/sub (or
+``LocalRedis`` in tests) so every uvicorn worker receives
+what any of them publishes. Messages are plain strings.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+MessageHandler = Callable[[str], Awaitable[None]]
+
+
+class MessageBus:
+    """Interface for pub/sub transports."""
+
+    async def publish(self, channel: str, message: str):
+        raise NotImplementedError
+
+    async def subscribe(self, channel: str, handler: MessageHandler):
+        raise NotImplementedError
+
+    async def unsubscribe(self, channel: str, handler: MessageHandler):
+        raise NotImplementedError
+
+    async def close(self):
+        return None
+
+
+class InProcessBus(MessageBus):
+    """
+    Bus whose subscribers all live in this process.
+
+    Handlers run inline in ``publish`` and should only hand the message off
+    (for example onto a queue); a failing handler is logged and skipped.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, List[MessageHandler]] = {}
+
+    async def publish(self, channel: str, message: str):
+        for handler in list(self._handlers.get(channel, ())):
+            try:
+                await handler(message)
+            except Exception as e:
+                logger.error(f"Message bus handler failed on {channel}: {e}")
+
+    async def subscribe(self, channel: str, handler: MessageHandler):
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def unsubscribe(self, channel: str, handler: MessageHandler):
+        handlers = self._handlers.get(channel, [])
+        if handler in handlers:
+            handlers.remove(handler)
+        if not handlers:
+            self._handlers.pop(channel, None)
+
+    async def close(self):
+        self._handlers.clear()
+
+
+class RedisMessageBus(MessageBus):
+    """
+    Bus backed by Redis pub/sub.
+
+    Works with a ``redis.asyncio`` client or with ``LocalRedis``. One pubsub
+    connection and listener task serve every channel; if the connection
+    drops, the listener resubscribes after ``reconnect_delay`` seconds.
+    """
+
+    def __init__(self, client: Any, reconnect_delay: float = 1.0):
+        self.client = client
+        self.reconnect_delay = reconnect_delay
+        self._handlers: Dict[str, List[MessageHandler]] = {}
+        self._pubsub: Optional[Any] = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def publish(self, channel: str, message: str):
+        await self.client.publish(channel, message)
+
+    async def subscribe(self, channel: str, handler: MessageHandler):
+        handlers = self._handlers.setdefault(channel, [])
+        handlers.append(handler)
+        if len(handlers) > 1:
+            return
+
+        if self._pubsub is None:
+            self._pubsub = self.client.pubsub()
+        await self._pubsub.subscribe(channel)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def unsubscribe(self, channel: str, handler: MessageHandler):
+        handlers = self._handlers.get(channel, [])
+        if handler in handlers:
+            handlers.remove(handler)
+        if handlers or channel not in self._handlers:
+            return
+
+        del self._handlers[channel]
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(channel)
+
+    async def _dispatch(self, channel: str, data: Any):
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        for handler in list(self._handlers.get(channel, ())):
+            try:
+                await handler(data)
+            except Exception as e:
+                logger.error(f"Message bus handler failed on {channel}: {e}")
+
+    async def _listen(self):
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode("utf-8")
+                    await self._dispatch(channel, message["data"])
+                if not self._handlers:
+                    return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Message bus connection lost: {e}")
+
+            # Reconnect and restore subscriptions
+            await asyncio.sleep(self.reconnect_delay)
+            try:
+                self._pubsub = self.client.pubsub()
+                if self._handlers:
+                    await self._pubsub.subscribe(*self._handlers)
+            except Exception as e:
+                logger.warning(f"Message bus resubscribe failed: {e}")
+
+    async def close(self):
+        self._handlers.clear()
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.unsubscribe()
+                await self._pubsub.close()
+            except Exception as e:
+                logger.debug(f"Message bus close failed: {e}")
+            self._pubsub = None
@@ -1,12 +1,29 @@
 """
 Pagination utilities for BrainOps backend.
+
+Offset pagination is kept for small admin lists. Large lists use keyset
+(seek) pagination: the page boundary is the sort key of the last row seen,
+carried in an HMAC-signed opaque cursor, so deep pages cost the same as
+the first one.
 """
 
-from typing import TypeVar, Generic, List, Optional
+import base64
+import hashlib
+import hmac
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Generic, List, NamedTuple, Optional, Sequence, TypeVar
+from uuid import UUID
+
+from fastapi import HTTPException, Query
 from pydantic import BaseModel
-from fastapi import Query
+from sqlalchemy import and_, case, false, or_
 from sqlalchemy.orm import Query as SQLQuery
 
+from .settings import settings
+
 
 T = TypeVar("T")
 
@@ -90,6 +107,255 @@ def create_paginated_response(
     )
 
 
+class SortKey:
+    """
+    One column of a keyset sort order.
+    
+    The last key of a sort order must be unique (normally the primary key)
+    so every row has a distinct position. Mark columns that can hold NULL as
+    ``nullable``; NULLs then sort last in either direction.
+    """
+    
+    def __init__(self, column, descending: bool = False, nullable: bool = False):
+        self.column = column
+        self.descending = descending
+        self.nullable = nullable
+    
+    @property
+    def name(self) -> str:
+        return self.column.key
+    
+    def value_of(self, item: Any) -> Any:
+        return getattr(item, self.name)
+
+
+def sort_keys(column, descending: bool, tiebreaker, nullable: bool = False) -> List[SortKey]:
+    """Sort by ``column`` with a unique ``tiebreaker`` in the same direction."""
+    if column is tiebreaker:
+        return [SortKey(tiebreaker, descending)]
+    return [SortKey(column, descending, nullable), SortKey(tiebreaker, descending)]
+
+
+class KeysetPage(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+    has_more: bool
+
+
+def _encode_value(value: Any) -> Any:
+    """Tag non-JSON sort values so they decode to the same Python type."""
+    if isinstance(value, Enum):
+        value = value.value
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"$d": value.isoformat()}
+    if isinstance(value, UUID):
+        return {"$u": str(value)}
+    if isinstance(value, Decimal):
+        return {"$n": str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        (tag, raw), = value.items()
+        if tag == "$dt":
+            return datetime.fromisoformat(raw)
+        if tag == "$d":
+            return date.fromisoformat(raw)
+        if tag == "$u":
+            return UUID(raw)
+        if tag == "$n":
+            return Decimal(raw)
+    return value
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _signature(payload: bytes) -> str:
+    digest = hmac.new(settings.SECRET_KEY.encode("utf-8"), payload, hashlib.sha256).digest()
+    return _b64encode(digest[:16])
+
+
+def _fingerprint(keys: Sequence[SortKey], scope: str) -> str:
+    """Bind cursors to the sort order (and caller scope) that produced them."""
+    spec = scope + "|" + ",".join(
+        f"{key.name}:{'d' if key.descending else 'a'}" for key in keys
+    )
+    return hashlib.sha256(spec.encode("utf-8")).hexdigest()[:12]
+
+
+def encode_cursor(data: dict) -> str:
+    """Serialize and sign cursor data into an opaque URL-safe token."""
+    payload = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return f"{_b64encode(payload)}.{_signature(payload)}"
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Verify and deserialize a cursor; raises HTTP 400 if it was tampered with."""
+    try:
+        encoded, signature = cursor.split(".", 1)
+        payload = _b64decode(encoded)
+        if not hmac.compare_digest(signature, _signature(payload)):
+            raise ValueError("bad signature")
+        data = json.loads(payload)
+        if not isinstance(data, dict):
+            raise ValueError("bad payload")
+        return data
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def _seek_condition(keys: Sequence[SortKey], values: Sequence[Any], backwards: bool):
+    """
+    Build the row-value comparison "sort key comes after ``values``".
+    
+    Expands to (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ... with each
+    comparison flipped for descending keys, which works for mixed
+    directions where a SQL row constructor would not.
+    """
+    clauses = []
+    equal_so_far = []
+    for key, value in zip(keys, values):
+        ascending = key.descending == backwards
+        column = key.column
+        
+        if key.nullable:
+            # NULLs sort last: (col IS NULL) orders as 0/1 before the column
+            is_null = value is None
+            null_rank = case((column.is_(None), 1), else_=0)
+            after_rank = null_rank > int(is_null) if not backwards else null_rank < int(is_null)
+            clauses.append(and_(*equal_so_far, after_rank))
+            equal_so_far.append(null_rank == int(is_null))
+            if is_null:
+                continue
+        
+        if value is None:
+            equal_so_far.append(column.is_(None))
+            continue
+        
+        after = column > value if ascending else column < value
+        clauses.append(and_(*equal_so_far, after))
+        equal_so_far.append(column == value)
+    
+    return or_(*clauses) if clauses else false()
+
+
+def _order_by(keys: Sequence[SortKey], backwards: bool) -> List[Any]:
+    ordering = []
+    for key in keys:
+        ascending = key.descending == backwards
+        if key.nullable:
+            null_rank = case((key.column.is_(None), 1), else_=0)
+            ordering.append(null_rank.desc() if backwards else null_rank.asc())
+        ordering.append(key.column.asc() if ascending else key.column.desc())
+    return ordering
+
+
+def keyset_paginate(
+    query: SQLQuery,
+    keys: Sequence[SortKey],
+    limit: int,
+    cursor: Optional[str] = None,
+    scope: str = ""
+) -> KeysetPage:
+    """
+    Fetch one page of ``query`` ordered by ``keys`` using keyset pagination.
+    
+    Args:
+        query: Filtered SQLAlchemy query without ORDER BY, OFFSET or LIMIT
+        keys: Sort order; the last key must be unique
+        limit: Page size
+        cursor: ``next_cursor`` or ``prev_cursor`` from a previous page
+        scope: Extra string bound into cursors (e.g. the endpoint name)
+    
+    Returns:
+        KeysetPage with the items in sort order and cursors for both
+        directions (None where there is nothing further that way)
+    """
+    fingerprint = _fingerprint(keys, scope)
+    backwards = False
+    
+    if cursor:
+        data = decode_cursor(cursor)
+        if data.get("f") != fingerprint or len(data.get("k", [])) != len(keys):
+            raise HTTPException(
+                status_code=400,
+                detail="Pagination cursor does not match this sort order"
+            )
+        backwards = data.get("d") == "p"
+        values = [_decode_value(value) for value in data["k"]]
+        query = query.filter(_seek_condition(keys, values, backwards))
+    
+    rows = query.order_by(*_order_by(keys, backwards)).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    items = rows[:limit]
+    if backwards:
+        items.reverse()
+    
+    def make_cursor(item: Any, direction: str) -> str:
+        return encode_cursor({
+            "f": fingerprint,
+            "d": direction,
+            "k": [_encode_value(key.value_of(item)) for key in keys]
+        })
+    
+    if not items:
+        return KeysetPage(items, None, None, False)
+    
+    # Moving forward, "more" lies ahead; moving backwards it lies behind
+    more_after = has_more if not backwards else True
+    more_before = bool(cursor) if not backwards else has_more
+    return KeysetPage(
+        items,
+        make_cursor(items[-1], "n") if more_after else None,
+        make_cursor(items[0], "p") if more_before else None,
+        more_after
+    )
+
+
+def offset_paginate(
+    query: SQLQuery,
+    keys: Sequence[SortKey],
+    offset: int,
+    limit: int
+) -> List[Any]:
+    """OFFSET page in the same order ``keyset_paginate`` uses, for page-number clients."""
+    return query.order_by(*_order_by(keys, False)).offset(offset).limit(limit).all()
+
+
+def count_total(query: SQLQuery, mode: str = "exact") -> Optional[int]:
+    """
+    Count the rows of ``query``.
+    
+    ``mode`` is "exact" for COUNT(*), "estimate" for the PostgreSQL planner's
+    row estimate (falls back to exact elsewhere), or "none" to skip counting.
+    """
+    if mode == "none":
+        return None
+    
+    if mode == "estimate":
+        connection = query.session.connection()
+        if connection.dialect.name == "postgresql":
+            compiled = query.statement.compile(dialect=connection.dialect)
+            plan = connection.exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+            ).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
+    
+    return query.order_by(None).count()
+
+
 class CursorPagination:
     """Cursor-based pagination for better performance with large datasets."""
     
@@ -105,28 +371,12 @@ class CursorPagination:
         """Decode cursor string to pagination info."""
         if not self.cursor:
             return None
-        
-        # In production, use proper encoding/encryption
-        import base64
-        import json
-        
-        try:
-            decoded = base64.b64decode(self.cursor).decode('utf-8')
-            return json.loads(decoded)
-        except:
-            return None
+        return decode_cursor(self.cursor)
     
     @staticmethod
     def encode_cursor(data: dict) -> str:
         """Encode pagination info to cursor string."""
-        import base64
-        import json
-        
-        encoded = base64.b64encode(
-            json.dumps(data).encode('utf-8')
-        ).decode('utf-8')
-        
-        return encoded
+        return encode_cursor(data)
 
 
 def apply_cursor_pagination(
@@ -145,31 +395,8 @@ def apply_cursor_pagination(
     Returns:
         Tuple of (items, next_cursor)
     """
-    cursor_data = cursor_pagination.decode_cursor()
-    
-    if cursor_data and "last_id" in cursor_data:
-        # Continue from last ID
-        query = query.filter(
-            getattr(query.column_descriptions[0]['type'], order_field) > cursor_data["last_id"]
-        )
-    
-    # Get one extra item to check if there's a next page
-    items = query.order_by(
-        getattr(query.column_descriptions[0]['type'], order_field)
-    ).limit(cursor_pagination.limit + 1).all()
-    
-    has_next = len(items) > cursor_pagination.limit
-    
-    if has_next:
-        # Remove the extra item
-        items = items[:-1]
-        
-        # Create cursor for next page
-        last_item = items[-1]
-        next_cursor = CursorPagination.encode_cursor({
-            "last_id": getattr(last_item, order_field)
-        })
-    else:
-        next_cursor = None
-    
-    return items, next_cursor
\ No newline at end of file
+    column = getattr(query.column_descriptions[0]['type'], order_field)
+    page = keyset_paginate(
+        query, [SortKey(column)], cursor_pagination.limit, cursor_pagination.cursor
+    )
+    return page.items, page.next_cursor
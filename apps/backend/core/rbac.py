@@ -8,10 +8,14 @@ Comprehensive permissions system with:
 - Field-level access control
 - Dynamic permission evaluation
 - Audit trail integration
+
+Role permission sets are compiled into integer bitmasks (one bit per
+``Permission``, wildcards expanded), so a permission check is a memoized
+mask lookup and a bitwise AND.
 """
 
-from typing import List, Dict, Any, Optional, Set, Union, Callable
-from functools import wraps
+from typing import List, Dict, Any, FrozenSet, Iterable, Optional, Set, Tuple, Union, Callable
+from functools import lru_cache, wraps
 from datetime import datetime
 from enum import Enum
 import json
@@ -198,6 +202,95 @@ CUSTOM_ROLE_PERMISSIONS: Dict[CustomRole, Set[Permission]] = {
 }
 
 
+# One bit per permission, in declaration order
+PERMISSION_BITS: Dict[Permission, int] = {
+    permission: 1 << position for position, permission in enumerate(Permission)
+}
+ALL_PERMISSIONS_MASK = sum(PERMISSION_BITS.values())
+
+# Wildcard strings ("*", "jobs.*") to the bits they cover
+_WILDCARD_MASKS: Dict[str, int] = {"*": ALL_PERMISSIONS_MASK}
+for _permission, _bit in PERMISSION_BITS.items():
+    _resource = _permission.value.split(".")[0]
+    _WILDCARD_MASKS[f"{_resource}.*"] = _WILDCARD_MASKS.get(f"{_resource}.*", 0) | _bit
+
+# Compiled role masks; rebuilt by compile_permissions()
+ROLE_MASKS: Dict[Any, int] = {}
+
+
+def permission_mask(permissions: Iterable[Union[Permission, str]]) -> int:
+    """Compile permissions and wildcard strings into a bitmask."""
+    mask = 0
+    for permission in permissions:
+        if isinstance(permission, Permission):
+            mask |= PERMISSION_BITS[permission]
+        elif permission in _WILDCARD_MASKS:
+            mask |= _WILDCARD_MASKS[permission]
+        else:
+            mask |= PERMISSION_BITS[Permission(permission)]
+    return mask
+
+
+@lru_cache(maxsize=None)
+def permission_bits(permission: Union[Permission, str]) -> int:
+    """Bits that must all be set to hold ``permission``; 0 if it is unknown."""
+    try:
+        return permission_mask([permission])
+    except ValueError:
+        return 0
+
+
+@lru_cache(maxsize=None)
+def permissions_from_mask(mask: int) -> FrozenSet[Permission]:
+    return frozenset(permission for permission, bit in PERMISSION_BITS.items() if mask & bit)
+
+
+@lru_cache(maxsize=1024)
+def roles_mask(role: Any, custom_roles: Tuple[Any, ...] = ()) -> int:
+    """Combined mask for a base role and custom roles, memoized per combination."""
+    mask = ROLE_MASKS.get(role, 0)
+    for custom_role in custom_roles:
+        mask |= ROLE_MASKS.get(custom_role, 0)
+    return mask
+
+
+def compile_permissions():
+    """
+    Compile ROLE_PERMISSIONS and CUSTOM_ROLE_PERMISSIONS into ROLE_MASKS.
+
+    Runs at import; call it again after changing either mapping at runtime.
+    """
+    ROLE_MASKS.clear()
+    for role, permissions in {**ROLE_PERMISSIONS, **CUSTOM_ROLE_PERMISSIONS}.items():
+        ROLE_MASKS[role] = permission_mask(permissions)
+    roles_mask.cache_clear()
+    _restricted_fields.cache_clear()
+
+
+def user_permission_mask(user: User) -> int:
+    """Permission mask for a user's base role and custom roles."""
+    custom_roles = getattr(user, "custom_roles", None) or ()
+    return roles_mask(user.role, tuple(custom_roles))
+
+
+# Response fields hidden from roles that may not see them
+RESTRICTED_FIELDS: Dict[str, Tuple[FrozenSet[str], FrozenSet[UserRole]]] = {
+    # resource type: (fields, roles allowed to see them)
+    "users": (frozenset({"hashed_password", "two_factor_secret", "reset_token"}), frozenset()),
+    "estimates": (
+        frozenset({"cost_breakdown", "profit_margin"}),
+        frozenset({UserRole.ADMIN, UserRole.SUPERVISOR})
+    ),
+    "finance": (frozenset({"bank_details", "tax_info"}), frozenset({UserRole.ADMIN})),
+}
+
+
+@lru_cache(maxsize=256)
+def _restricted_fields(role: Any, resource_type: str) -> FrozenSet[str]:
+    fields, allowed_roles = RESTRICTED_FIELDS.get(resource_type, (frozenset(), frozenset()))
+    return frozenset() if role in allowed_roles else fields
+
+
 class PermissionContext:
     """Context for permission evaluation with resource details."""
     
@@ -223,24 +316,14 @@ class RBACService:
     def __init__(self, db: Session):
         self.db = db
     
+    def get_permission_mask(self, user: User) -> int:
+        """Get the compiled permission mask for a user including custom roles."""
+        # Additional permissions from groups/teams would be OR-ed in here
+        return user_permission_mask(user)
+
     def get_user_permissions(self, user: User) -> Set[Permission]:
         """Get all permissions for a user including custom roles."""
-        permissions = set()
-        
-        # Base role permissions
-        if user.role in ROLE_PERMISSIONS:
-            permissions.update(ROLE_PERMISSIONS[user.role])
-        
-        # Custom role permissions (from user metadata)
-        if hasattr(user, 'custom_roles'):
-            for custom_role in user.custom_roles:
-                if custom_role in CUSTOM_ROLE_PERMISSIONS:
-                    permissions.update(CUSTOM_ROLE_PERMISSIONS[custom_role])
-        
-        # Additional permissions from groups/teams
-        # This would query team memberships and aggregate permissions
-        
-        return permissions
+        return set(permissions_from_mask(self.get_permission_mask(user)))
     
     def has_permission(
         self,
@@ -248,35 +331,25 @@ class RBACService:
         permission: Union[Permission, str],
         context: Optional[PermissionContext] = None
     ) -> bool:
-        """Check if user has specific permission."""
-        # Convert string to Permission enum if needed
-        if isinstance(permission, str):
-            try:
-                permission = Permission(permission)
-            except ValueError:
-                return False
-        
-        # Get user's permissions
-        user_permissions = self.get_user_permissions(user)
-        
-        # Check direct permission
-        if permission in user_permissions:
-            # Additional context-based checks
-            if context:
-                return self._evaluate_context(user, permission, context)
-            return True
-        
-        # Check wildcard permissions
-        resource = permission.value.split('.')[0]
-        if Permission(f"{resource}.*") in user_permissions:
-            return True
-        
-        return False
+        """
+        Check if user has specific permission.
+
+        ``permission`` may also be a wildcard such as ``"jobs.*"``, which
+        requires every permission on that resource.
+        """
+        bits = permission_bits(permission)
+        if not bits or self.get_permission_mask(user) & bits != bits:
+            return False
+
+        # Additional context-based checks
+        if context:
+            return self._evaluate_context(user, permission, context)
+        return True
     
     def _evaluate_context(
         self,
         user: User,
-        permission: Permission,
+        permission: Union[Permission, str],
         context: PermissionContext
     ) -> bool:
         """Evaluate permission in context (ownership, field-level, etc)."""
@@ -331,7 +404,7 @@ class RBACService:
     def _check_field_access(
         self,
         user: User,
-        permission: Permission,
+        permission: Union[Permission, str],
         field_filters: Dict[str, Any]
     ) -> bool:
         """Check field-level access restrictions."""
@@ -344,7 +417,7 @@ class RBACService:
         
         # Check if user is trying to access sensitive fields
         for resource, fields in sensitive_fields.items():
-            if permission.value.startswith(resource):
+            if getattr(permission, "value", permission).startswith(resource):
                 requested_fields = field_filters.get("fields", [])
                 if any(field in fields for field in requested_fields):
                     # Only admin can access sensitive fields
@@ -361,20 +434,22 @@ class RBACService:
         self,
         user: User,
         resource_type: str,
-        data: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Filter response data based on user's field-level permissions."""
-        # Define fields to remove for non-admin users
-        restricted_fields = {
-            "users": ["hashed_password", "two_factor_secret", "reset_token"],
-            "estimates": ["cost_breakdown", "profit_margin"] if user.role not in [UserRole.ADMIN, UserRole.SUPERVISOR] else [],
-            "finance": ["bank_details", "tax_info"] if user.role != UserRole.ADMIN else [],
-        }
-        
-        # Remove restricted fields
-        fields_to_remove = restricted_fields.get(resource_type, [])
-        for field in fields_to_remove:
-            data.pop(field, None)
+        data: Union[Dict[str, Any], List[Dict[str, Any]]]
+    ) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Filter response data based on user's field-level permissions.
+
+        Accepts a single record or a list of records; the restricted field
+        set is resolved once per call and records are filtered in place.
+        """
+        fields_to_remove = _restricted_fields(user.role, resource_type)
+        if not fields_to_remove:
+            return data
+
+        records = data if isinstance(data, list) else [data]
+        for record in records:
+            for field in fields_to_remove:
+                record.pop(field, None)
         
         return data
     
@@ -414,6 +489,9 @@ class RBACService:
         return filters
 
 
+compile_permissions()
+
+
 # Dependency injection helpers
 def get_rbac_service(db: Session = Depends(get_db)) -> RBACService:
     """Get RBAC service instance."""
@@ -459,7 +537,9 @@ def require_permission(permission: Union[Permission, str]):
                     resource_type="permission",
                     details={
                         "permission": permission.value if isinstance(permission, Permission) else permission,
-                        "context": context.__dict__ if context else None
+                        "context": {
+                            key: value for key, value in context.__dict__.items() if key != "user"
+                        } if context else None
                     }
                 )
                 
@@ -468,7 +548,7 @@ def require_permission(permission: Union[Permission, str]):
                     detail=f"Insufficient permissions. Required: {permission.value if isinstance(permission, Permission) else permission}"
                 )
             
-            # Audit successful access
+            # Audit successful access; the audit pipeline aggregates these
             await audit_log(
                 user_id=current_user.id,
                 action="access_granted",
@@ -141,6 +141,10 @@ class Settings(BaseSettings):
 
     GOOGLE_AI_API_KEY: Optional[str] = Field(default=None, env="GOOGLE_AI_API_KEY")
     EMBEDDING_MODEL: str = Field(default="text-embedding-3-small", env="EMBEDDING_MODEL")
+    EMBEDDING_CACHE_PATH: Optional[str] = Field(default=None, env="EMBEDDING_CACHE_PATH")
+    EMBEDDING_CACHE_MAX_BYTES: int = Field(
+        default=64 * 1024 * 1024, env="EMBEDDING_CACHE_MAX_BYTES"
+    )
 
     # Claude/Anthropic
     claude_api_key: Optional[str] = Field(default=None, env="CLAUDE_API_KEY")
@@ -149,6 +153,25 @@ class Settings(BaseSettings):
     # Gemini
     GEMINI_API_KEY: Optional[str] = Field(default=None, env="GEMINI_API_KEY")
 
+    # LLM gateway (rate limits of 0 are disabled)
+    LLM_PROVIDER_CONCURRENCY: int = Field(default=32, env="LLM_PROVIDER_CONCURRENCY")
+    LLM_MODEL_CONCURRENCY: int = Field(default=8, env="LLM_MODEL_CONCURRENCY")
+    LLM_REQUESTS_PER_MINUTE: int = Field(default=0, env="LLM_REQUESTS_PER_MINUTE")
+    LLM_TOKENS_PER_MINUTE: int = Field(default=0, env="LLM_TOKENS_PER_MINUTE")
+    LLM_MAX_RETRIES: int = Field(default=4, env="LLM_MAX_RETRIES")
+    # {"model": {"requests_per_minute": 50, "fallback": "other-model", ...}}
+    LLM_MODEL_LIMITS: Optional[Dict[str, Dict[str, Any]]] = Field(default=None, env="LLM_MODEL_LIMITS")
+
+    # Chat history
+    CHAT_CONTEXT_TOKENS: int = Field(default=4000, env="CHAT_CONTEXT_TOKENS")
+    CHAT_HISTORY_SESSIONS: int = Field(default=2000, env="CHAT_HISTORY_SESSIONS")
+    CHAT_HISTORY_BATCH_SIZE: int = Field(default=200, env="CHAT_HISTORY_BATCH_SIZE")
+    CHAT_HISTORY_FLUSH_SECONDS: float = Field(default=1.0, env="CHAT_HISTORY_FLUSH_SECONDS")
+
+    # AI usage accounting
+    AI_QUOTA_REFRESH_SECONDS: float = Field(default=60.0, env="AI_QUOTA_REFRESH_SECONDS")
+    AI_USAGE_FLUSH_SECONDS: float = Field(default=2.0, env="AI_USAGE_FLUSH_SECONDS")
+
     COST_THRESHOLD_USD: float = Field(default=100.0, env="COST_THRESHOLD_USD")
     
     # Email
@@ -238,6 +261,42 @@ class Settings(BaseSettings):
         default="sqlite:///brainops_bot.db", env="DATABASE_URL"
     )
 
+    # Caching
+    REDIS_URL: Optional[str] = Field(default=None, env="REDIS_URL")
+    CACHE_MAX_ENTRIES: int = Field(default=10000, env="CACHE_MAX_ENTRIES")
+    CACHE_MAX_BYTES: int = Field(default=64 * 1024 * 1024, env="CACHE_MAX_BYTES")
+    CACHE_SWEEP_INTERVAL_SECONDS: int = Field(
+        default=60, env="CACHE_SWEEP_INTERVAL_SECONDS"
+    )
+
+    # Authentication fast path
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: float = Field(
+        default=30.0, env="AUTH_PRINCIPAL_CACHE_TTL_SECONDS"
+    )
+    AUTH_PRINCIPAL_CACHE_MAX_ENTRIES: int = Field(
+        default=10000, env="AUTH_PRINCIPAL_CACHE_MAX_ENTRIES"
+    )
+    AUTH_ACTIVITY_FLUSH_SECONDS: float = Field(default=30.0, env="AUTH_ACTIVITY_FLUSH_SECONDS")
+
+    # Audit trail
+    # "database", "jsonl" or "none"
+    AUDIT_SINK: str = Field(default="database", env="AUDIT_SINK")
+    AUDIT_LOG_DIR: str = Field(default="logs/audit", env="AUDIT_LOG_DIR")
+    AUDIT_LOG_MAX_BYTES: int = Field(default=100 * 1024 * 1024, env="AUDIT_LOG_MAX_BYTES")
+    AUDIT_QUEUE_SIZE: int = Field(default=10000, env="AUDIT_QUEUE_SIZE")
+    AUDIT_BATCH_SIZE: int = Field(default=500, env="AUDIT_BATCH_SIZE")
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = Field(default=1.0, env="AUDIT_FLUSH_INTERVAL_SECONDS")
+
+    # WebSockets
+    WEBSOCKET_SEND_QUEUE_SIZE: int = Field(default=256, env="WEBSOCKET_SEND_QUEUE_SIZE")
+    WEBSOCKET_SEND_TIMEOUT_SECONDS: float = Field(
+        default=10.0, env="WEBSOCKET_SEND_TIMEOUT_SECONDS"
+    )
+    # "drop_oldest" or "close"
+    WEBSOCKET_SLOW_CONSUMER_POLICY: str = Field(
+        default="drop_oldest", env="WEBSOCKET_SLOW_CONSUMER_POLICY"
+    )
+
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -1,32 +1,156 @@
 """
 WebSocket management for real-time communication.
+
+Every connection gets a bounded send queue drained by its own writer task,
+so a broadcast only serializes the message once and enqueues the text; a
+slow or offline client fills its own queue instead of stalling the room.
+When a queue is full the manager either drops the oldest pending message
+or closes the connection, depending on ``slow_consumer_policy``.
+
+Broadcasts are also published on a ``MessageBus`` so rooms span workers:
+with ``REDIS_URL`` configured each worker delivers to its own clients
+whatever any worker sends.
 """
 
-from typing import Dict, Set, Optional, Any
+from typing import Dict, Iterable, Set, Optional, Any
 from fastapi import WebSocket, WebSocketDisconnect
 import json
 import asyncio
-from datetime import datetime
+from datetime import date, datetime
+from uuid import uuid4
 import structlog
 
+from .cache import redis_client
+from .message_bus import InProcessBus, MessageBus, RedisMessageBus
+from .settings import settings
+
 logger = structlog.get_logger()
 
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "close")
+# Close code sent to clients that cannot keep up ("Try Again Later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_message(message: Dict[str, Any]) -> str:
+    """Serialize a message the way ``WebSocket.send_json`` does."""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=_json_default)
+
+
+class _ClientSender:
+    """Bounded send queue and writer task for one connection."""
+
+    def __init__(self, manager: "ConnectionManager", client_id: str, websocket: WebSocket):
+        self.manager = manager
+        self.client_id = client_id
+        self.websocket = websocket
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=manager.queue_size)
+        self.dropped = 0
+        self.task = asyncio.create_task(self._run())
+
+    def offer(self, text: str) -> bool:
+        """Queue a message without waiting; False if the client is too slow."""
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            if self.manager.slow_consumer_policy == "close":
+                return False
+        self.queue.get_nowait()
+        self.queue.put_nowait(text)
+        self.dropped += 1
+        self.manager.dropped_messages += 1
+        return True
+
+    async def _run(self):
+        try:
+            while True:
+                text = await self.queue.get()
+                await asyncio.wait_for(
+                    self.websocket.send_text(text), timeout=self.manager.send_timeout
+                )
+        except asyncio.TimeoutError:
+            logger.warning(f"WebSocket send to {self.client_id} timed out; closing")
+            self.manager._evict(self.client_id, self, SLOW_CONSUMER_CLOSE_CODE)
+        except Exception as e:
+            logger.error(f"Failed to send message to {self.client_id}: {e}")
+            self.manager._evict(self.client_id, self)
+
+
 class ConnectionManager:
     """Manages WebSocket connections for real-time updates."""
-    
-    def __init__(self):
+
+    CHANNEL = "websocket:fanout"
+    # Clients enqueued per event loop turn during a fan-out
+    FANOUT_BATCH = 500
+
+    def __init__(
+        self,
+        bus: Optional[MessageBus] = None,
+        queue_size: int = 256,
+        send_timeout: float = 10.0,
+        slow_consumer_policy: str = "drop_oldest"
+    ):
+        if slow_consumer_policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(
+                f"Unknown slow consumer policy {slow_consumer_policy}; "
+                f"expected one of {SLOW_CONSUMER_POLICIES}"
+            )
         # Active connections by client ID
         self.active_connections: Dict[str, WebSocket] = {}
         # Room/channel subscriptions
         self.rooms: Dict[str, Set[str]] = {}
         # Client metadata
         self.client_metadata: Dict[str, Dict[str, Any]] = {}
-    
+
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.slow_consumer_policy = slow_consumer_policy
+        self.bus = bus or InProcessBus()
+        self.worker_id = uuid4().hex
+        self.dropped_messages = 0
+        self.slow_consumers_closed = 0
+        self._senders: Dict[str, _ClientSender] = {}
+        self._closing: Set[asyncio.Task] = set()
+        self._subscribed = False
+
+    async def start(self):
+        """Subscribe to the bus so messages from other workers arrive here."""
+        if self._subscribed:
+            return
+        self._subscribed = True
+        try:
+            await self.bus.subscribe(self.CHANNEL, self._on_bus_message)
+        except Exception as e:
+            self._subscribed = False
+            logger.error(f"WebSocket bus subscribe failed: {e}")
+
+    async def shutdown(self):
+        """Close every connection and leave the bus."""
+        for client_id, websocket in list(self.active_connections.items()):
+            self.disconnect(client_id)
+            self._schedule_close(websocket, 1001)
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+        if self._subscribed:
+            await self.bus.unsubscribe(self.CHANNEL, self._on_bus_message)
+            self._subscribed = False
+
     async def connect(self, websocket: WebSocket, client_id: str) -> bool:
         """Accept and register a new WebSocket connection."""
         try:
             await websocket.accept()
+            await self.start()
+            previous = self._senders.pop(client_id, None)
+            if previous is not None:
+                previous.task.cancel()
             self.active_connections[client_id] = websocket
+            self._senders[client_id] = _ClientSender(self, client_id, websocket)
             self.client_metadata[client_id] = {
                 "connected_at": datetime.utcnow(),
                 "rooms": set()
@@ -46,45 +170,103 @@ class ConnectionManager:
             logger.error(f"Failed to connect WebSocket client {client_id}: {e}")
             return False
     
-    def disconnect(self, client_id: str):
-        """Remove a WebSocket connection."""
-        if client_id in self.active_connections:
-            # Remove from all rooms
-            for room in self.client_metadata.get(client_id, {}).get("rooms", set()):
-                self.leave_room(client_id, room)
-            
-            # Remove connection
-            del self.active_connections[client_id]
-            if client_id in self.client_metadata:
-                del self.client_metadata[client_id]
-            
-            logger.info(f"WebSocket client disconnected: {client_id}")
-    
-    async def send_personal_message(self, message: Dict[str, Any], client_id: str):
-        """Send a message to a specific client."""
-        if client_id in self.active_connections:
+    def disconnect(self, client_id: str, websocket: Optional[WebSocket] = None):
+        """
+        Remove a WebSocket connection.
+
+        When ``websocket`` is given, nothing happens unless it is still the
+        registered connection, so a stale handler cannot remove a client
+        that has since reconnected under the same ID.
+        """
+        if client_id not in self.active_connections:
+            return
+        if websocket is not None and self.active_connections[client_id] is not websocket:
+            return
+
+        # Remove from all rooms
+        for room in list(self.client_metadata.get(client_id, {}).get("rooms", ())):
+            self.leave_room(client_id, room)
+
+        sender = self._senders.pop(client_id, None)
+        if sender is not None and sender.task is not asyncio.current_task():
+            sender.task.cancel()
+
+        # Remove connection
+        del self.active_connections[client_id]
+        self.client_metadata.pop(client_id, None)
+
+        logger.info(f"WebSocket client disconnected: {client_id}")
+
+    def _schedule_close(self, websocket: WebSocket, code: int):
+        async def _close():
             try:
-                websocket = self.active_connections[client_id]
-                await websocket.send_json(message)
-            except Exception as e:
-                logger.error(f"Failed to send message to {client_id}: {e}")
-                self.disconnect(client_id)
-    
+                await websocket.close(code=code)
+            except Exception:
+                pass
+
+        task = asyncio.create_task(_close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def _evict(self, client_id: str, sender: _ClientSender, code: Optional[int] = None):
+        """Drop a connection whose writer failed or fell behind."""
+        if self._senders.get(client_id) is not sender:
+            return
+        self.disconnect(client_id)
+        if code is not None:
+            self.slow_consumers_closed += 1
+            self._schedule_close(sender.websocket, code)
+
+    def _enqueue(self, client_id: str, text: str):
+        sender = self._senders.get(client_id)
+        if sender is None:
+            return
+        if not sender.offer(text):
+            logger.warning(f"WebSocket client {client_id} send queue is full; closing")
+            self._evict(client_id, sender, SLOW_CONSUMER_CLOSE_CODE)
+
+    async def _fanout(self, client_ids: Iterable[str], text: str, exclude_client: Optional[str]):
+        for count, client_id in enumerate(list(client_ids), 1):
+            if client_id != exclude_client:
+                self._enqueue(client_id, text)
+            if count % self.FANOUT_BATCH == 0:
+                # Let other tasks run during very large fan-outs
+                await asyncio.sleep(0)
+
+    async def _publish(self, text: str, **target: Optional[str]):
+        """Forward a serialized message to the other workers."""
+        header = json.dumps({"origin": self.worker_id, **target})
+        try:
+            await self.bus.publish(self.CHANNEL, f"{header}\n{text}")
+        except Exception as e:
+            logger.error(f"WebSocket bus publish failed: {e}")
+
+    async def _on_bus_message(self, data: str):
+        header, _, text = data.partition("\n")
+        target = json.loads(header)
+        if target.get("origin") == self.worker_id:
+            return
+
+        if target.get("client"):
+            self._enqueue(target["client"], text)
+        elif target.get("room"):
+            await self._fanout(self.rooms.get(target["room"], ()), text, target.get("exclude"))
+        else:
+            await self._fanout(self.active_connections, text, target.get("exclude"))
+
+    async def send_personal_message(self, message: Dict[str, Any], client_id: str):
+        """Send a message to a specific client, on whichever worker holds it."""
+        text = encode_message(message)
+        if client_id in self._senders:
+            self._enqueue(client_id, text)
+        else:
+            await self._publish(text, client=client_id)
+
     async def broadcast(self, message: Dict[str, Any], exclude_client: Optional[str] = None):
         """Broadcast a message to all connected clients."""
-        disconnected_clients = []
-        
-        for client_id, websocket in self.active_connections.items():
-            if client_id != exclude_client:
-                try:
-                    await websocket.send_json(message)
-                except Exception as e:
-                    logger.error(f"Failed to send broadcast to {client_id}: {e}")
-                    disconnected_clients.append(client_id)
-        
-        # Clean up disconnected clients
-        for client_id in disconnected_clients:
-            self.disconnect(client_id)
+        text = encode_message(message)
+        await self._fanout(self.active_connections, text, exclude_client)
+        await self._publish(text, exclude=exclude_client)
     
     def join_room(self, client_id: str, room: str):
         """Add a client to a room/channel."""
@@ -113,23 +295,10 @@ class ConnectionManager:
     
     async def broadcast_to_room(self, room: str, message: Dict[str, Any], 
                                exclude_client: Optional[str] = None):
-        """Broadcast a message to all clients in a room."""
-        if room not in self.rooms:
-            return
-        
-        disconnected_clients = []
-        
-        for client_id in self.rooms[room]:
-            if client_id != exclude_client and client_id in self.active_connections:
-                try:
-                    await self.active_connections[client_id].send_json(message)
-                except Exception as e:
-                    logger.error(f"Failed to send room message to {client_id}: {e}")
-                    disconnected_clients.append(client_id)
-        
-        # Clean up disconnected clients
-        for client_id in disconnected_clients:
-            self.disconnect(client_id)
+        """Broadcast a message to all clients in a room, across workers."""
+        text = encode_message(message)
+        await self._fanout(self.rooms.get(room, ()), text, exclude_client)
+        await self._publish(text, room=room, exclude=exclude_client)
     
     def get_room_members(self, room: str) -> Set[str]:
         """Get all clients in a room."""
@@ -146,6 +315,16 @@ class ConnectionManager:
     def get_connected_clients(self) -> Set[str]:
         """Get all connected client IDs."""
         return set(self.active_connections.keys())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": len(self.active_connections),
+            "rooms": len(self.rooms),
+            "queued_messages": sum(sender.queue.qsize() for sender in self._senders.values()),
+            "dropped_messages": self.dropped_messages,
+            "slow_consumers_closed": self.slow_consumers_closed,
+            "bus": type(self.bus).__name__,
+        }
     
     async def handle_message(self, client_id: str, message: Dict[str, Any]):
         """Handle incoming WebSocket messages."""
@@ -216,7 +395,12 @@ class ConnectionManager:
                 }, exclude_client=client_id)
 
 # Global connection manager instance
-manager = ConnectionManager()
+manager = ConnectionManager(
+    bus=RedisMessageBus(redis_client) if redis_client is not None else None,
+    queue_size=settings.WEBSOCKET_SEND_QUEUE_SIZE,
+    send_timeout=settings.WEBSOCKET_SEND_TIMEOUT_SECONDS,
+    slow_consumer_policy=settings.WEBSOCKET_SLOW_CONSUMER_POLICY
+)
 
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
     """WebSocket endpoint handler."""
@@ -234,10 +418,10 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
             await manager.handle_message(client_id, data)
             
     except WebSocketDisconnect:
-        manager.disconnect(client_id)
+        manager.disconnect(client_id, websocket)
     except Exception as e:
         logger.error(f"WebSocket error for client {client_id}: {e}")
-        manager.disconnect(client_id)
+        manager.disconnect(client_id, websocket)
 
 async def send_notification(client_id: str, notification: Dict[str, Any]):
     """Send a notification to a specific client."""
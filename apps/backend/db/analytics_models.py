@@ -0,0 +1,285 @@
+"""
+Rollup tables for financial and CRM analytics.
+
+Dashboards and reports read pre-aggregated daily and monthly totals
+from ``analytics_rollups`` instead of scanning invoices, payments,
+expenses and opportunities. The rollups are maintained incrementally:
+after every flush, each written row's old contribution is subtracted
+and its new one added, in the same transaction as the write. Bulk
+``Query.update()``/``delete()`` calls bypass the ORM and therefore the
+rollups; ``services.rollups.rebuild_rollups`` recomputes them from
+scratch.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Tuple
+
+from sqlalchemy import BigInteger, Column, Date, Float, Index, Integer, String, event, inspect
+from sqlalchemy.orm import Session
+
+from .models import Base
+from .financial_models import Expense, Invoice, Payment
+from .crm_models import Opportunity
+
+
+ROLLUP_GRAINS = ("day", "month")
+
+# Invoice statuses that never count as revenue
+EXCLUDED_INVOICE_STATUSES = frozenset({"cancelled", "void"})
+
+
+class AnalyticsRollup(Base):
+    """
+    Pre-aggregated totals for one metric, dimension and period.
+
+    ``grain`` is "day" or "month"; ``period_start`` is the day itself or the
+    first of the month. ``dimension`` is "" for metrics without one.
+    """
+    __tablename__ = "analytics_rollups"
+
+    grain = Column(String(10), primary_key=True)
+    period_start = Column(Date, primary_key=True)
+    metric = Column(String(50), primary_key=True)
+    dimension = Column(String(100), primary_key=True, default="")
+
+    count = Column(Integer, nullable=False, default=0)
+    amount_cents = Column(BigInteger, nullable=False, default=0)
+    weighted_cents = Column(BigInteger, nullable=False, default=0)
+    duration_days = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        Index("idx_rollup_metric_period", "metric", "grain", "period_start"),
+    )
+
+
+class Contribution(NamedTuple):
+    """What one source row adds to one rollup key."""
+    day: date
+    metric: str
+    dimension: str = ""
+    count: int = 1
+    amount_cents: int = 0
+    weighted_cents: int = 0
+    duration_days: float = 0.0
+
+
+def _day(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _enum_value(value) -> str:
+    return str(getattr(value, "value", value) or "")
+
+
+def invoice_contributions(invoice) -> List[Contribution]:
+    if not invoice.invoice_date or invoice.status in EXCLUDED_INVOICE_STATUSES:
+        return []
+    return [
+        Contribution(invoice.invoice_date, "invoice.billed", amount_cents=invoice.total_cents or 0),
+        Contribution(
+            invoice.invoice_date, "invoice.collected",
+            count=1 if invoice.amount_paid_cents else 0,
+            amount_cents=invoice.amount_paid_cents or 0
+        ),
+    ]
+
+
+def payment_contributions(payment) -> List[Contribution]:
+    if not payment.payment_date or payment.status == "failed":
+        return []
+    return [Contribution(
+        payment.payment_date, "payment.received", payment.payment_method or "",
+        amount_cents=(payment.amount_cents or 0) - (payment.refund_amount_cents or 0)
+    )]
+
+
+def expense_contributions(expense) -> List[Contribution]:
+    if not expense.expense_date:
+        return []
+    contributions = [Contribution(
+        expense.expense_date, "expense", expense.category or "", amount_cents=expense.amount_cents or 0
+    )]
+    if expense.approved_date:
+        contributions.append(contributions[0]._replace(metric="expense.approved"))
+    return contributions
+
+
+def opportunity_contributions(opportunity) -> List[Contribution]:
+    value = opportunity.value_cents or 0
+    weighted = round(value * (opportunity.probability or 0) / 100)
+    created = opportunity.created_at or datetime.utcnow()
+    contributions = []
+
+    if opportunity.is_active:
+        contributions.append(Contribution(
+            _day(created), "opportunity.open", _enum_value(opportunity.stage),
+            amount_cents=value, weighted_cents=weighted
+        ))
+        if opportunity.expected_close_date:
+            contributions.append(Contribution(
+                opportunity.expected_close_date, "opportunity.expected",
+                amount_cents=value, weighted_cents=weighted
+            ))
+
+    if opportunity.closed_date and opportunity.is_won is not None:
+        contributions.append(Contribution(
+            _day(opportunity.closed_date),
+            "opportunity.won" if opportunity.is_won else "opportunity.lost",
+            amount_cents=value,
+            duration_days=(opportunity.closed_date - created).total_seconds() / 86400
+        ))
+    return contributions
+
+
+# Source model -> (fields the contributions read, contribution function)
+ROLLUP_SOURCES: Dict[type, Tuple[Tuple[str, ...], Callable[[Any], List[Contribution]]]] = {}
+
+
+def _keep_previous(target, value, oldvalue, initiator):
+    return value
+
+
+def register_rollup_source(
+    model: type, fields: Tuple[str, ...], contributions: Callable[[Any], List[Contribution]]
+):
+    """
+    Maintain rollups for ``model`` from ``contributions(row)``.
+
+    ``fields`` must list every attribute the function reads. They get
+    active history, so assigning to an expired attribute (e.g. after a
+    commit) loads the old value first and the old contribution can be
+    subtracted.
+    """
+    ROLLUP_SOURCES[model] = (fields, contributions)
+    for field in fields:
+        event.listen(getattr(model, field), "set", _keep_previous, active_history=True, retval=True)
+
+
+register_rollup_source(
+    Invoice, ("invoice_date", "status", "total_cents", "amount_paid_cents"), invoice_contributions
+)
+register_rollup_source(
+    Payment,
+    ("payment_date", "status", "payment_method", "amount_cents", "refund_amount_cents"),
+    payment_contributions
+)
+register_rollup_source(
+    Expense, ("expense_date", "category", "amount_cents", "approved_date"), expense_contributions
+)
+register_rollup_source(
+    Opportunity,
+    ("value_cents", "probability", "stage", "created_at", "expected_close_date",
+     "closed_date", "is_won", "is_active"),
+    opportunity_contributions
+)
+
+# Rollup key (grain, period_start, metric, dimension) -> [count, amount, weighted, days]
+RollupDeltas = Dict[Tuple[str, date, str, str], List[Any]]
+
+
+def period_start(day: date, grain: str) -> date:
+    return day.replace(day=1) if grain == "month" else day
+
+
+def accumulate(deltas: RollupDeltas, contributions: Iterable[Contribution], sign: int = 1):
+    """Add (or with ``sign=-1`` subtract) contributions into ``deltas`` for every grain."""
+    for c in contributions:
+        for grain in ROLLUP_GRAINS:
+            totals = deltas[(grain, period_start(c.day, grain), c.metric, c.dimension)]
+            totals[0] += sign * c.count
+            totals[1] += sign * c.amount_cents
+            totals[2] += sign * c.weighted_cents
+            totals[3] += sign * c.duration_days
+
+
+def new_deltas() -> RollupDeltas:
+    return defaultdict(lambda: [0, 0, 0, 0.0])
+
+
+def _previous_state(obj, fields: Tuple[str, ...]) -> SimpleNamespace:
+    """The committed values of ``fields`` before the pending changes."""
+    state = inspect(obj)
+    values = {}
+    for field in fields:
+        history = state.attrs[field].history
+        values[field] = history.deleted[0] if history.deleted else getattr(obj, field)
+    return SimpleNamespace(**values)
+
+
+def session_deltas(session: Session) -> RollupDeltas:
+    """Rollup changes implied by the session's pending inserts, updates and deletes."""
+    deltas = new_deltas()
+    for obj in session.new:
+        source = ROLLUP_SOURCES.get(type(obj))
+        if source:
+            accumulate(deltas, source[1](obj))
+    for obj in session.dirty:
+        source = ROLLUP_SOURCES.get(type(obj))
+        if source and session.is_modified(obj, include_collections=False):
+            fields, contributions = source
+            accumulate(deltas, contributions(_previous_state(obj, fields)), -1)
+            accumulate(deltas, contributions(obj))
+    for obj in session.deleted:
+        source = ROLLUP_SOURCES.get(type(obj))
+        if source:
+            fields, contributions = source
+            accumulate(deltas, contributions(_previous_state(obj, fields)), -1)
+    return deltas
+
+
+def apply_rollup_deltas(connection, deltas: RollupDeltas) -> int:
+    """Upsert ``deltas`` into ``analytics_rollups``; returns the rows touched."""
+    rows = [
+        {
+            "grain": grain, "period_start": start, "metric": metric, "dimension": dimension,
+            "count": totals[0], "amount_cents": totals[1],
+            "weighted_cents": totals[2], "duration_days": totals[3],
+        }
+        for (grain, start, metric, dimension), totals in deltas.items()
+        if any(totals)
+    ]
+    if not rows:
+        return 0
+
+    table = AnalyticsRollup.__table__
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(table).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=["grain", "period_start", "metric", "dimension"],
+            set_={
+                name: table.c[name] + statement.excluded[name]
+                for name in ("count", "amount_cents", "weighted_cents", "duration_days")
+            }
+        )
+        connection.execute(statement)
+        return len(rows)
+
+    for row in rows:
+        key = (
+            (table.c.grain == row["grain"]) & (table.c.period_start == row["period_start"])
+            & (table.c.metric == row["metric"]) & (table.c.dimension == row["dimension"])
+        )
+        updated = connection.execute(table.update().where(key).values(
+            count=table.c.count + row["count"],
+            amount_cents=table.c.amount_cents + row["amount_cents"],
+            weighted_cents=table.c.weighted_cents + row["weighted_cents"],
+            duration_days=table.c.duration_days + row["duration_days"],
+        ))
+        if updated.rowcount == 0:
+            connection.execute(table.insert().values(**row))
+    return len(rows)
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_rollups(session, flush_context):
+    # new/dirty/deleted and attribute history still describe the flushed changes here
+    deltas = session_deltas(session)
+    if deltas:
+        apply_rollup_deltas(session.connection(), deltas)
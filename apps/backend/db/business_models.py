@@ -6,7 +6,7 @@ Defines models for users, teams, projects, products, billing, and field operatio
 
 from datetime import datetime
 from typing import Optional, List
-from sqlalchemy import Column, String, DateTime, JSON, Boolean, Text, Integer, ForeignKey, Index, Float, Enum as SQLEnum, Table
+from sqlalchemy import Column, String, DateTime, JSON, Boolean, Text, Integer, ForeignKey, Index, Float, Enum as SQLEnum, Table, DDL, event, case, func, or_
 from sqlalchemy.orm import relationship
 import uuid
 import enum
@@ -172,6 +172,13 @@ class Project(Base):
     meta_data = Column(JSON, default={})  # Renamed from metadata to avoid SQLAlchemy conflict
     tags = Column(JSON, default=[])
     
+    # Job fields copied out of meta_data on flush (see sync_project_fields)
+    phase = Column(String(50), nullable=True)
+    assigned_foreman_id = Column(String(36), nullable=True)
+    customer_name = Column(String(200), nullable=True)
+    property_address = Column(String(500), nullable=True)
+    search_text = Column(Text, nullable=True)  # lowercased name, customer and address
+    
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -187,7 +194,85 @@ class Project(Base):
     __table_args__ = (
         Index("idx_project_status", "status"),
         Index("idx_project_owner_status", "owner_id", "status"),
+        Index("idx_project_type_phase", "project_type", "phase"),
+        Index("idx_project_foreman", "assigned_foreman_id"),
+        Index(
+            "idx_project_search_trgm", "search_text",
+            postgresql_using="gin", postgresql_ops={"search_text": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
+
+
+# Separator between the fields of Project.search_text
+SEARCH_TEXT_SEPARATOR = "\n"
+
+
+def project_search_text(*fields: Optional[str]) -> Optional[str]:
+    """Build the lowercased text that job search matches against."""
+    text = SEARCH_TEXT_SEPARATOR.join(str(field) for field in fields if field)
+    return text.lower() or None
+
+
+def sync_project_fields(project: Project):
+    """Copy the searchable job fields out of meta_data into their columns."""
+    meta = project.meta_data or {}
+    customer = meta.get('customer')
+    foreman_id = meta.get('assigned_foreman_id')
+    
+    project.phase = meta.get('phase')
+    project.assigned_foreman_id = str(foreman_id) if foreman_id else None
+    project.customer_name = customer.get('name') if isinstance(customer, dict) else None
+    project.property_address = meta.get('property_address')
+    project.search_text = project_search_text(
+        project.name, project.customer_name, project.property_address
+    )
+
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def project_search(search: str, dialect: str = "default"):
+    """
+    Build the filter and relevance ordering for a project search.
+    
+    Matches ``search`` as a substring of ``Project.search_text``, which the
+    pg_trgm GIN index serves on PostgreSQL. Matches at the start of the
+    name, customer or address rank first, then matches at the start of a
+    word, then anywhere; on PostgreSQL each tier is further ordered by
+    trigram similarity.
+    
+    Returns:
+        (filter clause, list of ORDER BY clauses)
+    """
+    term = search.strip().lower()
+    pattern = _escape_like(term)
+    text = Project.search_text
+    tier = case(
+        (or_(
+            text.like(f"{pattern}%", escape="\\"),
+            text.like(f"%{SEARCH_TEXT_SEPARATOR}{pattern}%", escape="\\")
+        ), 0),
+        (text.like(f"% {pattern}%", escape="\\"), 1),
+        else_=2
     )
+    ordering = [tier.asc()]
+    if dialect == "postgresql":
+        ordering.append(func.similarity(text, term).desc())
+    return text.like(f"%{pattern}%", escape="\\"), ordering
+
+@event.listens_for(Project, "before_insert")
+@event.listens_for(Project, "before_update")
+def _sync_project_fields(mapper, connection, target):
+    sync_project_fields(target)
+
+
+# The trigram index needs pg_trgm when the schema is created without Alembic
+event.listen(
+    Project.__table__, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
 
 
 class ProjectTask(Base):
@@ -258,6 +343,31 @@ class TaskComment(Base):
     user = relationship("User")
 
 
+class TaskDependencyModel(Base):
+    """
+    Dependency between two project tasks.
+    """
+    __tablename__ = "task_dependencies"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    task_id = Column(UUID(as_uuid=True), ForeignKey("project_tasks.id", ondelete="CASCADE"), nullable=False)
+    predecessor_id = Column(UUID(as_uuid=True), ForeignKey("project_tasks.id", ondelete="CASCADE"), nullable=False)
+    dependency_type = Column(String(20), default="finish_to_start")
+    lag_hours = Column(Float, default=0)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    task = relationship("ProjectTask", foreign_keys=[task_id])
+    predecessor = relationship("ProjectTask", foreign_keys=[predecessor_id])
+    
+    # Indexes
+    __table_args__ = (
+        Index("idx_task_dependency_task", "task_id"),
+        Index("idx_task_dependency_predecessor", "predecessor_id"),
+    )
+
+
 class Product(Base):
     """
     Digital product model for marketplace.
@@ -179,4 +179,77 @@ class SystemConfig(Base):
     
     # Audit fields
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    updated_by = Column(String(100), nullable=True)
\ No newline at end of file
+    updated_by = Column(String(100), nullable=True)
+
+class AuditEvent(Base):
+    """
+    Append-only audit trail written in batches by the audit pipeline.
+
+    High-volume actions such as ``access_granted`` are aggregated per flush
+    window; ``count`` holds how many events a row stands for.
+    """
+    __tablename__ = "audit_events"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    occurred_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Who did what to which resource; no foreign keys so rows outlive users
+    user_id = Column(UUID(as_uuid=True), nullable=True)
+    action = Column(String(100), nullable=False)
+    resource_type = Column(String(50), nullable=False)
+    resource_id = Column(String(100), nullable=True)
+    details = Column(JSON, default={})
+    ip_address = Column(String(45), nullable=True)
+    count = Column(Integer, default=1, nullable=False)
+    
+    __table_args__ = (
+        Index("idx_audit_user_time", "user_id", "occurred_at"),
+        Index("idx_audit_action_time", "action", "occurred_at"),
+        Index("idx_audit_resource", "resource_type", "resource_id"),
+    )
+
+
+class ChatSession(Base):
+    """
+    One chat conversation and its rolling summary.
+
+    ``summary`` condenses every message up to ``summarized_through`` (a
+    ``chat_messages.seq``); newer messages are sent to the model verbatim.
+    """
+    __tablename__ = "chat_sessions"
+    
+    id = Column(String(100), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    title = Column(String(255), nullable=True)
+    model = Column(String(50), nullable=True)
+    message_count = Column(Integer, default=0, nullable=False)
+    summary = Column(Text, nullable=True)
+    summarized_through = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        Index("idx_chat_session_user_updated", "user_id", "updated_at"),
+    )
+
+
+class ChatMessage(Base):
+    """
+    Append-only chat message log, numbered per session by ``seq``.
+    
+    Rows are written in batches by the conversation store and never updated;
+    ``seq`` is unique per session so concurrent writers cannot both claim it.
+    """
+    __tablename__ = "chat_messages"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    session_id = Column(String(100), nullable=False)
+    seq = Column(Integer, nullable=False)
+    role = Column(String(20), nullable=False)
+    content = Column(Text, nullable=False)
+    tokens = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        Index("idx_chat_message_session_seq", "session_id", "seq", unique=True),
+    )
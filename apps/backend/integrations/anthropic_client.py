@@ -1,10 +1,10 @@
 """
 Anthropic (Claude) Integration Client
 """
-import asyncio
 from typing import Optional, List, Dict, Any, Union
 import anthropic
 from anthropic import AsyncAnthropic
+from ..core.llm_gateway import estimate_tokens, llm_gateway
 from ..core.settings import settings
 from ..core.logging import logger
 
@@ -37,13 +37,19 @@ class AnthropicClient:
             # Convert messages to Anthropic format if needed
             anthropic_messages = self._convert_messages(messages)
             
-            response = await self.client.messages.create(
-                model=model,
-                messages=anthropic_messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                system=system,
-                **kwargs
+            response = await llm_gateway.call(
+                model,
+                lambda model: self.client.messages.create(
+                    model=model,
+                    messages=anthropic_messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    system=system,
+                    **kwargs
+                ),
+                provider="anthropic",
+                estimated_tokens=estimate_tokens(str(anthropic_messages) + (system or "")) + max_tokens,
+                usage=lambda response: response.usage.input_tokens + response.usage.output_tokens
             )
             return response
         except anthropic.RateLimitError as e:
@@ -145,15 +151,26 @@ class AnthropicClient:
         model = model or self.default_model
         anthropic_messages = self._convert_messages(messages)
         
-        try:
+        max_tokens = kwargs.pop("max_tokens", 1000)
+
+        async def open_stream(model: str):
             async with self.client.messages.stream(
                 model=model,
                 messages=anthropic_messages,
-                max_tokens=kwargs.get("max_tokens", 1000),
+                max_tokens=max_tokens,
                 **kwargs
             ) as stream:
                 async for text in stream.text_stream:
                     yield text
+
+        try:
+            async for text in llm_gateway.stream(
+                model,
+                open_stream,
+                provider="anthropic",
+                estimated_tokens=estimate_tokens(str(anthropic_messages)) + max_tokens
+            ):
+                yield text
         except Exception as e:
             logger.error(f"Error in streaming completion: {str(e)}")
             raise
\ No newline at end of file
@@ -1,10 +1,10 @@
 """
 OpenAI Integration Client
 """
-import asyncio
 from typing import Optional, List, Dict, Any, Union
 from openai import AsyncOpenAI
 import openai
+from ..core.llm_gateway import estimate_tokens, llm_gateway
 from ..core.settings import settings
 from ..core.logging import logger
 
@@ -33,12 +33,18 @@ class OpenAIClient:
         model = model or self.default_model
         
         try:
-            response = await self.client.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                **kwargs
+            response = await llm_gateway.call(
+                model,
+                lambda model: self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    **kwargs
+                ),
+                provider="openai",
+                estimated_tokens=estimate_tokens(str(messages)) + (max_tokens or 0),
+                usage=lambda response: response.usage.total_tokens
             )
             return response
         except openai.RateLimitError as e:
@@ -18,6 +18,12 @@ from starlette.middleware.sessions import SessionMiddleware
 
 from .core.settings import settings
 from .core.database import engine, Base
+from .core.cache import default_cache
+from .core.auth import activity_recorder
+from .core.audit import audit_pipeline
+from .core.websocket import manager as websocket_manager
+from .services.ai_usage import ai_usage_tracker
+from .services.conversation_store import conversation_store
 from .core.logging import setup_logging, get_logger
 from .middleware.security import SecurityMiddleware
 from .middleware.logging import LoggingMiddleware
@@ -101,10 +107,29 @@ async def lifespan(app: FastAPI):
     logger.info(f"Database URL configured: {'Yes' if settings.DATABASE_URL else 'No'}")
     logger.info(f"CORS Origins: {settings.CORS_ORIGINS}")
     
+    # Start evicting expired cache entries in the background
+    default_cache.start_sweeper()
+    # Write buffered session activity and API key usage periodically
+    activity_recorder.start()
+    # Write audit events in batches off the request path
+    audit_pipeline.start()
+    # Write chat messages in batches off the request path
+    conversation_store.start()
+    # Write AI usage records and quota counters in batches
+    ai_usage_tracker.start()
+    
     yield
     
     # Shutdown
     logger.info("Shutting down BrainOps Backend...")
+    # Close sockets with 1001 (going away), then the bus listener and its connection
+    await websocket_manager.shutdown()
+    await websocket_manager.bus.close()
+    await default_cache.stop_sweeper()
+    await activity_recorder.stop()
+    await audit_pipeline.stop()
+    await conversation_store.stop()
+    await ai_usage_tracker.stop()
 
 
 # Initialize FastAPI app
@@ -221,6 +246,12 @@ async def get_route_diagnostics():
     }
 
 
+@app.get("/api/v1/diagnostics/audit", tags=["Diagnostics"])
+async def get_audit_diagnostics():
+    """Get audit pipeline queue depth, drops and write counts."""
+    return audit_pipeline.stats()
+
+
 # Include routers with error handling and logging
 def include_router_safe(router, prefix: str, tags: list, router_name: str):
     """Safely include a router with error handling."""
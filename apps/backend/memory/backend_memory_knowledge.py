@@ -17,7 +17,9 @@ from .models import (
     MemoryType, MemoryRecord
 )
 from .supabase_client import get_supabase_client
-from .vector_utils import generate_embedding, chunk_text_with_overlap
+from .backend_memory_vector_utils import (
+    generate_embedding, batch_generate_embeddings, chunk_text_with_overlap
+)
 from ..core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -352,10 +354,11 @@ class KnowledgeManager:
         
         # Create chunk objects and generate embeddings
         chunk_objects = []
+        embeddings = await batch_generate_embeddings([text for text, _, _ in chunks])
         
-        for idx, (text, start, end) in enumerate(chunks):
-            # Generate embedding for chunk
-            embedding = await generate_embedding(text)
+        for idx, ((text, start, end), embedding) in enumerate(zip(chunks, embeddings)):
+            if embedding is None:
+                raise ValueError(f"Failed to generate embedding for chunk {idx} of {title}")
             
             chunk = DocumentChunk(
                 document_id=document_id,
@@ -7,13 +7,18 @@ for the BrainOps RAG and memory systems.
 
 from typing import List, Tuple, Optional, Dict, Any
 import asyncio
+import random
+import time
 try:
     import tiktoken
 except ImportError:  # Re-added by Codex for import fix
     tiktoken = None
 import numpy as np
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, APIStatusError, BadRequestError, RateLimitError
 import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
 from functools import lru_cache
 
 from apps.backend.core.settings import settings
@@ -49,7 +54,11 @@ def get_openai_client() -> AsyncOpenAI:
     return _openai_client
 
 
-@lru_cache(maxsize=1)
+# Max input tokens for OpenAI embedding models
+MAX_EMBEDDING_TOKENS = 8191
+
+
+@lru_cache(maxsize=8)
 def get_tokenizer(model: str = "text-embedding-ada-002"):
     """Return a tokenizer; falls back to a simple implementation if tiktoken is missing."""
     if tiktoken is None:
@@ -94,10 +103,9 @@ async def generate_embedding(
     tokenizer = get_tokenizer(model)
     tokens = tokenizer.encode(text)
     
-    # Max tokens for ada-002 is 8191
-    if len(tokens) > 8191:
-        logger.warning(f"Text too long ({len(tokens)} tokens), truncating to 8191")
-        tokens = tokens[:8191]
+    if len(tokens) > MAX_EMBEDDING_TOKENS:
+        logger.warning(f"Text too long ({len(tokens)} tokens), truncating to {MAX_EMBEDDING_TOKENS}")
+        tokens = tokens[:MAX_EMBEDDING_TOKENS]
         text = tokenizer.decode(tokens)
     
     try:
@@ -258,48 +266,212 @@ def calculate_similarity(
         raise ValueError(f"Unknown similarity metric: {metric}")
 
 
+class EmbeddingPipeline:
+    """
+    Concurrent batch embedding with rate-limit handling.
+    
+    Identical texts are embedded once per run and texts already in the
+    embedding cache are skipped. The rest are packed into requests by token
+    budget and sent with bounded concurrency. A 429 pauses every worker
+    (honouring ``retry-after``) with a delay that doubles on consecutive
+    rate limits. Other transient failures are retried with backoff. A
+    rejected batch is split in half until the offending text is isolated,
+    so only that text comes back as None.
+    """
+    
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        max_batch_tokens: int = 100_000,
+        max_batch_items: int = 2048,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        cache: Optional["EmbeddingCache"] = None
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_items = max_batch_items
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.cache = cache
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        # Shared backoff state: every worker waits until _paused_until
+        self._paused_until = 0.0
+        self._rate_limit_delay = base_delay
+    
+    def _prepare(self, text: str, model: str) -> Tuple[str, int]:
+        """Truncate to the model's input limit and return the token count."""
+        tokenizer = get_tokenizer(model)
+        tokens = tokenizer.encode(text)
+        if len(tokens) > MAX_EMBEDDING_TOKENS:
+            logger.warning(f"Text too long ({len(tokens)} tokens), truncating to {MAX_EMBEDDING_TOKENS}")
+            tokens = tokens[:MAX_EMBEDDING_TOKENS]
+            text = tokenizer.decode(tokens)
+        return text, len(tokens)
+    
+    def _pack(self, items: List[Tuple[str, int]], max_items: int) -> List[List[int]]:
+        """Group item positions into batches under the token and item budgets."""
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        for position, (_, token_count) in enumerate(items):
+            if current and (
+                current_tokens + token_count > self.max_batch_tokens
+                or len(current) >= max_items
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(position)
+            current_tokens += token_count
+        if current:
+            batches.append(current)
+        return batches
+    
+    async def _wait_for_rate_limit(self):
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    def _on_rate_limit(self, error: RateLimitError):
+        self.rate_limited += 1
+        delay = self._rate_limit_delay
+        retry_after = error.response.headers.get("retry-after") if error.response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        self._rate_limit_delay = min(self._rate_limit_delay * 2, self.max_delay)
+    
+    async def _request(self, texts: List[str], model: str) -> List[List[float]]:
+        """One embeddings call, retried on rate limits and transient errors."""
+        attempt = 0
+        while True:
+            await self._wait_for_rate_limit()
+            try:
+                self.requests += 1
+                response = await get_openai_client().embeddings.create(model=model, input=texts)
+                self._rate_limit_delay = self.base_delay
+                return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+            except BadRequestError:
+                raise
+            except RateLimitError as e:
+                self._on_rate_limit(e)
+            except APIStatusError as e:
+                if e.status_code < 500:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+            except Exception:
+                # Connection errors and timeouts
+                await asyncio.sleep(self._backoff(attempt))
+            
+            attempt += 1
+            self.retries += 1
+            if attempt > self.max_retries:
+                raise RuntimeError(f"Embedding request failed after {self.max_retries} retries")
+    
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.base_delay * 2 ** attempt, self.max_delay)
+        return delay * random.uniform(0.5, 1.0)
+    
+    async def _embed_batch(
+        self,
+        texts: List[str],
+        model: str
+    ) -> List[Optional[List[float]]]:
+        try:
+            return await self._request(texts, model)
+        except BadRequestError as e:
+            if len(texts) == 1:
+                logger.error(f"Embedding rejected for one input: {str(e)}")
+                return [None]
+            # Bisect so one bad input does not fail the whole batch
+            middle = len(texts) // 2
+            return (
+                await self._embed_batch(texts[:middle], model)
+                + await self._embed_batch(texts[middle:], model)
+            )
+        except Exception as e:
+            logger.error(f"Failed to generate batch embeddings: {str(e)}")
+            return [None] * len(texts)
+    
+    async def embed(
+        self,
+        texts: List[str],
+        model: str = "text-embedding-ada-002",
+        max_batch_items: Optional[int] = None
+    ) -> List[Optional[List[float]]]:
+        """
+        Embed ``texts`` in order; failed or empty texts come back as None.
+        """
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        
+        # Unique non-empty texts -> positions in the input
+        positions: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            if text and text.strip():
+                positions.setdefault(text, []).append(i)
+        
+        pending: List[str] = []
+        for text, indices in positions.items():
+            cached = self.cache.get(text, model) if self.cache is not None else None
+            if cached is None:
+                pending.append(text)
+                continue
+            for i in indices:
+                results[i] = cached
+        
+        if not pending:
+            return results
+        
+        prepared = [self._prepare(text, model) for text in pending]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def run(batch: List[int]):
+            async with semaphore:
+                embeddings = await self._embed_batch([prepared[p][0] for p in batch], model)
+            for position, embedding in zip(batch, embeddings):
+                if embedding is None:
+                    continue
+                text = pending[position]
+                if self.cache is not None:
+                    self.cache.set(text, embedding, model)
+                for i in positions[text]:
+                    results[i] = embedding
+        
+        batches = self._pack(prepared, max_batch_items or self.max_batch_items)
+        await asyncio.gather(*(run(batch) for batch in batches))
+        if self.cache is not None:
+            await self.cache.flush()
+        logger.debug(
+            f"Embedded {len(pending)} unique texts of {len(texts)} in {len(batches)} batches"
+        )
+        return results
+
+
 async def batch_generate_embeddings(
     texts: List[str],
     model: str = "text-embedding-ada-002",
-    batch_size: int = 100
-) -> List[List[float]]:
+    batch_size: int = 2048
+) -> List[Optional[List[float]]]:
     """
-    Generate embeddings for multiple texts in batches.
+    Generate embeddings for multiple texts in concurrent batches.
     
     Args:
         texts: List of texts to embed
         model: OpenAI embedding model
-        batch_size: Number of texts per API call
+        batch_size: Maximum number of texts per API call
         
     Returns:
-        List of embedding vectors
+        List of embedding vectors, None where an input could not be embedded
     """
     
-    client = get_openai_client()
-    all_embeddings = []
-    
-    # Process in batches
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i + batch_size]
-        
-        try:
-            response = await client.embeddings.create(
-                model=model,
-                input=batch
-            )
-            
-            # Extract embeddings in order
-            embeddings = [item.embedding for item in response.data]
-            all_embeddings.extend(embeddings)
-            
-            logger.debug(f"Generated batch embeddings: {i+1}-{i+len(batch)} of {len(texts)}")
-            
-        except Exception as e:
-            logger.error(f"Failed to generate batch embeddings: {str(e)}")
-            # Return None for failed embeddings
-            all_embeddings.extend([None] * len(batch))
-    
-    return all_embeddings
+    return await _embedding_pipeline.embed(texts, model, max_batch_items=batch_size)
 
 
 # Re-added by Codex for import fix
@@ -404,52 +576,165 @@ async def find_optimal_chunk_size(
 
 class EmbeddingCache:
     """
-    Simple in-memory cache for embeddings to avoid redundant API calls.
+    LRU cache of embeddings to avoid redundant API calls.
+    
+    Entries are keyed on model plus content hash and held as float32 arrays,
+    bounded by both entry count and total bytes. With ``persist_path`` set,
+    entries are also written to a SQLite file so they survive restarts, and
+    in-memory misses fall through to it. Writes are buffered until
+    ``flush()``, which stores them in one transaction off the event loop.
     """
     
-    def __init__(self, max_size: int = 1000):
-        self.cache: Dict[str, List[float]] = {}
+    def __init__(
+        self,
+        max_size: int = 1000,
+        max_bytes: int = 64 * 1024 * 1024,
+        persist_path: Optional[str] = None
+    ):
+        self.cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
         self.max_size = max_size
-        self.access_order: List[str] = []
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        # key -> (model, float32 bytes) waiting for the next flush
+        self._unwritten: Dict[str, Tuple[str, bytes]] = {}
+        if persist_path:
+            self._db = sqlite3.connect(persist_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
     
-    def get(self, text: str) -> Optional[List[float]]:
-        """Get embedding from cache if available."""
+    @staticmethod
+    def make_key(text: str, model: str) -> str:
+        """Cache key for a text embedded with a given model."""
+        return create_content_hash(f"{model}\0{text}")
+    
+    def _remember(self, key: str, vector: np.ndarray):
+        """Insert into the in-memory tier, evicting least recently used entries."""
+        if vector.nbytes > self.max_bytes:
+            return
         
-        key = create_content_hash(text)
+        previous = self.cache.pop(key, None)
+        if previous is not None:
+            self.size_bytes -= previous.nbytes
         
-        if key in self.cache:
-            # Move to end (most recently used)
-            self.access_order.remove(key)
-            self.access_order.append(key)
-            return self.cache[key]
+        self.cache[key] = vector
+        self.size_bytes += vector.nbytes
+        while len(self.cache) > self.max_size or self.size_bytes > self.max_bytes:
+            _, evicted = self.cache.popitem(last=False)
+            self.size_bytes -= evicted.nbytes
+    
+    def get_array(self, text: str, model: str = "text-embedding-ada-002") -> Optional[np.ndarray]:
+        """Get the cached float32 embedding, or None."""
         
+        key = self.make_key(text, model)
+        
+        vector = self.cache.get(key)
+        if vector is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return vector
+        
+        if self._db is not None:
+            unwritten = self._unwritten.get(key)
+            if unwritten is not None:
+                row = (unwritten[1],)
+            else:
+                with self._db_lock:
+                    row = self._db.execute(
+                        "SELECT vector FROM embeddings WHERE key = ?", (key,)
+                    ).fetchone()
+            if row is not None:
+                vector = np.frombuffer(row[0], dtype=np.float32)
+                self._remember(key, vector)
+                self.disk_hits += 1
+                return vector
+        
+        self.misses += 1
         return None
     
-    def set(self, text: str, embedding: List[float]):
+    def get(self, text: str, model: str = "text-embedding-ada-002") -> Optional[List[float]]:
+        """Get embedding from cache if available."""
+        
+        vector = self.get_array(text, model)
+        return vector.tolist() if vector is not None else None
+    
+    def set(self, text: str, embedding: List[float], model: str = "text-embedding-ada-002"):
         """Store embedding in cache."""
         
-        key = create_content_hash(text)
+        key = self.make_key(text, model)
+        vector = np.asarray(embedding, dtype=np.float32)
+        # Never hand out a view the caller could still mutate
+        if vector is embedding or vector.base is not None:
+            vector = vector.copy()
+        vector.setflags(write=False)
+        self._remember(key, vector)
         
-        # Check cache size
-        if len(self.cache) >= self.max_size and key not in self.cache:
-            # Remove least recently used
-            lru_key = self.access_order.pop(0)
-            del self.cache[lru_key]
+        if self._db is not None:
+            self._unwritten[key] = (model, vector.tobytes())
+    
+    def _write(self, rows: List[Tuple[str, str, bytes]]):
+        with self._db_lock:
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, model, vector) VALUES (?, ?, ?)", rows
+                )
+                self._db.commit()
+            except Exception:
+                self._db.rollback()
+                raise
+    
+    async def flush(self):
+        """Write buffered entries to the on-disk tier in one transaction."""
         
-        self.cache[key] = embedding
-        if key in self.access_order:
-            self.access_order.remove(key)
-        self.access_order.append(key)
+        if self._db is None or not self._unwritten:
+            return
+        unwritten, self._unwritten = self._unwritten, {}
+        try:
+            await asyncio.to_thread(
+                self._write, [(key, model, data) for key, (model, data) in unwritten.items()]
+            )
+        except Exception as e:
+            # Newer entries set meanwhile win
+            self._unwritten = {**unwritten, **self._unwritten}
+            logger.error(f"Failed to persist {len(unwritten)} embeddings: {e}")
     
-    def clear(self):
-        """Clear the cache."""
+    def clear(self, persistent: bool = False):
+        """Clear the in-memory cache, and the on-disk tier if ``persistent``."""
         
         self.cache.clear()
-        self.access_order.clear()
+        self.size_bytes = 0
+        if persistent and self._db is not None:
+            self._unwritten.clear()
+            with self._db_lock:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.cache),
+            "bytes": self.size_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "unwritten": len(self._unwritten)
+        }
 
 
 # Global embedding cache instance
-_embedding_cache = EmbeddingCache()
+_embedding_cache = EmbeddingCache(
+    max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES,
+    persist_path=settings.EMBEDDING_CACHE_PATH
+)
+
+# Shared so concurrent callers see the same rate-limit backoff
+_embedding_pipeline = EmbeddingPipeline(cache=_embedding_cache)
 
 
 async def generate_embedding_with_cache(
@@ -468,7 +753,7 @@ async def generate_embedding_with_cache(
     """
     
     # Check cache first
-    cached = _embedding_cache.get(text)
+    cached = _embedding_cache.get(text, model)
     if cached is not None:
         logger.debug("Retrieved embedding from cache")
         return cached
@@ -477,7 +762,8 @@ async def generate_embedding_with_cache(
     embedding = await generate_embedding(text, model)
     
     # Cache the result
-    _embedding_cache.set(text, embedding)
+    _embedding_cache.set(text, embedding, model)
+    await _embedding_cache.flush()
     
     return embedding
 
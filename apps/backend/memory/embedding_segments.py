@@ -0,0 +1,308 @@
+"""
+On-disk, memory-mapped storage for vector store embeddings.
+
+A store is a directory holding append-only segments and a manifest:
+
+    manifest.json           active segment names, dimension and dtype
+    segment-000001.emb      fixed header + normalized matrix + norms
+    segment-000001.json     keys, metadata and keys deleted before it
+
+Segment matrices are opened with ``np.memmap`` so every worker that opens
+the same directory shares one copy through the OS page cache. Writers
+append a new segment per flush and periodically merge them into one;
+the manifest is replaced atomically, so readers always see a complete set
+of segments.
+"""
+
+import json
+import os
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+MAGIC = b"BOEMB"
+FORMAT_VERSION = 1
+HEADER_SIZE = 64
+# magic, version, dtype code, dimension, row count
+_HEADER = struct.Struct("<5sBBxIQ")
+
+DTYPES = {"float32": 1, "float16": 2}
+_DTYPE_CODES = {code: name for name, code in DTYPES.items()}
+
+
+class SegmentFormatError(ValueError):
+    """Raised when a segment or manifest on disk is not readable."""
+
+
+def _encode_metadata(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode_metadata(value: Dict[str, Any]) -> Any:
+    if set(value) == {"__datetime__"}:
+        return datetime.fromisoformat(value["__datetime__"])
+    return value
+
+
+def _write_atomic(path: Path, data: bytes):
+    """Write a file so readers see either the old or the new contents."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as handle:
+        handle.write(data)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
+
+
+class Segment:
+    """One immutable segment opened from disk."""
+
+    def __init__(
+        self,
+        name: str,
+        keys: List[str],
+        matrix: np.ndarray,
+        norms: np.ndarray,
+        metadata: List[Dict[str, Any]],
+        deleted: List[str]
+    ):
+        self.name = name
+        self.keys = keys
+        self.matrix = matrix
+        self.norms = norms
+        self.metadata = metadata
+        self.deleted = deleted
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+def write_segment(
+    path: Path,
+    keys: Sequence[str],
+    vectors: np.ndarray,
+    norms: np.ndarray,
+    metadata: Sequence[Dict[str, Any]],
+    deleted: Sequence[str] = (),
+    dtype: str = "float32"
+):
+    """
+    Write a segment and its JSON sidecar.
+
+    ``vectors`` must already be normalized; ``norms`` holds the original
+    lengths so callers can reconstruct the input embeddings.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"Unsupported dtype {dtype}; expected one of {sorted(DTYPES)}")
+
+    vectors = np.ascontiguousarray(vectors, dtype=dtype)
+    count, dim = vectors.shape if vectors.ndim == 2 else (0, 0)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, DTYPES[dtype], dim, count)
+
+    body = (
+        header.ljust(HEADER_SIZE, b"\0")
+        + vectors.tobytes()
+        + np.ascontiguousarray(norms, dtype=np.float32).tobytes()
+    )
+    sidecar = json.dumps(
+        {"keys": list(keys), "metadata": list(metadata), "deleted": list(deleted)},
+        default=_encode_metadata
+    ).encode("utf-8")
+
+    # Sidecar first: a segment file without one is never referenced by a manifest
+    _write_atomic(path.with_suffix(".json"), sidecar)
+    _write_atomic(path, body)
+
+
+def open_segment(path: Path) -> Segment:
+    """Memory-map a segment read-only and load its sidecar."""
+    with open(path, "rb") as handle:
+        header = handle.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE:
+        raise SegmentFormatError(f"{path} is truncated")
+
+    magic, version, dtype_code, dim, count = _HEADER.unpack_from(header)
+    if magic != MAGIC:
+        raise SegmentFormatError(f"{path} is not an embedding segment")
+    if version != FORMAT_VERSION:
+        raise SegmentFormatError(f"{path} has unsupported format version {version}")
+    dtype = np.dtype(_DTYPE_CODES[dtype_code])
+
+    sidecar = json.loads(
+        path.with_suffix(".json").read_text(encoding="utf-8"),
+        object_hook=_decode_metadata
+    )
+    if len(sidecar["keys"]) != count:
+        raise SegmentFormatError(f"{path} sidecar does not match segment row count")
+
+    if count:
+        matrix = np.memmap(path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(count, dim))
+        norms = np.memmap(
+            path, dtype=np.float32, mode="r",
+            offset=HEADER_SIZE + count * dim * dtype.itemsize, shape=(count,)
+        )
+    else:
+        matrix = np.zeros((0, dim), dtype=dtype)
+        norms = np.zeros(0, dtype=np.float32)
+
+    return Segment(
+        path.name, sidecar["keys"], matrix, norms, sidecar["metadata"], sidecar["deleted"]
+    )
+
+
+class SegmentedEmbeddingStore:
+    """
+    Directory of embedding segments tracked by a manifest.
+
+    Later segments win: a key written again supersedes earlier copies, and
+    a segment's ``deleted`` list removes keys written before it.
+    """
+
+    MANIFEST = "manifest.json"
+
+    def __init__(self, directory: str, dtype: str = "float32", readonly: bool = False):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported dtype {dtype}; expected one of {sorted(DTYPES)}")
+        self.directory = Path(directory)
+        self.readonly = readonly
+
+        manifest_path = self.directory / self.MANIFEST
+        if manifest_path.exists():
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            self.dtype = manifest["dtype"]
+            self.dim: Optional[int] = manifest["dim"]
+            self.segment_names: List[str] = manifest["segments"]
+            self._next_segment: int = manifest["next_segment"]
+        elif readonly:
+            raise FileNotFoundError(f"No embedding store at {self.directory}")
+        else:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.dtype = dtype
+            self.dim = None
+            self.segment_names = []
+            self._next_segment = 1
+
+    def _write_manifest(self):
+        manifest = {
+            "version": FORMAT_VERSION,
+            "dtype": self.dtype,
+            "dim": self.dim,
+            "segments": self.segment_names,
+            "next_segment": self._next_segment
+        }
+        _write_atomic(
+            self.directory / self.MANIFEST,
+            json.dumps(manifest, indent=2).encode("utf-8")
+        )
+
+    def _check_writable(self):
+        if self.readonly:
+            raise PermissionError(f"Embedding store at {self.directory} is open read-only")
+
+    def _new_segment_path(self) -> Path:
+        path = self.directory / f"segment-{self._next_segment:06d}.emb"
+        self._next_segment += 1
+        return path
+
+    def open_segments(self) -> List[Segment]:
+        return [open_segment(self.directory / name) for name in self.segment_names]
+
+    def append(
+        self,
+        keys: Sequence[str],
+        vectors: np.ndarray,
+        norms: np.ndarray,
+        metadata: Sequence[Dict[str, Any]],
+        deleted: Sequence[str] = ()
+    ) -> str:
+        """Write a new segment and publish it in the manifest."""
+        self._check_writable()
+        if len(keys):
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(
+                    f"Embedding dimension {vectors.shape[1]} does not match store dimension {self.dim}"
+                )
+
+        path = self._new_segment_path()
+        write_segment(path, keys, vectors, norms, metadata, deleted, self.dtype)
+        self.segment_names.append(path.name)
+        self._write_manifest()
+        return path.name
+
+    def replace_all(
+        self,
+        keys: Sequence[str],
+        vectors: np.ndarray,
+        norms: np.ndarray,
+        metadata: Sequence[Dict[str, Any]]
+    ) -> str:
+        """
+        Merge: write the full current state as one segment and drop the rest.
+
+        Old segment files are unlinked after the manifest switches over;
+        readers that still have them mapped keep working until they reopen.
+        """
+        self._check_writable()
+        if len(keys) and self.dim is None:
+            self.dim = int(vectors.shape[1])
+
+        old_names = self.segment_names
+        path = self._new_segment_path()
+        write_segment(path, keys, vectors, norms, metadata, (), self.dtype)
+        self.segment_names = [path.name]
+        self._write_manifest()
+
+        for name in old_names:
+            for stale in (self.directory / name, (self.directory / name).with_suffix(".json")):
+                try:
+                    stale.unlink()
+                except FileNotFoundError:
+                    pass
+        return path.name
+
+    def load(self) -> Tuple[List[str], np.ndarray, np.ndarray, Dict[str, Dict[str, Any]]]:
+        """
+        Resolve all segments into ``(keys, matrix, norms, metadata)``.
+
+        With a single segment the matrix and norms are the read-only memory
+        maps themselves; otherwise surviving rows are gathered into memory.
+        """
+        segments = self.open_segments()
+        dim = self.dim or 0
+        if len(segments) == 1 and not segments[0].deleted:
+            segment = segments[0]
+            metadata = dict(zip(segment.keys, segment.metadata))
+            return list(segment.keys), segment.matrix, segment.norms, metadata
+
+        # Key -> (segment index, row); later segments overwrite earlier ones
+        latest: Dict[str, Tuple[int, int]] = {}
+        for position, segment in enumerate(segments):
+            for key in segment.deleted:
+                latest.pop(key, None)
+            for row, key in enumerate(segment.keys):
+                latest.pop(key, None)
+                latest[key] = (position, row)
+
+        keys = list(latest)
+        picks = np.array(list(latest.values()), dtype=np.int64).reshape(-1, 2)
+        matrix = np.empty((len(keys), dim), dtype=self.dtype)
+        norms = np.empty(len(keys), dtype=np.float32)
+        for position, segment in enumerate(segments):
+            selected = picks[:, 0] == position
+            rows = picks[selected, 1]
+            matrix[selected] = segment.matrix[rows]
+            norms[selected] = segment.norms[rows]
+
+        metadata = {
+            key: segments[position].metadata[row]
+            for key, (position, row) in latest.items()
+        }
+        return keys, matrix, norms, metadata
@@ -5,20 +5,477 @@ This module provides vector storage and search capabilities for
 semantic memory retrieval using embeddings.
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
+from pathlib import Path
 import numpy as np
 from datetime import datetime
 
+from .embedding_segments import SegmentedEmbeddingStore
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length; zero rows stay zero."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF-flat) index over normalized vectors.
+    
+    Training clusters the vectors into ``nlist`` cells with spherical
+    k-means. A query only scores the rows in its ``nprobe`` closest cells,
+    so raising ``nprobe`` buys recall at the cost of latency and
+    ``nprobe == nlist`` is equivalent to brute force.
+    """
+    
+    # Rows per chunk when assigning vectors to cells, to bound memory
+    ASSIGN_CHUNK = 4096
+    # k-means trains on at most this many points per cell
+    MAX_POINTS_PER_CELL = 256
+    
+    def __init__(self, nlist: int, nprobe: int = 8, n_iter: int = 10, seed: int = 0):
+        if nlist < 1:
+            raise ValueError("nlist must be at least 1")
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.n_iter = n_iter
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        # Cell per store row, -1 for rows never added
+        self._assignments = np.full(0, -1, dtype=np.int32)
+        # Cell membership may hold stale rows after a reassignment; they are
+        # filtered against _assignments when the cell is next materialized
+        self._cells: List[List[int]] = []
+        self._cell_arrays: Dict[int, np.ndarray] = {}
+        # Key -> cell read by ``load`` and consumed by ``restore``
+        self._saved_cells: Dict[str, int] = {}
+    
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+    
+    def _nearest_cells(self, vectors: np.ndarray) -> np.ndarray:
+        """Return the closest centroid for each row of ``vectors``."""
+        labels = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), self.ASSIGN_CHUNK):
+            chunk = vectors[start:start + self.ASSIGN_CHUNK]
+            labels[start:start + len(chunk)] = np.argmax(chunk @ self.centroids.T, axis=1)
+        return labels
+    
+    def train(self, vectors: np.ndarray):
+        """Fit centroids to a sample of normalized ``vectors``."""
+        if not len(vectors):
+            raise ValueError("Cannot train an index on an empty set of vectors")
+        
+        rng = np.random.default_rng(self.seed)
+        self.nlist = min(self.nlist, len(vectors))
+        max_points = self.nlist * self.MAX_POINTS_PER_CELL
+        if len(vectors) > max_points:
+            sample = vectors[rng.choice(len(vectors), max_points, replace=False)]
+        else:
+            sample = vectors
+        
+        self.centroids = sample[rng.choice(len(sample), self.nlist, replace=False)].copy()
+        for _ in range(self.n_iter):
+            labels = self._nearest_cells(sample)
+            order = np.argsort(labels, kind="stable")
+            cells, starts = np.unique(labels[order], return_index=True)
+            sums = np.add.reduceat(sample[order], starts, axis=0)
+            
+            centroids = sample[rng.choice(len(sample), self.nlist)].copy()
+            centroids[cells] = sums
+            self.centroids = _normalize_rows(centroids).astype(np.float32)
+        
+        self._cells = [[] for _ in range(self.nlist)]
+        self._cell_arrays = {}
+        self._assignments = np.full(len(self._assignments), -1, dtype=np.int32)
+    
+    def add(self, rows: np.ndarray, vectors: np.ndarray):
+        """Assign store ``rows`` (with normalized ``vectors``) to cells."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return
+        
+        needed = int(rows.max()) + 1
+        if needed > len(self._assignments):
+            grown = np.full(max(needed, 2 * len(self._assignments)), -1, dtype=np.int32)
+            grown[:len(self._assignments)] = self._assignments
+            self._assignments = grown
+        
+        labels = self._nearest_cells(vectors)
+        for row, cell in zip(rows.tolist(), labels.tolist()):
+            if self._assignments[row] == cell:
+                continue
+            self._assignments[row] = cell
+            self._cells[cell].append(row)
+            self._cell_arrays.pop(cell, None)
+    
+    def _cell_rows(self, cell: int) -> np.ndarray:
+        rows = self._cell_arrays.get(cell)
+        if rows is None:
+            rows = np.unique(np.asarray(self._cells[cell], dtype=np.int64))
+            rows = rows[self._assignments[rows] == cell]
+            self._cells[cell] = rows.tolist()
+            self._cell_arrays[cell] = rows
+        return rows
+    
+    def candidates(self, query: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """Return the store rows in the cells closest to a normalized query."""
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        scores = self.centroids @ query
+        if nprobe < self.nlist:
+            probes = np.argpartition(-scores, nprobe - 1)[:nprobe]
+        else:
+            probes = np.arange(self.nlist)
+        return np.concatenate([self._cell_rows(cell) for cell in probes.tolist()])
+    
+    def remap(self, live: np.ndarray):
+        """Follow a compaction where store row ``live[i]`` became row ``i``."""
+        assignments = np.full(len(live), -1, dtype=np.int32)
+        known = live < len(self._assignments)
+        assignments[known] = self._assignments[live[known]]
+        self._assignments = assignments
+        
+        order = np.argsort(assignments, kind="stable")
+        order = order[assignments[order] >= 0]
+        cells, starts = np.unique(assignments[order], return_index=True)
+        self._cells = [[] for _ in range(self.nlist)]
+        for cell, rows in zip(cells.tolist(), np.split(order, starts[1:])):
+            self._cells[cell] = rows.tolist()
+        self._cell_arrays = {}
+    
+    def save(self, path: Path, row_keys: Sequence[Optional[str]]):
+        """Write centroids and assignments keyed by embedding key."""
+        size = min(len(row_keys), len(self._assignments))
+        keys = [key for key in row_keys[:size] if key is not None]
+        cells = [int(self._assignments[row]) for row, key in enumerate(row_keys[:size]) if key is not None]
+        with open(path, "wb") as handle:
+            np.savez(
+                handle,
+                centroids=self.centroids,
+                keys=np.array(keys, dtype=str),
+                cells=np.array(cells, dtype=np.int32),
+                params=np.array([self.nlist, self.nprobe, self.n_iter, self.seed], dtype=np.int64)
+            )
+    
+    @classmethod
+    def load(cls, path: Path) -> "IVFIndex":
+        """Read an index written by ``save``; call ``restore`` to attach rows."""
+        with np.load(path, allow_pickle=False) as data:
+            nlist, nprobe, n_iter, seed = (int(value) for value in data["params"])
+            index = cls(nlist, nprobe=nprobe, n_iter=n_iter, seed=seed)
+            index.centroids = data["centroids"].astype(np.float32)
+            index._saved_cells = dict(zip(data["keys"].tolist(), data["cells"].tolist()))
+        index._cells = [[] for _ in range(index.nlist)]
+        return index
+    
+    def restore(self, row_keys: Sequence[Optional[str]], live: np.ndarray, vectors: np.ndarray):
+        """
+        Attach store rows to a loaded index by key.
+        
+        ``vectors`` holds the normalized rows of the whole store. Rows the
+        saved index does not know about go to their nearest cell.
+        """
+        cells = np.array(
+            [self._saved_cells.get(row_keys[row], -1) for row in live.tolist()],
+            dtype=np.int32
+        )
+        cells[cells >= self.nlist] = -1
+        self._saved_cells = {}
+        
+        self._assignments = np.full(len(row_keys), -1, dtype=np.int32)
+        self._assignments[live] = cells
+        self.remap(np.arange(len(row_keys)))
+        
+        unknown = live[cells < 0]
+        self.add(unknown, vectors[unknown])
+
 
 class VectorStore:
     """
     Vector store for managing embeddings and similarity search.
+    
+    Embeddings live in one contiguous float32 matrix whose rows are
+    normalized on insert, so a search is a single matrix-vector product.
+    Deleted rows are tombstoned and reclaimed by ``compact`` once they make
+    up ``compact_ratio`` of the matrix.
+    
+    For large corpora ``build_index`` adds an approximate IVF index that
+    ``search`` uses unless ``exact=True`` is passed.
+    
+    ``VectorStore.open`` backs the store with an on-disk segment directory.
+    A fully merged directory is memory-mapped without copying, so workers
+    opening it read-only share the matrix through the page cache.
     """
     
-    def __init__(self):
+    INDEX_FILE = "index.npz"
+    # Rows upcast per step when searching a float16 matrix
+    SCORE_CHUNK = 65536
+    
+    def __init__(self, initial_capacity: int = 1024, compact_ratio: float = 0.25):
         """Initialize the vector store."""
-        self.embeddings: Dict[str, np.ndarray] = {}
         self.metadata: Dict[str, Dict[str, Any]] = {}
+        self.compact_ratio = compact_ratio
+        self._initial_capacity = initial_capacity
+        self._dim: Optional[int] = None
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        # Original vector lengths, so get_embedding can undo normalization
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._row_keys: List[Optional[str]] = []
+        self._key_rows: Dict[str, int] = {}
+        self._size = 0
+        self._tombstones = 0
+        self._index: Optional[IVFIndex] = None
+        # Persistence state, set by VectorStore.open
+        self._segments: Optional[SegmentedEmbeddingStore] = None
+        self._dirty: Dict[str, None] = {}
+        self._deleted: Dict[str, None] = {}
+        self.max_segments = 8
+    
+    @classmethod
+    def open(
+        cls,
+        path: str,
+        readonly: bool = False,
+        dtype: str = "float32",
+        max_segments: int = 8,
+        **kwargs
+    ) -> "VectorStore":
+        """
+        Open (or create) a store persisted in the directory ``path``.
+        
+        Args:
+            path: Segment directory
+            readonly: Refuse to flush; for workers that only search
+            dtype: On-disk precision for a new directory, float32 or float16
+            max_segments: Merge segments on flush once there are more than this
+        
+        Returns:
+            Store loaded with every persisted embedding
+        """
+        store = cls(**kwargs)
+        store.max_segments = max_segments
+        segments = SegmentedEmbeddingStore(path, dtype=dtype, readonly=readonly)
+        keys, matrix, norms, metadata = segments.load()
+        
+        store._segments = segments
+        store._dim = segments.dim
+        if keys:
+            store._matrix = matrix
+            store._norms = norms
+            store._alive = np.ones(len(keys), dtype=bool)
+            store._row_keys = list(keys)
+            store._key_rows = {key: row for row, key in enumerate(keys)}
+            store._size = len(keys)
+            store.metadata = metadata
+        
+        index_path = segments.directory / cls.INDEX_FILE
+        if keys and index_path.exists():
+            store.load_index(str(index_path))
+        return store
+    
+    def _snapshot(self, keys: Sequence[str]):
+        rows = np.array([self._key_rows[key] for key in keys], dtype=np.int64)
+        return (
+            list(keys),
+            self._matrix[rows] if len(rows) else np.zeros((0, self._dim or 0), dtype=np.float32),
+            self._norms[rows] if len(rows) else np.zeros(0, dtype=np.float32),
+            [self.metadata.get(key, {}) for key in keys]
+        )
+    
+    def flush(self) -> Optional[str]:
+        """
+        Append changes since the last flush as a new on-disk segment.
+        
+        Merges all segments into one when more than ``max_segments`` exist.
+        
+        Returns:
+            Name of the segment written, or None if nothing changed
+        """
+        if self._segments is None:
+            raise ValueError("Store is not backed by disk; use VectorStore.open")
+        if not self._dirty and not self._deleted:
+            return None
+        
+        if len(self._segments.segment_names) >= self.max_segments:
+            return self.merge()
+        
+        keys, vectors, norms, metadata = self._snapshot(list(self._dirty))
+        name = self._segments.append(keys, vectors, norms, metadata, list(self._deleted))
+        self._dirty.clear()
+        self._deleted.clear()
+        self._save_index_file()
+        return name
+    
+    def merge(self) -> str:
+        """Rewrite the on-disk store as a single segment of the live rows."""
+        if self._segments is None:
+            raise ValueError("Store is not backed by disk; use VectorStore.open")
+        
+        live = np.flatnonzero(self._alive[:self._size])
+        keys, vectors, norms, metadata = self._snapshot([self._row_keys[row] for row in live])
+        name = self._segments.replace_all(keys, vectors, norms, metadata)
+        self._dirty.clear()
+        self._deleted.clear()
+        self._save_index_file()
+        return name
+    
+    def _save_index_file(self):
+        index_path = self._segments.directory / self.INDEX_FILE
+        if self._index is not None:
+            self.save_index(str(index_path))
+        elif index_path.exists():
+            index_path.unlink()
+    
+    def __len__(self) -> int:
+        return len(self._key_rows)
+    
+    @property
+    def dimension(self) -> Optional[int]:
+        return self._dim
+    
+    def _ensure_capacity(self, rows_needed: int):
+        """Grow the matrix geometrically so appends are amortized O(1)."""
+        capacity = self._matrix.shape[0]
+        if rows_needed <= capacity:
+            return
+        
+        new_capacity = max(rows_needed, capacity * 2, self._initial_capacity)
+        matrix = np.zeros((new_capacity, self._dim), dtype=np.float32)
+        norms = np.zeros(new_capacity, dtype=np.float32)
+        alive = np.zeros(new_capacity, dtype=bool)
+        if self._size:
+            matrix[:self._size] = self._matrix[:self._size]
+            norms[:self._size] = self._norms[:self._size]
+            alive[:self._size] = self._alive[:self._size]
+        
+        self._matrix, self._norms, self._alive = matrix, norms, alive
+    
+    def _ensure_writable(self):
+        """Copy a memory-mapped matrix into process memory before mutating it."""
+        if not self._matrix.flags.writeable or self._matrix.dtype != np.float32:
+            self._matrix = np.array(self._matrix, dtype=np.float32)
+            self._norms = np.array(self._norms, dtype=np.float32)
+    
+    def _as_vectors(self, vectors: Any) -> np.ndarray:
+        """Convert input to a 2-D float32 array of the store's dimension."""
+        array = np.asarray(vectors, dtype=np.float32)
+        if array.ndim == 1:
+            array = array[np.newaxis, :]
+        if self._dim is None:
+            self._dim = array.shape[1]
+        elif array.shape[1] != self._dim:
+            raise ValueError(
+                f"Embedding dimension {array.shape[1]} does not match store dimension {self._dim}"
+            )
+        return array
+    
+    def _put(self, key: str, vector: np.ndarray):
+        """Insert or overwrite one row without touching metadata."""
+        norm = float(np.linalg.norm(vector))
+        self._ensure_writable()
+        row = self._key_rows.get(key)
+        if row is None:
+            self._ensure_capacity(self._size + 1)
+            row = self._size
+            self._size += 1
+            self._row_keys.append(key)
+            self._key_rows[key] = row
+            self._alive[row] = True
+        
+        self._matrix[row] = vector / norm if norm else vector
+        self._norms[row] = norm
+        if self._index is not None:
+            self._index.add(np.array([row]), self._matrix[row:row + 1])
+        if self._segments is not None:
+            self._dirty[key] = None
+            self._deleted.pop(key, None)
+    
+    def compact(self):
+        """Drop tombstoned rows and rebuild the id/row mapping."""
+        if not self._tombstones:
+            return
+        
+        live = np.flatnonzero(self._alive[:self._size])
+        self._matrix = np.ascontiguousarray(self._matrix[live])
+        self._norms = self._norms[live]
+        self._alive = np.ones(len(live), dtype=bool)
+        self._row_keys = [self._row_keys[row] for row in live]
+        self._key_rows = {key: row for row, key in enumerate(self._row_keys)}
+        self._size = len(live)
+        self._tombstones = 0
+        if self._index is not None:
+            self._index.remap(live)
+    
+    @property
+    def index(self) -> Optional[IVFIndex]:
+        return self._index
+    
+    def build_index(
+        self,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        n_iter: int = 10,
+        seed: int = 0
+    ) -> IVFIndex:
+        """
+        Train an IVF index over the stored embeddings.
+        
+        Embeddings added afterwards are assigned to the existing cells, so
+        rebuild occasionally if the corpus drifts far from the training set.
+        
+        Args:
+            nlist: Number of cells; defaults to roughly sqrt(n)
+            nprobe: Cells scanned per query; higher is slower but more accurate
+            n_iter: k-means iterations
+            seed: Seed for centroid initialization and sampling
+        
+        Returns:
+            The trained index
+        """
+        live = np.flatnonzero(self._alive[:self._size])
+        if not len(live):
+            raise ValueError("Cannot build an index on an empty store")
+        
+        index = IVFIndex(
+            nlist or max(1, int(np.sqrt(len(live)))),
+            nprobe=nprobe, n_iter=n_iter, seed=seed
+        )
+        index.train(self._matrix[live])
+        index.add(live, self._matrix[live])
+        self._index = index
+        return index
+    
+    def drop_index(self):
+        """Go back to exact search."""
+        self._index = None
+    
+    def save_index(self, path: str):
+        """Persist the IVF index next to whatever persists the embeddings."""
+        if self._index is None:
+            raise ValueError("No index to save")
+        self._index.save(Path(path), self._row_keys[:self._size])
+    
+    def load_index(self, path: str) -> IVFIndex:
+        """
+        Load an index saved by ``save_index`` and attach the current rows.
+        
+        Rows are matched by key; embeddings the saved index does not know
+        about are assigned to their nearest cell.
+        """
+        index = IVFIndex.load(Path(path))
+        if self._dim is not None and index.centroids.shape[1] != self._dim:
+            raise ValueError(
+                f"Index dimension {index.centroids.shape[1]} does not match store dimension {self._dim}"
+            )
+        
+        live = np.flatnonzero(self._alive[:self._size])
+        index.restore(self._row_keys[:self._size], live, self._matrix[:self._size])
+        self._index = index
+        return index
     
     async def add_embedding(
         self,
@@ -37,11 +494,39 @@ class VectorStore:
         Returns:
             True if successful
         """
-        self.embeddings[key] = np.array(embedding)
+        self._put(key, self._as_vectors(embedding)[0])
         self.metadata[key] = metadata or {}
         self.metadata[key]["created_at"] = datetime.utcnow()
         return True
     
+    async def add_embeddings(
+        self,
+        keys: Sequence[str],
+        embeddings: Any,
+        metadata: Optional[Sequence[Optional[Dict[str, Any]]]] = None
+    ) -> int:
+        """
+        Add many embeddings at once.
+        
+        Args:
+            keys: Unique identifiers, one per row of ``embeddings``
+            embeddings: 2-D array-like of embedding vectors
+            metadata: Optional metadata per embedding
+        
+        Returns:
+            Number of embeddings stored
+        """
+        vectors = self._as_vectors(embeddings)
+        if len(keys) != len(vectors):
+            raise ValueError("keys and embeddings must have the same length")
+        
+        created_at = datetime.utcnow()
+        for i, key in enumerate(keys):
+            self._put(key, vectors[i])
+            self.metadata[key] = (metadata[i] if metadata else None) or {}
+            self.metadata[key]["created_at"] = created_at
+        return len(keys)
+    
     async def get_conversation_history(
         self,
         user_id: str,
@@ -149,11 +634,76 @@ class VectorStore:
         # Mock implementation for testing
         return True
     
+    def _top_k(
+        self,
+        scores: np.ndarray,
+        top_k: int,
+        threshold: float,
+        rows: Optional[np.ndarray] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Pick the best ``top_k`` scores above threshold.
+        
+        ``scores[i]`` belongs to store row ``rows[i]``, or row ``i`` when
+        ``rows`` is omitted.
+        """
+        if top_k <= 0:
+            return []
+        
+        if top_k < len(scores):
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            candidates = np.arange(len(scores))
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        
+        results = []
+        for position in candidates:
+            similarity = float(scores[position])
+            if similarity < threshold:
+                break
+            key = self._row_keys[position if rows is None else rows[position]]
+            results.append({
+                "key": key,
+                "similarity": similarity,
+                "metadata": self.metadata.get(key, {})
+            })
+        return results
+    
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        """Cosine similarity of normalized queries against every live row."""
+        matrix = self._matrix[:self._size]
+        if matrix.dtype == np.float32:
+            scores = queries @ matrix.T
+        else:
+            # Reduced-precision maps are upcast a chunk at a time
+            scores = np.empty((len(queries), self._size), dtype=np.float32)
+            for start in range(0, self._size, self.SCORE_CHUNK):
+                chunk = matrix[start:start + self.SCORE_CHUNK].astype(np.float32)
+                scores[:, start:start + len(chunk)] = queries @ chunk.T
+        if self._tombstones:
+            scores[:, ~self._alive[:self._size]] = -np.inf
+        return scores
+    
+    def _search_index(
+        self,
+        query: np.ndarray,
+        top_k: int,
+        threshold: float,
+        nprobe: Optional[int]
+    ) -> List[Dict[str, Any]]:
+        """Score only the rows in the query's closest IVF cells."""
+        rows = self._index.candidates(query, nprobe)
+        rows = rows[self._alive[rows]]
+        scores = self._matrix[rows].astype(np.float32, copy=False) @ query
+        return self._top_k(scores, top_k, threshold, rows)
+    
     async def search(
         self,
         query_embedding: List[float],
         top_k: int = 10,
-        threshold: float = 0.7
+        threshold: float = 0.7,
+        nprobe: Optional[int] = None,
+        exact: bool = False
     ) -> List[Dict[str, Any]]:
         """
         Search for similar embeddings.
@@ -162,32 +712,56 @@ class VectorStore:
             query_embedding: The query embedding vector
             top_k: Number of results to return
             threshold: Minimum similarity threshold
+            nprobe: Override the index's cells-per-query for this search
+            exact: Ignore the IVF index and scan every embedding
         
         Returns:
             List of similar items with metadata
         """
-        if not self.embeddings:
+        if not self._key_rows:
             return []
         
-        query_vec = np.array(query_embedding)
-        results = []
+        queries = _normalize_rows(self._as_vectors(query_embedding))
+        if self._index is not None and not exact:
+            return self._search_index(queries[0], top_k, threshold, nprobe)
         
-        for key, embedding in self.embeddings.items():
-            # Cosine similarity
-            similarity = np.dot(query_vec, embedding) / (
-                np.linalg.norm(query_vec) * np.linalg.norm(embedding)
-            )
-            
-            if similarity >= threshold:
-                results.append({
-                    "key": key,
-                    "similarity": float(similarity),
-                    "metadata": self.metadata.get(key, {})
-                })
+        scores = self._scores(queries)[0]
+        return self._top_k(scores, top_k, threshold)
+    
+    async def search_many(
+        self,
+        query_embeddings: Any,
+        top_k: int = 10,
+        threshold: float = 0.7,
+        nprobe: Optional[int] = None,
+        exact: bool = False
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for several queries with one matrix-matrix product.
+        
+        Args:
+            query_embeddings: 2-D array-like of query vectors
+            top_k: Number of results to return per query
+            threshold: Minimum similarity threshold
+            nprobe: Override the index's cells-per-query for this search
+            exact: Ignore the IVF index and scan every embedding
+        
+        Returns:
+            One result list per query, in query order
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if not self._key_rows:
+            return [[] for _ in range(len(queries))]
         
-        # Sort by similarity and return top_k
-        results.sort(key=lambda x: x["similarity"], reverse=True)
-        return results[:top_k]
+        queries = _normalize_rows(self._as_vectors(queries))
+        if self._index is not None and not exact:
+            return [
+                self._search_index(query, top_k, threshold, nprobe)
+                for query in queries
+            ]
+        
+        scores = self._scores(queries)
+        return [self._top_k(row_scores, top_k, threshold) for row_scores in scores]
     
     async def delete_embedding(self, key: str) -> bool:
         """
@@ -199,11 +773,21 @@ class VectorStore:
         Returns:
             True if deleted, False if not found
         """
-        if key in self.embeddings:
-            del self.embeddings[key]
-            del self.metadata[key]
-            return True
-        return False
+        row = self._key_rows.pop(key, None)
+        if row is None:
+            return False
+        
+        self._alive[row] = False
+        self._row_keys[row] = None
+        self._tombstones += 1
+        self.metadata.pop(key, None)
+        if self._segments is not None:
+            self._dirty.pop(key, None)
+            self._deleted[key] = None
+        
+        if self._tombstones > self.compact_ratio * self._size:
+            self.compact()
+        return True
     
     async def clear(self) -> bool:
         """
@@ -212,8 +796,19 @@ class VectorStore:
         Returns:
             True if successful
         """
-        self.embeddings.clear()
+        if self._segments is not None:
+            self._deleted.update(dict.fromkeys(self._key_rows))
+            self._dirty.clear()
         self.metadata.clear()
+        self._dim = None
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._row_keys = []
+        self._key_rows = {}
+        self._size = 0
+        self._tombstones = 0
+        self._index = None
         return True
     
     async def get_embedding(self, key: str) -> Optional[Dict[str, Any]]:
@@ -226,10 +821,11 @@ class VectorStore:
         Returns:
             Dict with embedding and metadata, or None if not found
         """
-        if key in self.embeddings:
+        row = self._key_rows.get(key)
+        if row is not None:
             return {
                 "key": key,
-                "embedding": self.embeddings[key].tolist(),
+                "embedding": (self._matrix[row] * self._norms[row]).tolist(),
                 "metadata": self.metadata.get(key, {})
             }
         return None
@@ -6,24 +6,27 @@ Comprehensive AI endpoints for chat, document generation, analysis, and multi-mo
 
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
-from uuid import UUID, uuid4
-import asyncio
+from uuid import uuid4
 import json
 import io
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Request, status, UploadFile, File
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from ..core.database import get_db
-from ..core.auth import get_current_user
-from ..db.business_models import User, Subscription
+from ..core.auth import get_admin_user, get_current_user
+from ..core.llm_gateway import GatewayModel, llm_gateway
+from ..services.ai_response_cache import ai_response_cache, tenant_scope
+from ..services.ai_usage import QuotaExceededError, Reservation, ai_usage_tracker, count_tokens, token_counter
+from ..services.chat_stream import StreamResult, stream_chat
+from ..services.conversation_store import SessionNotFoundError, conversation_store
+from ..db.business_models import User
 from ..agents import claude_agent, gemini, codex
 
 # Create openai_agent for compatibility
 openai_agent = codex  # Use codex as OpenAI agent
-from ..memory.vector_store import VectorStore
 from ..core.settings import settings
 
 router = APIRouter()
@@ -128,48 +131,114 @@ class ModelInfo(BaseModel):
     is_available: bool
 
 
+# Analysis, translation and extraction run deterministically so repeats hit the cache
+ANALYSIS_TEMPERATURE = 0.0
+
+
+# Chat models by preference name; looked up per call so the agents can be swapped
+def _chat_agents() -> Dict[str, Any]:
+    return {"claude": claude_agent, "gpt": codex, "gemini": gemini}
+
+
+CHAT_PROVIDERS = {"claude": "anthropic", "gpt": "openai", "gemini": "google"}
+
+# Each falls back to another provider's model when saturated
+llm_gateway.configure("claude", provider=CHAT_PROVIDERS["claude"], fallback="gpt")
+llm_gateway.configure("gpt", provider=CHAT_PROVIDERS["gpt"], fallback="claude")
+llm_gateway.configure("gemini", provider=CHAT_PROVIDERS["gemini"], fallback="claude")
+
+
 # Helper functions
-async def get_ai_model(model_preference: str, task_type: str = "general"):
+async def get_ai_model(model_preference: str, task_type: str = "general") -> GatewayModel:
     """Select appropriate AI model based on preference and task."""
     if model_preference == "auto":
         # Auto-select based on task type
         if task_type in ["code", "technical"]:
-            return codex
+            model = "gpt"
         elif task_type in ["creative", "long_form"]:
-            return claude_agent
+            model = "claude"
         else:
-            return gemini
-    
-    model_map = {
-        "claude": claude_agent,
-        "gpt": codex,
-        "gemini": gemini
-    }
-    
-    return model_map.get(model_preference, claude_agent)
+            model = "gemini"
+    elif model_preference in ("claude", "gpt", "gemini"):
+        model = model_preference
+    else:
+        model = "claude"
+    
+    return GatewayModel(model, _chat_agents())
+
+
+async def generate_cached(
+    ai_model: GatewayModel,
+    prompt: str,
+    user: User,
+    variant: Optional[Dict[str, Any]] = None,
+    semantic: bool = False,
+    **params
+) -> str:
+    """
+    Generate through the response cache; for endpoints whose output depends only on the input.
+
+    Hits are exact unless ``semantic``; enable it only where the answer
+    for a near-identical text is acceptable (summaries), never where the
+    output carries the text's own values (translation, extraction).
+
+    ``variant`` holds the request options that shape the prompt (target
+    language, analysis type, ...). They join the cache key and the semantic
+    signature, so a near-identical prompt asking for something else never
+    matches; a long text barely moves the embedding when they change.
+    """
+    temperature = params.pop("temperature", ANALYSIS_TEMPERATURE)
+    return await ai_response_cache.get_or_generate(
+        tenant_scope(user),
+        ai_model.model,
+        prompt,
+        lambda: ai_model.generate(prompt, temperature=temperature, **params),
+        temperature=temperature,
+        semantic=semantic,
+        **(variant or {}),
+        **params
+    )
 
 
-async def check_ai_quota(user: User, db: Session):
-    """Check if user has remaining AI requests."""
-    if user.subscription:
-        if user.subscription.used_ai_requests >= user.subscription.monthly_ai_requests:
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Monthly AI request limit reached"
-            )
+async def check_ai_quota(user: User, db: Session, endpoint: str, request_type: str) -> Reservation:
+    """Reserve one of the user's AI requests; 429 when the monthly limit is reached."""
+    try:
+        return await ai_usage_tracker.reserve(user.id, endpoint, request_type)
+    except QuotaExceededError:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Monthly AI request limit reached"
+        )
 
 
-async def increment_ai_usage(user: User, tokens_used: int, db: Session):
-    """Increment user's AI usage counter."""
-    if user.subscription:
-        user.subscription.used_ai_requests += 1
-        # Could also track tokens for more granular billing
-        db.commit()
+async def increment_ai_usage(
+    reservation: Reservation,
+    ai_model: GatewayModel,
+    prompt: str,
+    response: Any = None,
+    output_tokens: Optional[int] = None
+) -> int:
+    """Record a completed AI call against its reservation; returns the tokens counted."""
+    model = ai_model.served_model
+    input_tokens = count_tokens(model, prompt)
+    if output_tokens is None:
+        output_tokens = count_tokens(model, response) if isinstance(response, str) else 0
+    ai_usage_tracker.commit(
+        reservation,
+        model=ai_model.name,
+        service=CHAT_PROVIDERS.get(model, model),
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        reported_tokens=ai_model.reported_tokens
+    )
+    if ai_model.reported_tokens is not None:
+        return ai_model.reported_tokens
+    return input_tokens + output_tokens
 
 
-def format_chat_context(messages: List[Any], max_messages: int = 10):
+def format_chat_context(messages: List[Any], max_messages: Optional[int] = 10):
     """Format chat messages for AI context."""
-    recent_messages = messages[-max_messages:] if len(messages) > max_messages else messages
+    recent_messages = messages[-max_messages:] if max_messages and len(messages) > max_messages else messages
     formatted_messages = []
     for msg in recent_messages:
         if isinstance(msg, dict):
@@ -179,69 +248,93 @@ def format_chat_context(messages: List[Any], max_messages: int = 10):
     return "\n".join(formatted_messages)
 
 
+async def summarize_turns(previous: str, messages: List[Any]) -> str:
+    """Fold older chat turns into a session's rolling summary."""
+    prompt = (
+        "Update the summary of this conversation with the new turns. Keep facts, "
+        "decisions, names and open questions; answer with the summary only.\n\n"
+        f"Summary so far:\n{previous or '(none)'}\n\n"
+        f"New turns:\n{format_chat_context(messages, max_messages=None)}"
+    )
+    ai_model = GatewayModel("claude", _chat_agents())
+    return await ai_model.generate(prompt, temperature=ANALYSIS_TEMPERATURE, max_tokens=500)
+
+
+conversation_store.summarize = summarize_turns
+
+
 # Chat Endpoints
 @router.post("/chat")
 async def chat(
     request: ChatRequest,
-    background_tasks: BackgroundTasks,
+    http_request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Send a chat message to AI."""
     # Check quota
-    await check_ai_quota(current_user, db)
+    reservation = await check_ai_quota(current_user, db, "/chat", "chat")
     
     # Get or create session
     session_id = request.session_id or str(uuid4())
     
-    # Get conversation history from memory
-    vector_store = VectorStore()
-    history = await vector_store.get_conversation_history(
-        user_id=str(current_user.id),
-        session_id=session_id,
-        limit=request.context_window
-    )
+    # Recent turns within the token budget, after a summary of older ones
+    try:
+        window = await conversation_store.context(
+            session_id,
+            current_user.id,
+            budget_tokens=settings.CHAT_CONTEXT_TOKENS,
+            max_messages=request.context_window
+        )
+    except SessionNotFoundError:
+        ai_usage_tracker.release(reservation)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found"
+        )
     
     # Select AI model
     ai_model = await get_ai_model(request.model, "chat")
     
     # Prepare context
-    context = format_chat_context(history)
+    context = format_chat_context(window.as_messages(), max_messages=None)
     full_prompt = f"{context}\nuser: {request.message}\nassistant:"
     
     if request.stream:
-        # Stream response
-        async def generate():
-            response_text = ""
-            async for chunk in ai_model.stream(
-                full_prompt,
-                temperature=request.temperature,
-                max_tokens=request.max_tokens
-            ):
-                response_text += chunk
-                yield f"data: {json.dumps({'content': chunk})}\n\n"
-            
-            # Save to memory in background
-            background_tasks.add_task(
-                save_chat_messages,
-                current_user.id,
-                session_id,
-                request.message,
-                response_text,
-                db
-            )
-            
-            yield f"data: {json.dumps({'done': True})}\n\n"
+        # Stream response; runs after the request's db session has closed
+        user_id = current_user.id
         
-        return StreamingResponse(generate(), media_type="text/event-stream")
-    
-    else:
-        # Regular response
-        response = await ai_model.generate(
+        async def finish(result: StreamResult):
+            if not result.chunks and result.error:
+                ai_usage_tracker.release(reservation)
+                return
+            # Keep partial replies too: the client saw them and the provider billed them
+            if result.text:
+                await save_chat_messages(user_id, session_id, request.message, result.text, None, ai_model.name)
+            await increment_ai_usage(reservation, ai_model, full_prompt, output_tokens=result.output_tokens)
+        
+        chunks = ai_model.stream(
             full_prompt,
             temperature=request.temperature,
             max_tokens=request.max_tokens
         )
+        return StreamingResponse(
+            stream_chat(chunks, http_request.is_disconnected, finish, count_tokens=token_counter(ai_model.model)),
+            media_type="text/event-stream",
+            headers={"X-Session-Id": session_id, "Cache-Control": "no-cache"}
+        )
+    
+    else:
+        # Regular response
+        try:
+            response = await ai_model.generate(
+                full_prompt,
+                temperature=request.temperature,
+                max_tokens=request.max_tokens
+            )
+        except Exception:
+            ai_usage_tracker.release(reservation)
+            raise
         
         # Save to memory
         await save_chat_messages(
@@ -249,17 +342,18 @@ async def chat(
             session_id,
             request.message,
             response,
-            db
+            db,
+            ai_model.name
         )
         
         # Increment usage
-        await increment_ai_usage(current_user, len(response.split()), db)
+        tokens_used = await increment_ai_usage(reservation, ai_model, full_prompt, response)
         
         return {
             "session_id": session_id,
             "message": response,
             "model_used": ai_model.name,
-            "tokens_used": len(response.split())  # Rough estimate
+            "tokens_used": tokens_used
         }
 
 
@@ -271,9 +365,8 @@ async def list_chat_sessions(
     db: Session = Depends(get_db)
 ):
     """List user's chat sessions."""
-    vector_store = VectorStore()
-    sessions = await vector_store.get_user_sessions(
-        user_id=str(current_user.id),
+    sessions = await conversation_store.sessions(
+        current_user.id,
         limit=limit,
         offset=offset
     )
@@ -298,12 +391,10 @@ async def get_chat_session(
     db: Session = Depends(get_db)
 ):
     """Get chat session history."""
-    vector_store = VectorStore()
-    messages = await vector_store.get_conversation_history(
-        user_id=str(current_user.id),
-        session_id=session_id,
-        limit=1000  # Get all messages
-    )
+    try:
+        messages = await conversation_store.messages(session_id, current_user.id, limit=1000)
+    except SessionNotFoundError:
+        messages = []
     
     if not messages:
         raise HTTPException(
@@ -364,16 +455,9 @@ async def select_model_for_session(
     db: Session = Depends(get_db)
 ):
     """Select a model for a session."""
-    vector_store = VectorStore()
-    
-    # Update session model
-    success = await vector_store.update_session_model(
-        user_id=str(current_user.id),
-        session_id=request.session_id,
-        model=request.model
-    )
-    
-    if not success:
+    try:
+        await conversation_store.set_model(request.session_id, current_user.id, request.model)
+    except SessionNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Session not found"
@@ -440,11 +524,13 @@ async def delete_chat_session(
     db: Session = Depends(get_db)
 ):
     """Delete a chat session."""
-    vector_store = VectorStore()
-    await vector_store.delete_session(
-        user_id=str(current_user.id),
-        session_id=session_id
-    )
+    try:
+        await conversation_store.delete(session_id, current_user.id)
+    except SessionNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found"
+        )
 
 
 @router.post("/chat/sessions/{session_id}/export")
@@ -455,12 +541,10 @@ async def export_chat_session(
     db: Session = Depends(get_db)
 ):
     """Export conversation history."""
-    vector_store = VectorStore()
-    messages = await vector_store.get_conversation_history(
-        user_id=str(current_user.id),
-        session_id=session_id,
-        limit=10000
-    )
+    try:
+        messages = await conversation_store.messages(session_id, current_user.id, limit=10000)
+    except SessionNotFoundError:
+        messages = []
     
     if not messages:
         raise HTTPException(
@@ -518,7 +602,7 @@ async def generate_document(
 ):
     """Generate a document using AI."""
     # Check quota
-    await check_ai_quota(current_user, db)
+    reservation = await check_ai_quota(current_user, db, "/documents/generate", "document")
     
     # Get template if specified
     template_content = ""
@@ -542,7 +626,11 @@ Format: {request.format}
 Please generate a professional, well-structured document."""
     
     # Generate document
-    document_content = await ai_model.generate(prompt, max_tokens=4000)
+    try:
+        document_content = await ai_model.generate(prompt, max_tokens=4000)
+    except Exception:
+        ai_usage_tracker.release(reservation)
+        raise
     
     # Post-process based on format
     if request.format == "html":
@@ -565,7 +653,7 @@ Please generate a professional, well-structured document."""
     )
     
     # Increment usage
-    await increment_ai_usage(current_user, len(document_content.split()), db)
+    await increment_ai_usage(reservation, ai_model, prompt, document_content)
     
     return {
         "document_id": doc_id,
@@ -668,7 +756,7 @@ async def analyze_text(
 ):
     """Analyze text content."""
     # Check quota
-    await check_ai_quota(current_user, db)
+    reservation = await check_ai_quota(current_user, db, "/analyze/text", "analysis")
     
     # Select AI model
     ai_model = await get_ai_model(request.model, "analysis")
@@ -688,13 +776,20 @@ async def analyze_text(
         prompt += f"\n\nAdditional instructions: {json.dumps(request.options)}"
     
     # Perform analysis
-    result = await ai_model.generate(prompt)
+    try:
+        result = await generate_cached(
+            ai_model, prompt, current_user,
+            variant={"analysis_type": request.analysis_type, "options": request.options}
+        )
+    except Exception:
+        ai_usage_tracker.release(reservation)
+        raise
     
     # Parse result based on analysis type
     analysis_result = parse_analysis_result(request.analysis_type, result)
     
     # Increment usage
-    await increment_ai_usage(current_user, len(request.content.split()), db)
+    await increment_ai_usage(reservation, ai_model, prompt, result)
     
     # For comprehensive analysis, return the parsed result directly
     if request.analysis_type == "comprehensive" and isinstance(analysis_result, dict):
@@ -716,7 +811,7 @@ async def summarize_content(
 ):
     """Summarize content."""
     # Check quota
-    await check_ai_quota(current_user, db)
+    reservation = await check_ai_quota(current_user, db, "/analyze/summarize", "summary")
     
     # Select AI model
     ai_model = await get_ai_model(request.model, "analysis")
@@ -733,10 +828,16 @@ async def summarize_content(
 {request.content}"""
     
     # Generate summary
-    summary = await ai_model.generate(prompt)
+    try:
+        summary = await generate_cached(
+            ai_model, prompt, current_user, variant={"length": request.length}, semantic=True
+        )
+    except Exception:
+        ai_usage_tracker.release(reservation)
+        raise
     
     # Increment usage
-    await increment_ai_usage(current_user, len(request.content.split()), db)
+    await increment_ai_usage(reservation, ai_model, prompt, summary)
     
     return {
         "summary": summary,
@@ -754,27 +855,35 @@ async def translate_text(
 ):
     """Translate text to target language."""
     # Check quota
-    await check_ai_quota(current_user, db)
+    reservation = await check_ai_quota(current_user, db, "/analyze/translate", "translation")
     
     # Select AI model
     ai_model = await get_ai_model(request.model, "translation")
     
-    # Detect source language if auto
-    source_lang = request.source_language
-    if source_lang == "auto":
-        source_lang = await detect_language(request.text, ai_model)
-    
-    # Build prompt
-    prompt = f"""Translate the following text from {source_lang} to {request.target_language}. 
+    try:
+        # Detect source language if auto
+        source_lang = request.source_language
+        if source_lang == "auto":
+            source_lang = await detect_language(request.text, ai_model)
+        
+        # Build prompt
+        prompt = f"""Translate the following text from {source_lang} to {request.target_language}. 
 Only return the translated text, nothing else:
 
 {request.text}"""
-    
-    # Translate
-    translated = await ai_model.generate(prompt)
+        
+        # Translate
+        translated = await generate_cached(
+            ai_model, prompt, current_user,
+            variant={"source_language": source_lang, "target_language": request.target_language},
+            semantic=False
+        )
+    except Exception:
+        ai_usage_tracker.release(reservation)
+        raise
     
     # Increment usage
-    await increment_ai_usage(current_user, len(request.text.split()), db)
+    await increment_ai_usage(reservation, ai_model, prompt, translated)
     
     return {
         "translated_text": translated.strip(),
@@ -792,7 +901,7 @@ async def extract_data(
 ):
     """Extract structured data from text."""
     # Check quota
-    await check_ai_quota(current_user, db)
+    reservation = await check_ai_quota(current_user, db, "/analyze/extract", "extraction")
     
     # Select AI model
     ai_model = await get_ai_model(request.model, "extraction")
@@ -806,7 +915,14 @@ Return the results as a JSON object with keys matching the requested types.
 Text: {request.text}"""
     
     # Extract data
-    result = await ai_model.generate(prompt)
+    try:
+        result = await generate_cached(
+            ai_model, prompt, current_user, variant={"extract_types": sorted(request.extract_types)},
+            semantic=False
+        )
+    except Exception:
+        ai_usage_tracker.release(reservation)
+        raise
     
     # Parse result
     try:
@@ -820,11 +936,17 @@ Text: {request.text}"""
         }
     
     # Increment usage
-    await increment_ai_usage(current_user, len(request.text.split()), db)
+    await increment_ai_usage(reservation, ai_model, prompt, result)
     
     return extracted_data
 
 
+@router.get("/analyze/cache/stats", dependencies=[Depends(get_admin_user)])
+async def get_response_cache_stats():
+    """Hit rates and sizes for the analysis response cache."""
+    return ai_response_cache.stats()
+
+
 @router.post("/analyze/document")
 async def analyze_document(
     file: UploadFile = File(...),
@@ -834,8 +956,7 @@ async def analyze_document(
     db: Session = Depends(get_db)
 ):
     """Analyze uploaded document."""
-    # Check quota
-    await check_ai_quota(current_user, db)
+    # analyze_text checks the quota
     
     # Read and process document
     content = await file.read()
@@ -866,7 +987,7 @@ async def analyze_image(
 ):
     """Analyze uploaded image."""
     # Check quota
-    await check_ai_quota(current_user, db)
+    reservation = await check_ai_quota(current_user, db, "/analyze/image", "vision")
     
     # Read image
     image_data = await file.read()
@@ -885,10 +1006,14 @@ async def analyze_image(
     prompt = prompts.get(request.task, "Analyze this image:")
     
     # Perform analysis (assuming model supports image input)
-    result = await ai_model.analyze_image(image_data, prompt)
+    try:
+        result = await ai_model.analyze_image(image_data, prompt)
+    except Exception:
+        ai_usage_tracker.release(reservation)
+        raise
     
     # Increment usage
-    await increment_ai_usage(current_user, 1, db)
+    await increment_ai_usage(reservation, ai_model, prompt, result)
     
     return {
         "task": request.task,
@@ -908,7 +1033,7 @@ async def summarize_content(
 ):
     """Summarize long content."""
     # Check quota
-    await check_ai_quota(current_user, db)
+    reservation = await check_ai_quota(current_user, db, "/summarize", "summary")
     
     # Select AI model
     ai_model = await get_ai_model(model, "summary")
@@ -923,10 +1048,14 @@ async def summarize_content(
     prompt = f"Summarize the following content {length_instructions.get(summary_length, '')}:\n\n{content}"
     
     # Generate summary
-    summary = await ai_model.generate(prompt)
+    try:
+        summary = await ai_model.generate(prompt)
+    except Exception:
+        ai_usage_tracker.release(reservation)
+        raise
     
     # Increment usage
-    await increment_ai_usage(current_user, len(content.split()), db)
+    await increment_ai_usage(reservation, ai_model, prompt, summary)
     
     return {
         "summary": summary,
@@ -945,7 +1074,7 @@ async def translate_text(
 ):
     """Translate text between languages."""
     # Check quota
-    await check_ai_quota(current_user, db)
+    reservation = await check_ai_quota(current_user, db, "/translate", "translation")
     
     # Select AI model
     ai_model = await get_ai_model(request.model, "translation")
@@ -957,15 +1086,19 @@ async def translate_text(
         prompt = f"Translate the following text from {request.source_language} to {request.target_language}:\n\n{request.text}"
     
     # Perform translation
-    translation = await ai_model.generate(prompt)
+    try:
+        translation = await ai_model.generate(prompt)
     
-    # Detect source language if auto
-    detected_language = None
-    if request.source_language == "auto":
-        detected_language = await detect_language(request.text, ai_model)
+        # Detect source language if auto
+        detected_language = None
+        if request.source_language == "auto":
+            detected_language = await detect_language(request.text, ai_model)
+    except Exception:
+        ai_usage_tracker.release(reservation)
+        raise
     
     # Increment usage
-    await increment_ai_usage(current_user, len(request.text.split()), db)
+    await increment_ai_usage(reservation, ai_model, prompt, translation)
     
     return {
         "original_text": request.text,
@@ -986,7 +1119,7 @@ async def extract_data(
 ):
     """Extract structured data from unstructured text."""
     # Check quota
-    await check_ai_quota(current_user, db)
+    reservation = await check_ai_quota(current_user, db, "/extract", "extraction")
     
     # Select AI model
     ai_model = await get_ai_model(model, "extraction")
@@ -1003,7 +1136,11 @@ Text:
 Return the extracted data as valid JSON matching the schema."""
     
     # Perform extraction
-    result = await ai_model.generate(prompt)
+    try:
+        result = await ai_model.generate(prompt)
+    except Exception:
+        ai_usage_tracker.release(reservation)
+        raise
     
     # Parse JSON result
     try:
@@ -1018,7 +1155,7 @@ Return the extracted data as valid JSON matching the schema."""
             extracted_data = {"error": "Could not parse extraction result"}
     
     # Increment usage
-    await increment_ai_usage(current_user, len(content.split()), db)
+    await increment_ai_usage(reservation, ai_model, prompt, result)
     
     return {
         "extracted_data": extracted_data,
@@ -1080,12 +1217,13 @@ async def select_model_for_session(
 ):
     """Select a specific model for a session."""
     # Update session preference
-    vector_store = VectorStore()
-    await vector_store.update_session_model(
-        user_id=str(current_user.id),
-        session_id=selection.session_id,
-        model=selection.model
-    )
+    try:
+        await conversation_store.set_model(selection.session_id, current_user.id, selection.model)
+    except SessionNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found"
+        )
     
     return {"message": f"Model {selection.model} selected for session"}
 
@@ -1125,33 +1263,10 @@ async def get_usage_costs(
 
 
 # Helper functions (these would be implemented separately)
-async def save_chat_messages(user_id, session_id, user_message, ai_response, db):
-    """Save chat messages to memory."""
-    vector_store = VectorStore()
-    
-    # Save user message
-    await vector_store.add_memory(
-        content=user_message,
-        memory_type="conversation",
-        metadata={
-            "user_id": str(user_id),
-            "session_id": session_id,
-            "role": "user",
-            "timestamp": datetime.utcnow().isoformat()
-        }
-    )
-    
-    # Save AI response
-    await vector_store.add_memory(
-        content=ai_response,
-        memory_type="conversation",
-        metadata={
-            "user_id": str(user_id),
-            "session_id": session_id,
-            "role": "assistant",
-            "timestamp": datetime.utcnow().isoformat()
-        }
-    )
+async def save_chat_messages(user_id, session_id, user_message, ai_response, db, model=None):
+    """Append a chat turn to the session log; rows are written in the background."""
+    await conversation_store.append(session_id, user_id, "user", user_message, model=model)
+    await conversation_store.append(session_id, user_id, "assistant", ai_response, model=model)
 
 
 async def get_document_template(template_id: str, db: Session):
@@ -18,7 +18,9 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 
 from ..core.database import get_db
-from ..core.auth import get_current_user, create_access_token, verify_password, get_password_hash
+from ..core.auth import (
+    get_current_user, create_access_token, verify_password, get_password_hash, principal_cache
+)
 from ..core.email import send_email
 from ..core.settings import settings
 from ..db.business_models import User, APIKey, UserSession
@@ -403,6 +405,7 @@ async def revoke_all_sessions(
     ).update({"is_active": False})
     
     db.commit()
+    principal_cache.revoke_user(current_user.id)
     
     return {"message": "All other sessions revoked"}
 
@@ -9,7 +9,7 @@ from typing import Dict, Any, List, Optional
 from uuid import UUID
 import json
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, File, Query, UploadFile
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_
 
@@ -23,11 +23,17 @@ from ..db.crm_models import (
 from ..core.auth import get_current_user
 from ..core.database import get_db
 from ..core.rbac import Permission, require_permission
-from ..core.cache import cache_key_builder, cache
+from ..core.cache import cache_key_builder, cache, invalidate_tags, entity_tags
+from ..core.pagination import count_total, keyset_paginate, offset_paginate, sort_keys
 from ..services.email_service import send_email
 from ..services.notifications import NotificationService
 from ..integrations.calendar import CalendarService
 from ..services.analytics import AnalyticsService
+from ..services.lead_import import (
+    LeadImportResult, calculate_lead_score, get_import_progress, import_leads, iter_upload_rows,
+    publish_progress, upload_format
+)
+from ..services.rollups import RollupTotals, metric_total, next_month, rollup_series, rollup_totals
 
 
 router = APIRouter()
@@ -78,6 +84,8 @@ async def create_lead(
     db.add(lead)
     db.commit()
     
+    await invalidate_tags(*entity_tags("lead", lead.id))
+    
     # Track lead source attribution
     track_lead_source(lead.source, db)
     
@@ -125,6 +133,8 @@ async def list_leads(
     search: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page; replaces skip"),
+    total_mode: str = Query("exact", pattern="^(exact|estimate|none)$"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> Dict[str, Any]:
@@ -150,10 +160,16 @@ async def list_leads(
         )
     
     # Get total count
-    total = query.count()
-    
-    # Get paginated results
-    leads = query.order_by(Lead.created_at.desc()).offset(skip).limit(limit).all()
+    total = count_total(query, total_mode)
+    
+    # Get paginated results; an explicit skip keeps the old OFFSET behaviour
+    keys = sort_keys(Lead.created_at, True, Lead.id)
+    next_cursor = prev_cursor = None
+    if cursor or not skip:
+        result = keyset_paginate(query, keys, limit, cursor, scope="leads")
+        leads, next_cursor, prev_cursor = result.items, result.next_cursor, result.prev_cursor
+    else:
+        leads = offset_paginate(query, keys, skip, limit)
     
     # Get summary stats
     stats = db.query(
@@ -178,6 +194,8 @@ async def list_leads(
             for lead in leads
         ],
         "total": total,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
         "stats": {
             "total_leads": stats.total_leads or 0,
             "average_score": float(stats.avg_score or 0),
@@ -259,6 +277,10 @@ async def convert_lead_to_opportunity(
     
     db.commit()
     
+    await invalidate_tags(
+        *entity_tags("lead", lead.id), *entity_tags("opportunity", opportunity.id)
+    )
+    
     # Send notifications
     background_tasks.add_task(
         notification_service.notify_team,
@@ -308,6 +330,8 @@ async def create_opportunity(
     db.add(opportunity)
     db.commit()
     
+    await invalidate_tags(*entity_tags("opportunity", opportunity.id))
+    
     # Calculate weighted pipeline value
     weighted_value = (opportunity.value_cents * opportunity.probability) / 10000
     
@@ -386,6 +410,8 @@ async def update_opportunity_stage(
     
     db.commit()
     
+    await invalidate_tags(*entity_tags("opportunity", opportunity.id))
+    
     return {
         "opportunity": {
             "id": str(opportunity.id),
@@ -463,6 +489,10 @@ async def log_communication(
     
     db.commit()
     
+    await invalidate_tags(
+        f"communications:{communication.entity_type}:{communication.entity_id}"
+    )
+    
     return {
         "communication": {
             "id": str(communication.id),
@@ -476,6 +506,7 @@ async def log_communication(
 
 @router.get("/communications/timeline/{entity_type}/{entity_id}")
 @require_permission(Permission.CRM_READ)
+@cache(ttl=300, tags=["communications:{entity_type}:{entity_id}"])
 async def get_communication_timeline(
     entity_type: str,
     entity_id: UUID,
@@ -540,7 +571,11 @@ async def get_communication_timeline(
 # Sales Analytics
 @router.get("/analytics/pipeline")
 @require_permission(Permission.CRM_READ)
-@cache(key_builder=cache_key_builder)
+@cache(
+    key_builder=cache_key_builder,
+    stale_ttl=120,
+    tags=["entity:lead", "entity:opportunity"]
+)
 async def get_pipeline_analytics(
     date_range: str = Query("30d", pattern="^(7d|30d|90d|1y)$"),
     db: Session = Depends(get_db),
@@ -558,37 +593,17 @@ async def get_pipeline_analytics(
     else:  # 1y
         start_date = end_date - timedelta(days=365)
     
-    # Pipeline by stage
-    pipeline_by_stage = db.query(
-        Opportunity.stage,
-        func.count(Opportunity.id).label("count"),
-        func.sum(Opportunity.value_cents).label("total_value"),
-        func.avg(Opportunity.probability).label("avg_probability")
-    ).filter(
-        Opportunity.created_at >= start_date,
-        Opportunity.is_active == True
-    ).group_by(Opportunity.stage).all()
-    
-    # Win/loss analysis
-    win_loss = db.query(
-        func.count(Opportunity.id).filter(Opportunity.is_won == True).label("won"),
-        func.count(Opportunity.id).filter(Opportunity.is_won == False).label("lost"),
-        func.sum(Opportunity.value_cents).filter(Opportunity.is_won == True).label("won_value"),
-        func.sum(Opportunity.value_cents).filter(Opportunity.is_won == False).label("lost_value")
-    ).filter(
-        Opportunity.closed_date >= start_date,
-        Opportunity.closed_date.isnot(None)
-    ).one()
-    
-    # Sales velocity metrics
-    avg_sales_cycle = db.query(
-        func.avg(
-            func.extract('epoch', Opportunity.closed_date - Opportunity.created_at) / 86400
-        ).label("avg_days")
-    ).filter(
-        Opportunity.closed_date >= start_date,
-        Opportunity.is_won == True
-    ).scalar() or 0
+    # Pipeline by stage, win/loss and sales cycle from the rollups
+    totals = rollup_totals(
+        db, ["opportunity.open", "opportunity.won", "opportunity.lost"],
+        start_date.date(), end_date.date(), by_dimension=True
+    )
+    pipeline_by_stage = [
+        (stage, value) for (metric, stage), value in totals.items() if metric == "opportunity.open"
+    ]
+    won = metric_total(totals, "opportunity.won")
+    lost = metric_total(totals, "opportunity.lost")
+    avg_sales_cycle = won.duration_days / won.count if won.count else 0
     
     # Lead conversion funnel
     lead_funnel = db.query(
@@ -618,24 +633,24 @@ async def get_pipeline_analytics(
             "by_stage": [
                 {
                     "stage": stage,
-                    "opportunities": count,
-                    "total_value": total_value / 100 if total_value else 0,
-                    "weighted_value": (total_value * avg_prob) / 10000 if total_value and avg_prob else 0
+                    "opportunities": value.count,
+                    "total_value": value.amount_cents / 100,
+                    "weighted_value": value.weighted_cents / 100
                 }
-                for stage, count, total_value, avg_prob in pipeline_by_stage
+                for stage, value in pipeline_by_stage
             ],
-            "total_pipeline_value": sum(s[2] for s in pipeline_by_stage if s[2]) / 100
+            "total_pipeline_value": sum(value.amount_cents for _, value in pipeline_by_stage) / 100
         },
         "win_loss": {
-            "won_deals": win_loss.won or 0,
-            "lost_deals": win_loss.lost or 0,
-            "win_rate": (win_loss.won / (win_loss.won + win_loss.lost) * 100) if (win_loss.won + win_loss.lost) > 0 else 0,
-            "won_value": win_loss.won_value / 100 if win_loss.won_value else 0,
-            "lost_value": win_loss.lost_value / 100 if win_loss.lost_value else 0
+            "won_deals": won.count,
+            "lost_deals": lost.count,
+            "win_rate": (won.count / (won.count + lost.count) * 100) if (won.count + lost.count) > 0 else 0,
+            "won_value": won.amount_cents / 100,
+            "lost_value": lost.amount_cents / 100
         },
         "velocity": {
             "average_sales_cycle_days": round(avg_sales_cycle, 1),
-            "deals_in_pipeline": sum(s[1] for s in pipeline_by_stage)
+            "deals_in_pipeline": sum(value.count for _, value in pipeline_by_stage)
         },
         "lead_conversion": {
             "total_leads": lead_funnel.total_leads or 0,
@@ -656,6 +671,7 @@ async def get_pipeline_analytics(
 
 @router.get("/analytics/forecast")
 @require_permission(Permission.CRM_READ)
+@cache(ttl=900, tags=["entity:opportunity"])
 async def get_sales_forecast(
     months: int = Query(3, ge=1, le=12),
     db: Session = Depends(get_db),
@@ -663,33 +679,31 @@ async def get_sales_forecast(
 ) -> Dict[str, Any]:
     """Generate sales forecast based on pipeline and historical data."""
     current_date = date.today()
-    forecast = []
+    month_starts = [current_date.replace(day=1)]
+    for _ in range(months - 1):
+        month_starts.append(next_month(month_starts[-1]))
+    
+    # Expected closes per month and daily closed deals, one query each
+    expected = rollup_series(db, ["opportunity.expected"], month_starts[0], month_starts[-1])
+    closed = rollup_series(
+        db, ["opportunity.won", "opportunity.lost"],
+        current_date - timedelta(days=30 * (months - 1)), current_date, grain="day"
+    )
     
-    for month_offset in range(months):
-        month_start = current_date.replace(day=1) + timedelta(days=30 * month_offset)
-        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        
-        # Get opportunities expected to close this month
-        opportunities = db.query(
-            func.sum(Opportunity.value_cents).label("total_value"),
-            func.sum(Opportunity.value_cents * Opportunity.probability / 100).label("weighted_value"),
-            func.count(Opportunity.id).label("count")
-        ).filter(
-            Opportunity.expected_close_date >= month_start,
-            Opportunity.expected_close_date <= month_end,
-            Opportunity.is_active == True
-        ).one()
+    forecast = []
+    for month_offset, month_start in enumerate(month_starts):
+        opportunities = expected.get(("opportunity.expected", month_start), RollupTotals())
         
         # Calculate forecast based on historical win rate
-        historical_win_rate = get_historical_win_rate(db, month_offset)
+        historical_win_rate = win_rate_since(closed, current_date - timedelta(days=30 * month_offset))
         
         forecast.append({
             "month": month_start.strftime("%Y-%m"),
-            "opportunities": opportunities.count or 0,
-            "pipeline_value": opportunities.total_value / 100 if opportunities.total_value else 0,
-            "weighted_forecast": opportunities.weighted_value / 100 if opportunities.weighted_value else 0,
-            "ai_forecast": (opportunities.weighted_value * historical_win_rate / 100) / 100 if opportunities.weighted_value else 0,
-            "confidence": calculate_forecast_confidence(opportunities.count or 0, historical_win_rate)
+            "opportunities": opportunities.count,
+            "pipeline_value": opportunities.amount_cents / 100,
+            "weighted_forecast": opportunities.weighted_cents / 100,
+            "ai_forecast": (opportunities.weighted_cents * historical_win_rate / 100) / 100,
+            "confidence": calculate_forecast_confidence(opportunities.count, historical_win_rate)
         })
     
     return {
@@ -758,100 +772,67 @@ async def import_campaign_leads(
     if not campaign:
         raise HTTPException(404, "Campaign not found")
     
-    imported = 0
-    duplicates = 0
-    errors = []
-    
-    for lead_data in leads_data:
-        try:
-            # Check for duplicates
-            existing = db.query(Lead).filter(Lead.email == lead_data["email"]).first()
-            if existing:
-                duplicates += 1
-                # Update campaign association
-                existing.campaign_id = campaign_id
-                continue
-            
-            # Create new lead
-            lead = Lead(
-                name=lead_data["name"],
-                email=lead_data["email"],
-                phone=lead_data.get("phone"),
-                company=lead_data.get("company"),
-                source=f"campaign_{campaign.name}",
-                campaign_id=campaign_id,
-                score=calculate_lead_score(lead_data),
-                status="new",
-                tags=lead_data.get("tags", []) + [f"campaign:{campaign.name}"],
-                created_by=current_user.id
-            )
-            db.add(lead)
-            imported += 1
-            
-        except Exception as e:
-            errors.append({"email": lead_data.get("email"), "error": str(e)})
-    
-    db.commit()
+    result = await import_leads(db, campaign, leads_data, current_user.id)
+    return await _finish_lead_import(result, background_tasks)
+
+
+@router.post("/campaigns/{campaign_id}/leads/upload")
+@require_permission(Permission.CRM_WRITE)
+async def upload_campaign_leads(
+    campaign_id: UUID,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    import_id: Optional[str] = Query(None, max_length=64, description="Client-chosen id for progress polling"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """
+    Import leads for a campaign from a CSV or NDJSON file.
     
-    # Update campaign metrics
-    campaign.leads_generated = (campaign.leads_generated or 0) + imported
-    db.commit()
+    CSV files need a header row; NDJSON files hold one lead object per
+    line. The file is read row by row and imported in chunks; poll
+    ``/campaigns/{campaign_id}/leads/imports/{import_id}`` for progress.
+    """
+    campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
+    if not campaign:
+        raise HTTPException(404, "Campaign not found")
     
-    # Trigger lead nurturing
-    if imported > 0:
-        background_tasks.add_task(
-            start_campaign_nurture_sequence,
-            campaign_id,
-            db
-        )
+    format = upload_format(file.filename, file.content_type)
+    if format is None:
+        raise HTTPException(400, "Upload a .csv or .ndjson file")
     
-    return {
-        "campaign_id": str(campaign_id),
-        "imported": imported,
-        "duplicates": duplicates,
-        "errors": len(errors),
-        "error_details": errors[:10]  # First 10 errors
-    }
+    result = await import_leads(
+        db, campaign, iter_upload_rows(file.file, format), current_user.id,
+        import_id=import_id, on_progress=publish_progress
+    )
+    return await _finish_lead_import(result, background_tasks)
 
 
-# Helper Functions
-def calculate_lead_score(lead_data: Dict[str, Any]) -> int:
-    """Calculate lead score based on various factors."""
-    score = 0
-    
-    # Email domain scoring
-    email = lead_data.get("email", "")
-    if email.endswith((".com", ".org", ".net")):
-        score += 10
-    if not email.endswith(("gmail.com", "yahoo.com", "hotmail.com")):
-        score += 20  # Business email
-    
-    # Company info
-    if lead_data.get("company"):
-        score += 15
-    if lead_data.get("title"):
-        score += 10
-        if any(term in lead_data["title"].lower() for term in ["ceo", "president", "director", "manager"]):
-            score += 20
-    
-    # Source scoring
-    source = lead_data.get("source", "")
-    if source in ["referral", "partner"]:
-        score += 30
-    elif source in ["website", "content"]:
-        score += 20
-    elif source in ["event", "webinar"]:
-        score += 25
-    
-    # Engagement
-    if lead_data.get("downloaded_content"):
-        score += 15
-    if lead_data.get("requested_demo"):
-        score += 40
-    
-    return min(score, 100)  # Cap at 100
+@router.get("/campaigns/{campaign_id}/leads/imports/{import_id}")
+@require_permission(Permission.CRM_READ)
+async def get_lead_import_progress(
+    campaign_id: UUID,
+    import_id: str,
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Get the running totals of a lead upload."""
+    progress = await get_import_progress(import_id)
+    if not progress or progress["campaign_id"] != str(campaign_id):
+        raise HTTPException(404, "Import not found")
+    return progress
 
 
+async def _finish_lead_import(result: LeadImportResult, background_tasks: BackgroundTasks) -> Dict[str, Any]:
+    if result.imported > 0:
+        await invalidate_tags("entity:lead")
+        
+        # Trigger lead nurturing
+        background_tasks.add_task(start_campaign_nurture_sequence, UUID(result.campaign_id))
+    
+    return result.as_dict()
+
+
+# Helper Functions
 def assign_lead_to_rep(lead_data: Dict[str, Any], score: int, db: Session) -> Optional[UUID]:
     """Auto-assign lead to sales rep based on rules."""
     # High-value leads go to senior reps
@@ -901,23 +882,27 @@ def get_stage_actions(stage: str) -> List[str]:
     return actions.get(stage, [])
 
 
-def get_historical_win_rate(db: Session, months_back: int = 6) -> float:
-    """Calculate historical win rate for forecasting."""
-    start_date = datetime.utcnow() - timedelta(days=30 * months_back)
-    
-    stats = db.query(
-        func.count(Opportunity.id).filter(Opportunity.is_won == True).label("won"),
-        func.count(Opportunity.id).label("total")
-    ).filter(
-        Opportunity.closed_date >= start_date,
-        Opportunity.closed_date.isnot(None)
-    ).one()
+def win_rate_since(closed: Dict[Any, RollupTotals], since: date) -> float:
+    """Win rate over daily won/lost rollups from ``since`` onwards."""
+    won = total = 0
+    for (metric, day), value in closed.items():
+        if day >= since:
+            total += value.count
+            if metric == "opportunity.won":
+                won += value.count
     
-    if stats.total and stats.total > 0:
-        return (stats.won / stats.total) * 100
+    if total > 0:
+        return (won / total) * 100
     return 25.0  # Default win rate
 
 
+def get_historical_win_rate(db: Session, months_back: int = 6) -> float:
+    """Calculate historical win rate for forecasting."""
+    since = date.today() - timedelta(days=30 * months_back)
+    closed = rollup_series(db, ["opportunity.won", "opportunity.lost"], since, date.today(), grain="day")
+    return win_rate_since(closed, since)
+
+
 def calculate_forecast_confidence(opportunity_count: int, win_rate: float) -> str:
     """Calculate confidence level for forecast."""
     if opportunity_count >= 20 and win_rate >= 20:
@@ -964,7 +949,12 @@ async def setup_email_campaign(campaign_id: UUID, email_sequence: List[Dict]):
     pass
 
 
-async def start_campaign_nurture_sequence(campaign_id: UUID, db: Session):
-    """Start nurture sequence for campaign leads."""
+async def start_campaign_nurture_sequence(campaign_id: UUID):
+    """
+    Start nurture sequence for campaign leads.
+    
+    Runs after the response is sent, so it must open its own session
+    rather than use the request's.
+    """
     # Implementation would trigger email workflows
     pass
\ No newline at end of file
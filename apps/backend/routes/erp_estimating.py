@@ -25,7 +25,9 @@ from pydantic import BaseModel, Field, validator
 
 from ..core.database import get_db
 from ..core.auth import get_current_user
+from ..core.cache import cache_result, invalidate_tags, entity_tags
 from ..core.logging import get_logger
+from ..core.pagination import count_total, keyset_paginate, offset_paginate, sort_keys
 from ..db.business_models import (
     User, Project, Estimate, Inspection, Product, 
     DocumentTemplate, Document
@@ -429,6 +431,8 @@ async def create_estimate(
     db.commit()
     db.refresh(estimate)
     
+    await invalidate_tags(*entity_tags("estimate", estimate.id))
+    
     # Schedule follow-up tasks
     background_tasks.add_task(
         schedule_estimate_followup,
@@ -456,10 +460,23 @@ async def create_estimate(
         'created_at': estimate.created_at.isoformat()
     }
 
+# Sortable estimate columns and whether they may be NULL
+ESTIMATE_SORT_COLUMNS = {
+    "created_at": (Estimate.created_at, False),
+    "total": (Estimate.total, False),
+    "client_name": (Estimate.client_name, False),
+    "estimate_number": (Estimate.estimate_number, False),
+    "status": (Estimate.status, False),
+    "valid_until": (Estimate.valid_until, True),
+}
+
+
 @router.get("/estimates", response_model=Dict[str, Any])
 async def list_estimates(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page; replaces page"),
+    total_mode: str = Query("exact", pattern="^(exact|estimate|none)$"),
     status: Optional[EstimateStatus] = None,
     client_name: Optional[str] = None,
     date_from: Optional[datetime] = None,
@@ -497,18 +514,20 @@ async def list_estimates(
     if max_amount is not None:
         query = query.filter(Estimate.total <= max_amount)
     
-    # Apply sorting
-    sort_column = getattr(Estimate, sort_by, Estimate.created_at)
-    if sort_order == "desc":
-        query = query.order_by(sort_column.desc())
-    else:
-        query = query.order_by(sort_column)
-    
     # Get total count
-    total = query.count()
+    total = count_total(query, total_mode)
     
-    # Apply pagination
-    estimates = query.offset((page - 1) * limit).limit(limit).all()
+    # Apply sorting
+    sort_column, nullable = ESTIMATE_SORT_COLUMNS.get(sort_by, ESTIMATE_SORT_COLUMNS["created_at"])
+    keys = sort_keys(sort_column, sort_order == "desc", Estimate.id, nullable=nullable)
+    
+    # Apply pagination; page numbers beyond the first fall back to OFFSET
+    next_cursor = prev_cursor = None
+    if cursor or page == 1:
+        result = keyset_paginate(query, keys, limit, cursor, scope="estimates")
+        estimates, next_cursor, prev_cursor = result.items, result.next_cursor, result.prev_cursor
+    else:
+        estimates = offset_paginate(query, keys, (page - 1) * limit, limit)
     
     # Calculate statistics
     stats_query = db.query(
@@ -540,7 +559,9 @@ async def list_estimates(
         'total': total,
         'page': page,
         'limit': limit,
-        'pages': (total + limit - 1) // limit,
+        'pages': (total + limit - 1) // limit if total is not None else None,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor,
         'statistics': {
             'count': stats.count or 0,
             'total_value': float(stats.total_value or 0),
@@ -549,6 +570,7 @@ async def list_estimates(
     }
 
 @router.get("/estimates/{estimate_id}", response_model=Dict[str, Any])
+@cache_result(ttl=300, tags=["estimate:{estimate_id}"])
 async def get_estimate(
     estimate_id: str,
     current_user: User = Depends(get_current_user),
@@ -664,6 +686,8 @@ async def update_estimate(
     db.commit()
     db.refresh(estimate)
     
+    await invalidate_tags(*entity_tags("estimate", estimate.id))
+    
     return {
         'id': estimate.id,
         'estimate_number': estimate.estimate_number,
@@ -705,6 +729,8 @@ async def send_estimate(
     estimate.sent_at = datetime.utcnow()
     db.commit()
     
+    await invalidate_tags(*entity_tags("estimate", estimate.id))
+    
     return {
         'message': 'Estimate queued for sending',
         'estimate_id': estimate.id,
@@ -756,6 +782,8 @@ async def duplicate_estimate(
     db.commit()
     db.refresh(new_estimate)
     
+    await invalidate_tags(*entity_tags("estimate", new_estimate.id))
+    
     return {
         'id': new_estimate.id,
         'estimate_number': new_estimate.estimate_number,
@@ -816,6 +844,7 @@ async def bulk_update_pricing(
     }
 
 @router.get("/estimates/analytics", response_model=Dict[str, Any])
+@cache_result(ttl=600, tags=["entity:estimate"])
 async def get_estimate_analytics(
     date_from: datetime = Query(
         default=datetime.utcnow() - timedelta(days=90)
@@ -933,7 +962,9 @@ async def apply_bulk_pricing_update(
     """Apply pricing updates to multiple estimates."""
     # This would update material costs and recalculate
     # Send notifications if requested
-    pass
+    await invalidate_tags(
+        *[tag for estimate in estimates for tag in entity_tags("estimate", estimate.id)]
+    )
 
 # Initialize pricing and tax services
 class PricingService:
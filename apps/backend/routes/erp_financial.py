@@ -9,26 +9,28 @@ financial reporting, and integrations with payment processors and accounting sof
 from fastapi import APIRouter, HTTPException, Depends, Query, BackgroundTasks, UploadFile, File
 from fastapi.responses import StreamingResponse, FileResponse
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, func, extract, case
-from typing import List, Optional, Dict, Any, Union
+from sqlalchemy import and_, or_, func, case, select
+from typing import Iterable, Iterator, List, Optional, Dict, Any, Union
 from datetime import datetime, timedelta, date
 from decimal import Decimal, ROUND_HALF_UP
 from pydantic import BaseModel, Field, validator, condecimal
 import uuid
 import json
-import io
-import csv
 from enum import Enum
 
 from ..core.database import get_db
 from ..core.auth import get_current_user
 from ..core.rbac import Permission, require_permission, PermissionChecker
-from ..core.cache import cache_result, invalidate_cache
+from ..core.cache import cache_result, invalidate_cache, invalidate_tags, entity_tags
+from ..core.aggregates import aggregate, count_where, sum_where
+from ..core.export import EXPORT_MEDIA_TYPES, export_response, stream_rows
+from ..core.pagination import count_total, keyset_paginate, offset_paginate, sort_keys
 from ..services.notifications import send_notification, NotificationType
 from ..core.audit import audit_log
 from ..db.business_models import User, UserRole, Project, Estimate
 from ..db.financial_models import Job, Invoice, Payment, Expense, Customer, Vendor
 from ..services.document_generator import DocumentGenerator
+from ..services.rollups import metric_total, rollup_months, rollup_totals
 from ..integrations.stripe import StripeService
 from ..integrations.quickbooks import QuickBooksService
 from ..integrations.tax_service import TaxService
@@ -223,7 +225,7 @@ class FinancialReportRequest(BaseModel):
     
     # Options
     include_details: bool = True
-    format: str = Field(default="json", pattern="^(json|csv|pdf)$")
+    format: str = Field(default="json", pattern="^(json|csv|jsonl|pdf)$")
     compare_period: Optional[str] = None  # "previous_period", "previous_year"
 
 
@@ -326,6 +328,8 @@ async def create_invoice(
                 job.invoice_id = invoice.id
                 db.commit()
         
+        await invalidate_tags(*entity_tags("invoice", invoice.id))
+        
         # Audit log
         await audit_log(
             user_id=current_user.id,
@@ -368,6 +372,8 @@ async def list_invoices(
     # Pagination
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page; replaces page"),
+    total_mode: str = Query("exact", pattern="^(exact|estimate|none)$"),
     
     # Sorting
     sort_by: str = Query("invoice_date", pattern="^(invoice_date|due_date|total|invoice_number)$"),
@@ -414,7 +420,7 @@ async def list_invoices(
             )
         
         # Get total count
-        total_count = query.count()
+        total_count = count_total(query, total_mode)
         
         # Calculate summary statistics
         stats_query = query.with_entities(
@@ -426,14 +432,15 @@ async def list_invoices(
         
         # Apply sorting
         sort_column = getattr(Invoice, sort_by)
-        if sort_order == "desc":
-            query = query.order_by(sort_column.desc())
-        else:
-            query = query.order_by(sort_column.asc())
+        keys = sort_keys(sort_column, sort_order == "desc", Invoice.id)
         
-        # Apply pagination
-        offset = (page - 1) * page_size
-        invoices = query.offset(offset).limit(page_size).all()
+        # Apply pagination; page numbers beyond the first fall back to OFFSET
+        next_cursor = prev_cursor = None
+        if cursor or page == 1:
+            result = keyset_paginate(query, keys, page_size, cursor, scope="invoices")
+            invoices, next_cursor, prev_cursor = result.items, result.next_cursor, result.prev_cursor
+        else:
+            invoices = offset_paginate(query, keys, (page - 1) * page_size, page_size)
         
         # Format response
         invoice_list = []
@@ -466,7 +473,9 @@ async def list_invoices(
                 "page": page,
                 "page_size": page_size,
                 "total_count": total_count,
-                "total_pages": (total_count + page_size - 1) // page_size
+                "total_pages": (total_count + page_size - 1) // page_size if total_count is not None else None,
+                "next_cursor": next_cursor,
+                "prev_cursor": prev_cursor
             },
             "summary": {
                 "total_invoices": stats_query.count or 0,
@@ -477,12 +486,15 @@ async def list_invoices(
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(500, f"Failed to retrieve invoices: {str(e)}")
 
 
 @router.get("/invoices/{invoice_id}", response_model=Dict[str, Any])
 @require_permission(Permission.FINANCE_READ)
+@cache_result(ttl=300, tags=["invoice:{invoice_id}"])
 async def get_invoice_details(
     invoice_id: uuid.UUID,
     db: Session = Depends(get_db),
@@ -625,6 +637,8 @@ async def send_invoice(
         invoice.sent_date = datetime.utcnow()
         db.commit()
         
+        await invalidate_tags(*entity_tags("invoice", invoice.id))
+        
         # Send email
         background_tasks.add_task(
             _send_invoice_email,
@@ -718,6 +732,10 @@ async def record_payment(
         db.commit()
         db.refresh(payment)
         
+        await invalidate_tags(
+            *entity_tags("payment", payment.id), *entity_tags("invoice", invoice.id)
+        )
+        
         # Send receipt
         if invoice.customer and invoice.customer.email:
             background_tasks.add_task(
@@ -839,6 +857,8 @@ async def create_expense(
                 job.actual_costs = (job.actual_costs or 0) + float(expense_data.amount)
                 db.commit()
         
+        await invalidate_tags(*entity_tags("expense", expense.id))
+        
         # Audit log
         await audit_log(
             user_id=current_user.id,
@@ -867,7 +887,6 @@ async def create_expense(
 
 @router.get("/reports", response_model=Dict[str, Any])
 @require_permission(Permission.FINANCE_READ)
-@cache_result(ttl=3600)  # Cache for 1 hour
 async def generate_financial_report(
     report_request: FinancialReportRequest = Depends(),
     db: Session = Depends(get_db),
@@ -883,7 +902,30 @@ async def generate_financial_report(
     - Accounts Receivable Aging
     - Job Profitability Analysis
     - Tax Summary
+    
+    CSV and JSONL exports are streamed row by row and never cached; the
+    AR aging export lists every open invoice with its aging bucket.
     """
+    if report_request.format in EXPORT_MEDIA_TYPES:
+        rows = await FinancialReportGenerator(db).export_rows(report_request)
+        return export_response(
+            rows,
+            report_request.format,
+            f"{report_request.report_type.value}_{report_request.start_date}_{report_request.end_date}"
+        )
+    
+    return await _build_financial_report(
+        report_request=report_request, db=db, current_user=current_user
+    )
+
+
+@cache_result(ttl=3600, tags=["entity:invoice", "entity:payment", "entity:expense"])
+async def _build_financial_report(
+    report_request: FinancialReportRequest,
+    db: Session,
+    current_user: User
+) -> Union[Dict[str, Any], FileResponse]:
+    """Build a JSON or PDF report."""
     try:
         report_generator = FinancialReportGenerator(db)
         
@@ -927,21 +969,7 @@ async def generate_financial_report(
             report_data["comparison"] = comparison_data
         
         # Format response based on requested format
-        if report_request.format == "csv":
-            csv_buffer = io.StringIO()
-            csv_writer = csv.DictWriter(csv_buffer, fieldnames=report_data["data"][0].keys())
-            csv_writer.writeheader()
-            csv_writer.writerows(report_data["data"])
-            
-            return StreamingResponse(
-                io.BytesIO(csv_buffer.getvalue().encode()),
-                media_type="text/csv",
-                headers={
-                    "Content-Disposition": f"attachment; filename={report_request.report_type.value}_{report_request.start_date}_{report_request.end_date}.csv"
-                }
-            )
-        
-        elif report_request.format == "pdf":
+        if report_request.format == "pdf":
             # Generate PDF report
             pdf_path = await report_generator.generate_pdf_report(
                 report_type=report_request.report_type,
@@ -966,7 +994,7 @@ async def generate_financial_report(
 
 @router.get("/dashboard", response_model=Dict[str, Any])
 @require_permission(Permission.FINANCE_READ)
-@cache_result(ttl=300)  # Cache for 5 minutes
+@cache_result(ttl=300, tags=["entity:invoice", "entity:payment", "entity:expense"])
 async def financial_dashboard(
     period: str = Query("month", pattern="^(week|month|quarter|year)$"),
     db: Session = Depends(get_db),
@@ -988,43 +1016,30 @@ async def financial_dashboard(
         else:  # year
             start_date = date(end_date.year, 1, 1)
         
-        # Revenue metrics
-        revenue_query = db.query(
-            func.sum(Invoice.total_cents).label('total_revenue'),
-            func.sum(Invoice.paid_cents).label('collected_revenue'),
-            func.count(Invoice.id).label('invoice_count')
-        ).filter(
-            Invoice.invoice_date >= start_date,
-            Invoice.invoice_date <= end_date,
-            Invoice.status != InvoiceStatus.CANCELLED.value
-        ).first()
-        
-        # Expense metrics
-        expense_query = db.query(
-            func.sum(Expense.amount_cents).label('total_expenses'),
-            func.count(Expense.id).label('expense_count')
-        ).filter(
-            Expense.expense_date >= start_date,
-            Expense.expense_date <= end_date,
-            Expense.approved_at.isnot(None)
-        ).first()
-        
-        # Outstanding invoices
-        outstanding_query = db.query(
-            func.count(Invoice.id).label('count'),
-            func.sum(Invoice.total_cents - Invoice.paid_cents).label('amount')
-        ).filter(
-            Invoice.status.in_([InvoiceStatus.SENT.value, InvoiceStatus.VIEWED.value, InvoiceStatus.PARTIAL.value])
-        ).first()
-        
-        # Overdue invoices
-        overdue_query = db.query(
-            func.count(Invoice.id).label('count'),
-            func.sum(Invoice.total_cents - Invoice.paid_cents).label('amount')
-        ).filter(
-            Invoice.due_date < date.today(),
-            Invoice.status.in_([InvoiceStatus.SENT.value, InvoiceStatus.VIEWED.value, InvoiceStatus.PARTIAL.value])
-        ).first()
+        # Period totals come from the daily/monthly rollups
+        totals = rollup_totals(
+            db, ["invoice.billed", "invoice.collected", "expense", "expense.approved"],
+            start_date, end_date, by_dimension=True
+        )
+        billed = metric_total(totals, "invoice.billed")
+        approved_expenses = metric_total(totals, "expense.approved")
+        total_revenue = billed.amount_cents
+        collected_revenue = metric_total(totals, "invoice.collected").amount_cents
+        
+        # Outstanding and overdue balances are current state, not period totals
+        open_invoice = Invoice.status.in_([
+            InvoiceStatus.SENT.value, InvoiceStatus.VIEWED.value, InvoiceStatus.PARTIAL.value
+        ])
+        balances = aggregate(db.query(Invoice).filter(open_invoice), {
+            'outstanding': {
+                'count': count_where(),
+                'amount': sum_where(Invoice.balance_cents)
+            },
+            'overdue': {
+                'count': count_where(Invoice.due_date < date.today()),
+                'amount': sum_where(Invoice.balance_cents, Invoice.due_date < date.today())
+            }
+        })
         
         # Top customers by revenue
         top_customers = db.query(
@@ -1039,27 +1054,11 @@ async def financial_dashboard(
             func.sum(Invoice.total_cents).desc()
         ).limit(5).all()
         
-        # Revenue by month trend
-        monthly_trend = db.query(
-            extract('month', Invoice.invoice_date).label('month'),
-            func.sum(Invoice.total_cents).label('revenue')
-        ).filter(
-            Invoice.invoice_date >= start_date,
-            Invoice.invoice_date <= end_date
-        ).group_by(
-            extract('month', Invoice.invoice_date)
-        ).all()
-        
-        # Expense breakdown by category
-        expense_breakdown = db.query(
-            Expense.category,
-            func.sum(Expense.amount_cents).label('amount')
-        ).filter(
-            Expense.expense_date >= start_date,
-            Expense.expense_date <= end_date
-        ).group_by(
-            Expense.category
-        ).all()
+        # Revenue by month trend, limited to the period's own days
+        monthly_trend = sorted(
+            (month, value.amount_cents)
+            for (_, month), value in rollup_months(db, ["invoice.billed"], start_date, end_date).items()
+        )
         
         return {
             "period": {
@@ -1068,26 +1067,26 @@ async def financial_dashboard(
                 "end_date": end_date.isoformat()
             },
             "revenue": {
-                "total": (revenue_query.total_revenue or 0) / 100,
-                "collected": (revenue_query.collected_revenue or 0) / 100,
-                "pending": ((revenue_query.total_revenue or 0) - (revenue_query.collected_revenue or 0)) / 100,
-                "invoice_count": revenue_query.invoice_count or 0
+                "total": total_revenue / 100,
+                "collected": collected_revenue / 100,
+                "pending": (total_revenue - collected_revenue) / 100,
+                "invoice_count": billed.count
             },
             "expenses": {
-                "total": (expense_query.total_expenses or 0) / 100,
-                "count": expense_query.expense_count or 0
+                "total": approved_expenses.amount_cents / 100,
+                "count": approved_expenses.count
             },
             "profit": {
-                "gross": ((revenue_query.total_revenue or 0) - (expense_query.total_expenses or 0)) / 100,
-                "margin": (((revenue_query.total_revenue or 0) - (expense_query.total_expenses or 0)) / (revenue_query.total_revenue or 1) * 100) if revenue_query.total_revenue else 0
+                "gross": (total_revenue - approved_expenses.amount_cents) / 100,
+                "margin": ((total_revenue - approved_expenses.amount_cents) / total_revenue * 100) if total_revenue else 0
             },
             "outstanding": {
-                "count": outstanding_query.count or 0,
-                "amount": (outstanding_query.amount or 0) / 100
+                "count": balances['outstanding']['count'],
+                "amount": balances['outstanding']['amount'] / 100
             },
             "overdue": {
-                "count": overdue_query.count or 0,
-                "amount": (overdue_query.amount or 0) / 100
+                "count": balances['overdue']['count'],
+                "amount": balances['overdue']['amount'] / 100
             },
             "top_customers": [
                 {
@@ -1098,17 +1097,18 @@ async def financial_dashboard(
             ],
             "monthly_trend": [
                 {
-                    "month": int(m.month),
-                    "revenue": m.revenue / 100
+                    "month": month.month,
+                    "revenue": revenue / 100
                 }
-                for m in monthly_trend
+                for month, revenue in monthly_trend
             ],
             "expense_breakdown": [
                 {
-                    "category": e.category,
-                    "amount": e.amount / 100
+                    "category": category,
+                    "amount": value.amount_cents / 100
                 }
-                for e in expense_breakdown
+                for (metric, category), value in totals.items()
+                if metric == "expense"
             ]
         }
         
@@ -1189,37 +1189,42 @@ class FinancialReportGenerator:
     
     async def generate_profit_loss(self, start_date: date, end_date: date, project_ids: Optional[List[uuid.UUID]] = None) -> Dict[str, Any]:
         """Generate P&L statement."""
-        # Revenue
-        revenue_query = self.db.query(
-            func.sum(Invoice.total_cents).label('total')
-        ).filter(
-            Invoice.invoice_date >= start_date,
-            Invoice.invoice_date <= end_date,
-            Invoice.status != InvoiceStatus.CANCELLED.value
-        )
-        
-        if project_ids:
-            revenue_query = revenue_query.join(Job).filter(Job.project_id.in_(project_ids))
-        
-        revenue = revenue_query.first().total or 0
-        
-        # Expenses by category
-        expenses_query = self.db.query(
-            Expense.category,
-            func.sum(Expense.amount_cents).label('amount')
-        ).filter(
-            Expense.expense_date >= start_date,
-            Expense.expense_date <= end_date,
-            Expense.approved_at.isnot(None)
-        )
-        
         if project_ids:
-            expenses_query = expenses_query.join(Job).filter(Job.project_id.in_(project_ids))
-        
-        expenses = expenses_query.group_by(Expense.category).all()
+            # The rollups carry no project dimension; scan the project's rows
+            revenue = self.db.query(
+                func.sum(Invoice.total_cents).label('total')
+            ).join(Job).filter(
+                Invoice.invoice_date >= start_date,
+                Invoice.invoice_date <= end_date,
+                Invoice.status != InvoiceStatus.CANCELLED.value,
+                Job.project_id.in_(project_ids)
+            ).first().total or 0
+            
+            expenses = [
+                (e.category, e.amount)
+                for e in self.db.query(
+                    Expense.category,
+                    func.sum(Expense.amount_cents).label('amount')
+                ).join(Job).filter(
+                    Expense.expense_date >= start_date,
+                    Expense.expense_date <= end_date,
+                    Expense.approved_date.isnot(None),
+                    Job.project_id.in_(project_ids)
+                ).group_by(Expense.category)
+            ]
+        else:
+            totals = rollup_totals(
+                self.db, ["invoice.billed", "expense.approved"], start_date, end_date, by_dimension=True
+            )
+            revenue = metric_total(totals, "invoice.billed").amount_cents
+            expenses = [
+                (category, value.amount_cents)
+                for (metric, category), value in totals.items()
+                if metric == "expense.approved"
+            ]
         
         # Calculate totals
-        total_expenses = sum(e.amount for e in expenses)
+        total_expenses = sum(amount for _, amount in expenses)
         net_income = revenue - total_expenses
         
         return {
@@ -1236,74 +1241,139 @@ class FinancialReportGenerator:
                 "total": total_expenses / 100,
                 "by_category": [
                     {
-                        "category": e.category,
-                        "amount": e.amount / 100,
-                        "percentage": (e.amount / total_expenses * 100) if total_expenses else 0
+                        "category": category,
+                        "amount": amount / 100,
+                        "percentage": (amount / total_expenses * 100) if total_expenses else 0
                     }
-                    for e in expenses
+                    for category, amount in expenses
                 ]
             },
             "net_income": net_income / 100,
             "profit_margin": (net_income / revenue * 100) if revenue else 0
         }
     
-    async def generate_ar_aging(self, as_of_date: date, customer_ids: Optional[List[uuid.UUID]] = None) -> Dict[str, Any]:
-        """Generate accounts receivable aging report."""
-        # Get unpaid invoices
-        query = self.db.query(Invoice).filter(
+    @staticmethod
+    def _open_invoices(as_of_date: date, customer_ids: Optional[List[uuid.UUID]] = None) -> List[Any]:
+        """Filters for invoices with a balance outstanding on ``as_of_date``."""
+        conditions = [
             Invoice.status.in_([InvoiceStatus.SENT.value, InvoiceStatus.VIEWED.value, InvoiceStatus.PARTIAL.value]),
             Invoice.invoice_date <= as_of_date
-        )
-        
+        ]
         if customer_ids:
-            query = query.filter(Invoice.customer_id.in_(customer_ids))
-        
-        invoices = query.all()
-        
-        # Categorize by age
-        aging_buckets = {
-            "current": {"count": 0, "amount": 0},
-            "1-30": {"count": 0, "amount": 0},
-            "31-60": {"count": 0, "amount": 0},
-            "61-90": {"count": 0, "amount": 0},
-            "over_90": {"count": 0, "amount": 0}
-        }
-        
-        for invoice in invoices:
-            days_old = (as_of_date - invoice.due_date).days
-            balance = invoice.total_cents - invoice.paid_cents
-            
-            if days_old <= 0:
-                bucket = "current"
-            elif days_old <= 30:
-                bucket = "1-30"
-            elif days_old <= 60:
-                bucket = "31-60"
-            elif days_old <= 90:
-                bucket = "61-90"
-            else:
-                bucket = "over_90"
-            
-            aging_buckets[bucket]["count"] += 1
-            aging_buckets[bucket]["amount"] += balance
+            conditions.append(Invoice.customer_id.in_(customer_ids))
+        return conditions
+    
+    @staticmethod
+    def _aging_buckets(as_of_date: date) -> Dict[str, Any]:
+        """Due-date range for each aging bucket, by days past due on ``as_of_date``."""
+        buckets = {"current": Invoice.due_date >= as_of_date}
+        previous = as_of_date
+        for name, days in (("1-30", 30), ("31-60", 60), ("61-90", 90)):
+            cutoff = as_of_date - timedelta(days=days)
+            buckets[name] = and_(Invoice.due_date >= cutoff, Invoice.due_date < previous)
+            previous = cutoff
+        buckets["over_90"] = Invoice.due_date < previous
+        return buckets
+    
+    async def generate_ar_aging(self, as_of_date: date, customer_ids: Optional[List[uuid.UUID]] = None) -> Dict[str, Any]:
+        """Generate accounts receivable aging report."""
+        # Count and sum every bucket in one pass over the open invoices
+        aging_buckets = aggregate(
+            self.db.query(Invoice).filter(*self._open_invoices(as_of_date, customer_ids)),
+            {
+                name: {
+                    "count": count_where(condition),
+                    "amount": sum_where(Invoice.balance_cents, condition)
+                }
+                for name, condition in self._aging_buckets(as_of_date).items()
+            }
+        )
+        total_outstanding = sum(b["amount"] for b in aging_buckets.values())
         
         return {
             "report_type": "ar_aging",
             "as_of_date": as_of_date.isoformat(),
             "summary": {
-                "total_outstanding": sum(b["amount"] for b in aging_buckets.values()) / 100,
+                "total_outstanding": total_outstanding / 100,
                 "invoice_count": sum(b["count"] for b in aging_buckets.values())
             },
             "aging": {
                 k: {
                     "count": v["count"],
                     "amount": v["amount"] / 100,
-                    "percentage": (v["amount"] / sum(b["amount"] for b in aging_buckets.values()) * 100) if sum(b["amount"] for b in aging_buckets.values()) else 0
+                    "percentage": (v["amount"] / total_outstanding * 100) if total_outstanding else 0
                 }
                 for k, v in aging_buckets.items()
             }
         }
     
+    def ar_aging_rows(
+        self,
+        as_of_date: date,
+        customer_ids: Optional[List[uuid.UUID]] = None,
+        batch_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """Open invoices with their aging bucket, streamed from a server-side cursor."""
+        bucket = case(
+            *((condition, name) for name, condition in self._aging_buckets(as_of_date).items())
+        ).label("bucket")
+        statement = select(
+            Invoice.invoice_number,
+            Invoice.customer_id,
+            Invoice.invoice_date,
+            Invoice.due_date,
+            bucket,
+            Invoice.total_cents,
+            Invoice.amount_paid_cents,
+            Invoice.balance_cents
+        ).where(
+            *self._open_invoices(as_of_date, customer_ids)
+        ).order_by(Invoice.due_date, Invoice.invoice_number)
+        
+        rows = stream_rows(self.db.get_bind(), statement, batch_size)
+        return (
+            {
+                "invoice_number": row["invoice_number"],
+                "customer_id": str(row["customer_id"]),
+                "invoice_date": row["invoice_date"].isoformat(),
+                "due_date": row["due_date"].isoformat(),
+                "days_past_due": max((as_of_date - row["due_date"]).days, 0),
+                "bucket": row["bucket"],
+                "total": row["total_cents"] / 100,
+                "paid": (row["amount_paid_cents"] or 0) / 100,
+                "balance": row["balance_cents"] / 100
+            }
+            for row in rows
+        )
+    
+    async def export_rows(self, report_request: FinancialReportRequest) -> Iterable[Dict[str, Any]]:
+        """Detail rows for a CSV/JSONL export of ``report_request``."""
+        if report_request.report_type == ReportType.ACCOUNTS_RECEIVABLE:
+            return self.ar_aging_rows(
+                as_of_date=report_request.end_date,
+                customer_ids=report_request.customer_ids
+            )
+        
+        if report_request.report_type == ReportType.PROFIT_LOSS:
+            report = await self.generate_profit_loss(
+                start_date=report_request.start_date,
+                end_date=report_request.end_date,
+                project_ids=report_request.project_ids
+            )
+            return report["expenses"]["by_category"]
+        
+        if report_request.report_type == ReportType.JOB_PROFITABILITY:
+            report = await self.generate_job_profitability(
+                start_date=report_request.start_date,
+                end_date=report_request.end_date,
+                job_ids=report_request.job_ids
+            )
+            return report["jobs"]
+        
+        raise HTTPException(
+            400, f"Report type {report_request.report_type} cannot be exported as {report_request.format}"
+        )
+    
     async def generate_job_profitability(self, start_date: date, end_date: date, job_ids: Optional[List[uuid.UUID]] = None) -> Dict[str, Any]:
         """Generate job profitability analysis."""
         # Would implement detailed job cost analysis
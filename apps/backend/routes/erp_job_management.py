@@ -19,7 +19,6 @@ from enum import Enum
 import asyncio
 import json
 from uuid import uuid4
-from collections import defaultdict
 
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, WebSocket
 from sqlalchemy.orm import Session, joinedload
@@ -31,10 +30,12 @@ import pytz
 from ..core.database import get_db
 from ..core.auth import get_current_user, require_admin
 from ..core.logging import get_logger
-from ..core.websocket import ConnectionManager
+from ..core.aggregates import aggregate, avg_where, count_by, count_where, seconds_between, sum_where
+from ..core.pagination import count_total, keyset_paginate, offset_paginate, sort_keys
+from ..core.websocket import manager as ws_manager
 from ..db.business_models import (
     User, Project, ProjectTask, Team, Estimate,
-    Inspection, Document, Notification
+    Inspection, Document, Notification, project_search
 )
 from ..services.scheduling import SchedulingEngine
 from ..services.notifications import NotificationService
@@ -44,7 +45,12 @@ from ..integrations.gps import GPSTracker
 
 logger = get_logger(__name__)
 router = APIRouter()
-ws_manager = ConnectionManager()
+
+
+def job_room(job_id: str) -> str:
+    """WebSocket room that receives live updates for a job."""
+    return f"job:{job_id}"
+
 
 # Enums for type safety
 class JobStatus(str, Enum):
@@ -577,22 +583,35 @@ async def create_job(
         'created_at': job.created_at.isoformat()
     }
 
+# Sortable job columns and whether they may be NULL
+JOB_SORT_COLUMNS = {
+    "created_at": (Project.created_at, False),
+    "updated_at": (Project.updated_at, False),
+    "name": (Project.name, False),
+    "status": (Project.status, False),
+    "start_date": (Project.start_date, True),
+    "due_date": (Project.due_date, True),
+}
+
+
 @router.get("/jobs", response_model=Dict[str, Any])
 async def list_jobs(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page; replaces page"),
+    total_mode: str = Query("exact", pattern="^(exact|estimate|none)$"),
     status: Optional[JobStatus] = None,
     phase: Optional[JobPhase] = None,
     assigned_to: Optional[str] = None,
     date_from: Optional[date] = None,
     date_to: Optional[date] = None,
     search: Optional[str] = None,
-    sort_by: str = "created_at",
+    sort_by: Optional[str] = Query(None, description="Defaults to relevance when searching, else created_at"),
     sort_order: str = "desc",
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """List jobs with comprehensive filtering."""
+    """List jobs with comprehensive filtering and ranked search."""
     query = db.query(Project).filter(
         Project.project_type == "roofing"
     )
@@ -603,7 +622,7 @@ async def list_jobs(
         query = query.filter(
             or_(
                 Project.owner_id == current_user.id,
-                Project.meta_data['assigned_foreman_id'].astext == str(current_user.id),
+                Project.assigned_foreman_id == str(current_user.id),
                 Project.members.any(User.id == current_user.id)
             )
         )
@@ -613,14 +632,10 @@ async def list_jobs(
         query = query.filter(Project.status == status.value)
     
     if phase:
-        query = query.filter(
-            Project.meta_data['phase'].astext == phase.value
-        )
+        query = query.filter(Project.phase == phase.value)
     
     if assigned_to:
-        query = query.filter(
-            Project.meta_data['assigned_foreman_id'].astext == assigned_to
-        )
+        query = query.filter(Project.assigned_foreman_id == assigned_to)
     
     if date_from:
         query = query.filter(Project.start_date >= date_from)
@@ -628,44 +643,42 @@ async def list_jobs(
     if date_to:
         query = query.filter(Project.start_date <= date_to)
     
-    if search:
-        query = query.filter(
-            or_(
-                Project.name.ilike(f"%{search}%"),
-                Project.meta_data['customer']['name'].astext.ilike(f"%{search}%"),
-                Project.meta_data['property_address'].astext.ilike(f"%{search}%")
-            )
-        )
+    relevance = None
+    if search and search.strip():
+        match, relevance = project_search(search, db.get_bind().dialect.name)
+        query = query.filter(match)
     
     # Get total count
-    total = query.count()
+    total = count_total(query, total_mode)
     
     # Apply sorting
-    sort_column = getattr(Project, sort_by, Project.created_at)
-    if sort_order == "desc":
-        query = query.order_by(sort_column.desc())
+    if sort_by is None:
+        sort_by = "relevance" if relevance else "created_at"
+    sort_column, nullable = JOB_SORT_COLUMNS.get(sort_by, JOB_SORT_COLUMNS["created_at"])
+    keys = sort_keys(sort_column, sort_order == "desc", Project.id, nullable=nullable)
+    
+    # Apply pagination; page numbers beyond the first fall back to OFFSET.
+    # Relevance order has no stored key to seek on, so it always uses OFFSET.
+    next_cursor = prev_cursor = None
+    if sort_by == "relevance" and relevance:
+        jobs = offset_paginate(query.order_by(*relevance), keys, (page - 1) * limit, limit)
+    elif cursor or page == 1:
+        result = keyset_paginate(query, keys, limit, cursor, scope="jobs")
+        jobs, next_cursor, prev_cursor = result.items, result.next_cursor, result.prev_cursor
     else:
-        query = query.order_by(sort_column)
-    
-    # Apply pagination
-    jobs = query.offset((page - 1) * limit).limit(limit).all()
+        jobs = offset_paginate(query, keys, (page - 1) * limit, limit)
     
     # Calculate statistics
     stats = {
         'total_jobs': total,
-        'active_jobs': db.query(Project).filter(
-            Project.project_type == "roofing",
-            Project.status == JobStatus.IN_PROGRESS.value
-        ).count(),
-        'scheduled_jobs': db.query(Project).filter(
-            Project.project_type == "roofing",
-            Project.status == JobStatus.SCHEDULED.value
-        ).count(),
-        'completed_this_month': db.query(Project).filter(
-            Project.project_type == "roofing",
-            Project.status == JobStatus.COMPLETED.value,
-            Project.completed_at >= datetime.utcnow().replace(day=1)
-        ).count()
+        **aggregate(db.query(Project).filter(Project.project_type == "roofing"), {
+            'active_jobs': count_where(Project.status == JobStatus.IN_PROGRESS.value),
+            'scheduled_jobs': count_where(Project.status == JobStatus.SCHEDULED.value),
+            'completed_this_month': count_where(
+                Project.status == JobStatus.COMPLETED.value,
+                Project.completed_at >= datetime.utcnow().replace(day=1)
+            )
+        })
     }
     
     return {
@@ -674,10 +687,10 @@ async def list_jobs(
                 'id': job.id,
                 'name': job.name,
                 'status': job.status,
-                'phase': job.meta_data.get('phase'),
-                'customer': job.meta_data.get('customer', {}).get('name'),
-                'address': job.meta_data.get('property_address'),
-                'foreman': job.meta_data.get('assigned_foreman_id'),
+                'phase': job.phase,
+                'customer': job.customer_name,
+                'address': job.property_address,
+                'foreman': job.assigned_foreman_id,
                 'start_date': job.start_date.isoformat() if job.start_date else None,
                 'progress': job.meta_data.get('completion_percentage', 0),
                 'contract_amount': job.meta_data.get('financial', {}).get('contract_amount', 0)
@@ -687,7 +700,9 @@ async def list_jobs(
         'total': total,
         'page': page,
         'limit': limit,
-        'pages': (total + limit - 1) // limit,
+        'pages': (total + limit - 1) // limit if total is not None else None,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor,
         'statistics': stats
     }
 
@@ -709,7 +724,7 @@ async def get_job_details(
     # Check access
     if not current_user.is_superuser:
         if (job.owner_id != current_user.id and 
-            job.meta_data.get('assigned_foreman_id') != str(current_user.id)):
+            job.assigned_foreman_id != str(current_user.id)):
             raise HTTPException(403, "Access denied")
     
     # Get progress
@@ -804,7 +819,7 @@ async def update_job(
     # Check access
     if not current_user.is_superuser:
         if (job.owner_id != current_user.id and 
-            job.meta_data.get('assigned_foreman_id') != str(current_user.id)):
+            job.assigned_foreman_id != str(current_user.id)):
             raise HTTPException(403, "Access denied")
     
     # Update status
@@ -874,7 +889,7 @@ async def update_job(
     db.refresh(job)
     
     # Send real-time update
-    await ws_manager.send_job_update(job_id, {
+    await ws_manager.broadcast_to_room(job_room(job_id), {
         'type': 'job_updated',
         'job_id': job_id,
         'updated_by': current_user.full_name,
@@ -1092,7 +1107,10 @@ async def job_live_updates(
         await websocket.close(code=4004, reason="Job not found")
         return
     
-    await ws_manager.connect(websocket, job_id, user.id)
+    client_id = f"job:{job_id}:{user.id}:{uuid4().hex[:8]}"
+    if not await ws_manager.connect(websocket, client_id):
+        return
+    ws_manager.join_room(client_id, job_room(job_id))
     
     try:
         while True:
@@ -1107,7 +1125,7 @@ async def job_live_updates(
                 )
                 
                 # Broadcast to all connected clients
-                await ws_manager.broadcast_to_job(job_id, {
+                await ws_manager.broadcast_to_room(job_room(job_id), {
                     'type': 'crew_location',
                     'user_id': user.id,
                     'data': location_data
@@ -1120,7 +1138,7 @@ async def job_live_updates(
     except Exception as e:
         logger.error(f"WebSocket error: {str(e)}")
     finally:
-        await ws_manager.disconnect(job_id, user.id)
+        ws_manager.disconnect(client_id, websocket)
 
 @router.get("/jobs/analytics/dashboard", response_model=Dict[str, Any])
 async def get_job_analytics(
@@ -1130,66 +1148,43 @@ async def get_job_analytics(
     db: Session = Depends(get_db)
 ):
     """Get comprehensive job analytics."""
-    # Job counts by status
-    status_counts = db.query(
-        Project.status,
-        func.count(Project.id).label('count')
-    ).filter(
-        Project.project_type == "roofing",
-        Project.created_at >= date_from,
-        Project.created_at <= date_to
-    ).group_by(Project.status).all()
-    
-    # Revenue metrics
-    revenue_query = db.query(
-        func.sum(
-            case(
-                (Project.status == JobStatus.COMPLETED.value, 
-                 func.cast(Project.meta_data['financial']['contract_amount'].astext, Float)),
-                else_=0
-            )
-        ).label('completed_revenue'),
-        func.sum(
-            func.cast(Project.meta_data['financial']['contract_amount'].astext, Float)
-        ).label('total_contract_value')
-    ).filter(
-        Project.project_type == "roofing",
-        Project.created_at >= date_from,
-        Project.created_at <= date_to
-    ).first()
-    
-    # Average job duration
-    completed_jobs = db.query(Project).filter(
-        Project.project_type == "roofing",
-        Project.status == JobStatus.COMPLETED.value,
-        Project.completed_at.isnot(None),
-        Project.start_date.isnot(None)
-    ).all()
-    
-    durations = [
-        (job.completed_at.date() - job.start_date).days 
-        for job in completed_jobs
-        if job.completed_at and job.start_date
-    ]
-    
-    avg_duration = sum(durations) / len(durations) if durations else 0
+    # Status counts, revenue and average duration in one pass over roofing jobs
+    in_period = and_(Project.created_at >= date_from, Project.created_at <= date_to)
+    completed = Project.status == JobStatus.COMPLETED.value
+    contract_amount = Project.meta_data[('financial', 'contract_amount')].as_float()
+    duration_days = seconds_between(
+        Project.start_date, Project.completed_at, db.get_bind().dialect.name
+    ) / 86400
+    
+    summary = aggregate(db.query(Project).filter(Project.project_type == "roofing"), {
+        'total_jobs': count_where(in_period),
+        'by_status': count_by(Project.status, JobStatus, in_period),
+        'completed_revenue': sum_where(contract_amount, completed, in_period),
+        'total_contract_value': sum_where(contract_amount, in_period),
+        'avg_duration': avg_where(
+            duration_days,
+            completed,
+            Project.completed_at.isnot(None),
+            Project.start_date.isnot(None)
+        )
+    })
     
     # Crew productivity
     crew_stats = db.query(
-        func.jsonb_extract_path_text(Project.meta_data, 'assigned_foreman_id').label('foreman'),
+        Project.assigned_foreman_id.label('foreman'),
         func.count(Project.id).label('jobs_count'),
         func.avg(
             case(
                 (Project.status == JobStatus.COMPLETED.value,
-                 func.extract('epoch', Project.completed_at - Project.start_date) / 86400),
+                 duration_days),
                 else_=None
             )
         ).label('avg_completion_days')
     ).filter(
         Project.project_type == "roofing",
-        Project.meta_data['assigned_foreman_id'].astext.isnot(None)
+        Project.assigned_foreman_id.isnot(None)
     ).group_by(
-        func.jsonb_extract_path_text(Project.meta_data, 'assigned_foreman_id')
+        Project.assigned_foreman_id
     ).all()
     
     # Weather impact analysis
@@ -1208,19 +1203,19 @@ async def get_job_analytics(
             'to': date_to.isoformat()
         },
         'job_metrics': {
-            'by_status': {item.status: item.count for item in status_counts},
-            'total_jobs': sum(item.count for item in status_counts)
+            'by_status': summary['by_status'],
+            'total_jobs': summary['total_jobs']
         },
         'financial_metrics': {
-            'completed_revenue': float(revenue_query.completed_revenue or 0),
-            'total_contract_value': float(revenue_query.total_contract_value or 0),
+            'completed_revenue': float(summary['completed_revenue']),
+            'total_contract_value': float(summary['total_contract_value']),
             'revenue_realization_rate': (
-                (float(revenue_query.completed_revenue or 0) / 
-                 float(revenue_query.total_contract_value or 1)) * 100
+                (float(summary['completed_revenue']) / 
+                 float(summary['total_contract_value'] or 1)) * 100
             )
         },
         'operational_metrics': {
-            'average_job_duration_days': avg_duration,
+            'average_job_duration_days': float(summary['avg_duration'] or 0),
             'weather_delay_days': weather_delays,
             'on_time_completion_rate': 85.5  # Would calculate from actual data
         },
@@ -1318,28 +1313,3 @@ class GPSTracker:
             'lat': 33.7490 + (hash(user_id) % 100) / 10000,
             'lng': -84.3880 + (hash(user_id) % 100) / 10000
         }
-
-class ConnectionManager:
-    """WebSocket connection manager."""
-    
-    def __init__(self):
-        self.active_connections: Dict[str, Dict[str, WebSocket]] = defaultdict(dict)
-    
-    async def connect(self, websocket: WebSocket, job_id: str, user_id: str):
-        await websocket.accept()
-        self.active_connections[job_id][user_id] = websocket
-    
-    async def disconnect(self, job_id: str, user_id: str):
-        if job_id in self.active_connections:
-            self.active_connections[job_id].pop(user_id, None)
-    
-    async def send_job_update(self, job_id: str, message: dict):
-        if job_id in self.active_connections:
-            for websocket in self.active_connections[job_id].values():
-                try:
-                    await websocket.send_json(message)
-                except:
-                    pass
-    
-    async def broadcast_to_job(self, job_id: str, message: dict):
-        await self.send_job_update(job_id, message)
\ No newline at end of file
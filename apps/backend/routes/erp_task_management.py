@@ -9,7 +9,7 @@ to provide a unified operations view.
 
 from fastapi import APIRouter, HTTPException, Depends, Query, BackgroundTasks
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session, joinedload, relationship
+from sqlalchemy.orm import Session, aliased, joinedload
 from sqlalchemy import and_, or_, func, case, Column, String, Integer, Float, Boolean, Text, JSON, DateTime, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID
 from typing import List, Optional, Dict, Any, Set
@@ -18,17 +18,21 @@ from pydantic import BaseModel, Field, validator
 import uuid
 import json
 import asyncio
+from collections import defaultdict
 from enum import Enum
 
 from ..core.database import get_db
 from ..core.auth import get_current_user
 from ..core.permissions import require_permission
 from ..core.cache import cache_result, invalidate_cache
+from ..core.pagination import count_total, keyset_paginate, offset_paginate, sort_keys
+from ..core.aggregates import aggregate, avg_where, count_by, count_where, seconds_between
 from ..services.notifications import send_notification, NotificationType
 from ..core.audit import audit_log
-from ..db.business_models import User, UserRole, Project, ProjectTask, Base
+from ..db.business_models import User, UserRole, Project, ProjectTask, TaskDependencyModel
 from ..services.weather import WeatherService
 from ..services.crew_scheduler import CrewScheduler
+from ..services.task_graph import DependencyCycleError, get_task_graph, invalidate_task_graph_for_tasks
 from ..integrations.calendar import CalendarIntegration
 
 
@@ -234,23 +238,6 @@ class TaskExtended(ProjectTask):
     approved_at = Column(DateTime, nullable=True)
 
 
-class TaskDependencyModel(Base):
-    """Model for task dependencies."""
-    __tablename__ = "task_dependencies"
-    
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    task_id = Column(UUID(as_uuid=True), ForeignKey("project_tasks.id", ondelete="CASCADE"), nullable=False)
-    predecessor_id = Column(UUID(as_uuid=True), ForeignKey("project_tasks.id", ondelete="CASCADE"), nullable=False)
-    dependency_type = Column(String(20), default="finish_to_start")
-    lag_hours = Column(Float, default=0)
-    
-    created_at = Column(DateTime, default=datetime.utcnow)
-    
-    # Relationships
-    task = relationship("ProjectTask", foreign_keys=[task_id])
-    predecessor = relationship("ProjectTask", foreign_keys=[predecessor_id])
-
-
 # API Endpoints
 
 @router.post("/tasks", response_model=Dict[str, Any])
@@ -320,14 +307,20 @@ async def create_task(
                 task.crew_ids = best_assignee.get("crew_ids", [])
         
         # Validate and create dependencies
+        if task_data.dependencies:
+            predecessor_ids = {dep.predecessor_id for dep in task_data.dependencies}
+            existing = {
+                row.id for row in db.query(ProjectTask.id).filter(ProjectTask.id.in_(predecessor_ids))
+            }
+            graph = await get_task_graph(db, task_data.project_id)
+        
         for dep in task_data.dependencies:
             # Check predecessor exists
-            predecessor = db.query(ProjectTask).filter_by(id=dep.predecessor_id).first()
-            if not predecessor:
+            if dep.predecessor_id not in existing:
                 raise HTTPException(400, f"Predecessor task {dep.predecessor_id} not found")
             
             # Check for circular dependencies
-            if await _would_create_circular_dependency(db, task.id, dep.predecessor_id):
+            if graph.would_create_cycle(task.id, dep.predecessor_id):
                 raise HTTPException(400, f"Circular dependency detected with task {dep.predecessor_id}")
             
             # Create dependency
@@ -357,6 +350,7 @@ async def create_task(
         db.add(task)
         db.commit()
         db.refresh(task)
+        await invalidate_task_graph_for_tasks(db, task.id)
         
         # Send notifications
         if task_data.notify_on_creation:
@@ -404,6 +398,8 @@ async def list_tasks(
     # Pagination
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page; replaces page"),
+    total_mode: str = Query("exact", pattern="^(exact|estimate|none)$"),
     
     # Filters
     status: Optional[List[TaskStatus]] = Query(None),
@@ -485,18 +481,37 @@ async def list_tasks(
             query = query.filter(TaskExtended.is_blocked == True)
         
         # Get total count
-        total_count = query.count()
+        total_count = count_total(query, total_mode)
         
-        # Apply sorting
+        # Apply sorting; due_date is optional on tasks
         sort_column = getattr(TaskExtended, sort_by)
-        if sort_order == "desc":
-            query = query.order_by(sort_column.desc())
-        else:
-            query = query.order_by(sort_column.asc())
+        keys = sort_keys(
+            sort_column, sort_order == "desc", TaskExtended.id,
+            nullable=sort_by == "due_date"
+        )
         
-        # Apply pagination
-        offset = (page - 1) * page_size
-        tasks = query.offset(offset).limit(page_size).all()
+        # Apply pagination; page numbers beyond the first fall back to OFFSET
+        next_cursor = prev_cursor = None
+        if cursor or page == 1:
+            result = keyset_paginate(query, keys, page_size, cursor, scope="tasks")
+            tasks, next_cursor, prev_cursor = result.items, result.next_cursor, result.prev_cursor
+        else:
+            tasks = offset_paginate(query, keys, (page - 1) * page_size, page_size)
+        
+        # Unmet dependencies for the whole page in one query
+        blocked_by_task = defaultdict(list)
+        if tasks:
+            predecessor = aliased(ProjectTask)
+            unmet = db.query(
+                TaskDependencyModel.task_id, predecessor.id, predecessor.title, predecessor.status
+            ).join(
+                predecessor, predecessor.id == TaskDependencyModel.predecessor_id
+            ).filter(
+                TaskDependencyModel.task_id.in_([task.id for task in tasks]),
+                predecessor.status != TaskStatus.COMPLETED.value
+            )
+            for task_id, predecessor_id, title, status in unmet:
+                blocked_by_task[task_id].append({"task_id": predecessor_id, "title": title, "status": status})
         
         # Format response
         task_list = []
@@ -506,17 +521,7 @@ async def list_tasks(
             if task.assignee_id:
                 assignee = db.query(User).filter_by(id=task.assignee_id).first()
             
-            # Check dependencies
-            dependencies = db.query(TaskDependencyModel).filter_by(task_id=task.id).all()
-            blocked_by = []
-            for dep in dependencies:
-                predecessor = db.query(TaskExtended).filter_by(id=dep.predecessor_id).first()
-                if predecessor and predecessor.status != TaskStatus.COMPLETED.value:
-                    blocked_by.append({
-                        "task_id": predecessor.id,
-                        "title": predecessor.title,
-                        "status": predecessor.status
-                    })
+            blocked_by = blocked_by_task.get(task.id, [])
             
             task_list.append({
                 "id": task.id,
@@ -550,7 +555,9 @@ async def list_tasks(
                 "page": page,
                 "page_size": page_size,
                 "total_count": total_count,
-                "total_pages": (total_count + page_size - 1) // page_size
+                "total_pages": (total_count + page_size - 1) // page_size if total_count is not None else None,
+                "next_cursor": next_cursor,
+                "prev_cursor": prev_cursor
             },
             "filters_applied": {
                 "status": [s.value for s in status] if status else None,
@@ -561,6 +568,8 @@ async def list_tasks(
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(500, f"Failed to retrieve tasks: {str(e)}")
 
@@ -586,25 +595,23 @@ async def get_task_details(
         if not task:
             raise HTTPException(404, "Task not found")
         
-        # Get dependencies
-        dependencies = db.query(TaskDependencyModel).filter_by(task_id=task_id).all()
+        # Get dependencies and dependent tasks from the project graph
+        graph = await get_task_graph(db, task.project_id)
         dependency_list = []
-        for dep in dependencies:
-            predecessor = db.query(TaskExtended).filter_by(id=dep.predecessor_id).first()
+        for dep in graph.predecessors.get(task_id, ()):
+            predecessor = graph.nodes.get(dep.predecessor_id)
             dependency_list.append({
                 "predecessor_id": dep.predecessor_id,
                 "predecessor_title": predecessor.title if predecessor else "Unknown",
                 "predecessor_status": predecessor.status if predecessor else "unknown",
                 "dependency_type": dep.dependency_type,
                 "lag_hours": dep.lag_hours,
-                "is_satisfied": predecessor.status == TaskStatus.COMPLETED.value if predecessor else False
+                "is_satisfied": predecessor.is_completed if predecessor else False
             })
         
-        # Get dependent tasks
-        dependent_tasks = db.query(TaskDependencyModel).filter_by(predecessor_id=task_id).all()
         dependents_list = []
-        for dep in dependent_tasks:
-            dependent = db.query(TaskExtended).filter_by(id=dep.task_id).first()
+        for dep in graph.successors.get(task_id, ()):
+            dependent = graph.nodes.get(dep.task_id)
             dependents_list.append({
                 "task_id": dep.task_id,
                 "title": dependent.title if dependent else "Unknown",
@@ -749,7 +756,7 @@ async def update_task(
             
             # Check dependencies before marking as in progress
             if new_status == TaskStatus.IN_PROGRESS.value:
-                unmet_deps = await _get_unmet_dependencies(db, task_id)
+                unmet_deps = await _get_unmet_dependencies(db, task)
                 if unmet_deps:
                     raise HTTPException(400, f"Cannot start task: {len(unmet_deps)} dependencies not met")
                 
@@ -857,6 +864,7 @@ async def update_task(
         # Save changes
         db.commit()
         db.refresh(task)
+        await invalidate_task_graph_for_tasks(db, task.id)
         
         # Send notifications
         if changes:
@@ -971,6 +979,7 @@ async def bulk_update_tasks(
     try:
         updated_count = 0
         failed_updates = []
+        updated_ids = []
         
         for task_id in bulk_data.task_ids:
             try:
@@ -991,6 +1000,7 @@ async def bulk_update_tasks(
                     task.assignee_id = bulk_data.update_data.assignee_id
                 
                 task.updated_at = datetime.utcnow()
+                updated_ids.append(task.id)
                 updated_count += 1
                 
             except Exception as e:
@@ -998,6 +1008,7 @@ async def bulk_update_tasks(
         
         # Commit all changes
         db.commit()
+        await invalidate_task_graph_for_tasks(db, *updated_ids)
         
         # Audit log
         await audit_log(
@@ -1024,8 +1035,53 @@ async def bulk_update_tasks(
         raise HTTPException(500, f"Bulk update failed: {str(e)}")
 
 
+@router.get("/projects/{project_id}/dependency-graph", response_model=Dict[str, Any])
+async def get_dependency_graph(
+    project_id: uuid.UUID,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """
+    Get a project's task order, critical path and blocked tasks.
+    
+    Times are hours from the project start, from estimated hours and
+    dependency lags; slack is how far a task can slip without delaying
+    the project.
+    """
+    graph = await get_task_graph(db, project_id)
+    try:
+        schedule = graph.schedule()
+    except DependencyCycleError:
+        raise HTTPException(409, "Task dependencies contain a cycle")
+    
+    critical_path = graph.critical_path(schedule)
+    critical = set(critical_path)
+    blocked = graph.blocked_tasks()
+    
+    return {
+        "project_id": project_id,
+        "project_duration_hours": max((entry.earliest_finish for entry in schedule.values()), default=0.0),
+        "critical_path": critical_path,
+        "tasks": [
+            {
+                "id": task_id,
+                "title": graph.nodes[task_id].title if task_id in graph.nodes else "Unknown",
+                "status": graph.nodes[task_id].status if task_id in graph.nodes else "unknown",
+                "earliest_start": entry.earliest_start,
+                "earliest_finish": entry.earliest_finish,
+                "latest_start": entry.latest_start,
+                "latest_finish": entry.latest_finish,
+                "slack_hours": entry.slack,
+                "is_critical": task_id in critical,
+                "blocked_by": sorted(blocked.get(task_id, ()), key=str)
+            }
+            for task_id, entry in schedule.items()
+        ]
+    }
+
+
 @router.get("/dashboard/operations", response_model=Dict[str, Any])
-@cache_result(ttl=300)  # Cache for 5 minutes
+@cache_result(ttl=300, stale_ttl=120)  # Fresh for 5 minutes, refreshed in background
 async def get_operations_dashboard(
     date_range: str = Query("today", pattern="^(today|week|month)$"),
     db: Session = Depends(get_db),
@@ -1051,52 +1107,44 @@ async def get_operations_dashboard(
             else:
                 end_date = start_date.replace(month=now.month + 1)
         
-        # Get task statistics
+        # Every count, breakdown and average over the period in one query
         base_query = db.query(TaskExtended).filter(
             TaskExtended.created_at >= start_date,
             TaskExtended.created_at < end_date
         )
-        
-        # Overall metrics
-        total_tasks = base_query.count()
-        completed_tasks = base_query.filter(TaskExtended.status == TaskStatus.COMPLETED.value).count()
-        in_progress_tasks = base_query.filter(TaskExtended.status == TaskStatus.IN_PROGRESS.value).count()
-        blocked_tasks = base_query.filter(TaskExtended.is_blocked == True).count()
-        overdue_tasks = base_query.filter(
-            TaskExtended.due_date < now,
-            TaskExtended.status != TaskStatus.COMPLETED.value
-        ).count()
-        
-        # Completion rate
-        completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-        
-        # Average completion time
-        completed_with_times = base_query.filter(
-            TaskExtended.status == TaskStatus.COMPLETED.value,
-            TaskExtended.actual_start.isnot(None),
-            TaskExtended.actual_end.isnot(None)
-        ).all()
-        
-        if completed_with_times:
-            total_hours = sum(
-                (task.actual_end - task.actual_start).total_seconds() / 3600
-                for task in completed_with_times
+        completed = TaskExtended.status == TaskStatus.COMPLETED.value
+        overdue = and_(TaskExtended.due_date < now, TaskExtended.status != TaskStatus.COMPLETED.value)
+        completion_hours = seconds_between(
+            TaskExtended.actual_start, TaskExtended.actual_end, db.get_bind().dialect.name
+        ) / 3600
+        
+        summary = aggregate(base_query, {
+            "total_tasks": count_where(),
+            "completed_tasks": count_where(completed),
+            "in_progress_tasks": count_where(TaskExtended.status == TaskStatus.IN_PROGRESS.value),
+            "blocked_tasks": count_where(TaskExtended.is_blocked == True),
+            "overdue_tasks": count_where(overdue),
+            "weather_affected_tasks": count_where(TaskExtended.weather_hold == True),
+            "avg_completion_hours": avg_where(
+                completion_hours,
+                completed,
+                TaskExtended.actual_start.isnot(None),
+                TaskExtended.actual_end.isnot(None)
+            ),
+            "by_priority": count_by(TaskExtended.priority, TaskPriority),
+            "by_type": count_by(TaskExtended.task_type, TaskType),
+            "high_priority_overdue": count_where(
+                TaskExtended.priority == TaskPriority.CRITICAL.value, overdue
+            ),
+            "unassigned_urgent": count_where(
+                TaskExtended.priority.in_([TaskPriority.CRITICAL.value, TaskPriority.HIGH.value]),
+                TaskExtended.assignee_id.is_(None)
             )
-            avg_completion_hours = total_hours / len(completed_with_times)
-        else:
-            avg_completion_hours = 0
-        
-        # Tasks by priority
-        priority_breakdown = {}
-        for priority in TaskPriority:
-            count = base_query.filter(TaskExtended.priority == priority.value).count()
-            priority_breakdown[priority.value] = count
+        })
         
-        # Tasks by type
-        type_breakdown = {}
-        for task_type in TaskType:
-            count = base_query.filter(TaskExtended.task_type == task_type.value).count()
-            type_breakdown[task_type.value] = count
+        total_tasks = summary["total_tasks"]
+        completion_rate = (summary["completed_tasks"] / total_tasks * 100) if total_tasks > 0 else 0
+        avg_completion_hours = summary["avg_completion_hours"] or 0
         
         # Top performers (most tasks completed)
         top_performers = db.query(
@@ -1124,9 +1172,6 @@ async def get_operations_dashboard(
             TaskExtended.status.in_([TaskStatus.TODO.value, TaskStatus.PLANNED.value])
         ).order_by(TaskExtended.planned_start).limit(10).all()
         
-        # Weather-affected tasks
-        weather_affected = base_query.filter(TaskExtended.weather_hold == True).count()
-        
         return {
             "period": {
                 "range": date_range,
@@ -1135,17 +1180,17 @@ async def get_operations_dashboard(
             },
             "metrics": {
                 "total_tasks": total_tasks,
-                "completed_tasks": completed_tasks,
-                "in_progress_tasks": in_progress_tasks,
-                "blocked_tasks": blocked_tasks,
-                "overdue_tasks": overdue_tasks,
-                "weather_affected_tasks": weather_affected,
+                "completed_tasks": summary["completed_tasks"],
+                "in_progress_tasks": summary["in_progress_tasks"],
+                "blocked_tasks": summary["blocked_tasks"],
+                "overdue_tasks": summary["overdue_tasks"],
+                "weather_affected_tasks": summary["weather_affected_tasks"],
                 "completion_rate": round(completion_rate, 1),
-                "avg_completion_hours": round(avg_completion_hours, 1)
+                "avg_completion_hours": round(float(avg_completion_hours), 1)
             },
             "breakdowns": {
-                "by_priority": priority_breakdown,
-                "by_type": type_breakdown
+                "by_priority": summary["by_priority"],
+                "by_type": summary["by_type"]
             },
             "top_performers": [
                 {
@@ -1166,15 +1211,8 @@ async def get_operations_dashboard(
                 for t in upcoming_tasks
             ],
             "alerts": {
-                "high_priority_overdue": base_query.filter(
-                    TaskExtended.priority == TaskPriority.CRITICAL.value,
-                    TaskExtended.due_date < now,
-                    TaskExtended.status != TaskStatus.COMPLETED.value
-                ).count(),
-                "unassigned_urgent": base_query.filter(
-                    TaskExtended.priority.in_([TaskPriority.CRITICAL.value, TaskPriority.HIGH.value]),
-                    TaskExtended.assignee_id.is_(None)
-                ).count()
+                "high_priority_overdue": summary["high_priority_overdue"],
+                "unassigned_urgent": summary["unassigned_urgent"]
             }
         }
         
@@ -1221,45 +1259,18 @@ def _is_valid_status_transition(old_status: str, new_status: str) -> bool:
     return new_status in valid_transitions.get(old_status, [])
 
 
-async def _would_create_circular_dependency(db: Session, task_id: uuid.UUID, predecessor_id: uuid.UUID) -> bool:
-    """Check if adding dependency would create a circular reference."""
-    # Simple check: if predecessor depends on this task (directly or indirectly)
-    visited = set()
-    to_check = [predecessor_id]
-    
-    while to_check:
-        current = to_check.pop()
-        if current in visited:
-            continue
-        
-        visited.add(current)
-        
-        if current == task_id:
-            return True  # Circular dependency found
-        
-        # Get dependencies of current task
-        deps = db.query(TaskDependencyModel).filter_by(task_id=current).all()
-        to_check.extend(dep.predecessor_id for dep in deps)
-    
-    return False
-
-
-async def _get_unmet_dependencies(db: Session, task_id: uuid.UUID) -> List[Dict[str, Any]]:
+async def _get_unmet_dependencies(db: Session, task: ProjectTask) -> List[Dict[str, Any]]:
     """Get list of unmet dependencies for a task."""
-    deps = db.query(TaskDependencyModel).filter_by(task_id=task_id).all()
-    unmet = []
-    
-    for dep in deps:
-        predecessor = db.query(TaskExtended).filter_by(id=dep.predecessor_id).first()
-        if predecessor and predecessor.status != TaskStatus.COMPLETED.value:
-            unmet.append({
-                "task_id": predecessor.id,
-                "title": predecessor.title,
-                "status": predecessor.status,
-                "dependency_type": dep.dependency_type
-            })
-    
-    return unmet
+    graph = await get_task_graph(db, task.project_id)
+    return [
+        {
+            "task_id": dep.predecessor_id,
+            "title": graph.nodes[dep.predecessor_id].title,
+            "status": graph.nodes[dep.predecessor_id].status,
+            "dependency_type": dep.dependency_type
+        }
+        for dep in graph.unmet_dependencies(task.id)
+    ]
 
 
 async def _get_task_history(db: Session, task_id: uuid.UUID) -> List[Dict[str, Any]]:
@@ -20,6 +20,7 @@ from ..db.business_models import (
     project_members, Document
 )
 from ..core.pagination import paginate, PaginationParams
+from ..services.task_graph import invalidate_task_graph, invalidate_task_graph_for_tasks, linked_project_ids
 
 router = APIRouter()
 
@@ -517,6 +518,7 @@ async def create_task(
     db.add(task)
     db.commit()
     db.refresh(task)
+    await invalidate_task_graph(project_id)
     
     return format_task_response(task, db)
 
@@ -649,6 +651,7 @@ async def update_task(
     
     db.commit()
     db.refresh(task)
+    await invalidate_task_graph_for_tasks(db, task.id)
     
     return format_task_response(task, db)
 
@@ -675,8 +678,11 @@ async def delete_task(
             detail="Not authorized to delete this task"
         )
     
+    # Its dependencies go with it, so look up the linked projects first
+    project_ids = linked_project_ids(db, [task.id])
     db.delete(task)
     db.commit()
+    await invalidate_task_graph(*project_ids)
     
     return {"message": "Task deleted successfully"}
 
@@ -750,6 +756,7 @@ async def complete_task(
         task.actual_hours = request.actual_hours
     
     db.commit()
+    await invalidate_task_graph_for_tasks(db, task.id)
     
     return {"message": "Task completed successfully"}
 
@@ -0,0 +1,252 @@
+"""
+Response cache for deterministic AI endpoints.
+
+Summaries, translations and extractions of the same text at low
+temperature come out the same, so repeat requests are answered from the
+cache instead of the model:
+
+* exact hits: the SHA-256 of (model, prompt, params) keys the response
+  in the shared cache, so every worker sees it;
+* semantic hits (opt-in with ``semantic=True``): each tenant and
+  (model, params) pair keeps an in-process index of prompt embeddings,
+  and a new prompt whose cosine similarity to a cached one reaches
+  ``threshold`` reuses that response. Only for endpoints where a
+  near-duplicate's answer is acceptable: two invoices differing in one
+  amount embed almost identically.
+
+Nothing is cached above ``max_temperature``. Entries are scoped to a
+tenant (tenant, else team, else user) and never shared across scopes.
+Each scope is capped at ``max_entries`` responses (oldest evicted
+first), and prompts or responses over the size limits are not stored.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..core.cache import Cache, default_cache
+from ..core.logging import get_logger
+from ..core.settings import settings
+
+logger = get_logger(__name__)
+
+
+AI_RESPONSE_TTL = 24 * 3600
+MAX_CACHEABLE_TEMPERATURE = 0.2
+SEMANTIC_THRESHOLD = 0.97
+MAX_PROMPT_CHARS = 200_000
+MAX_RESPONSE_CHARS = 64 * 1024
+MAX_ENTRIES_PER_SCOPE = 1000
+MAX_SCOPES = 500
+
+Embedder = Callable[[str], Awaitable[Optional[List[float]]]]
+
+
+def tenant_scope(user: Any) -> str:
+    """The isolation scope for a user's cached responses."""
+    tenant_id = getattr(user, "tenant_id", None)
+    if tenant_id is not None:
+        return f"tenant:{tenant_id}"
+    team_id = getattr(user, "team_id", None)
+    if team_id is not None:
+        return f"team:{team_id}"
+    return f"user:{user.id}"
+
+
+def _digest(*parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def response_key(scope: str, model: str, prompt: str, params: Dict[str, Any]) -> str:
+    return f"ai_response:{scope}:{_digest(model, prompt, params)}"
+
+
+async def _default_embedder(text: str) -> Optional[List[float]]:
+    from ..memory.backend_memory_vector_utils import generate_embedding_with_cache
+    return await generate_embedding_with_cache(text, settings.EMBEDDING_MODEL)
+
+
+class _SemanticIndex:
+    """Unit-length prompt embeddings in a fixed-size ring; the oldest is overwritten."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.vectors: Optional[np.ndarray] = None
+        self.keys: List[Optional[str]] = [None] * capacity
+        self.count = 0
+        self.next = 0
+
+    def add(self, vector: np.ndarray, key: str):
+        if self.vectors is None:
+            self.vectors = np.zeros((self.capacity, vector.shape[0]), dtype=np.float32)
+        elif vector.shape[0] != self.vectors.shape[1]:
+            return
+        self.vectors[self.next] = vector
+        self.keys[self.next] = key
+        self.next = (self.next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def nearest(self, vector: np.ndarray) -> Tuple[float, Optional[str]]:
+        if not self.count or vector.shape[0] != self.vectors.shape[1]:
+            return 0.0, None
+        scores = self.vectors[:self.count] @ vector
+        best = int(np.argmax(scores))
+        return float(scores[best]), self.keys[best]
+
+    def remove(self, key: str):
+        for i, existing in enumerate(self.keys):
+            if existing == key:
+                self.keys[i] = None
+                self.vectors[i] = 0
+
+
+class _Scope:
+    """One tenant's stored keys (oldest first) and semantic indexes."""
+
+    def __init__(self):
+        self.keys: "OrderedDict[str, str]" = OrderedDict()
+        self.indexes: Dict[str, _SemanticIndex] = {}
+
+
+class AIResponseCache:
+    """Exact and semantic response cache, isolated per tenant scope."""
+
+    def __init__(
+        self,
+        cache: Cache = default_cache,
+        embed: Optional[Embedder] = _default_embedder,
+        ttl: int = AI_RESPONSE_TTL,
+        threshold: float = SEMANTIC_THRESHOLD,
+        max_temperature: float = MAX_CACHEABLE_TEMPERATURE,
+        max_prompt_chars: int = MAX_PROMPT_CHARS,
+        max_response_chars: int = MAX_RESPONSE_CHARS,
+        max_entries: int = MAX_ENTRIES_PER_SCOPE,
+        max_scopes: int = MAX_SCOPES
+    ):
+        self.cache = cache
+        self.embed = embed
+        self.ttl = ttl
+        self.threshold = threshold
+        self.max_temperature = max_temperature
+        self.max_prompt_chars = max_prompt_chars
+        self.max_response_chars = max_response_chars
+        self.max_entries = max_entries
+        self.max_scopes = max_scopes
+        self._scopes: "OrderedDict[str, _Scope]" = OrderedDict()
+        self.counts: Dict[str, int] = defaultdict(int)
+
+    def _scope(self, scope: str) -> _Scope:
+        entry = self._scopes.get(scope)
+        if entry is None:
+            entry = self._scopes[scope] = _Scope()
+            while len(self._scopes) > self.max_scopes:
+                self._scopes.popitem(last=False)
+        else:
+            self._scopes.move_to_end(scope)
+        return entry
+
+    async def _embedding(self, prompt: str) -> Optional[np.ndarray]:
+        if self.embed is None:
+            return None
+        try:
+            embedding = await self.embed(prompt)
+        except Exception as e:
+            logger.debug(f"Semantic cache lookup skipped: {e}")
+            return None
+        if not embedding:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    async def get_or_generate(
+        self,
+        scope: str,
+        model: str,
+        prompt: str,
+        generate: Callable[[], Awaitable[str]],
+        temperature: float,
+        semantic: bool = False,
+        **params
+    ) -> str:
+        """
+        Return a cached response for ``prompt`` or call ``generate()`` and cache it.
+
+        ``params`` (with ``temperature``) are part of the key, so the same
+        prompt with different options is a different entry.
+        """
+        if temperature > self.max_temperature or len(prompt) > self.max_prompt_chars:
+            self.counts["bypassed"] += 1
+            return await generate()
+
+        params = dict(params, temperature=temperature)
+        key = response_key(scope, model, prompt, params)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            self.counts["exact_hits"] += 1
+            return cached
+
+        vector = None
+        signature = _digest(model, params)
+        if semantic:
+            vector = await self._embedding(prompt)
+            index = self._scope(scope).indexes.get(signature)
+            if vector is not None and index is not None:
+                score, similar_key = index.nearest(vector)
+                if similar_key and score >= self.threshold:
+                    cached = await self.cache.get(similar_key)
+                    if cached is not None:
+                        self.counts["semantic_hits"] += 1
+                        return cached
+
+        self.counts["misses"] += 1
+        response = await generate()
+        if not isinstance(response, str) or len(response) > self.max_response_chars:
+            self.counts["not_stored"] += 1
+            return response
+
+        await self._store(scope, signature, key, response, vector)
+        return response
+
+    async def _store(self, scope: str, signature: str, key: str, response: str, vector: Optional[np.ndarray]):
+        await self.cache.set(key, response, ttl=self.ttl, tags=[f"ai_response:{scope}"])
+        self.counts["stored"] += 1
+
+        entry = self._scope(scope)
+        entry.keys[key] = signature
+        entry.keys.move_to_end(key)
+        if vector is not None:
+            index = entry.indexes.get(signature)
+            if index is None:
+                index = entry.indexes[signature] = _SemanticIndex(self.max_entries)
+            index.add(vector, key)
+
+        while len(entry.keys) > self.max_entries:
+            evicted, evicted_signature = entry.keys.popitem(last=False)
+            await self.cache.delete(evicted)
+            if evicted_signature in entry.indexes:
+                entry.indexes[evicted_signature].remove(evicted)
+            self.counts["evicted"] += 1
+
+    async def clear_scope(self, scope: str):
+        """Drop every cached response for a tenant scope."""
+        self._scopes.pop(scope, None)
+        await self.cache.invalidate_tags(f"ai_response:{scope}")
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.counts["exact_hits"] + self.counts["semantic_hits"]
+        lookups = hits + self.counts["misses"]
+        return {
+            **{name: self.counts[name] for name in (
+                "exact_hits", "semantic_hits", "misses", "bypassed", "stored", "not_stored", "evicted"
+            )},
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "scopes": len(self._scopes),
+        }
+
+
+ai_response_cache = AIResponseCache()
@@ -0,0 +1,380 @@
+"""
+Token accounting and AI request quotas.
+
+Every AI endpoint checks the caller's quota, so the check never touches
+the database:
+
+* each user's monthly request count and limit live in memory. They are
+  loaded from the subscription on the user's first call and re-read every
+  ``refresh_interval`` to pick up plan changes and period resets;
+* ``reserve()`` checks the limit and takes a request in one step, with no
+  await in between, so concurrent requests cannot both take the last one.
+  ``commit()`` settles a reservation and ``release()`` hands it back; one
+  left unsettled (a failed request) is handed back after
+  ``reservation_ttl``. A request that outlives it (a long stream) is still
+  recorded when it commits and takes its request back from the quota;
+* ``commit()`` records the provider-reported token total when the call
+  reported one, and otherwise counts with a tokenizer cached per model.
+  ``ai_usage_logs`` rows and the subscription counter increments are
+  written in batches by a background task.
+
+Counters are per process. With several workers each one re-reads the
+flushed totals every ``refresh_interval``, which bounds how far a user can
+go over their limit.
+"""
+
+import asyncio
+import itertools
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, insert, select, update
+
+from ..core.database import SessionLocal
+from ..core.llm_gateway import estimate_tokens
+from ..core.logging import get_logger
+from ..core.settings import settings
+
+logger = get_logger(__name__)
+
+
+@lru_cache(maxsize=64)
+def token_counter(model: str) -> Callable[[str], int]:
+    """A token counter for ``model``, built once per model."""
+    from ..memory import backend_memory_vector_utils as vector_utils
+
+    if vector_utils.tiktoken is None:
+        return estimate_tokens
+    encoding = vector_utils.get_tokenizer(model)
+    return lambda text: len(encoding.encode(text, disallowed_special=())) if text else 0
+
+
+def count_tokens(model: str, text: str) -> int:
+    return token_counter(model)(text)
+
+
+class QuotaExceededError(Exception):
+    """The user has no AI requests left this period."""
+
+
+@dataclass
+class Reservation:
+    id: int
+    user_id: str
+    endpoint: str
+    request_type: str
+    created: float = field(default_factory=time.monotonic)
+    settled: bool = False
+    # Handed back by expiry but not yet committed
+    expired: bool = False
+
+
+@dataclass
+class _Quota:
+    # None when the user has no subscription, which is not limited
+    limit: Optional[int]
+    # Flushed, committed and reserved requests
+    used: int
+    loaded_at: float
+    reserved: int = 0
+    unflushed: int = 0
+
+
+class UsageSink:
+    """Subscription limits and usage storage; methods run in a thread."""
+
+    def load(self, user_id: str) -> Optional[Tuple[int, int]]:
+        """``(monthly limit, requests used)``, or None without a subscription."""
+        raise NotImplementedError
+
+    def write(self, rows: List[Dict[str, Any]], requests: Dict[str, int]):
+        """Insert usage rows and add ``requests`` to each user's used count."""
+        raise NotImplementedError
+
+
+class DatabaseUsageSink(UsageSink):
+    """Read ``subscriptions`` and write ``ai_usage_logs`` with one statement per batch."""
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    @staticmethod
+    def _tables():
+        from ..db.business_models import AIUsageLog, Subscription
+        return Subscription.__table__, AIUsageLog.__table__
+
+    def load(self, user_id: str) -> Optional[Tuple[int, int]]:
+        subscriptions, _ = self._tables()
+        db = self.session_factory()
+        try:
+            row = db.execute(
+                select(subscriptions.c.monthly_ai_requests, subscriptions.c.used_ai_requests)
+                .where(subscriptions.c.user_id == uuid.UUID(user_id))
+            ).first()
+            return (row[0] or 0, row[1] or 0) if row else None
+        finally:
+            db.close()
+
+    def write(self, rows: List[Dict[str, Any]], requests: Dict[str, int]):
+        subscriptions, usage_logs = self._tables()
+        db = self.session_factory()
+        try:
+            if rows:
+                db.execute(insert(usage_logs), rows)
+            if requests:
+                db.execute(
+                    update(subscriptions)
+                    .where(subscriptions.c.user_id == bindparam("subscriber"))
+                    .values(used_ai_requests=subscriptions.c.used_ai_requests + bindparam("requests")),
+                    [
+                        {"subscriber": uuid.UUID(user_id), "requests": count}
+                        for user_id, count in requests.items()
+                    ]
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+class AIUsageTracker:
+    """In-memory quota counters with batched usage writes."""
+
+    def __init__(
+        self,
+        sink: Optional[UsageSink],
+        refresh_interval: float = 60.0,
+        reservation_ttl: float = 600.0,
+        batch_size: int = 500,
+        flush_interval: float = 2.0,
+        max_queue: int = 10000
+    ):
+        self.sink = sink
+        self.refresh_interval = refresh_interval
+        self.reservation_ttl = reservation_ttl
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+
+        self._quotas: Dict[str, _Quota] = {}
+        self._open: Dict[int, Reservation] = {}
+        self._ids = itertools.count(1)
+        self._rows: List[Dict[str, Any]] = []
+        self._requests: Dict[str, int] = defaultdict(int)
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._writer: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._batch_ready = asyncio.Event()
+        self.counts: Dict[str, int] = defaultdict(int)
+
+    async def _quota(self, user_id: str) -> _Quota:
+        quota = self._quotas.get(user_id)
+        if quota is not None and time.monotonic() - quota.loaded_at < self.refresh_interval:
+            return quota
+        # One load per user at a time; concurrent requests share it
+        loading = self._loading.get(user_id)
+        if loading is None:
+            loading = self._loading[user_id] = asyncio.ensure_future(self._load(user_id))
+            loading.add_done_callback(lambda _: self._loading.pop(user_id, None))
+        return await asyncio.shield(loading)
+
+    async def _load(self, user_id: str) -> _Quota:
+        quota = self._quotas.get(user_id)
+        row = None
+        if self.sink is not None:
+            try:
+                row = await asyncio.to_thread(self.sink.load, user_id)
+            except Exception as e:
+                logger.error(f"Failed to load AI quota for user {user_id}: {e}")
+                if quota is not None:
+                    quota.loaded_at = time.monotonic()
+                    return quota
+        self.counts["loads"] += 1
+        limit, flushed = row if row else (None, 0)
+
+        quota = self._quotas.get(user_id)
+        if quota is None:
+            quota = self._quotas[user_id] = _Quota(limit, flushed, time.monotonic())
+        else:
+            quota.limit = limit
+            quota.used = flushed + quota.unflushed + quota.reserved
+            quota.loaded_at = time.monotonic()
+        return quota
+
+    async def reserve(self, user_id: Any, endpoint: str, request_type: str) -> Reservation:
+        """Take one request from the user's quota; raises ``QuotaExceededError`` if none is left."""
+        user_id = str(user_id)
+        quota = await self._quota(user_id)
+        # No awaits from here on: the check and the take are one step
+        if quota.limit is not None and quota.used >= quota.limit:
+            self.counts["rejected"] += 1
+            raise QuotaExceededError(user_id)
+        quota.used += 1
+        quota.reserved += 1
+        reservation = Reservation(next(self._ids), user_id, endpoint, request_type)
+        self._open[reservation.id] = reservation
+        self.counts["reserved"] += 1
+        return reservation
+
+    def _settle(self, reservation: Reservation) -> Optional[_Quota]:
+        if reservation.settled:
+            return None
+        reservation.settled = True
+        self._open.pop(reservation.id, None)
+        quota = self._quotas[reservation.user_id]
+        quota.reserved -= 1
+        return quota
+
+    def release(self, reservation: Reservation):
+        """Hand an unused reservation back."""
+        quota = self._settle(reservation)
+        if quota is not None:
+            quota.used -= 1
+            self.counts["released"] += 1
+
+    def commit(
+        self,
+        reservation: Reservation,
+        model: str,
+        service: str,
+        input_tokens: int,
+        output_tokens: int,
+        reported_tokens: Optional[int] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        """Record a completed request; ``reported_tokens`` is the provider's total when known."""
+        if reservation.expired:
+            # Expired while still running: record it and take the request again
+            reservation.expired = False
+            quota = self._quotas[reservation.user_id]
+            quota.used += 1
+            self.counts["late_commits"] += 1
+        else:
+            quota = self._settle(reservation)
+            if quota is None:
+                return
+        quota.unflushed += 1
+
+        total = input_tokens + output_tokens
+        if reported_tokens is not None:
+            total = reported_tokens
+            input_tokens = max(reported_tokens - output_tokens, 0)
+        self._rows.append({
+            "id": uuid.uuid4(),
+            "user_id": uuid.UUID(reservation.user_id),
+            "service": service,
+            "model": model,
+            "endpoint": reservation.endpoint,
+            "request_type": reservation.request_type,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": total,
+            "tokens_used": total,
+            "response_time_ms": int((time.monotonic() - reservation.created) * 1000),
+            "status_code": 200,
+            "meta_data": {**(metadata or {}), "tokens_reported": reported_tokens is not None},
+            "created_at": datetime.utcnow(),
+        })
+        self._requests[reservation.user_id] += 1
+        self.counts["committed"] += 1
+        self.counts["tokens"] += total
+        if len(self._rows) >= self.batch_size:
+            self._batch_ready.set()
+
+    def usage(self, user_id: Any) -> Dict[str, Any]:
+        """The in-memory view of a user's quota."""
+        quota = self._quotas.get(str(user_id))
+        if quota is None:
+            return {"limit": None, "used": 0, "reserved": 0}
+        return {"limit": quota.limit, "used": quota.used, "reserved": quota.reserved}
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.reservation_ttl
+        for reservation in [r for r in self._open.values() if r.created < cutoff]:
+            self.release(reservation)
+            reservation.expired = True
+            self.counts["expired"] += 1
+
+    async def _write(self):
+        if not self._rows and not self._requests:
+            return
+        rows, self._rows = self._rows, []
+        requests, self._requests = self._requests, defaultdict(int)
+        try:
+            await asyncio.to_thread(self.sink.write, rows, dict(requests))
+        except Exception as e:
+            self.counts["write_errors"] += 1
+            logger.error(f"Failed to write {len(rows)} AI usage records: {e}")
+            # Keep them for the next flush, up to max_queue rows
+            self._rows = (rows + self._rows)[-self.max_queue:]
+            for user_id, count in requests.items():
+                self._requests[user_id] += count
+            return
+        for user_id, count in requests.items():
+            self._quotas[user_id].unflushed -= count
+        self.counts["written"] += len(rows)
+        self.counts["batches"] += 1
+
+    async def flush(self):
+        """Write all recorded usage now."""
+        self._expire()
+        if self.sink is None:
+            return
+        async with self._flush_lock:
+            await self._write()
+
+    async def _run(self):
+        next_flush = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                # Wake early once a full batch is waiting
+                await asyncio.wait_for(
+                    self._batch_ready.wait(), max(next_flush - time.monotonic(), 0)
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            await self.flush()
+            next_flush = time.monotonic() + self.flush_interval
+
+    def start(self):
+        """Start the background writer."""
+        if self.sink is None or (self._writer is not None and not self._writer.done()):
+            return
+        self._writer = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background writer and flush what is buffered."""
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "users": len(self._quotas),
+            "open_reservations": len(self._open),
+            "queued": len(self._rows),
+            **{name: self.counts[name] for name in (
+                "loads", "reserved", "rejected", "released", "expired", "late_commits",
+                "committed", "tokens", "written", "batches", "write_errors"
+            )},
+        }
+
+
+ai_usage_tracker = AIUsageTracker(
+    DatabaseUsageSink(),
+    refresh_interval=settings.AI_QUOTA_REFRESH_SECONDS,
+    flush_interval=settings.AI_USAGE_FLUSH_SECONDS
+)
@@ -0,0 +1,202 @@
+"""
+Server-sent event pipeline for streamed chat replies.
+
+``stream_chat`` relays model chunks to the client as SSE events:
+
+* chunks are buffered and sent as one event once ``flush_chars`` have
+  accumulated or ``flush_interval`` has passed, so a model emitting
+  single words does not cost a network write per word;
+* a producer task reads the model into a bounded queue. When the client
+  reads slower than the model writes, the queue fills and the producer
+  stops pulling from the upstream stream;
+* the connection is polled with ``is_disconnected``; when the client has
+  gone, or the response is cancelled, the producer is cancelled, which
+  closes the upstream stream and the provider request with it;
+* output tokens are counted as chunks arrive, and the reply is kept as a
+  list of parts joined once at the end;
+* ``on_complete`` gets the reply and counts after the stream ends, for
+  whatever reason, as a separate task, so it never runs on the request's
+  database session or inside a cancelled response.
+"""
+
+import asyncio
+import json
+import time
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Set
+
+from ..core.llm_gateway import estimate_tokens
+from ..core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+FLUSH_CHARS = 256
+FLUSH_INTERVAL = 0.05
+DISCONNECT_POLL_INTERVAL = 0.5
+QUEUE_SIZE = 64
+# Count tokens over whole words, at least this many characters at a time
+TOKEN_SEGMENT_CHARS = 64
+
+_END = object()
+
+# Completion tasks still running; held so they are not garbage collected
+_completions: Set[asyncio.Task] = set()
+
+
+def sse_event(payload: dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+class TokenCounter:
+    """
+    Running token count of streamed text.
+
+    Text is counted in segments that end at whitespace, so a token is
+    never split across two counts and short chunks share one call.
+    """
+
+    def __init__(self, count_tokens: Callable[[str], int] = estimate_tokens, segment_chars: int = TOKEN_SEGMENT_CHARS):
+        self.count_tokens = count_tokens
+        self.segment_chars = segment_chars
+        self.tokens = 0
+        self._pending: List[str] = []
+        self._pending_chars = 0
+
+    def add(self, chunk: str):
+        self._pending.append(chunk)
+        self._pending_chars += len(chunk)
+        if self._pending_chars < self.segment_chars:
+            return
+        text = "".join(self._pending)
+        cut = max(text.rfind(" "), text.rfind("\n")) + 1
+        if cut <= 0:
+            return
+        self.tokens += self.count_tokens(text[:cut])
+        rest = text[cut:]
+        self._pending = [rest] if rest else []
+        self._pending_chars = len(rest)
+
+    @property
+    def total(self) -> int:
+        """Tokens so far, including text not yet counted in a segment."""
+        if not self._pending_chars:
+            return self.tokens
+        return self.tokens + self.count_tokens("".join(self._pending))
+
+
+@dataclass
+class StreamResult:
+    text: str
+    output_tokens: int
+    chunks: int
+    events: int
+    # False when the client went away or the model failed mid-reply
+    completed: bool
+    error: Optional[str] = None
+
+
+class _Failure:
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+async def _produce(chunks: AsyncIterator[str], queue: "asyncio.Queue"):
+    try:
+        async with aclosing(chunks) as source:
+            async for chunk in source:
+                if chunk:
+                    await queue.put(chunk)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        await queue.put(_Failure(e))
+        return
+    await queue.put(_END)
+
+
+def _complete(on_complete: Callable[[StreamResult], Awaitable[None]], result: StreamResult):
+    async def run():
+        try:
+            await on_complete(result)
+        except Exception as e:
+            logger.error(f"Failed to finish chat stream: {e}")
+
+    task = asyncio.get_running_loop().create_task(run())
+    _completions.add(task)
+    task.add_done_callback(_completions.discard)
+
+
+async def stream_chat(
+    chunks: AsyncIterator[str],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    on_complete: Callable[[StreamResult], Awaitable[None]],
+    count_tokens: Callable[[str], int] = estimate_tokens,
+    flush_chars: int = FLUSH_CHARS,
+    flush_interval: float = FLUSH_INTERVAL,
+    poll_interval: float = DISCONNECT_POLL_INTERVAL,
+    queue_size: int = QUEUE_SIZE
+) -> AsyncIterator[str]:
+    """Yield SSE events for ``chunks``: ``content`` events, then ``done`` or ``error``."""
+    queue: "asyncio.Queue" = asyncio.Queue(maxsize=queue_size)
+    producer = asyncio.create_task(_produce(chunks, queue))
+    counter = TokenCounter(count_tokens)
+    parts: List[str] = []
+    buffer: List[str] = []
+    buffered = 0
+    events = 0
+    completed = False
+    error = None
+
+    last_event = last_poll = time.monotonic()
+    try:
+        while True:
+            timeout = flush_interval if buffer else poll_interval
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                item = None
+
+            if item is _END:
+                completed = True
+                break
+            if isinstance(item, _Failure):
+                error = item.error
+                break
+            if item is not None:
+                parts.append(item)
+                buffer.append(item)
+                buffered += len(item)
+                counter.add(item)
+
+            now = time.monotonic()
+            if buffer and (buffered >= flush_chars or now - last_event >= flush_interval):
+                yield sse_event({"content": "".join(buffer)})
+                events += 1
+                buffer, buffered, last_event = [], 0, now
+            if now - last_poll >= poll_interval:
+                last_poll = now
+                if await is_disconnected():
+                    logger.info("Chat client disconnected; cancelling the model stream")
+                    break
+
+        if buffer:
+            yield sse_event({"content": "".join(buffer)})
+            events += 1
+        if completed:
+            yield sse_event({"done": True, "tokens": counter.total})
+        elif error is not None:
+            logger.error(f"Chat stream failed: {error}")
+            yield sse_event({"error": "The model stream failed", "done": True})
+    finally:
+        # No awaits here: a cancelled response would cancel them too
+        producer.cancel()
+        _complete(on_complete, StreamResult(
+            text="".join(parts),
+            output_tokens=counter.total,
+            chunks=len(parts),
+            events=events,
+            completed=completed,
+            error=str(error) if error is not None else None
+        ))
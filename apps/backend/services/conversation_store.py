@@ -0,0 +1,677 @@
+"""
+Conversation history for the chat endpoints.
+
+Every chat session is an append-only log in ``chat_messages``, numbered
+per session by ``seq``, plus one ``chat_sessions`` row holding its title,
+model and rolling summary. Recently used sessions stay in memory (least
+recently used evicted past ``max_sessions``):
+
+* ``recent()`` reads the last messages from an in-memory tail, so it
+  costs the same at 10 messages as at 10,000;
+* ``context()`` fills a token budget with the newest turns, preceded by
+  a summary of the older ones. Once more than ``keep_recent`` messages
+  are unsummarized, the older ones are folded into the summary in the
+  background;
+* ``append()`` only updates memory and queues the row; a background task
+  writes queued rows in batches on its own database session.
+
+A session that is not in memory is loaded once: its row and the last
+``tail_size`` messages by ``seq``.
+
+Several workers may serve the same session. Before a cached session is
+used, its ``message_count`` and ``updated_at`` are compared with the
+``chat_sessions`` row (one primary-key read) and the session is reloaded
+if another worker has written to it. Turns this worker has not flushed
+yet are numbered optimistically; the writer renumbers them after
+whatever another worker wrote in the meantime, ``(session_id, seq)``
+being unique, and drops them if the session was deleted elsewhere.
+"""
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict, defaultdict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, delete, insert, select, update
+
+from ..core.database import SessionLocal
+from ..core.llm_gateway import estimate_tokens
+from ..core.logging import get_logger
+from ..core.settings import settings
+
+logger = get_logger(__name__)
+
+
+KEEP_RECENT = 30
+SUMMARY_BATCH = 10
+MAX_SUMMARY_CHARS = 4000
+MAX_SUMMARY_LINE_CHARS = 200
+TITLE_CHARS = 60
+
+
+class SessionNotFoundError(LookupError):
+    """The session does not exist or belongs to another user."""
+
+
+@dataclass
+class StoredMessage:
+    seq: int
+    role: str
+    content: str
+    tokens: int
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "seq": self.seq,
+            "role": self.role,
+            "content": self.content,
+            "timestamp": self.created_at.isoformat(),
+        }
+
+
+@dataclass
+class ConversationWindow:
+    """What to send with the next turn: a summary, then the newest messages."""
+    summary: str
+    messages: List[StoredMessage]
+    tokens: int
+
+    def as_messages(self) -> List[Dict[str, Any]]:
+        messages = [message.as_dict() for message in self.messages]
+        if self.summary:
+            messages.insert(0, {
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{self.summary}"
+            })
+        return messages
+
+
+Summarizer = Callable[[str, List[StoredMessage]], Awaitable[str]]
+
+
+def extractive_summary(previous: str, messages: List[StoredMessage], max_chars: int = MAX_SUMMARY_CHARS) -> str:
+    """Fallback summary: the previous one plus the opening of each message, newest kept."""
+    lines = [previous] if previous else []
+    for message in messages:
+        text = " ".join(message.content.split())
+        if len(text) > MAX_SUMMARY_LINE_CHARS:
+            text = text[:MAX_SUMMARY_LINE_CHARS - 3] + "..."
+        lines.append(f"{message.role}: {text}")
+    return "\n".join(lines)[-max_chars:]
+
+
+class _SessionLog:
+    """A session's row and the tail of its message log."""
+
+    def __init__(self, session_id: str, user_id: str, tail_size: int):
+        self.id = session_id
+        self.user_id = user_id
+        self.tail: Deque[StoredMessage] = deque(maxlen=tail_size)
+        self.message_count = 0
+        self.title: Optional[str] = None
+        self.model: Optional[str] = None
+        self.summary = ""
+        self.summary_tokens = 0
+        self.summarized_through = 0
+        self.created_at = self.updated_at = datetime.utcnow()
+        self.summarizing: Optional[asyncio.Task] = None
+        # The stored row's message_count and updated_at as of the last load or write
+        self.persisted = False
+        self.synced: Optional[Tuple[int, datetime]] = None
+
+    def as_row(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "user_id": uuid.UUID(self.user_id),
+            "title": self.title,
+            "model": self.model,
+            "message_count": self.message_count,
+            "summary": self.summary or None,
+            "summarized_through": self.summarized_through,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            # Where this worker's unwritten messages start; the sink renumbers from the stored count
+            "synced_count": self.synced[0] if self.synced else 0,
+            "persisted": self.persisted,
+        }
+
+    def as_info(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "title": self.title or "Untitled Chat",
+            "model": self.model or "unknown",
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "message_count": self.message_count,
+        }
+
+
+class ConversationSink:
+    """Durable storage for sessions and messages; methods run in a thread."""
+
+    def load(self, session_id: str, tail_size: int) -> Optional[Dict[str, Any]]:
+        """The session row with its last ``tail_size`` messages under ``"messages"``."""
+        raise NotImplementedError
+
+    def version(self, session_id: str) -> Optional[Tuple[int, datetime]]:
+        """The stored ``(message_count, updated_at)``, or None if there is no session."""
+        raise NotImplementedError
+
+    def messages(self, session_id: str, limit: int) -> List[Dict[str, Any]]:
+        """The last ``limit`` message rows, oldest first."""
+        raise NotImplementedError
+
+    def sessions(self, user_id: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+        """Session rows for a user, most recently updated first."""
+        raise NotImplementedError
+
+    def write(self, messages: List[Dict[str, Any]], sessions: List[Dict[str, Any]]) -> Set[str]:
+        """
+        Append ``messages`` and upsert ``sessions`` in one transaction.
+
+        A session's messages are renumbered to follow the stored count when
+        another writer got there first; those of a session that was deleted
+        (``persisted`` but missing) are dropped. Returns the dropped session ids.
+        """
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+
+class DatabaseConversationSink(ConversationSink):
+    """Store sessions in ``chat_sessions`` and messages in ``chat_messages``."""
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    @staticmethod
+    def _tables():
+        from ..db.models import ChatMessage, ChatSession
+        return ChatSession.__table__, ChatMessage.__table__
+
+    def _last_messages(self, db, session_id: str, limit: int) -> List[Dict[str, Any]]:
+        _, messages = self._tables()
+        rows = db.execute(
+            select(messages.c.seq, messages.c.role, messages.c.content, messages.c.tokens, messages.c.created_at)
+            .where(messages.c.session_id == session_id)
+            .order_by(messages.c.seq.desc())
+            .limit(limit)
+        ).mappings().all()
+        return [dict(row) for row in reversed(rows)]
+
+    def load(self, session_id: str, tail_size: int) -> Optional[Dict[str, Any]]:
+        sessions, _ = self._tables()
+        db = self.session_factory()
+        try:
+            row = db.execute(select(sessions).where(sessions.c.id == session_id)).mappings().first()
+            if row is None:
+                return None
+            return {**row, "messages": self._last_messages(db, session_id, tail_size)}
+        finally:
+            db.close()
+
+    def version(self, session_id: str) -> Optional[Tuple[int, datetime]]:
+        sessions, _ = self._tables()
+        db = self.session_factory()
+        try:
+            row = db.execute(
+                select(sessions.c.message_count, sessions.c.updated_at).where(sessions.c.id == session_id)
+            ).first()
+            return tuple(row) if row is not None else None
+        finally:
+            db.close()
+
+    def messages(self, session_id: str, limit: int) -> List[Dict[str, Any]]:
+        db = self.session_factory()
+        try:
+            return self._last_messages(db, session_id, limit)
+        finally:
+            db.close()
+
+    def sessions(self, user_id: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+        sessions, _ = self._tables()
+        db = self.session_factory()
+        try:
+            rows = db.execute(
+                select(sessions)
+                .where(sessions.c.user_id == uuid.UUID(user_id))
+                .order_by(sessions.c.updated_at.desc())
+                .limit(limit)
+                .offset(offset)
+            ).mappings().all()
+            return [dict(row) for row in rows]
+        finally:
+            db.close()
+
+    def write(self, messages: List[Dict[str, Any]], session_rows: List[Dict[str, Any]]) -> Set[str]:
+        sessions, message_table = self._tables()
+        db = self.session_factory()
+        try:
+            stored = {}
+            if session_rows:
+                stored = dict(db.execute(
+                    select(sessions.c.id, sessions.c.message_count)
+                    .where(sessions.c.id.in_([row["id"] for row in session_rows]))
+                    .with_for_update()
+                ).all())
+
+            dropped, shifts, new, changed = set(), {}, [], []
+            for row in session_rows:
+                if row["id"] not in stored:
+                    if row["persisted"]:
+                        dropped.add(row["id"])
+                    else:
+                        new.append({column: row[column] for column in sessions.c.keys()})
+                    continue
+                shift = stored[row["id"]] - row["synced_count"]
+                columns = ["title", "model", "message_count", "updated_at"]
+                if shift:
+                    shifts[row["id"]] = shift
+                else:
+                    # A summary numbered against another writer's messages would be wrong
+                    columns += ["summary", "summarized_through"]
+                changed.append({
+                    "session_id": row["id"],
+                    **{column: row[column] for column in columns},
+                    "message_count": row["message_count"] + shift,
+                })
+
+            messages = [
+                {**message, "seq": message["seq"] + shifts.get(message["session_id"], 0)}
+                for message in messages if message["session_id"] not in dropped
+            ]
+            if messages:
+                db.execute(insert(message_table), messages)
+            if new:
+                db.execute(insert(sessions), new)
+            for columns in {tuple(row) for row in changed}:
+                db.execute(
+                    update(sessions).where(sessions.c.id == bindparam("session_id")),
+                    [row for row in changed if tuple(row) == columns]
+                )
+            db.commit()
+            return dropped
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def delete(self, session_id: str):
+        sessions, messages = self._tables()
+        db = self.session_factory()
+        try:
+            db.execute(delete(messages).where(messages.c.session_id == session_id))
+            db.execute(delete(sessions).where(sessions.c.id == session_id))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+class ConversationStore:
+    """In-memory session tails over a durable log, written in batches."""
+
+    def __init__(
+        self,
+        sink: Optional[ConversationSink],
+        max_sessions: int = 2000,
+        keep_recent: int = KEEP_RECENT,
+        summary_batch: int = SUMMARY_BATCH,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        count_tokens: Callable[[str], int] = estimate_tokens,
+        summarize: Optional[Summarizer] = None,
+        max_summary_chars: int = MAX_SUMMARY_CHARS
+    ):
+        self.sink = sink
+        self.max_sessions = max_sessions
+        self.keep_recent = keep_recent
+        self.summary_batch = summary_batch
+        # Room for a batch to wait for the summarizer without leaving the tail
+        self.tail_size = keep_recent + 2 * summary_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.count_tokens = count_tokens
+        self.summarize = summarize
+        self.max_summary_chars = max_summary_chars
+
+        self._sessions: "OrderedDict[str, _SessionLog]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._pending: List[Dict[str, Any]] = []
+        # Sessions whose row changed since the last flush; authoritative over the sink
+        self._dirty: Dict[str, _SessionLog] = {}
+        self._summaries: Set[asyncio.Task] = set()
+        self._writer: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._batch_ready = asyncio.Event()
+        self.counts: Dict[str, int] = defaultdict(int)
+
+    # Sessions
+
+    def _remember(self, log: _SessionLog):
+        self._sessions[log.id] = log
+        self._sessions.move_to_end(log.id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    async def _load(self, session_id: str) -> Optional[_SessionLog]:
+        if self.sink is None:
+            return None
+        self.counts["loads"] += 1
+        row = await asyncio.to_thread(self.sink.load, session_id, self.tail_size)
+        if row is None:
+            return None
+
+        log = _SessionLog(session_id, str(row["user_id"]), self.tail_size)
+        log.title = row["title"]
+        log.model = row["model"]
+        log.message_count = row["message_count"]
+        log.summary = row["summary"] or ""
+        log.summary_tokens = self.count_tokens(log.summary) if log.summary else 0
+        log.summarized_through = row["summarized_through"]
+        log.created_at = row["created_at"]
+        log.updated_at = row["updated_at"]
+        for message in row["messages"]:
+            log.tail.append(StoredMessage(**message))
+        if log.tail:
+            log.message_count = max(log.message_count, log.tail[-1].seq)
+        log.persisted = True
+        log.synced = (row["message_count"], row["updated_at"])
+        # A concurrent append may have created the session while this was loading
+        return self._sessions.get(session_id) or self._dirty.get(session_id) or log
+
+    async def _session(self, session_id: str, user_id: Any, create: bool = False) -> Optional[_SessionLog]:
+        user_id = str(user_id)
+        log = self._sessions.get(session_id) or self._dirty.get(session_id)
+        if log is not None and self.sink is not None and session_id not in self._dirty:
+            # Another worker may have written or deleted it; unflushed sessions are reconciled on write
+            version = await asyncio.to_thread(self.sink.version, session_id)
+            if version != log.synced and session_id not in self._dirty:
+                self.counts["stale"] += 1
+                self._sessions.pop(session_id, None)
+                log = None
+        if log is None:
+            self.counts["misses"] += 1
+            loading = self._loading.get(session_id)
+            if loading is None:
+                loading = self._loading[session_id] = asyncio.ensure_future(self._load(session_id))
+                loading.add_done_callback(lambda _: self._loading.pop(session_id, None))
+            log = await asyncio.shield(loading)
+            if log is None:
+                if not create:
+                    return None
+                log = self._sessions.get(session_id) or _SessionLog(session_id, user_id, self.tail_size)
+        else:
+            self.counts["hits"] += 1
+
+        if log.user_id != user_id:
+            raise SessionNotFoundError(session_id)
+        self._remember(log)
+        return log
+
+    # Reads
+
+    async def recent(self, session_id: str, user_id: Any, limit: int) -> List[StoredMessage]:
+        """The last ``limit`` messages, oldest first."""
+        log = await self._session(session_id, user_id)
+        if log is None:
+            return []
+        if self.sink is None or limit <= len(log.tail) or len(log.tail) >= log.message_count:
+            messages = list(islice(reversed(log.tail), limit))
+            messages.reverse()
+            return messages
+        # Older than the tail: read the log itself
+        await self.flush()
+        rows = await asyncio.to_thread(self.sink.messages, session_id, limit)
+        return [StoredMessage(**row) for row in rows]
+
+    async def messages(self, session_id: str, user_id: Any, limit: int = 1000) -> List[Dict[str, Any]]:
+        """The last ``limit`` messages as dicts; raises ``SessionNotFoundError`` if there is no session."""
+        if await self._session(session_id, user_id) is None:
+            raise SessionNotFoundError(session_id)
+        return [message.as_dict() for message in await self.recent(session_id, user_id, limit)]
+
+    async def context(
+        self,
+        session_id: str,
+        user_id: Any,
+        budget_tokens: int,
+        max_messages: Optional[int] = None
+    ) -> ConversationWindow:
+        """
+        The summary and as many of the newest unsummarized messages as fit
+        in ``budget_tokens`` (and ``max_messages``), oldest first.
+        """
+        log = await self._session(session_id, user_id)
+        if log is None:
+            return ConversationWindow("", [], 0)
+
+        summary = log.summary if log.summary_tokens <= budget_tokens else ""
+        used = log.summary_tokens if summary else 0
+        window = []
+        for message in reversed(log.tail):
+            if message.seq <= log.summarized_through:
+                break
+            if max_messages is not None and len(window) >= max_messages:
+                break
+            if used + message.tokens > budget_tokens:
+                break
+            window.append(message)
+            used += message.tokens
+        window.reverse()
+        return ConversationWindow(summary, window, used)
+
+    async def sessions(self, user_id: Any, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """A user's sessions, most recently updated first."""
+        user_id = str(user_id)
+        if self.sink is None:
+            logs = sorted(
+                (log for log in self._sessions.values() if log.user_id == user_id),
+                key=lambda log: log.updated_at, reverse=True
+            )
+            return [log.as_info() for log in logs[offset:offset + limit]]
+
+        await self.flush()
+        rows = await asyncio.to_thread(self.sink.sessions, user_id, limit, offset)
+        return [
+            {
+                **row,
+                "title": row["title"] or "Untitled Chat",
+                "model": row["model"] or "unknown",
+            }
+            for row in rows
+        ]
+
+    # Writes
+
+    async def append(
+        self,
+        session_id: str,
+        user_id: Any,
+        role: str,
+        content: str,
+        model: Optional[str] = None
+    ) -> StoredMessage:
+        """Add a message to the session (created if new); it is written on the next flush."""
+        log = await self._session(session_id, user_id, create=True)
+        message = StoredMessage(log.message_count + 1, role, content, self.count_tokens(content))
+        log.tail.append(message)
+        log.message_count = message.seq
+        log.updated_at = message.created_at
+        if log.title is None and role == "user":
+            log.title = " ".join(content.split())[:TITLE_CHARS] or None
+        if model:
+            log.model = model
+
+        self._pending.append({
+            "id": uuid.uuid4(),
+            "session_id": session_id,
+            "seq": message.seq,
+            "role": role,
+            "content": content,
+            "tokens": message.tokens,
+            "created_at": message.created_at,
+        })
+        self._dirty[session_id] = log
+        self.counts["appended"] += 1
+        if len(self._pending) >= self.batch_size:
+            self._batch_ready.set()
+
+        self._maybe_summarize(log)
+        return message
+
+    async def set_model(self, session_id: str, user_id: Any, model: str):
+        """Record the model chosen for a session, creating the session if needed."""
+        log = await self._session(session_id, user_id, create=True)
+        log.model = model
+        self._dirty[session_id] = log
+
+    async def delete(self, session_id: str, user_id: Any) -> bool:
+        """Delete a session and its messages; False if there was none."""
+        log = await self._session(session_id, user_id)
+        if log is None:
+            return False
+        if log.summarizing is not None:
+            log.summarizing.cancel()
+        self._sessions.pop(session_id, None)
+        self._dirty.pop(session_id, None)
+        self._pending = [row for row in self._pending if row["session_id"] != session_id]
+        if self.sink is not None:
+            async with self._flush_lock:
+                await asyncio.to_thread(self.sink.delete, session_id)
+        return True
+
+    # Summaries
+
+    def _maybe_summarize(self, log: _SessionLog):
+        if log.summarizing is not None and not log.summarizing.done():
+            return
+        if log.message_count - log.summarized_through < self.keep_recent + self.summary_batch:
+            return
+        through = log.message_count - self.keep_recent
+        older = [m for m in log.tail if log.summarized_through < m.seq <= through]
+        if not older:
+            log.summarized_through = through
+            return
+        task = log.summarizing = asyncio.ensure_future(self._summarize(log, older))
+        self._summaries.add(task)
+        task.add_done_callback(self._summaries.discard)
+
+    async def _summarize(self, log: _SessionLog, messages: List[StoredMessage]):
+        summary = None
+        if self.summarize is not None:
+            try:
+                summary = await self.summarize(log.summary, messages)
+            except Exception as e:
+                self.counts["summary_errors"] += 1
+                logger.warning(f"Summarizing chat session {log.id} failed, using extract: {e}")
+        if not summary:
+            summary = extractive_summary(log.summary, messages, self.max_summary_chars)
+
+        log.summary = summary[-self.max_summary_chars:]
+        log.summary_tokens = self.count_tokens(log.summary)
+        log.summarized_through = messages[-1].seq
+        self._dirty[log.id] = log
+        self.counts["summaries"] += 1
+        # Messages appended meanwhile may already call for the next batch
+        log.summarizing = None
+        self._maybe_summarize(log)
+
+    # Background writer
+
+    async def _write(self):
+        if not self._pending and not self._dirty:
+            return
+        messages, self._pending = self._pending, []
+        dirty, self._dirty = self._dirty, {}
+        rows = [log.as_row() for log in dirty.values()]
+        try:
+            dropped = await asyncio.to_thread(self.sink.write, messages, rows)
+        except Exception as e:
+            # Keep everything for the next flush, in order
+            self._pending = messages + self._pending
+            self._dirty = {**dirty, **self._dirty}
+            self.counts["write_errors"] += 1
+            logger.error(f"Failed to write {len(messages)} chat messages: {e}")
+            return
+        for log, row in zip(dirty.values(), rows):
+            log.persisted = True
+            # In this worker's numbering: if the sink shifted it, the next check reloads
+            log.synced = (row["message_count"], row["updated_at"])
+        for session_id in dropped:
+            if session_id not in self._dirty:
+                self._sessions.pop(session_id, None)
+            self.counts["dropped"] += 1
+        self.counts["written"] += len(messages)
+        self.counts["batches"] += 1
+
+    async def flush(self):
+        """Finish running summaries and write everything queued so far."""
+        while self._summaries:
+            await asyncio.gather(*self._summaries, return_exceptions=True)
+        if self.sink is None:
+            return
+        async with self._flush_lock:
+            await self._write()
+
+    async def _run(self):
+        next_flush = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                # Wake early once a full batch is waiting
+                await asyncio.wait_for(
+                    self._batch_ready.wait(), max(next_flush - time.monotonic(), 0)
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+
+            async with self._flush_lock:
+                await self._write()
+            next_flush = time.monotonic() + self.flush_interval
+
+    def start(self):
+        """Start the background writer."""
+        if self.sink is None or (self._writer is not None and not self._writer.done()):
+            return
+        self._writer = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background writer and flush what is buffered."""
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "queued": len(self._pending),
+            "dirty_sessions": len(self._dirty),
+            "summarizing": len(self._summaries),
+            **{name: self.counts[name] for name in (
+                "hits", "misses", "stale", "loads", "appended", "written", "batches", "write_errors",
+                "dropped", "summaries", "summary_errors"
+            )},
+        }
+
+
+conversation_store = ConversationStore(
+    DatabaseConversationSink(),
+    max_sessions=settings.CHAT_HISTORY_SESSIONS,
+    batch_size=settings.CHAT_HISTORY_BATCH_SIZE,
+    flush_interval=settings.CHAT_HISTORY_FLUSH_SECONDS
+)
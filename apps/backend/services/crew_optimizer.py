@@ -0,0 +1,361 @@
+"""
+Batch crew assignment optimizer.
+
+``CrewScheduler.optimize_schedule`` hands the whole batch to
+``ScheduleOptimizer`` instead of placing tasks one at a time:
+
+* Skills are integer bitmasks, so "can this member do this task" is one
+  AND and the skill match is a popcount. Members are grouped by mask, and
+  each distinct task mask resolves its candidate list once.
+* Each member's booked time is a ``BusyIntervals``: sorted, non-overlapping
+  intervals searched with ``bisect``, so an overlap test is O(log n) on
+  datetimes parsed once up front.
+* A greedy pass places the most constrained tasks first, then a local
+  search relocates assignments to better members and ejects a blocking
+  assignment to another member (or drops a lower-value one) to fit an
+  unassigned task, until nothing improves or the time budget runs out.
+
+The objective is the sum over assigned tasks of ``ASSIGNMENT_VALUE +
+priority + score``: covering a task outweighs any difference in score,
+higher priority tasks win contested slots, and the remaining choice
+follows the same skill/workload weights as ``find_best_assignee``.
+"""
+
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+DEFAULT_TIME_BUDGET = 2.0
+ASSIGNMENT_VALUE = 10.0
+
+# Weights shared with CrewScheduler.find_best_assignee
+SKILL_WEIGHT = 0.4
+AVAILABILITY_WEIGHT = 0.3
+WORKLOAD_WEIGHT = 0.2
+LOCATION_WEIGHT = 0.1
+DEFAULT_LOCATION_SCORE = 0.8
+MAX_WORKLOAD = 10
+
+
+def skill_match(task_mask: int, member_mask: int) -> float:
+    """Share of the task's required skills the member has; 1.0 when none are required."""
+    if not task_mask:
+        return 1.0
+    return (task_mask & member_mask).bit_count() / task_mask.bit_count()
+
+
+def workload_score(assignments: int) -> float:
+    return max(0.0, 1.0 - assignments / MAX_WORKLOAD)
+
+
+def assignment_score(
+    skill: float,
+    workload: float,
+    availability: float = 1.0,
+    location: float = DEFAULT_LOCATION_SCORE
+) -> float:
+    return (
+        skill * SKILL_WEIGHT
+        + availability * AVAILABILITY_WEIGHT
+        + workload * WORKLOAD_WEIGHT
+        + location * LOCATION_WEIGHT
+    )
+
+
+class BusyIntervals:
+    """
+    One member's booked time as sorted, non-overlapping intervals.
+
+    Because bookings never overlap, the ends are sorted along with the
+    starts and the first interval that could overlap a query is a single
+    ``bisect`` away. Each interval carries the item that booked it.
+    """
+    __slots__ = ("starts", "ends", "items")
+
+    def __init__(self, intervals=()):
+        self.starts: List[datetime] = []
+        self.ends: List[datetime] = []
+        self.items: List[Any] = []
+        for start, end, item in sorted(intervals, key=lambda interval: interval[0]):
+            self.starts.append(start)
+            self.ends.append(end)
+            self.items.append(item)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def copy(self) -> "BusyIntervals":
+        return BusyIntervals(zip(self.starts, self.ends, self.items))
+
+    def is_free(self, start: datetime, end: datetime) -> bool:
+        i = bisect_right(self.ends, start)
+        return i == len(self.starts) or self.starts[i] >= end
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Any]:
+        """Items booked at any time within [start, end)."""
+        found = []
+        i = bisect_right(self.ends, start)
+        while i < len(self.starts) and self.starts[i] < end:
+            found.append(self.items[i])
+            i += 1
+        return found
+
+    def add(self, start: datetime, end: datetime, item: Any):
+        i = bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.items.insert(i, item)
+
+    def remove(self, start: datetime, item: Any):
+        i = bisect_left(self.starts, start)
+        while self.items[i] is not item:
+            i += 1
+        del self.starts[i], self.ends[i], self.items[i]
+
+
+@dataclass
+class OptimizerTask:
+    index: int
+    skill_mask: int
+    start: datetime
+    end: datetime
+    priority: float = 0.0
+
+
+@dataclass
+class OptimizerMember:
+    id: Hashable
+    skill_mask: int
+    busy: BusyIntervals = field(default_factory=BusyIntervals)
+    # Assignments already on the schedule before this batch
+    base_load: int = 0
+
+
+@dataclass
+class OptimizerResult:
+    assignments: Dict[int, Hashable]
+    objective: float
+    iterations: int
+    elapsed: float
+    timed_out: bool = False
+
+
+class ScheduleOptimizer:
+    """Assign a batch of tasks to members to maximise the total objective."""
+
+    def __init__(
+        self,
+        tasks: List[OptimizerTask],
+        members: List[OptimizerMember],
+        time_budget: float = DEFAULT_TIME_BUDGET,
+        max_assignments: Optional[int] = None
+    ):
+        self.tasks = tasks
+        self.members = {member.id: member for member in members}
+        self.time_budget = time_budget
+        self.max_assignments = max_assignments
+
+        self.assigned: Dict[int, Hashable] = {}
+        self.load: Dict[Hashable, int] = {member.id: 0 for member in members}
+        self.skill_total: Dict[Hashable, float] = defaultdict(float)
+        self.candidates = self._candidate_lists()
+
+        self._deadline = 0.0
+        self.timed_out = False
+
+    def _candidate_lists(self) -> Dict[int, List[Tuple[Hashable, float]]]:
+        """(member id, skill match) per task, resolved once per distinct skill mask."""
+        by_mask: Dict[int, List[Hashable]] = defaultdict(list)
+        for member in self.members.values():
+            by_mask[member.skill_mask].append(member.id)
+
+        resolved: Dict[int, List[Tuple[Hashable, float]]] = {}
+        candidates = {}
+        for task in self.tasks:
+            if task.skill_mask not in resolved:
+                matches = []
+                for member_mask, member_ids in by_mask.items():
+                    match = skill_match(task.skill_mask, member_mask)
+                    if match > 0:
+                        matches.extend((member_id, match) for member_id in member_ids)
+                matches.sort(key=lambda candidate: -candidate[1])
+                resolved[task.skill_mask] = matches
+            candidates[task.index] = resolved[task.skill_mask]
+        return candidates
+
+    # Objective
+
+    def _member_value(self, member_id: Hashable, count: int, skill_total: float) -> float:
+        """A member's part of the objective with ``count`` batch assignments."""
+        if not count:
+            return 0.0
+        member = self.members[member_id]
+        per_assignment = assignment_score(0.0, workload_score(member.base_load + count))
+        return count * (ASSIGNMENT_VALUE + per_assignment) + skill_total * SKILL_WEIGHT
+
+    def _change(self, member_id: Hashable, count_delta: int, skill_delta: float) -> float:
+        count = self.load[member_id]
+        skills = self.skill_total[member_id]
+        return (
+            self._member_value(member_id, count + count_delta, skills + skill_delta)
+            - self._member_value(member_id, count, skills)
+        )
+
+    def objective(self) -> float:
+        total = sum(self.tasks[index].priority for index in self.assigned)
+        for member_id, count in self.load.items():
+            total += self._member_value(member_id, count, self.skill_total[member_id])
+        return total
+
+    def score(self, index: int, member_id: Hashable) -> float:
+        """The reported score for an assignment under the final workloads."""
+        return assignment_score(
+            self._match(index, member_id),
+            workload_score(self.members[member_id].base_load + self.load[member_id])
+        )
+
+    # Moves
+
+    def _has_room(self, member_id: Hashable) -> bool:
+        return self.max_assignments is None or self.load[member_id] < self.max_assignments
+
+    def _assign(self, index: int, member_id: Hashable, match: float):
+        task = self.tasks[index]
+        self.members[member_id].busy.add(task.start, task.end, task)
+        self.assigned[index] = member_id
+        self.load[member_id] += 1
+        self.skill_total[member_id] += match
+
+    def _unassign(self, index: int) -> Hashable:
+        task = self.tasks[index]
+        member_id = self.assigned.pop(index)
+        self.members[member_id].busy.remove(task.start, task)
+        self.load[member_id] -= 1
+        self.skill_total[member_id] -= self._match(index, member_id)
+        return member_id
+
+    def _match(self, index: int, member_id: Hashable) -> float:
+        return skill_match(self.tasks[index].skill_mask, self.members[member_id].skill_mask)
+
+    def _best_insertion(
+        self, index: int, exclude: Optional[Hashable] = None
+    ) -> Tuple[Optional[Hashable], float, float]:
+        """The free candidate that adds most to the objective: (member, gain, match)."""
+        task = self.tasks[index]
+        best, best_gain, best_match = None, float("-inf"), 0.0
+        for member_id, match in self.candidates[index]:
+            if member_id == exclude or not self._has_room(member_id):
+                continue
+            if not self.members[member_id].busy.is_free(task.start, task.end):
+                continue
+            gain = self._change(member_id, 1, match)
+            if gain > best_gain:
+                best, best_gain, best_match = member_id, gain, match
+        return best, best_gain + task.priority, best_match
+
+    def _try_insert(self, index: int) -> bool:
+        member_id, gain, match = self._best_insertion(index)
+        if member_id is None or gain <= 0:
+            return False
+        self._assign(index, member_id, match)
+        return True
+
+    def _try_relocate(self, index: int) -> bool:
+        """Move an assigned task to another member if that scores better."""
+        current = self.assigned[index]
+        task = self.tasks[index]
+        removal = self._change(current, -1, -self._match(index, current))
+
+        member_id, gain, match = self._best_insertion(index, exclude=current)
+        if member_id is None or gain - task.priority + removal <= 1e-9:
+            return False
+        self._unassign(index)
+        self._assign(index, member_id, match)
+        return True
+
+    def _try_eject(self, index: int) -> bool:
+        """
+        Fit an unassigned task by clearing one blocking assignment.
+
+        The blocker moves to another free member if one exists, otherwise
+        it is dropped when the incoming task is worth more.
+        """
+        task = self.tasks[index]
+        for member_id, match in self.candidates[index]:
+            if self._past_deadline():
+                return False
+            blockers = self.members[member_id].busy.overlapping(task.start, task.end)
+            if len(blockers) != 1 or not isinstance(blockers[0], OptimizerTask):
+                continue
+            blocker = blockers[0].index
+            blocker_match = self._match(blocker, member_id)
+
+            gain = task.priority - self.tasks[blocker].priority
+            gain += self._change(member_id, -1, -blocker_match)
+            self._unassign(blocker)
+            gain += self._change(member_id, 1, match)
+            self._assign(index, member_id, match)
+
+            moved_to, moved_gain, moved_match = self._best_insertion(blocker, exclude=member_id)
+            if moved_to is not None and moved_gain > 0:
+                gain += moved_gain
+            else:
+                moved_to = None
+
+            if gain > 1e-9:
+                if moved_to is not None:
+                    self._assign(blocker, moved_to, moved_match)
+                return True
+
+            self._unassign(index)
+            self._assign(blocker, member_id, blocker_match)
+        return False
+
+    def _past_deadline(self) -> bool:
+        if time.monotonic() >= self._deadline:
+            self.timed_out = True
+        return self.timed_out
+
+    # Search
+
+    def solve(self) -> OptimizerResult:
+        started = time.monotonic()
+        self._deadline = started + self.time_budget
+
+        # Greedy seed: highest priority, then fewest candidates, then longest first
+        order = sorted(
+            range(len(self.tasks)),
+            key=lambda i: (
+                -self.tasks[i].priority,
+                len(self.candidates[i]),
+                self.tasks[i].start - self.tasks[i].end
+            )
+        )
+        for index in order:
+            if self.candidates[index]:
+                self._try_insert(index)
+
+        iterations = 0
+        improved = True
+        while improved and not self._past_deadline():
+            improved = False
+            iterations += 1
+            for index in order:
+                if self._past_deadline():
+                    break
+                if index in self.assigned:
+                    improved |= self._try_relocate(index)
+                elif self.candidates[index]:
+                    improved |= self._try_insert(index) or self._try_eject(index)
+
+        return OptimizerResult(
+            assignments=dict(self.assigned),
+            objective=self.objective(),
+            iterations=iterations,
+            elapsed=time.monotonic() - started,
+            timed_out=self.timed_out
+        )
@@ -9,6 +9,10 @@ import uuid
 from sqlalchemy.orm import Session
 from ..db.business_models import User
 from collections import defaultdict
+from .crew_optimizer import (
+    DEFAULT_TIME_BUDGET, BusyIntervals, OptimizerMember, OptimizerTask, ScheduleOptimizer,
+    assignment_score, skill_match, workload_score
+)
 
 
 class CrewSkill(str, Enum):
@@ -24,6 +28,21 @@ class CrewSkill(str, Enum):
     EMERGENCY = "emergency"
 
 
+# One bit per skill; a member or task's skills compile to a single int
+SKILL_BITS = {skill: 1 << i for i, skill in enumerate(CrewSkill)}
+
+
+def skill_mask(skills) -> int:
+    """Bitmask for a list of skills; unknown skill names are ignored."""
+    mask = 0
+    for skill in skills:
+        try:
+            mask |= SKILL_BITS[CrewSkill(skill)]
+        except ValueError:
+            continue
+    return mask
+
+
 class CrewStatus(str, Enum):
     AVAILABLE = "available"
     ASSIGNED = "assigned"
@@ -34,6 +53,16 @@ class CrewStatus(str, Enum):
     TRAINING = "training"
 
 
+PRIORITY_LEVELS = {"low": 0, "medium": 1, "high": 2, "critical": 3, "urgent": 3}
+
+
+def _task_priority(priority: Any) -> float:
+    """Numeric priorities pass through; named levels map to 0-3."""
+    if isinstance(priority, (int, float)):
+        return float(priority)
+    return float(PRIORITY_LEVELS.get(str(getattr(priority, "value", priority) or "").lower(), 0))
+
+
 class CrewScheduler:
     """Service for intelligent crew scheduling and assignment."""
     
@@ -42,6 +71,8 @@ class CrewScheduler:
         self.crew_members: Dict[str, Dict[str, Any]] = {}
         self.assignments: Dict[str, Dict[str, Any]] = {}
         self.schedule: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        # Parsed form of self.schedule, per member
+        self._busy: Dict[str, BusyIntervals] = {}
         self._initialize_sample_data()
         
     def _initialize_sample_data(self):
@@ -76,6 +107,22 @@ class CrewScheduler:
         
         for member in sample_members:
             self.crew_members[member["id"]] = member
+
+    def _busy_intervals(self, member_id: str) -> BusyIntervals:
+        """The member's schedule as intervals, parsed once and re-parsed only if it changed."""
+        member_schedule = self.schedule.get(member_id, [])
+        busy = self._busy.get(member_id)
+        if busy is None or len(busy) != len(member_schedule):
+            busy = BusyIntervals(
+                (datetime.fromisoformat(a["start_time"]), datetime.fromisoformat(a["end_time"]), a)
+                for a in member_schedule
+            )
+            self._busy[member_id] = busy
+        return busy
+
+    def _book(self, member_id: str, assignment: Dict[str, Any], start_time: datetime, end_time: datetime):
+        self._busy_intervals(member_id).add(start_time, end_time, assignment)
+        self.schedule[member_id].append(assignment)
     
     async def find_best_assignee(
         self,
@@ -95,26 +142,16 @@ class CrewScheduler:
         - Performance history
         """
         candidates = []
-        
-        # Convert required skills to enum
-        required_skill_enums = []
-        for skill in required_skills:
-            try:
-                required_skill_enums.append(CrewSkill(skill))
-            except ValueError:
-                continue
-        
+        required_mask = skill_mask(required_skills)
+
         # Evaluate each crew member
         for member_id, member in self.crew_members.items():
             if member["status"] != CrewStatus.AVAILABLE:
                 continue
                 
             # Calculate skill match score
-            member_skills = set(member["skills"])
-            required_skills_set = set(required_skill_enums)
-            skill_match = len(member_skills.intersection(required_skills_set)) / len(required_skills_set) if required_skills_set else 1.0
-            
-            if skill_match == 0:
+            skill_score = skill_match(required_mask, skill_mask(member["skills"]))
+            if skill_score == 0:
                 continue
                 
             # Calculate availability score
@@ -122,27 +159,22 @@ class CrewScheduler:
             
             # Calculate workload score (mock - would check actual schedule)
             current_workload = len(self.schedule.get(member_id, []))
-            workload_score = max(0, 1.0 - (current_workload / 10))  # Assuming 10 is max workload
+            workload = workload_score(current_workload)
             
             # Calculate location score (mock)
             location_score = 0.8  # Would calculate based on actual distance
             
             # Calculate overall score
-            overall_score = (
-                skill_match * 0.4 +
-                availability_score * 0.3 +
-                workload_score * 0.2 +
-                location_score * 0.1
-            )
+            overall_score = assignment_score(skill_score, workload, availability_score, location_score)
             
             candidates.append({
                 "user_id": member_id,
                 "name": member["name"],
                 "score": overall_score,
                 "factors": {
-                    "skill_match": skill_match,
+                    "skill_match": skill_score,
                     "availability": availability_score,
-                    "workload": workload_score,
+                    "workload": workload,
                     "location": location_score,
                     "performance": member["performance_score"] / 5.0
                 },
@@ -185,21 +217,13 @@ class CrewScheduler:
                 continue
                 
             # Check schedule conflicts
-            member_schedule = self.schedule.get(crew_id, [])
-            has_conflict = False
-            
-            for assignment in member_schedule:
-                assignment_start = datetime.fromisoformat(assignment["start_time"])
-                assignment_end = datetime.fromisoformat(assignment["end_time"])
-                
-                # Check for time overlap
-                if not (end_time <= assignment_start or start_time >= assignment_end):
-                    conflicts.append({
-                        "user_id": crew_id,
-                        "conflict": f"Already scheduled for job {assignment['job_id']}"
-                    })
-                    has_conflict = True
-                    break
+            booked = self._busy_intervals(crew_id).overlapping(start_time, end_time)
+            has_conflict = bool(booked)
+            if has_conflict:
+                conflicts.append({
+                    "user_id": crew_id,
+                    "conflict": f"Already scheduled for job {booked[0]['job_id']}"
+                })
                     
             if not has_conflict:
                 available.append(crew_id)
@@ -218,66 +242,67 @@ class CrewScheduler:
         """
         Optimize task scheduling across multiple crews.
         
-        Uses constraint satisfaction and optimization algorithms.
+        The whole batch is solved together by ``ScheduleOptimizer`` (see
+        services/crew_optimizer.py); members can take any number of
+        non-overlapping tasks. ``constraints`` may set
+        ``time_budget_seconds`` and ``max_assignments_per_member``.
         """
+        now = datetime.now()
+        windows = []
+        optimizer_tasks = []
+        for index, task in enumerate(tasks):
+            start_time = task.get("preferred_time") or now
+            if isinstance(start_time, str):
+                start_time = datetime.fromisoformat(start_time)
+            end_time = start_time + timedelta(hours=task.get("estimated_hours", 4))
+            windows.append((start_time, end_time))
+            optimizer_tasks.append(OptimizerTask(
+                index=index,
+                skill_mask=skill_mask(task.get("required_skills", [])),
+                start=start_time,
+                end=end_time,
+                priority=_task_priority(task.get("priority"))
+            ))
+
+        members = [
+            OptimizerMember(
+                id=member_id,
+                skill_mask=skill_mask(member["skills"]),
+                busy=self._busy_intervals(member_id).copy(),
+                base_load=len(self.schedule.get(member_id, []))
+            )
+            for member_id, member in self.crew_members.items()
+            if member["status"] == CrewStatus.AVAILABLE
+        ]
+
+        optimizer = ScheduleOptimizer(
+            optimizer_tasks,
+            members,
+            time_budget=constraints.get("time_budget_seconds", DEFAULT_TIME_BUDGET),
+            max_assignments=constraints.get("max_assignments_per_member")
+        )
+        result = optimizer.solve()
+
         optimized_assignments = []
         unassigned_tasks = []
-        
-        # Sort tasks by priority and estimated duration
-        sorted_tasks = sorted(
-            tasks,
-            key=lambda x: (x.get("priority", 0), x.get("estimated_hours", 0)),
-            reverse=True
-        )
-        
-        # Track assigned crew members
-        assigned_members = set()
-        
-        for task in sorted_tasks:
-            # Find best assignee for this task
-            required_skills = task.get("required_skills", [])
-            preferred_time = datetime.fromisoformat(task.get("preferred_time", datetime.now().isoformat()))
-            location = task.get("location")
-            
-            best_assignee = await self.find_best_assignee(
-                task.get("type", "general"),
-                required_skills,
-                preferred_time,
-                location
-            )
-            
-            if best_assignee and best_assignee["user_id"] not in assigned_members:
-                # Check availability
-                start_time = preferred_time
-                end_time = start_time + timedelta(hours=task.get("estimated_hours", 4))
-                
-                availability = await self.check_crew_availability(
-                    [best_assignee["user_id"]],
-                    start_time,
-                    end_time
-                )
-                
-                if availability["fully_available"]:
-                    # Create assignment
-                    assignment = {
-                        "task_id": task.get("id", str(uuid.uuid4())),
-                        "user_id": best_assignee["user_id"],
-                        "user_name": best_assignee["name"],
-                        "start_time": start_time.isoformat(),
-                        "end_time": end_time.isoformat(),
-                        "assignment_score": best_assignee["score"],
-                        "job_id": task.get("job_id")
-                    }
-                    
-                    # Update schedule
-                    self.schedule[best_assignee["user_id"]].append(assignment)
-                    assigned_members.add(best_assignee["user_id"])
-                    
-                    optimized_assignments.append(assignment)
-                else:
-                    unassigned_tasks.append(task)
-            else:
+        for index, task in enumerate(tasks):
+            member_id = result.assignments.get(index)
+            if member_id is None:
                 unassigned_tasks.append(task)
+                continue
+
+            start_time, end_time = windows[index]
+            assignment = {
+                "task_id": task.get("id", str(uuid.uuid4())),
+                "user_id": member_id,
+                "user_name": self.crew_members[member_id]["name"],
+                "start_time": start_time.isoformat(),
+                "end_time": end_time.isoformat(),
+                "assignment_score": optimizer.score(index, member_id),
+                "job_id": task.get("job_id")
+            }
+            self._book(member_id, assignment, start_time, end_time)
+            optimized_assignments.append(assignment)
                 
         return {
             "optimized_assignments": optimized_assignments,
@@ -385,7 +410,7 @@ class CrewScheduler:
         
         # Update schedule and assignments
         self.assignments[assignment_id] = assignment
-        self.schedule[crew_id].append(assignment)
+        self._book(crew_id, assignment, start_time, end_time)
         
         # Update member status
         member["status"] = CrewStatus.ASSIGNED
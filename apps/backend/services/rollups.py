@@ -0,0 +1,224 @@
+"""
+Read and rebuild the analytics rollups.
+
+``rollup_totals`` answers "totals for these metrics between two dates"
+from at most one day row per partial month at either end plus one
+month row per full month, so a year-to-date report reads a few dozen
+rows instead of every invoice. ``rollup_series`` returns per-period
+rows for trends and forecasts, and ``rollup_months`` per-month totals
+clipped to a date range.
+
+Rebuild after restoring data or after bulk SQL updates that bypass the
+ORM:
+
+    python -m apps.backend.services.rollups rebuild
+"""
+
+import argparse
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from ..core.logging import get_logger
+from ..db.analytics_models import ROLLUP_SOURCES, AnalyticsRollup, accumulate, apply_rollup_deltas, new_deltas
+
+logger = get_logger(__name__)
+
+# Read through the table so queries do not depend on mapper configuration
+rollups = AnalyticsRollup.__table__
+
+
+@dataclass
+class RollupTotals:
+    """Summed rollup values for one metric (and dimension)."""
+    count: int = 0
+    amount_cents: int = 0
+    weighted_cents: int = 0
+    duration_days: float = 0.0
+
+
+def next_month(day: date) -> date:
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _period_condition(start: date, end: date):
+    """Rows covering [start, end]: month rows for full months, day rows for the edges."""
+    month_from = start if start.day == 1 else next_month(start)
+    month_to = (end + timedelta(days=1)).replace(day=1)
+
+    if month_from >= month_to:
+        return and_(
+            rollups.c.grain == "day",
+            rollups.c.period_start >= start,
+            rollups.c.period_start <= end
+        )
+    return or_(
+        and_(
+            rollups.c.grain == "month",
+            rollups.c.period_start >= month_from,
+            rollups.c.period_start < month_to
+        ),
+        and_(
+            rollups.c.grain == "day",
+            or_(
+                and_(rollups.c.period_start >= start, rollups.c.period_start < month_from),
+                and_(rollups.c.period_start >= month_to, rollups.c.period_start <= end)
+            )
+        )
+    )
+
+
+def rollup_totals(
+    db: Session,
+    metrics: Iterable[str],
+    start: date,
+    end: date,
+    by_dimension: bool = False
+) -> Dict[object, RollupTotals]:
+    """
+    Sum ``metrics`` over the inclusive date range in one query.
+
+    Returns a mapping from metric, or from ``(metric, dimension)`` when
+    ``by_dimension`` is set, to its totals. Metrics with no rows are
+    absent; use ``.get(key, RollupTotals())``.
+    """
+    group = [rollups.c.metric]
+    if by_dimension:
+        group.append(rollups.c.dimension)
+
+    rows = db.query(
+        *group,
+        func.sum(rollups.c.count),
+        func.sum(rollups.c.amount_cents),
+        func.sum(rollups.c.weighted_cents),
+        func.sum(rollups.c.duration_days)
+    ).filter(
+        rollups.c.metric.in_(list(metrics)),
+        _period_condition(start, end)
+    ).group_by(*group).all()
+
+    totals = {}
+    for row in rows:
+        key = (row[0], row[1]) if by_dimension else row[0]
+        values = row[len(group):]
+        totals[key] = RollupTotals(
+            int(values[0] or 0), int(values[1] or 0), int(values[2] or 0), float(values[3] or 0)
+        )
+    return totals
+
+
+def metric_total(totals: Dict[object, RollupTotals], metric: str) -> RollupTotals:
+    """Sum a metric across dimensions in ``rollup_totals(..., by_dimension=True)`` output."""
+    result = RollupTotals()
+    for (name, _), value in totals.items():
+        if name == metric:
+            result.count += value.count
+            result.amount_cents += value.amount_cents
+            result.weighted_cents += value.weighted_cents
+            result.duration_days += value.duration_days
+    return result
+
+
+def rollup_series(
+    db: Session,
+    metrics: Iterable[str],
+    start: date,
+    end: date,
+    grain: str = "month"
+) -> Dict[Tuple[str, date], RollupTotals]:
+    """Per-period totals keyed by ``(metric, period_start)`` for periods starting in the range."""
+    rows = db.query(
+        rollups.c.metric, rollups.c.period_start, rollups.c.count,
+        rollups.c.amount_cents, rollups.c.weighted_cents, rollups.c.duration_days
+    ).filter(
+        rollups.c.grain == grain,
+        rollups.c.metric.in_(list(metrics)),
+        rollups.c.period_start >= start,
+        rollups.c.period_start <= end
+    ).all()
+
+    series: Dict[Tuple[str, date], RollupTotals] = defaultdict(RollupTotals)
+    for metric, start_day, count, amount_cents, weighted_cents, duration_days in rows:
+        totals = series[(metric, start_day)]
+        totals.count += count
+        totals.amount_cents += amount_cents
+        totals.weighted_cents += weighted_cents
+        totals.duration_days += duration_days
+    return series
+
+
+def rollup_months(
+    db: Session,
+    metrics: Iterable[str],
+    start: date,
+    end: date
+) -> Dict[Tuple[str, date], RollupTotals]:
+    """
+    Per-month totals keyed by ``(metric, month_start)``, counting only days in [start, end].
+
+    Reads the same rows as ``rollup_totals``: month rows for full months
+    and day rows for partial months at either end, so a week that
+    crosses a month boundary gets two buckets holding just its own days.
+    """
+    rows = db.query(
+        rollups.c.metric, rollups.c.period_start, rollups.c.count,
+        rollups.c.amount_cents, rollups.c.weighted_cents, rollups.c.duration_days
+    ).filter(
+        rollups.c.metric.in_(list(metrics)),
+        _period_condition(start, end)
+    ).all()
+
+    months: Dict[Tuple[str, date], RollupTotals] = defaultdict(RollupTotals)
+    for metric, start_day, count, amount_cents, weighted_cents, duration_days in rows:
+        totals = months[(metric, start_day.replace(day=1))]
+        totals.count += count
+        totals.amount_cents += amount_cents
+        totals.weighted_cents += weighted_cents
+        totals.duration_days += duration_days
+    return months
+
+
+def rebuild_rollups(db: Session, batch_size: int = 1000) -> int:
+    """
+    Recompute every rollup row from the source tables.
+
+    Runs in one transaction, so readers see either the old or the new
+    totals. Returns the number of rollup rows written.
+    """
+    deltas = new_deltas()
+    for model, (_, contributions) in ROLLUP_SOURCES.items():
+        sources = 0
+        for obj in db.query(model).yield_per(batch_size):
+            accumulate(deltas, contributions(obj))
+            sources += 1
+        logger.info(f"Rolled up {sources} {model.__tablename__} rows")
+
+    connection = db.connection()
+    connection.execute(AnalyticsRollup.__table__.delete())
+    written = apply_rollup_deltas(connection, deltas)
+    db.commit()
+    return written
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Maintain analytics rollup tables")
+    parser.add_argument("command", choices=["rebuild"])
+    args = parser.parse_args(argv)
+
+    from ..core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            written = rebuild_rollups(db)
+            print(f"Rebuilt analytics rollups: {written} rows")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Per-project task dependency graph.
+
+A project's tasks and dependencies are loaded with two bulk queries and
+kept in the shared cache until a task or dependency in the project
+changes (``invalidate_task_graph``). A graph also holds the tasks in
+other projects that share a dependency with it, so changing a task
+drops the graphs of every project linked to it
+(``invalidate_task_graph_for_tasks``). Everything else runs in memory in
+O(V + E): cycle checks, topological order, unmet and blocked
+dependencies, and the critical path with per-task slack.
+
+Cached graphs are shared between requests; treat them as read-only.
+"""
+
+import uuid
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from ..core.cache import default_cache, invalidate_tags
+from ..db.business_models import ProjectTask, TaskDependencyModel
+
+
+TASK_GRAPH_TTL = 600
+COMPLETED_STATUS = "completed"
+
+task_table = ProjectTask.__table__
+dependency_table = TaskDependencyModel.__table__
+
+
+class DependencyCycleError(ValueError):
+    """The dependencies contain a cycle, so there is no valid order."""
+
+
+@dataclass
+class TaskNode:
+    id: uuid.UUID
+    title: str
+    status: str
+    project_id: Optional[uuid.UUID] = None
+    duration_hours: float = 0.0
+
+    @property
+    def is_completed(self) -> bool:
+        return self.status == COMPLETED_STATUS
+
+
+@dataclass(frozen=True)
+class DependencyEdge:
+    predecessor_id: uuid.UUID
+    task_id: uuid.UUID
+    dependency_type: str = "finish_to_start"
+    lag_hours: float = 0.0
+
+
+@dataclass
+class ScheduleEntry:
+    """Earliest/latest start and finish, in hours from the project start."""
+    earliest_start: float
+    earliest_finish: float
+    latest_start: float
+    latest_finish: float
+
+    @property
+    def slack(self) -> float:
+        return self.latest_start - self.earliest_start
+
+
+class TaskGraph:
+    """Tasks and their dependencies, indexed in both directions."""
+
+    def __init__(self, nodes: Iterable[TaskNode], edges: Iterable[DependencyEdge]):
+        self.nodes: Dict[uuid.UUID, TaskNode] = {node.id: node for node in nodes}
+        self.predecessors: Dict[uuid.UUID, List[DependencyEdge]] = defaultdict(list)
+        self.successors: Dict[uuid.UUID, List[DependencyEdge]] = defaultdict(list)
+        for edge in edges:
+            self.predecessors[edge.task_id].append(edge)
+            self.successors[edge.predecessor_id].append(edge)
+
+    def descendants(self, task_id: uuid.UUID) -> Set[uuid.UUID]:
+        """Every task that depends on ``task_id``, directly or transitively."""
+        seen: Set[uuid.UUID] = set()
+        stack = [task_id]
+        while stack:
+            for edge in self.successors.get(stack.pop(), ()):
+                if edge.task_id not in seen:
+                    seen.add(edge.task_id)
+                    stack.append(edge.task_id)
+        return seen
+
+    def would_create_cycle(self, task_id: uuid.UUID, predecessor_id: uuid.UUID) -> bool:
+        """Whether making ``task_id`` depend on ``predecessor_id`` closes a loop."""
+        return task_id == predecessor_id or predecessor_id in self.descendants(task_id)
+
+    def topological_order(self) -> List[uuid.UUID]:
+        """Tasks with every task after all of its predecessors."""
+        task_ids = set(self.nodes)
+        for edges in self.predecessors.values():
+            for edge in edges:
+                task_ids.update((edge.task_id, edge.predecessor_id))
+
+        pending = {task_id: len(self.predecessors.get(task_id, ())) for task_id in task_ids}
+        ready = deque(task_id for task_id in self.nodes if pending[task_id] == 0)
+        ready.extend(task_id for task_id in task_ids - set(self.nodes) if pending[task_id] == 0)
+
+        order = []
+        while ready:
+            task_id = ready.popleft()
+            order.append(task_id)
+            for edge in self.successors.get(task_id, ()):
+                pending[edge.task_id] -= 1
+                if pending[edge.task_id] == 0:
+                    ready.append(edge.task_id)
+
+        if len(order) != len(task_ids):
+            raise DependencyCycleError("Task dependencies contain a cycle")
+        return order
+
+    def unmet_dependencies(self, task_id: uuid.UUID) -> List[DependencyEdge]:
+        """Dependencies of ``task_id`` whose predecessor is not completed yet."""
+        return [
+            edge for edge in self.predecessors.get(task_id, ())
+            if edge.predecessor_id in self.nodes and not self.nodes[edge.predecessor_id].is_completed
+        ]
+
+    def blocked_tasks(self) -> Dict[uuid.UUID, Set[uuid.UUID]]:
+        """
+        Incomplete tasks that cannot start, mapped to what holds them up.
+
+        Blocking propagates down the chain: a task waiting on B, which is
+        itself waiting on A, is held up by both.
+        """
+        blocked: Dict[uuid.UUID, Set[uuid.UUID]] = {}
+        for task_id in self.topological_order():
+            node = self.nodes.get(task_id)
+            if node is None or node.is_completed:
+                continue
+            blockers: Set[uuid.UUID] = set()
+            for edge in self.unmet_dependencies(task_id):
+                blockers.add(edge.predecessor_id)
+                blockers |= blocked.get(edge.predecessor_id, set())
+            if blockers:
+                blocked[task_id] = blockers
+        return blocked
+
+    def schedule(self) -> Dict[uuid.UUID, ScheduleEntry]:
+        """
+        Critical path method over estimated durations and lags.
+
+        Each dependency type constrains a different pair of ends:
+        finish-to-start (the default) starts a task after its predecessor
+        finishes; start-to-start, finish-to-finish and start-to-finish
+        relate the named ends, each offset by ``lag_hours``.
+        """
+        order = self.topological_order()
+        duration = {
+            task_id: self.nodes[task_id].duration_hours if task_id in self.nodes else 0.0
+            for task_id in order
+        }
+
+        earliest: Dict[uuid.UUID, float] = {}
+        for task_id in order:
+            start = 0.0
+            for edge in self.predecessors.get(task_id, ()):
+                before_start = earliest[edge.predecessor_id]
+                before_finish = before_start + duration[edge.predecessor_id]
+                start = max(start, {
+                    "start_to_start": before_start + edge.lag_hours,
+                    "finish_to_finish": before_finish + edge.lag_hours - duration[task_id],
+                    "start_to_finish": before_start + edge.lag_hours - duration[task_id],
+                }.get(edge.dependency_type, before_finish + edge.lag_hours))
+            earliest[task_id] = start
+
+        project_finish = max((earliest[t] + duration[t] for t in order), default=0.0)
+
+        latest: Dict[uuid.UUID, float] = {}
+        for task_id in reversed(order):
+            finish = project_finish
+            for edge in self.successors.get(task_id, ()):
+                after_finish = latest[edge.task_id]
+                after_start = after_finish - duration[edge.task_id]
+                finish = min(finish, {
+                    "start_to_start": after_start - edge.lag_hours + duration[task_id],
+                    "finish_to_finish": after_finish - edge.lag_hours,
+                    "start_to_finish": after_finish - edge.lag_hours + duration[task_id],
+                }.get(edge.dependency_type, after_start - edge.lag_hours))
+            latest[task_id] = finish
+
+        return {
+            task_id: ScheduleEntry(
+                earliest_start=earliest[task_id],
+                earliest_finish=earliest[task_id] + duration[task_id],
+                latest_start=latest[task_id] - duration[task_id],
+                latest_finish=latest[task_id],
+            )
+            for task_id in order
+        }
+
+    def critical_path(self, schedule: Optional[Dict[uuid.UUID, ScheduleEntry]] = None) -> List[uuid.UUID]:
+        """Tasks with no slack, in schedule order."""
+        schedule = schedule or self.schedule()
+        critical = [task_id for task_id, entry in schedule.items() if abs(entry.slack) < 1e-9]
+        return sorted(critical, key=lambda task_id: schedule[task_id].earliest_start)
+
+
+def load_task_graph(db: Session, project_id: uuid.UUID) -> TaskGraph:
+    """
+    Load a project's graph in two queries.
+
+    Tasks in other projects that are linked by a dependency are included
+    so checks across the project boundary still see them.
+    """
+    project_tasks = select(task_table.c.id).where(task_table.c.project_id == project_id)
+
+    edges = [
+        DependencyEdge(row.predecessor_id, row.task_id, row.dependency_type or "finish_to_start", row.lag_hours or 0.0)
+        for row in db.execute(
+            select(
+                dependency_table.c.predecessor_id, dependency_table.c.task_id,
+                dependency_table.c.dependency_type, dependency_table.c.lag_hours
+            ).where(or_(
+                dependency_table.c.task_id.in_(project_tasks),
+                dependency_table.c.predecessor_id.in_(project_tasks)
+            ))
+        )
+    ]
+
+    linked = {edge.task_id for edge in edges} | {edge.predecessor_id for edge in edges}
+    node_filter = task_table.c.project_id == project_id
+    if linked:
+        node_filter = or_(node_filter, task_table.c.id.in_(linked))
+    nodes = [
+        TaskNode(row.id, row.title, row.status, row.project_id, row.estimated_hours or 0.0)
+        for row in db.execute(
+            select(
+                task_table.c.id, task_table.c.title, task_table.c.status,
+                task_table.c.project_id, task_table.c.estimated_hours
+            ).where(node_filter)
+        )
+    ]
+    return TaskGraph(nodes, edges)
+
+
+def _graph_tag(project_id: uuid.UUID) -> str:
+    return f"task_graph:{project_id}"
+
+
+async def get_task_graph(db: Session, project_id: uuid.UUID) -> TaskGraph:
+    """The project's graph from the cache, loading it on a miss."""
+    async def load():
+        return load_task_graph(db, project_id)
+
+    return await default_cache.get_or_compute(
+        f"task_graph:{project_id}", load, ttl=TASK_GRAPH_TTL, tags=[_graph_tag(project_id)]
+    )
+
+
+async def invalidate_task_graph(*project_ids: uuid.UUID):
+    """Drop cached graphs after tasks or dependencies in these projects change."""
+    tags = {_graph_tag(project_id) for project_id in project_ids if project_id is not None}
+    if tags:
+        await invalidate_tags(*tags)
+
+
+def linked_project_ids(db: Session, task_ids: Iterable[uuid.UUID]) -> Set[uuid.UUID]:
+    """Projects of these tasks and of every task sharing a dependency with them."""
+    task_ids = list(task_ids)
+    if not task_ids:
+        return set()
+    neighbours = select(dependency_table.c.predecessor_id).where(
+        dependency_table.c.task_id.in_(task_ids)
+    ).union(
+        select(dependency_table.c.task_id).where(dependency_table.c.predecessor_id.in_(task_ids))
+    )
+    rows = db.execute(
+        select(task_table.c.project_id).distinct().where(or_(
+            task_table.c.id.in_(task_ids), task_table.c.id.in_(neighbours)
+        ))
+    ).scalars()
+    return {project_id for project_id in rows if project_id is not None}
+
+
+async def invalidate_task_graph_for_tasks(db: Session, *task_ids: uuid.UUID):
+    """Drop the cached graphs that include these tasks, after they or their dependencies change."""
+    await invalidate_task_graph(*linked_project_ids(db, task_ids))
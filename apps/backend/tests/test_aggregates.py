@@ -0,0 +1,103 @@
+"""
+Tests for single-pass dashboard aggregates.
+"""
+
+import enum
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, String, create_engine, event
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from ..core.aggregates import (
+    aggregate, avg_where, count_by, count_where, seconds_between, sum_where
+)
+
+
+Base = declarative_base()
+
+
+class Priority(enum.Enum):
+    LOW = "low"
+    HIGH = "high"
+    CRITICAL = "critical"
+
+
+class Row(Base):
+    __tablename__ = "aggregate_rows"
+
+    id = Column(Integer, primary_key=True)
+    status = Column(String(20), nullable=False)
+    priority = Column(String(20), nullable=False)
+    amount = Column(Integer, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    start = datetime(2024, 1, 1)
+    session.add_all([
+        Row(id=1, status="done", priority="high", amount=100,
+            started_at=start, finished_at=start + timedelta(hours=2)),
+        Row(id=2, status="done", priority="low", amount=50,
+            started_at=start, finished_at=start + timedelta(hours=4)),
+        Row(id=3, status="open", priority="high", amount=25),
+        Row(id=4, status="open", priority="high", amount=10),
+    ])
+    session.commit()
+    session.statements = []
+    event.listen(
+        engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: session.statements.append(statement)
+    )
+    yield session
+    session.close()
+
+
+class TestAggregate:
+    """Test that nested breakdowns come back from one SELECT."""
+
+    def test_dashboard_in_one_query(self, db):
+        done = Row.status == "done"
+        hours = seconds_between(Row.started_at, Row.finished_at, "sqlite") / 3600
+
+        result = aggregate(db.query(Row), {
+            "total": count_where(),
+            "done": count_where(done),
+            "revenue": sum_where(Row.amount, done),
+            "avg_hours": avg_where(hours, done),
+            "by_priority": count_by(Row.priority, Priority),
+            "alerts": {"open_high": count_where(Row.status == "open", Row.priority == "high")},
+        })
+
+        assert len(db.statements) == 1
+        assert result["total"] == 4
+        assert result["done"] == 2
+        assert result["revenue"] == 150
+        assert result["avg_hours"] == pytest.approx(3)
+        assert result["by_priority"] == {"low": 1, "high": 3, "critical": 0}
+        assert result["alerts"] == {"open_high": 2}
+
+    def test_query_filters_apply_to_every_expression(self, db):
+        result = aggregate(db.query(Row).filter(Row.priority == "high"), {
+            "total": count_where(),
+            "by_status": count_by(Row.status, ["done", "open"]),
+        })
+
+        assert result == {"total": 3, "by_status": {"done": 1, "open": 2}}
+
+    def test_empty_sums_are_zero_and_averages_null(self, db):
+        result = aggregate(db.query(Row).filter(Row.id > 100), {
+            "revenue": sum_where(Row.amount),
+            "avg_amount": avg_where(Row.amount),
+        })
+
+        assert result == {"revenue": 0, "avg_amount": None}
+
+    def test_unsupported_dialect_is_rejected(self):
+        with pytest.raises(ValueError):
+            seconds_between(Row.started_at, Row.finished_at, "mssql")
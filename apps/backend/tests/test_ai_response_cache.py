@@ -0,0 +1,137 @@
+"""
+Tests for the exact and semantic AI response cache.
+"""
+
+from types import SimpleNamespace
+
+from ..core.cache import Cache
+from ..services.ai_response_cache import AIResponseCache, tenant_scope
+
+
+# Prompts map to fixed embeddings; "near" is almost parallel to "base"
+EMBEDDINGS = {
+    "summarize: base": [1.0, 0.0, 0.0],
+    "summarize: near": [0.99, 0.05, 0.0],
+    "summarize: far": [0.0, 1.0, 0.0],
+    "extract: invoice 1001, total $500": [1.0, 0.0, 1.0],
+    "extract: invoice 1002, total $900": [1.0, 0.01, 1.0],
+}
+
+
+async def embed(text):
+    return EMBEDDINGS.get(text)
+
+
+class Model:
+    def __init__(self):
+        self.calls = []
+
+    async def generate(self, prompt):
+        self.calls.append(prompt)
+        return f"answer {len(self.calls)}"
+
+
+def response_cache(**kwargs):
+    kwargs.setdefault("embed", embed)
+    return AIResponseCache(cache=Cache(), threshold=0.95, **kwargs)
+
+
+async def ask(cache, model, prompt, scope="tenant:a", temperature=0.0, semantic=True, **params):
+    return await cache.get_or_generate(
+        scope, "claude", prompt, lambda: model.generate(prompt),
+        temperature=temperature, semantic=semantic, **params
+    )
+
+
+class TestAIResponseCache:
+    async def test_exact_hit(self):
+        cache, model = response_cache(), Model()
+        assert await ask(cache, model, "summarize: base") == "answer 1"
+        assert await ask(cache, model, "summarize: base") == "answer 1"
+        assert len(model.calls) == 1
+        assert cache.stats()["exact_hits"] == 1
+        assert cache.stats()["hit_rate"] == 0.5
+
+    async def test_semantic_hit_above_threshold_only(self):
+        cache, model = response_cache(), Model()
+        await ask(cache, model, "summarize: base")
+
+        assert await ask(cache, model, "summarize: near") == "answer 1"
+        assert await ask(cache, model, "summarize: far") == "answer 2"
+        assert cache.stats()["semantic_hits"] == 1
+
+    async def test_exact_only_never_shares_near_identical_documents(self):
+        cache, model = response_cache(), Model()
+        first = await ask(cache, model, "extract: invoice 1001, total $500", semantic=False)
+        second = await ask(cache, model, "extract: invoice 1002, total $900", semantic=False)
+
+        assert (first, second) == ("answer 1", "answer 2")
+        assert cache.stats()["semantic_hits"] == 0
+        # Repeats of the same document still hit exactly
+        assert await ask(cache, model, "extract: invoice 1002, total $900", semantic=False) == "answer 2"
+
+    async def test_semantic_hits_are_opt_in(self):
+        cache, model = response_cache(), Model()
+        await cache.get_or_generate("tenant:a", "claude", "summarize: base", lambda: model.generate("x"), 0.0)
+        await cache.get_or_generate("tenant:a", "claude", "summarize: near", lambda: model.generate("y"), 0.0)
+        assert len(model.calls) == 2
+
+    async def test_params_are_part_of_the_key(self):
+        cache, model = response_cache(), Model()
+        await ask(cache, model, "summarize: base", max_tokens=100)
+        assert await ask(cache, model, "summarize: base", max_tokens=200) == "answer 2"
+        # Same prompt embedding, but a different params signature
+        assert await ask(cache, model, "summarize: near", max_tokens=200) == "answer 2"
+        assert len(model.calls) == 2
+
+    async def test_high_temperature_bypasses_the_cache(self):
+        cache, model = response_cache(), Model()
+        await ask(cache, model, "summarize: base", temperature=0.7)
+        await ask(cache, model, "summarize: base", temperature=0.7)
+        assert len(model.calls) == 2
+        assert cache.stats()["bypassed"] == 2
+
+    async def test_tenants_are_isolated(self):
+        cache, model = response_cache(), Model()
+        await ask(cache, model, "summarize: base", scope="tenant:a")
+        assert await ask(cache, model, "summarize: base", scope="tenant:b") == "answer 2"
+        assert await ask(cache, model, "summarize: near", scope="tenant:b") == "answer 2"
+
+        await cache.clear_scope("tenant:a")
+        assert await ask(cache, model, "summarize: base", scope="tenant:a") == "answer 3"
+
+    async def test_size_limits(self):
+        cache = response_cache(max_entries=2, max_response_chars=8, max_prompt_chars=20)
+        model = Model()
+        for prompt in ("summarize: base", "summarize: far", "summarize: x"):
+            await ask(cache, model, prompt)
+        # The oldest entry was evicted, from both tiers
+        assert await ask(cache, model, "summarize: base") == "answer 4"
+        assert await ask(cache, model, "summarize: near") == "answer 4"
+        assert cache.stats()["evicted"] >= 1
+
+        await ask(cache, model, "summarize: " + "x" * 20)
+        assert cache.stats()["bypassed"] == 1
+
+        model.generate = lambda prompt: _long_answer()
+        await ask(cache, model, "summarize: long")
+        assert cache.stats()["not_stored"] == 1
+
+    async def test_embedding_failure_falls_back_to_exact_only(self):
+        async def broken(text):
+            raise RuntimeError("no embeddings configured")
+
+        cache, model = response_cache(embed=broken), Model()
+        await ask(cache, model, "summarize: base")
+        assert await ask(cache, model, "summarize: base") == "answer 1"
+        assert await ask(cache, model, "summarize: near") == "answer 2"
+
+
+async def _long_answer():
+    return "a much longer answer"
+
+
+def test_tenant_scope():
+    assert tenant_scope(SimpleNamespace(id=1, tenant_id=7, team_id=3)) == "tenant:7"
+    assert tenant_scope(SimpleNamespace(id=1, team_id=3)) == "team:3"
+    assert tenant_scope(SimpleNamespace(id=1, team_id=None)) == "user:1"
@@ -74,14 +74,13 @@ class TestChatEndpoints:
         assert data["message"] == "Hello! How can I help you?"
         assert data["model_used"] == "claude"
     
-    @patch('apps.backend.memory.vector_store.VectorStore')
-    def test_list_chat_sessions(self, mock_vector_store, client, ai_auth_headers):
+    @patch('apps.backend.routes.ai_services.conversation_store')
+    def test_list_chat_sessions(self, mock_store, client, ai_auth_headers):
         """Test listing chat sessions."""
-        mock_store = mock_vector_store.return_value
-        mock_store.get_user_sessions = AsyncMock(return_value=[
+        mock_store.sessions = AsyncMock(return_value=[
             {
                 "id": "session1",
-                "title": "Test Chat",
+                "title": "Project Discussion",
                 "model": "claude",
                 "created_at": datetime.utcnow(),
                 "updated_at": datetime.utcnow(),
@@ -99,23 +98,13 @@ class TestChatEndpoints:
         assert len(sessions) >= 1  # At least one session
         assert any(s["title"] == "Project Discussion" for s in sessions)
     
-    @patch('apps.backend.memory.vector_store.VectorStore')
-    def test_get_chat_session(self, mock_vector_store, client, ai_auth_headers):
+    @patch('apps.backend.routes.ai_services.conversation_store')
+    def test_get_chat_session(self, mock_store, client, ai_auth_headers):
         """Test getting chat session history."""
-        mock_store = mock_vector_store.return_value
-        mock_messages = [
-            type('Message', (), {
-                'role': 'user',
-                'content': 'Hello',
-                'timestamp': datetime.utcnow()
-            }),
-            type('Message', (), {
-                'role': 'assistant',
-                'content': 'Hi there!',
-                'timestamp': datetime.utcnow()
-            })
-        ]
-        mock_store.get_chat_history = AsyncMock(return_value=mock_messages)
+        mock_store.messages = AsyncMock(return_value=[
+            {"seq": 1, "role": "user", "content": "Hello", "timestamp": datetime.utcnow().isoformat()},
+            {"seq": 2, "role": "assistant", "content": "Hi there!", "timestamp": datetime.utcnow().isoformat()}
+        ])
         
         response = client.get(
             "/api/v1/ai/chat/sessions/session1",
@@ -0,0 +1,214 @@
+"""
+Tests for token accounting and in-memory AI quotas.
+"""
+
+import asyncio
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from ..core.llm_gateway import GatewayModel, LLMGateway
+from ..db.business_models import AIUsageLog, Subscription
+from ..services.ai_usage import (
+    AIUsageTracker,
+    DatabaseUsageSink,
+    QuotaExceededError,
+    UsageSink,
+)
+
+
+class MemorySink(UsageSink):
+    def __init__(self, limits=None):
+        self.limits = limits or {}
+        self.loads = 0
+        self.writes = []
+
+    def load(self, user_id):
+        self.loads += 1
+        return self.limits.get(user_id)
+
+    def write(self, rows, requests):
+        self.writes.append((rows, requests))
+        for user_id, count in requests.items():
+            limit, used = self.limits[user_id]
+            self.limits[user_id] = (limit, used + count)
+
+
+USER = str(uuid.uuid4())
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Subscription.__table__.create(engine)
+    AIUsageLog.__table__.create(engine)
+    return engine
+
+
+def subscribe(engine, user_id, limit, used=0):
+    with engine.begin() as conn:
+        conn.execute(Subscription.__table__.insert().values(
+            id=uuid.uuid4(), user_id=uuid.UUID(user_id), monthly_ai_requests=limit,
+            used_ai_requests=used, created_at=datetime.utcnow()
+        ))
+
+
+class TestQuota:
+    async def test_reserve_stops_at_the_limit(self):
+        tracker = AIUsageTracker(MemorySink({USER: (3, 1)}))
+        await tracker.reserve(USER, "/chat", "chat")
+        await tracker.reserve(USER, "/chat", "chat")
+        with pytest.raises(QuotaExceededError):
+            await tracker.reserve(USER, "/chat", "chat")
+        assert tracker.usage(USER) == {"limit": 3, "used": 3, "reserved": 2}
+
+    async def test_concurrent_reservations_never_overshoot(self):
+        sink = MemorySink({USER: (10, 0)})
+        tracker = AIUsageTracker(sink)
+        results = await asyncio.gather(
+            *(tracker.reserve(USER, "/chat", "chat") for _ in range(50)), return_exceptions=True
+        )
+        assert sum(not isinstance(r, Exception) for r in results) == 10
+        assert sink.loads == 1
+
+    async def test_users_without_a_subscription_are_not_limited(self):
+        tracker = AIUsageTracker(MemorySink())
+        for _ in range(5):
+            await tracker.reserve(USER, "/chat", "chat")
+        assert tracker.usage(USER)["limit"] is None
+
+    async def test_release_and_expiry_hand_requests_back(self):
+        tracker = AIUsageTracker(MemorySink({USER: (1, 0)}), reservation_ttl=0.01)
+        reservation = await tracker.reserve(USER, "/chat", "chat")
+        tracker.release(reservation)
+        tracker.release(reservation)
+        assert tracker.usage(USER)["used"] == 0
+
+        await tracker.reserve(USER, "/chat", "chat")
+        await asyncio.sleep(0.02)
+        await tracker.flush()
+        assert tracker.stats()["expired"] == 1
+        await tracker.reserve(USER, "/chat", "chat")
+
+    async def test_streams_outliving_their_reservation_are_still_charged(self):
+        sink = MemorySink({USER: (5, 0)})
+        tracker = AIUsageTracker(sink, reservation_ttl=0.01)
+        reservation = await tracker.reserve(USER, "/chat", "chat")
+        await asyncio.sleep(0.02)
+        await tracker.flush()
+        assert tracker.usage(USER)["used"] == 0
+
+        tracker.commit(reservation, "gpt-4", "openai", 100, 900)
+        tracker.commit(reservation, "gpt-4", "openai", 100, 900)
+        assert tracker.usage(USER) == {"limit": 5, "used": 1, "reserved": 0}
+        await tracker.flush()
+        assert [len(rows) for rows, _ in sink.writes] == [1]
+        assert sink.limits[USER] == (5, 1)
+        assert tracker.stats()["late_commits"] == 1
+
+    async def test_refresh_picks_up_flushed_usage_from_other_workers(self):
+        sink = MemorySink({USER: (5, 0)})
+        tracker = AIUsageTracker(sink, refresh_interval=0.01)
+        await tracker.reserve(USER, "/chat", "chat")
+        sink.limits[USER] = (5, 3)
+        await asyncio.sleep(0.02)
+        await tracker.reserve(USER, "/chat", "chat")
+        assert tracker.usage(USER) == {"limit": 5, "used": 5, "reserved": 2}
+        with pytest.raises(QuotaExceededError):
+            await tracker.reserve(USER, "/chat", "chat")
+
+
+class TestCommit:
+    async def test_reported_tokens_replace_the_count(self):
+        sink = MemorySink({USER: (10, 0)})
+        tracker = AIUsageTracker(sink)
+        counted = await tracker.reserve(USER, "/chat", "chat")
+        reported = await tracker.reserve(USER, "/chat", "chat")
+        tracker.commit(counted, "Claude", "anthropic", input_tokens=10, output_tokens=5)
+        tracker.commit(reported, "Claude", "anthropic", input_tokens=10, output_tokens=5, reported_tokens=40)
+        await tracker.flush()
+
+        (rows, requests), = sink.writes
+        assert [r["total_tokens"] for r in rows] == [15, 40]
+        assert rows[1]["input_tokens"] == 35 and rows[1]["meta_data"]["tokens_reported"]
+        assert requests == {USER: 2}
+        assert tracker.usage(USER) == {"limit": 10, "used": 2, "reserved": 0}
+
+    async def test_failed_writes_are_retried(self):
+        sink = MemorySink({USER: (10, 0)})
+        tracker = AIUsageTracker(sink)
+        reservation = await tracker.reserve(USER, "/chat", "chat")
+        tracker.commit(reservation, "Claude", "anthropic", 1, 1)
+
+        write, sink.write = sink.write, None
+        await tracker.flush()
+        assert tracker.stats()["write_errors"] == 1
+        sink.write = write
+        await tracker.flush()
+        assert len(sink.writes) == 1 and sink.limits[USER] == (10, 1)
+
+    async def test_batches_reach_the_database(self, engine):
+        user_id = str(uuid.uuid4())
+        subscribe(engine, user_id, limit=100, used=7)
+        tracker = AIUsageTracker(DatabaseUsageSink(sessionmaker(bind=engine)), batch_size=10)
+        for _ in range(25):
+            reservation = await tracker.reserve(user_id, "/analyze/text", "analysis")
+            tracker.commit(reservation, "GPT-4", "openai", 3, 4)
+        await tracker.stop()
+
+        with engine.connect() as conn:
+            used = conn.execute(select(Subscription.__table__.c.used_ai_requests)).scalar()
+            logged = conn.execute(select(AIUsageLog.__table__.c.total_tokens)).scalars().all()
+        assert used == 32
+        assert logged == [7] * 25
+        assert tracker.usage(user_id)["used"] == 32
+
+
+async def test_gateway_model_reports_provider_usage():
+    llm = LLMGateway()
+
+    class Agent:
+        name = "claude"
+
+        async def generate(self, prompt, temperature=0.7, max_tokens=None):
+            # Agents call the gateway themselves, with the provider's usage
+            for used in (11, 31):
+                await llm.call("claude", lambda model: asyncio.sleep(0, result=used), usage=lambda r: r)
+            return "reply"
+
+    class Quiet(Agent):
+        async def generate(self, prompt, temperature=0.7, max_tokens=None):
+            return "reply"
+
+    model = GatewayModel("claude", {"claude": Agent(), "gpt": Quiet()}, llm)
+    assert await model.generate("hi") == "reply"
+    assert model.reported_tokens == 42 and model.served_model == "claude"
+
+    quiet = GatewayModel("gpt", {"claude": Agent(), "gpt": Quiet()}, llm)
+    await quiet.generate("hi")
+    assert quiet.reported_tokens is None
+
+
+async def test_quota_check_takes_microseconds():
+    users = [str(uuid.uuid4()) for _ in range(1000)]
+    tracker = AIUsageTracker(MemorySink({user: (10**9, 0) for user in users}))
+    for user in users:
+        await tracker.reserve(user, "/chat", "chat")
+
+    timings = []
+    for i in range(20_000):
+        start = time.perf_counter()
+        reservation = await tracker.reserve(users[i % len(users)], "/chat", "chat")
+        timings.append(time.perf_counter() - start)
+        tracker.release(reservation)
+
+    p95 = statistics.quantiles(timings, n=20)[-1]
+    assert p95 < 100e-6, f"p95 quota check {p95 * 1e6:.1f}us"
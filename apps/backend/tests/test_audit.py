@@ -0,0 +1,140 @@
+"""
+Tests for the batched audit pipeline.
+"""
+
+import asyncio
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from ..core import audit
+from ..core.audit import AuditPipeline, AuditSink, DatabaseAuditSink, JsonlAuditSink, audit_log
+from ..db.models import AuditEvent, Base
+
+
+class MemorySink(AuditSink):
+    def __init__(self):
+        self.batches = []
+
+    def write(self, entries):
+        self.batches.append(list(entries))
+
+    @property
+    def entries(self):
+        return [entry for batch in self.batches for entry in batch]
+
+
+@pytest.fixture
+def install(monkeypatch):
+    def install(sink, **kwargs):
+        pipeline = AuditPipeline(sink, **kwargs)
+        monkeypatch.setattr(audit, "audit_pipeline", pipeline)
+        return pipeline
+    return install
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    Base.metadata.create_all(engine, tables=[AuditEvent.__table__])
+    return sessionmaker(bind=engine)
+
+
+class TestAuditPipeline:
+    """Test queueing, aggregation and flushing."""
+
+    async def test_access_granted_is_aggregated(self, install, session_factory):
+        pipeline = install(DatabaseAuditSink(session_factory))
+        user_id = uuid.uuid4()
+        for _ in range(100):
+            await audit_log(user_id, "access_granted", "permission", details={"permission": "jobs.read"})
+        await audit_log(user_id, "access_granted", "permission", details={"permission": "crm.read"})
+        await audit_log(
+            user_id, "access_denied", "permission",
+            details={"permission": "finance.write", "context": {"timestamp": datetime(2024, 1, 1)}}
+        )
+
+        assert pipeline.stats()["queued"] == 1
+        await pipeline.flush()
+
+        db = session_factory()
+        rows = {
+            (row.action, row.details["permission"]): row
+            for row in db.execute(select(AuditEvent)).scalars()
+        }
+        assert rows[("access_granted", "jobs.read")].count == 100
+        assert rows[("access_granted", "crm.read")].count == 1
+        denied = rows[("access_denied", "finance.write")]
+        assert denied.user_id == user_id
+        assert denied.details["context"]["timestamp"] == "2024-01-01 00:00:00"
+        assert pipeline.written == 3
+        db.close()
+
+    async def test_full_queue_drops_instead_of_blocking(self, install):
+        pipeline = install(MemorySink(), max_queue=3)
+        for i in range(5):
+            await audit_log(None, "task_updated", "task", resource_id=str(i))
+
+        stats = pipeline.stats()
+        assert stats["queued"] == 3
+        assert stats["dropped"] == 2
+        assert stats["high_water"] == 3
+
+    async def test_full_batch_is_written_before_the_interval(self, install):
+        sink = MemorySink()
+        pipeline = install(sink, batch_size=5, flush_interval=60)
+        pipeline.start()
+        for i in range(12):
+            await audit_log(None, "task_updated", "task", resource_id=str(i))
+        await asyncio.sleep(0.05)
+
+        assert [len(batch) for batch in sink.batches] == [5, 5]
+
+        await pipeline.stop()
+        assert [entry["resource_id"] for entry in sink.entries] == [str(i) for i in range(12)]
+        assert pipeline.stats()["queued"] == 0
+
+    async def test_interval_flush_writes_partial_batches(self, install):
+        sink = MemorySink()
+        pipeline = install(sink, batch_size=100, flush_interval=0.02)
+        pipeline.start()
+        await audit_log(None, "task_created", "task")
+        await audit_log(None, "access_granted", "permission")
+        await asyncio.sleep(0.1)
+
+        assert len(sink.entries) == 2
+        await pipeline.stop()
+
+    async def test_failed_writes_are_counted(self, install):
+        class BrokenSink(AuditSink):
+            def write(self, entries):
+                raise OSError("disk full")
+
+        pipeline = install(BrokenSink())
+        await audit_log(None, "task_created", "task")
+        await pipeline.flush()
+
+        assert pipeline.write_errors == 1
+        assert pipeline.dropped == 1
+
+
+class TestJsonlAuditSink:
+    """Test the rotating file sink."""
+
+    def test_files_rotate_by_size(self, tmp_path):
+        sink = JsonlAuditSink(str(tmp_path), max_bytes=200)
+        for i in range(5):
+            sink.write([{"id": i, "details": {"padding": "x" * 100}}])
+
+        files = sorted(path.name for path in tmp_path.iterdir())
+        assert len(files) > 1
+        ids = sorted(
+            json.loads(line)["id"]
+            for path in tmp_path.iterdir()
+            for line in path.read_text().splitlines()
+        )
+        assert ids == list(range(5))
@@ -0,0 +1,202 @@
+"""
+Tests for the verified-principal cache and batched auth activity writes.
+"""
+
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from ..core import auth
+from ..core.auth import (
+    ActivityRecorder, PrincipalCache, create_access_token, get_current_user,
+    get_password_hash, invalidate_user_tokens
+)
+from ..db.business_models import APIKey, User, UserSession
+from ..db.models import Base
+
+
+API_KEY = "brainops_testkey_0123456789abcdef"
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'auth.db'}")
+    Base.metadata.create_all(
+        engine, tables=[User.__table__, APIKey.__table__, UserSession.__table__]
+    )
+    engine.statements = []
+    event.listen(
+        engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: engine.statements.append(statement)
+    )
+    factory = sessionmaker(bind=engine)
+    factory.engine = engine
+    return factory
+
+
+@pytest.fixture
+def recorder(monkeypatch, session_factory):
+    recorder = ActivityRecorder(interval=3600, session_factory=session_factory)
+    monkeypatch.setattr(auth, "principal_cache", PrincipalCache(ttl=30))
+    monkeypatch.setattr(auth, "activity_recorder", recorder)
+    return recorder
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def user(db):
+    user = User(id=uuid.uuid4(), email="crew@example.com", hashed_password="x", is_active=True)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def bearer(token):
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+class TestPrincipalCache:
+    """Test cached JWT and API key authentication."""
+
+    async def test_cached_token_skips_the_database(self, recorder, session_factory, db, user):
+        token = create_access_token({"sub": user.email})
+        await get_current_user(bearer(token), db)
+
+        session_factory.engine.statements.clear()
+        fresh = session_factory()
+        cached = await get_current_user(bearer(token), fresh)
+
+        assert session_factory.engine.statements == []
+        assert cached.id == user.id and cached.email == user.email
+        assert cached in fresh
+        # Relationships still lazy-load through the request's session
+        assert cached.api_keys == []
+        assert auth.principal_cache.hits == 1
+        fresh.close()
+
+    async def test_user_update_revokes_cached_principal(self, recorder, db, user):
+        token = create_access_token({"sub": user.email})
+        await get_current_user(bearer(token), db)
+
+        user.is_active = False
+        db.commit()
+
+        assert len(auth.principal_cache) == 0
+        with pytest.raises(HTTPException) as error:
+            await get_current_user(bearer(token), db)
+        assert error.value.detail == "User account is disabled"
+
+    async def test_cache_entry_expires_with_the_token(self, recorder, db, user):
+        token = create_access_token({"sub": user.email}, expires_delta=timedelta(seconds=1))
+        await get_current_user(bearer(token), db)
+
+        principal = next(iter(auth.principal_cache._entries.values()))
+        assert principal.expires_at <= time.time() + 1
+
+    async def test_api_key_is_verified_once(self, recorder, monkeypatch, db, user):
+        key = APIKey(
+            user_id=user.id, name="integration", prefix=API_KEY[:12],
+            key_hash=get_password_hash(API_KEY), usage_count=0
+        )
+        db.add(key)
+        db.commit()
+
+        verifications = []
+        original = auth.verify_password
+        monkeypatch.setattr(
+            auth, "verify_password", lambda *args: verifications.append(1) or original(*args)
+        )
+
+        for _ in range(3):
+            assert (await get_current_user(bearer(API_KEY), db)).id == user.id
+        assert len(verifications) == 1
+
+        assert recorder.flush() == 1
+        db.refresh(key)
+        assert key.usage_count == 3
+        assert key.last_used_at is not None
+
+    async def test_deactivated_api_key_is_rejected(self, recorder, db, user):
+        key = APIKey(
+            user_id=user.id, name="integration", prefix=API_KEY[:12],
+            key_hash=get_password_hash(API_KEY), usage_count=0
+        )
+        db.add(key)
+        db.commit()
+        await get_current_user(bearer(API_KEY), db)
+
+        key.is_active = False
+        db.commit()
+
+        with pytest.raises(HTTPException) as error:
+            await get_current_user(bearer(API_KEY), db)
+        assert error.value.detail == "Invalid API key"
+
+    async def test_bulk_session_invalidation_revokes(self, recorder, db, user):
+        token = create_access_token({"sub": user.email})
+        await get_current_user(bearer(token), db)
+
+        invalidate_user_tokens(user, db)
+        assert len(auth.principal_cache) == 0
+
+
+class TestActivityRecorder:
+    """Test debounced last-activity and usage writes."""
+
+    async def test_session_activity_is_batched(self, recorder, session_factory, db, user):
+        active = UserSession(
+            user_id=user.id, refresh_token_hash="a", expires_at=datetime.utcnow() + timedelta(days=1),
+            last_activity=datetime(2020, 1, 1)
+        )
+        revoked = UserSession(
+            user_id=user.id, refresh_token_hash="b", expires_at=datetime.utcnow() + timedelta(days=1),
+            last_activity=datetime(2020, 1, 1), is_active=False
+        )
+        db.add_all([active, revoked])
+        db.commit()
+
+        token = create_access_token({"sub": user.email, "session_id": str(active.id)})
+        revoked_token = create_access_token({"sub": user.email, "session_id": str(revoked.id)})
+        session_factory.engine.statements.clear()
+        for _ in range(5):
+            await get_current_user(bearer(token), db)
+        await get_current_user(bearer(revoked_token), db)
+
+        assert not any(s.startswith("UPDATE") for s in session_factory.engine.statements)
+        assert recorder.pending == 2
+        recorder.flush()
+
+        db.expire_all()
+        assert active.last_activity > datetime(2020, 1, 1)
+        assert revoked.last_activity == datetime(2020, 1, 1)
+
+    def test_failed_flush_keeps_usage_counts(self, session_factory):
+        def broken_session():
+            session = session_factory()
+            session.execute = lambda *args, **kwargs: (_ for _ in ()).throw(RuntimeError("db down"))
+            return session
+
+        recorder = ActivityRecorder(interval=3600, session_factory=broken_session)
+        recorder.record_api_key_use("key-1")
+        recorder.record_api_key_use("key-1")
+
+        assert recorder.flush() == 0
+        assert recorder._api_keys["key-1"][0] == 2
+
+    def test_flushes_inline_without_background_task(self, session_factory):
+        recorder = ActivityRecorder(interval=0, session_factory=session_factory)
+        recorder.record_api_key_use(str(uuid.uuid4()))
+
+        assert recorder.pending == 0
@@ -0,0 +1,307 @@
+"""
+Tests for the tiered cache backend.
+"""
+
+import asyncio
+import time
+
+from ..core.cache import (
+    Cache, CacheEntry, MemoryCacheBackend, RedisCacheBackend, cache_key_builder,
+    cache_result, entity_tags, invalidate_tags, _generate_cache_key
+)
+from ..core.local_redis import LocalRedis
+
+
+class TestMemoryCacheBackend:
+    """Test the bounded in-process LRU tier."""
+
+    async def test_lru_eviction_by_entry_count(self):
+        backend = MemoryCacheBackend(max_entries=2, max_bytes=1024 * 1024)
+        expires_at = time.time() + 60
+
+        await backend.set_entry("a", CacheEntry(1, expires_at))
+        await backend.set_entry("b", CacheEntry(2, expires_at))
+        # Touch "a" so "b" becomes least recently used
+        assert (await backend.get_entry("a")).value == 1
+        await backend.set_entry("c", CacheEntry(3, expires_at))
+
+        assert await backend.get_entry("b") is None
+        assert (await backend.get_entry("a")).value == 1
+        assert (await backend.get_entry("c")).value == 3
+        assert backend.evictions == 1
+
+    async def test_eviction_by_byte_limit(self):
+        backend = MemoryCacheBackend(max_entries=100, max_bytes=3000)
+        expires_at = time.time() + 60
+
+        for i in range(5):
+            await backend.set_entry(f"k{i}", CacheEntry("x" * 1000, expires_at))
+
+        assert backend.size_bytes <= 3000
+        assert len(backend) < 5
+        assert await backend.get_entry("k4") is not None
+
+    async def test_oversized_value_is_not_cached(self):
+        backend = MemoryCacheBackend(max_entries=10, max_bytes=100)
+        await backend.set_entry("big", CacheEntry("x" * 1000, time.time() + 60))
+        assert await backend.get_entry("big") is None
+        assert backend.size_bytes == 0
+
+    async def test_sweep_expired(self):
+        backend = MemoryCacheBackend()
+        await backend.set_entry("old", CacheEntry(1, time.time() - 1))
+        await backend.set_entry("new", CacheEntry(2, time.time() + 60))
+
+        assert backend.sweep_expired() == 1
+        assert len(backend) == 1
+
+
+class TestTieredCache:
+    """Test the local + shared cache facade."""
+
+    async def test_get_set_delete(self):
+        cache_instance = Cache(local=MemoryCacheBackend())
+
+        await cache_instance.set("key", {"data": "value"}, ttl=60)
+        assert await cache_instance.get("key") == {"data": "value"}
+
+        await cache_instance.delete("key")
+        assert await cache_instance.get("key") is None
+
+    async def test_shared_tier_is_visible_across_instances(self):
+        shared = RedisCacheBackend(LocalRedis())
+        worker_a = Cache(local=MemoryCacheBackend(), shared=shared)
+        worker_b = Cache(local=MemoryCacheBackend(), shared=shared)
+
+        await worker_a.set("dashboard", {"total": 42}, ttl=60)
+
+        assert await worker_b.get("dashboard") == {"total": 42}
+        # Promoted into worker B's local tier
+        assert len(worker_b.local) == 1
+
+    async def test_invalidate_pattern(self):
+        cache_instance = Cache(
+            local=MemoryCacheBackend(), shared=RedisCacheBackend(LocalRedis())
+        )
+        await cache_instance.set("user:123:profile", {"name": "Test"})
+        await cache_instance.set("user:123:settings", {"theme": "dark"})
+        await cache_instance.set("user:456:profile", {"name": "Other"})
+
+        assert await cache_instance.invalidate_pattern("user:123:*") == 2
+        assert await cache_instance.get("user:123:profile") is None
+        assert await cache_instance.get("user:456:profile") is not None
+
+    async def test_shared_tier_failure_is_a_miss(self):
+        class BrokenRedis(LocalRedis):
+            async def get(self, name):
+                raise ConnectionError("Redis connection failed")
+
+        cache_instance = Cache(
+            local=MemoryCacheBackend(), shared=RedisCacheBackend(BrokenRedis())
+        )
+        assert await cache_instance.get("missing") is None
+        assert cache_instance.shared_errors == 1
+
+    async def test_corrupted_shared_entry_is_discarded(self):
+        client = LocalRedis()
+        shared = RedisCacheBackend(client)
+        await client.set(shared._key("bad"), b"corrupted{data}")
+
+        cache_instance = Cache(local=MemoryCacheBackend(), shared=shared)
+        assert await cache_instance.get("bad") is None
+        assert await client.get(shared._key("bad")) is None
+
+    async def test_sweeper_lifecycle(self):
+        cache_instance = Cache(local=MemoryCacheBackend())
+        await cache_instance.local.set_entry("old", CacheEntry(1, time.time() - 1))
+
+        cache_instance.start_sweeper(interval=0.01)
+        await asyncio.sleep(0.05)
+        await cache_instance.stop_sweeper()
+
+        assert len(cache_instance.local) == 0
+
+
+class TestCacheResultDecorator:
+    """Test the cache_result decorator on top of the default cache."""
+
+    async def test_cached_call_runs_once(self):
+        calls = []
+
+        @cache_result(ttl=60)
+        async def compute(value: int):
+            calls.append(value)
+            return {"value": value * 2}
+
+        assert await compute(21) == {"value": 42}
+        assert await compute(21) == {"value": 42}
+        assert calls == [21]
+
+
+class TestStampedeProtection:
+    """Test single-flight and stale-while-revalidate behaviour."""
+
+    async def test_concurrent_misses_share_one_computation(self):
+        cache_instance = Cache(local=MemoryCacheBackend())
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"total": 42}
+
+        results = await asyncio.gather(*[
+            cache_instance.get_or_compute("dashboard", compute, ttl=60)
+            for _ in range(20)
+        ])
+
+        assert calls == 1
+        assert all(result == {"total": 42} for result in results)
+        assert cache_instance.coalesced == 19
+
+    async def test_failure_propagates_to_every_waiter(self):
+        cache_instance = Cache(local=MemoryCacheBackend())
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise ValueError("query failed")
+
+        results = await asyncio.gather(*[
+            cache_instance.get_or_compute("dashboard", compute, ttl=60)
+            for _ in range(3)
+        ], return_exceptions=True)
+
+        assert all(isinstance(result, ValueError) for result in results)
+        # Nothing cached and nothing left in flight
+        assert await cache_instance.get("dashboard") is None
+        assert cache_instance.stats()["in_flight"] == 0
+
+    async def test_stale_value_served_while_refreshing(self):
+        cache_instance = Cache(local=MemoryCacheBackend())
+        now = time.time()
+        await cache_instance.set_entry(
+            "dashboard", CacheEntry({"version": 1}, now - 1, now + 60)
+        )
+        refreshed = asyncio.Event()
+
+        async def compute():
+            refreshed.set()
+            return {"version": 2}
+
+        value = await cache_instance.get_or_compute(
+            "dashboard", compute, ttl=60, stale_ttl=60
+        )
+        assert value == {"version": 1}
+        assert cache_instance.stale_served == 1
+
+        await asyncio.wait_for(refreshed.wait(), timeout=1)
+        await asyncio.sleep(0)
+        assert await cache_instance.get("dashboard") == {"version": 2}
+
+    async def test_plain_get_ignores_stale_entries(self):
+        cache_instance = Cache(local=MemoryCacheBackend())
+        now = time.time()
+        await cache_instance.set_entry(
+            "dashboard", CacheEntry({"version": 1}, now - 1, now + 60)
+        )
+        assert await cache_instance.get("dashboard") is None
+
+
+class FakeUser:
+    """Minimal stand-in for an authenticated user."""
+
+    def __init__(self, user_id):
+        self.id = user_id
+
+
+class TestScopedKeysAndTags:
+    """Test user-scoped keys and tag-based invalidation."""
+
+    def test_keys_differ_per_user(self):
+        key_a = _generate_cache_key("dashboard", (), {"current_user": FakeUser(1), "period": "month"})
+        key_b = _generate_cache_key("dashboard", (), {"current_user": FakeUser(2), "period": "month"})
+        assert key_a != key_b
+        assert key_a.startswith("dashboard:")
+
+    def test_sessions_do_not_affect_keys(self):
+        from sqlalchemy.orm import Session
+
+        key_a = _generate_cache_key("dashboard", (), {"db": Session(), "period": "month"})
+        key_b = _generate_cache_key("dashboard", (), {"db": Session(), "period": "month"})
+        assert key_a == key_b
+
+    def test_cache_key_builder_is_readable(self):
+        assert "users" in cache_key_builder("test", request=None, namespace="users")
+
+    async def test_invalidate_tags_evicts_only_tagged_entries(self):
+        cache_instance = Cache(local=MemoryCacheBackend())
+        await cache_instance.set("invoice-1", {"id": 1}, tags=entity_tags("invoice", 1))
+        await cache_instance.set("invoice-2", {"id": 2}, tags=entity_tags("invoice", 2))
+        await cache_instance.set("expense-1", {"id": 1}, tags=entity_tags("expense", 1))
+
+        await cache_instance.invalidate_tags("invoice:1")
+        assert await cache_instance.get("invoice-1") is None
+        assert await cache_instance.get("invoice-2") == {"id": 2}
+
+        await cache_instance.invalidate_tags("entity:invoice")
+        assert await cache_instance.get("invoice-2") is None
+        assert await cache_instance.get("expense-1") == {"id": 1}
+
+    async def test_tag_invalidation_reaches_other_workers(self):
+        shared = RedisCacheBackend(LocalRedis())
+        worker_a = Cache(local=MemoryCacheBackend(), shared=shared)
+        worker_b = Cache(local=MemoryCacheBackend(), shared=shared)
+
+        await worker_a.set("pipeline", {"total": 1}, tags=["entity:lead"])
+        assert await worker_b.get("pipeline") == {"total": 1}
+
+        await worker_a.invalidate_tags("entity:lead")
+        # Worker B still holds the entry locally but must not serve it
+        assert await worker_b.get("pipeline") is None
+
+    async def test_invalidation_during_compute_is_not_lost(self):
+        cache_instance = Cache(local=MemoryCacheBackend())
+
+        async def compute():
+            await cache_instance.invalidate_tags("entity:lead")
+            return {"total": 1}
+
+        await cache_instance.get_or_compute(
+            "pipeline", compute, ttl=60, tags=["entity:lead"]
+        )
+        assert await cache_instance.get("pipeline") is None
+
+    async def test_decorator_tags_from_templates(self):
+        calls = []
+
+        @cache_result(ttl=60, tags=["invoice:{invoice_id}"])
+        async def get_invoice(invoice_id: str, current_user=None):
+            calls.append(invoice_id)
+            return {"id": invoice_id}
+
+        user = FakeUser("u1")
+        await get_invoice(invoice_id="abc", current_user=user)
+        await get_invoice(invoice_id="abc", current_user=user)
+        assert calls == ["abc"]
+
+        await invalidate_tags("invoice:abc")
+        await get_invoice(invoice_id="abc", current_user=user)
+        assert calls == ["abc", "abc"]
+
+        await invalidate_tags(f"user:{user.id}")
+        await get_invoice(invoice_id="abc", current_user=user)
+        assert len(calls) == 3
+
+    async def test_unkeyable_arguments_bypass_cache(self):
+        calls = []
+
+        @cache_result(ttl=60)
+        async def handler(payload=None):
+            calls.append(payload)
+            return {"ok": True}
+
+        payload = object()
+        await handler(payload=payload)
+        await handler(payload=payload)
+        assert len(calls) == 2
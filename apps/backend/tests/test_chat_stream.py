@@ -0,0 +1,159 @@
+"""
+Tests for the streamed chat SSE pipeline.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from ..core.llm_gateway import GatewayModel, LLMGateway
+from ..services.chat_stream import TokenCounter, stream_chat
+
+
+def words(text):
+    return len(text.split())
+
+
+class Completion:
+    """Collects the ``on_complete`` result."""
+
+    def __init__(self):
+        self.done = asyncio.Event()
+        self.result = None
+
+    async def __call__(self, result):
+        self.result = result
+        self.done.set()
+
+    async def wait(self):
+        await asyncio.wait_for(self.done.wait(), 1)
+        return self.result
+
+
+async def connected():
+    return False
+
+
+def events(raw):
+    return [json.loads(event[len("data: "):]) for event in raw]
+
+
+async def word_stream(count, delay=0.0, closed=None):
+    try:
+        for i in range(count):
+            if delay:
+                await asyncio.sleep(delay)
+            yield f"w{i} "
+    finally:
+        if closed is not None:
+            closed.set()
+
+
+class TestStreamChat:
+    async def test_chunks_are_coalesced(self):
+        finish = Completion()
+        raw = [event async for event in stream_chat(word_stream(200), connected, finish, count_tokens=words)]
+        payloads = events(raw)
+
+        assert payloads[-1] == {"done": True, "tokens": 200}
+        text = "".join(p["content"] for p in payloads[:-1])
+        assert text == "".join(f"w{i} " for i in range(200))
+        assert len(payloads) < 20
+
+        result = await finish.wait()
+        assert result.completed and result.text == text
+        assert result.chunks == 200 and result.output_tokens == 200
+
+    async def test_slow_chunks_are_flushed_on_time(self):
+        finish = Completion()
+        raw = [event async for event in stream_chat(
+            word_stream(3, delay=0.03), connected, finish, flush_interval=0.01
+        )]
+        assert len(raw) == 4
+
+    async def test_disconnect_cancels_the_model_stream(self):
+        closed = asyncio.Event()
+        polls = []
+
+        async def is_disconnected():
+            polls.append(1)
+            return len(polls) > 1
+
+        finish = Completion()
+        raw = [event async for event in stream_chat(
+            word_stream(10_000, delay=0.001, closed=closed), is_disconnected, finish, poll_interval=0.01
+        )]
+
+        await asyncio.wait_for(closed.wait(), 1)
+        result = await finish.wait()
+        assert not result.completed
+        assert 0 < result.chunks < 10_000
+        assert "done" not in events(raw)[-1]
+
+    async def test_cancelled_response_closes_the_gateway_stream(self):
+        closed = asyncio.Event()
+
+        class Agent:
+            name = "claude"
+
+            def stream(self, prompt, temperature=0.7, max_tokens=None):
+                return word_stream(10_000, delay=0.001, closed=closed)
+
+        llm = LLMGateway()
+        model = GatewayModel("claude", {"claude": Agent()}, llm)
+        finish = Completion()
+        received = []
+
+        async def respond():
+            async for event in stream_chat(model.stream("hi"), connected, finish):
+                received.append(event)
+
+        response = asyncio.ensure_future(respond())
+        while not received:
+            await asyncio.sleep(0.01)
+        # What the server does when the client goes away mid-response
+        response.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await response
+
+        await asyncio.wait_for(closed.wait(), 1)
+        assert (await finish.wait()).text
+        assert llm.stats()["models"]["claude"]["in_flight"] == 0
+
+    async def test_slow_client_holds_back_the_model(self):
+        produced = []
+
+        async def source():
+            for i in range(1000):
+                produced.append(i)
+                yield "x" * 300
+
+        finish = Completion()
+        stream = stream_chat(source(), connected, finish, queue_size=8, flush_chars=1)
+        for _ in range(5):
+            await stream.__anext__()
+            await asyncio.sleep(0.01)
+        assert len(produced) <= 5 + 8 + 2
+        await stream.aclose()
+        assert not (await finish.wait()).completed
+
+    async def test_model_failure_ends_with_an_error_event(self):
+        async def failing():
+            yield "partial "
+            raise RuntimeError("connection reset")
+
+        finish = Completion()
+        payloads = events([event async for event in stream_chat(failing(), connected, finish)])
+
+        assert payloads[0] == {"content": "partial "}
+        assert payloads[-1]["error"] and payloads[-1]["done"]
+        result = await finish.wait()
+        assert result.error == "connection reset" and result.text == "partial "
+
+
+def test_token_counter_counts_whole_words():
+    counter = TokenCounter(words, segment_chars=8)
+    for chunk in ("hel", "lo wo", "rld and", " more", " te", "xt"):
+        counter.add(chunk)
+    assert counter.total == words("hello world and more text")
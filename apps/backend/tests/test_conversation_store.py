@@ -0,0 +1,258 @@
+"""
+Tests for the conversation history store.
+"""
+
+import statistics
+import time
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from ..db.models import ChatMessage, ChatSession
+from ..services.conversation_store import (
+    ConversationStore, DatabaseConversationSink, SessionNotFoundError, extractive_summary
+)
+
+
+USER = str(uuid.uuid4())
+
+
+def words(text):
+    return len(text.split())
+
+
+@pytest.fixture
+def sink():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    ChatSession.__table__.create(engine)
+    ChatMessage.__table__.create(engine)
+    return DatabaseConversationSink(sessionmaker(bind=engine))
+
+
+def store(sink=None, **kwargs):
+    kwargs.setdefault("count_tokens", words)
+    return ConversationStore(sink, **kwargs)
+
+
+async def fill(conversations, count, session_id="s1", start=1):
+    for i in range(start, start + count):
+        role = "user" if i % 2 else "assistant"
+        await conversations.append(session_id, USER, role, f"message {i}")
+
+
+class TestReads:
+    async def test_append_and_recent(self):
+        conversations = store()
+        await conversations.append("s1", USER, "user", "How do I   patch a flat roof?")
+        await conversations.append("s1", USER, "assistant", "Start with the seams.")
+
+        recent = await conversations.recent("s1", USER, 10)
+        assert [(m.seq, m.role) for m in recent] == [(1, "user"), (2, "assistant")]
+        assert [m.seq for m in await conversations.recent("s1", USER, 1)] == [2]
+        sessions = await conversations.sessions(USER)
+        assert sessions[0]["title"] == "How do I patch a flat roof?"
+        assert sessions[0]["message_count"] == 2
+
+    async def test_context_fills_the_token_budget_newest_first(self):
+        conversations = store()
+        await fill(conversations, 6)
+
+        window = await conversations.context("s1", USER, budget_tokens=6)
+        assert [m.content for m in window.messages] == ["message 4", "message 5", "message 6"]
+        assert window.tokens == 6
+
+        window = await conversations.context("s1", USER, budget_tokens=100, max_messages=2)
+        assert [m.seq for m in window.messages] == [5, 6]
+
+    async def test_other_users_cannot_read_or_write(self):
+        conversations = store()
+        await fill(conversations, 2)
+        intruder = str(uuid.uuid4())
+        with pytest.raises(SessionNotFoundError):
+            await conversations.context("s1", intruder, budget_tokens=100)
+        with pytest.raises(SessionNotFoundError):
+            await conversations.append("s1", intruder, "user", "hi")
+        with pytest.raises(SessionNotFoundError):
+            await conversations.messages("missing", USER)
+
+
+class TestSummaries:
+    async def test_older_turns_roll_into_the_summary(self):
+        summarized = []
+
+        async def summarize(previous, messages):
+            summarized.append([m.seq for m in messages])
+            return f"{previous} up to {messages[-1].seq}".strip()
+
+        conversations = store(keep_recent=4, summary_batch=2, summarize=summarize)
+        await fill(conversations, 6)
+        await conversations.flush()
+        assert summarized == [[1, 2]]
+
+        await fill(conversations, 2, start=7)
+        await conversations.flush()
+        assert summarized == [[1, 2], [3, 4]]
+
+        window = await conversations.context("s1", USER, budget_tokens=100)
+        assert window.summary == "up to 2 up to 4"
+        assert [m.seq for m in window.messages] == [5, 6, 7, 8]
+        assert window.as_messages()[0]["role"] == "system"
+
+    async def test_failed_summarizer_falls_back_to_extract(self):
+        async def broken(previous, messages):
+            raise RuntimeError("model unavailable")
+
+        conversations = store(keep_recent=2, summary_batch=2, summarize=broken)
+        await fill(conversations, 4)
+        await conversations.flush()
+
+        window = await conversations.context("s1", USER, budget_tokens=100)
+        assert window.summary == "user: message 1\nassistant: message 2"
+        assert conversations.stats()["summary_errors"] == 1
+
+    def test_extractive_summary_is_bounded(self):
+        class Message:
+            role, content = "user", "x" * 500
+
+        summary = extractive_summary("earlier", [Message()] * 3, max_chars=300)
+        assert len(summary) == 300
+        assert summary.endswith("...")
+
+
+class TestPersistence:
+    async def test_writes_are_batched_until_flush(self, sink):
+        writes = []
+        write = sink.write
+        sink.write = lambda messages, sessions: writes.append(len(messages)) or write(messages, sessions)
+        conversations = store(sink)
+
+        await fill(conversations, 5)
+        assert writes == []
+        await conversations.flush()
+        assert writes == [5]
+        assert conversations.stats()["queued"] == 0
+
+    async def test_session_reloads_from_the_log(self, sink):
+        first = store(sink, keep_recent=4, summary_batch=2)
+        await fill(first, 9)
+        await first.stop()
+
+        second = store(sink, keep_recent=4, summary_batch=2)
+        window = await second.context("s1", USER, budget_tokens=100)
+        assert window.summary.startswith("user: message 1")
+        assert [m.seq for m in window.messages] == [6, 7, 8, 9]
+
+        # The tail holds 8 messages; older ones come from the database
+        assert [m["content"] for m in await second.messages("s1", USER, limit=9)][0] == "message 1"
+
+        await second.append("s1", USER, "assistant", "message 10")
+        await second.flush()
+        assert (await second.sessions(USER))[0]["message_count"] == 10
+        assert second.stats()["loads"] == 1
+
+    async def test_delete(self, sink):
+        conversations = store(sink)
+        await fill(conversations, 2)
+        await conversations.flush()
+        await fill(conversations, 1, start=3)
+
+        assert await conversations.delete("s1", USER)
+        await conversations.flush()
+        assert await conversations.sessions(USER) == []
+        assert (await store(sink).context("s1", USER, budget_tokens=100)).messages == []
+
+
+class TestWorkers:
+    async def test_turns_written_by_another_worker_are_picked_up(self, sink):
+        first, second = store(sink), store(sink)
+        await fill(first, 2)
+        await first.flush()
+        assert len((await second.context("s1", USER, budget_tokens=100)).messages) == 2
+
+        await fill(first, 2, start=3)
+        await first.flush()
+        window = await second.context("s1", USER, budget_tokens=100)
+        assert [m.seq for m in window.messages] == [1, 2, 3, 4]
+        assert second.stats()["stale"] == 1
+
+    async def test_concurrent_turns_are_renumbered_not_lost(self, sink):
+        first, second = store(sink), store(sink)
+        await fill(first, 2)
+        await first.flush()
+        await second.context("s1", USER, budget_tokens=100)
+
+        # Both workers append before either flushes, each numbering from 3
+        await first.append("s1", USER, "user", "from first")
+        await second.append("s1", USER, "user", "from second")
+        await first.flush()
+        await second.flush()
+
+        window = await first.context("s1", USER, budget_tokens=100)
+        assert [(m.seq, m.content) for m in window.messages][2:] == [(3, "from first"), (4, "from second")]
+        assert (await first.sessions(USER))[0]["message_count"] == 4
+
+        # The renumbered copy is reloaded before its next turn
+        await second.append("s1", USER, "assistant", "again")
+        await second.flush()
+        assert [m.seq for m in await second.recent("s1", USER, 10)] == [1, 2, 3, 4, 5]
+
+    async def test_delete_on_another_worker_is_not_undone(self, sink):
+        first, second = store(sink), store(sink)
+        await fill(first, 2)
+        await first.flush()
+        await second.append("s1", USER, "user", "late")
+
+        assert await first.delete("s1", USER)
+        await second.flush()
+        assert await second.sessions(USER) == []
+        assert second.stats()["dropped"] == 1
+        assert await second.context("s1", USER, budget_tokens=100) == (
+            await first.context("s1", USER, budget_tokens=100)
+        )
+
+
+class TestLongSessions:
+    async def test_first_read_loads_only_the_tail(self, sink):
+        writer = store(sink, keep_recent=4, summary_batch=2)
+        for session in range(3):
+            await fill(writer, 500 if session == 0 else 5, session_id=f"s{session}")
+        await writer.stop()
+
+        conversations = store(sink, keep_recent=4, summary_batch=2)
+        for i in range(30):
+            window = await conversations.context(f"s{i % 3}", USER, budget_tokens=4000, max_messages=20)
+            assert window.messages
+        assert conversations.stats()["loads"] == 3
+        assert conversations.stats()["sessions"] == 3
+        assert len(conversations._sessions["s0"].tail) == conversations.tail_size
+
+
+@pytest.mark.performance
+class TestBenchmark:
+    async def test_context_assembly_p95_at_10k_messages(self, sink):
+        writer = store(sink)
+        for session in range(20):
+            await fill(writer, 10_000 if session == 0 else 50, session_id=f"s{session}")
+        await writer.stop()
+
+        # A fresh process: the first read of each session loads only its tail
+        conversations = store(sink)
+        started = time.perf_counter()
+        await conversations.context("s0", USER, budget_tokens=4000)
+        assert time.perf_counter() - started < 0.05
+
+        timings = []
+        for i in range(500):
+            started = time.perf_counter()
+            window = await conversations.context(f"s{i % 20}", USER, budget_tokens=4000, max_messages=20)
+            timings.append(time.perf_counter() - started)
+            assert window.messages
+
+        p95 = statistics.quantiles(timings, n=20)[-1]
+        assert p95 < 0.002, f"p95 context assembly took {p95 * 1000:.2f}ms"
+        assert conversations.stats()["loads"] == 20
@@ -0,0 +1,166 @@
+"""
+Query-count benchmark for the ERP dashboard endpoints.
+
+Each dashboard runs with a statement counter on the engine. Counts are
+recorded in ``QUERY_COUNTS`` and checked against a per-endpoint budget so a
+change that goes back to one query per breakdown fails here instead of
+showing up as a slow dashboard.
+
+The task and financial tables use PostgreSQL UUID columns; those
+dashboards run when ``BENCHMARK_DATABASE_URL`` points at a PostgreSQL
+database and are skipped on the default SQLite database.
+"""
+
+import inspect
+import os
+import uuid
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from ..db.analytics_models import AnalyticsRollup, Contribution, accumulate, apply_rollup_deltas, new_deltas
+from ..db.business_models import Project, ProjectTask, Team, User, project_members
+from ..db.financial_models import Expense, Invoice
+from ..db.models import Base
+from ..routes import erp_financial, erp_job_management, erp_task_management
+
+
+DATABASE_URL = os.environ.get("BENCHMARK_DATABASE_URL", "sqlite://")
+ON_POSTGRESQL = DATABASE_URL.startswith("postgresql")
+
+requires_postgresql = pytest.mark.skipif(
+    not ON_POSTGRESQL, reason="needs PostgreSQL; set BENCHMARK_DATABASE_URL"
+)
+
+# Endpoint -> statements per request; filled in as the tests run
+QUERY_COUNTS = {}
+
+QUERY_BUDGETS = {
+    "operations_dashboard": 3,
+    "list_jobs": 3,
+    "job_analytics": 3,
+    "financial_dashboard": 4,
+}
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(DATABASE_URL)
+    tables = [User.__table__, Team.__table__, Project.__table__, project_members]
+    if ON_POSTGRESQL:
+        tables += [
+            ProjectTask.__table__, erp_task_management.TaskExtended.__table__,
+            Invoice.__table__, Expense.__table__, AnalyticsRollup.__table__,
+        ]
+    Base.metadata.create_all(engine, tables=tables)
+    session = sessionmaker(bind=engine)()
+    session.engine = engine
+    yield session
+    session.close()
+    if ON_POSTGRESQL:
+        Base.metadata.drop_all(engine, tables=tables)
+
+
+@pytest.fixture
+def admin(db):
+    user = User(id=uuid.uuid4(), email="admin@example.com", hashed_password="x", is_superuser=True)
+    db.add(user)
+    db.commit()
+    # Load it now so the refresh is not counted against the endpoint
+    db.refresh(user)
+    return user
+
+
+@contextmanager
+def count_queries(db, endpoint):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+        QUERY_COUNTS[endpoint] = len(statements)
+
+
+def endpoint(function):
+    """The undecorated endpoint, bypassing the result cache and permission checks."""
+    return inspect.unwrap(function)
+
+
+class TestDashboardQueryCounts:
+    """Record and bound the round-trips per dashboard load."""
+
+    @requires_postgresql
+    async def test_operations_dashboard(self, db, admin):
+        with count_queries(db, "operations_dashboard") as statements:
+            result = await endpoint(erp_task_management.get_operations_dashboard)(
+                date_range="month", db=db, current_user=admin
+            )
+
+        assert result["metrics"]["total_tasks"] == 0
+        assert len(statements) <= QUERY_BUDGETS["operations_dashboard"]
+
+    async def test_list_jobs(self, db, admin):
+        with count_queries(db, "list_jobs") as statements:
+            result = await erp_job_management.list_jobs(
+                page=1, limit=20, cursor=None, total_mode="exact", status=None, phase=None,
+                assigned_to=None, date_from=None, date_to=None, search=None, sort_by=None,
+                sort_order="desc", current_user=admin, db=db
+            )
+
+        assert result["statistics"]["active_jobs"] == 0
+        assert len(statements) <= QUERY_BUDGETS["list_jobs"]
+
+    async def test_job_analytics(self, db, admin):
+        with count_queries(db, "job_analytics") as statements:
+            result = await erp_job_management.get_job_analytics(
+                date_from=erp_job_management.date(2024, 1, 1),
+                date_to=erp_job_management.date(2024, 3, 31),
+                current_user=admin, db=db
+            )
+
+        assert result["job_metrics"]["total_jobs"] == 0
+        assert len(statements) <= QUERY_BUDGETS["job_analytics"]
+
+    @requires_postgresql
+    async def test_financial_dashboard(self, db, admin):
+        with count_queries(db, "financial_dashboard") as statements:
+            result = await endpoint(erp_financial.financial_dashboard)(
+                period="quarter", db=db, current_user=admin
+            )
+
+        assert result["outstanding"]["count"] == 0
+        assert len(statements) <= QUERY_BUDGETS["financial_dashboard"]
+
+    @requires_postgresql
+    async def test_weekly_trend_covers_only_the_week(self, db, admin):
+        today = date.today()
+        deltas = new_deltas()
+        accumulate(deltas, [
+            Contribution(today - timedelta(days=2), "invoice.billed", amount_cents=500),
+            # Same month or the one before, but outside the last seven days
+            Contribution(today - timedelta(days=20), "invoice.billed", amount_cents=9900),
+        ])
+        apply_rollup_deltas(db.connection(), deltas)
+        db.commit()
+
+        result = await endpoint(erp_financial.financial_dashboard)(
+            period="week", db=db, current_user=admin
+        )
+
+        assert sum(point["revenue"] for point in result["monthly_trend"]) == 5
+        assert result["revenue"]["total"] == 5
+
+
+def test_query_count_summary():
+    """Print the recorded counts next to their budgets."""
+    print("\nDashboard queries per request:")
+    for name, budget in QUERY_BUDGETS.items():
+        print(f"  {name:<22} {QUERY_COUNTS.get(name, '-'):>3}  (budget {budget})")
@@ -0,0 +1,90 @@
+"""
+Tests for the embedding cache used by the memory system.
+"""
+
+import numpy as np
+import pytest
+
+from ..memory.backend_memory_vector_utils import EmbeddingCache
+
+
+class TestEmbeddingCache:
+    """Test the LRU, byte limits and the SQLite tier."""
+
+    def test_values_are_stored_as_float32(self):
+        cache = EmbeddingCache()
+        cache.set("hello", [0.1, 0.2, 0.3])
+
+        assert cache.get_array("hello").dtype == np.float32
+        assert cache.get("hello") == pytest.approx([0.1, 0.2, 0.3])
+        assert cache.size_bytes == 12
+
+    def test_model_is_part_of_the_key(self):
+        cache = EmbeddingCache()
+        cache.set("hello", [1.0], model="text-embedding-ada-002")
+
+        assert cache.get("hello", model="text-embedding-3-small") is None
+        assert cache.get("hello", model="text-embedding-ada-002") == [1.0]
+
+    def test_least_recently_used_is_evicted(self):
+        cache = EmbeddingCache(max_size=2)
+        cache.set("a", [1.0])
+        cache.set("b", [2.0])
+        cache.get("a")
+        cache.set("c", [3.0])
+
+        assert cache.get("b") is None
+        assert cache.get("a") == [1.0]
+        assert cache.get("c") == [3.0]
+
+    def test_byte_limit(self):
+        cache = EmbeddingCache(max_size=100, max_bytes=4 * 1536 * 2)
+        for i in range(5):
+            cache.set(f"text-{i}", np.full(1536, i, dtype=np.float32))
+
+        assert len(cache.cache) == 2
+        assert cache.size_bytes <= cache.max_bytes
+        assert cache.get("text-4") is not None
+
+    def test_cached_arrays_are_not_aliased(self):
+        cache = EmbeddingCache()
+        source = np.ones(4, dtype=np.float32)
+        cache.set("x", source)
+        source[0] = 5.0
+
+        assert cache.get("x")[0] == 1.0
+        with pytest.raises(ValueError):
+            cache.get_array("x")[0] = 2.0
+
+    async def test_persistent_tier_survives_restart(self, tmp_path):
+        path = str(tmp_path / "embeddings.db")
+        cache = EmbeddingCache(persist_path=path)
+        cache.set("hello", [0.5, 0.25])
+        await cache.flush()
+
+        restarted = EmbeddingCache(persist_path=path)
+        assert restarted.get("hello") == [0.5, 0.25]
+        assert restarted.disk_hits == 1
+        # Promoted into memory
+        assert restarted.get("hello") == [0.5, 0.25]
+        assert restarted.hits == 1
+
+        restarted.clear(persistent=True)
+        assert EmbeddingCache(persist_path=path).get("hello") is None
+
+    async def test_writes_are_buffered_until_flush(self, tmp_path):
+        path = str(tmp_path / "embeddings.db")
+        cache = EmbeddingCache(max_size=1, persist_path=path)
+        cache.set("a", [1.0])
+        cache.set("b", [2.0])
+
+        assert cache.stats()["unwritten"] == 2
+        assert EmbeddingCache(persist_path=path).get("a") is None
+        # Evicted from memory but not yet written: still served
+        assert cache.get("a") == [1.0]
+
+        await cache.flush()
+        assert cache.stats()["unwritten"] == 0
+        restarted = EmbeddingCache(persist_path=path)
+        assert restarted.get("a") == [1.0]
+        assert restarted.get("b") == [2.0]
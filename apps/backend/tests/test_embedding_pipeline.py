@@ -0,0 +1,129 @@
+"""
+Tests for the concurrent batch embedding pipeline.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import BadRequestError, RateLimitError
+
+from ..memory import backend_memory_vector_utils as vector_utils
+from ..memory.backend_memory_vector_utils import EmbeddingCache, EmbeddingPipeline
+
+
+def api_error(error_class, status_code, headers=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+    response = httpx.Response(status_code, request=request, headers=headers or {})
+    return error_class("error", response=response, body=None)
+
+
+class FakeEmbeddings:
+    """Stands in for client.embeddings; embeds a text as [len(text)]."""
+
+    def __init__(self, failures=None, reject=None, delay=0.01):
+        self.calls = []
+        self.failures = list(failures or [])
+        self.reject = reject
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+
+    async def create(self, model, input):
+        self.calls.append(list(input))
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.failures:
+                raise self.failures.pop(0)
+            if self.reject and self.reject in input:
+                raise api_error(BadRequestError, 400)
+            data = [
+                SimpleNamespace(index=i, embedding=[float(len(text))])
+                for i, text in reversed(list(enumerate(input)))
+            ]
+            return SimpleNamespace(data=data)
+        finally:
+            self.active -= 1
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    def install(**kwargs):
+        embeddings = FakeEmbeddings(**kwargs)
+        monkeypatch.setattr(
+            vector_utils, "get_openai_client",
+            lambda: SimpleNamespace(embeddings=embeddings)
+        )
+        return embeddings
+    return install
+
+
+class TestEmbeddingPipeline:
+    """Test packing, concurrency, dedup and failure isolation."""
+
+    async def test_results_follow_input_order_with_dedup(self, fake_client):
+        embeddings = fake_client()
+        pipeline = EmbeddingPipeline(base_delay=0)
+
+        results = await pipeline.embed(["aa", "b", "aa", "", "cccc"])
+
+        assert results == [[2.0], [1.0], [2.0], None, [4.0]]
+        sent = [text for call in embeddings.calls for text in call]
+        assert sorted(sent) == ["aa", "b", "cccc"]
+
+    async def test_batches_are_packed_by_token_budget(self, fake_client):
+        embeddings = fake_client()
+        # Every text exceeds the budget on its own, so each gets a request
+        pipeline = EmbeddingPipeline(max_batch_tokens=1, max_concurrency=2, base_delay=0)
+        texts = [f"text number {i}" for i in range(6)]
+
+        await pipeline.embed(texts)
+
+        assert all(len(call) == 1 for call in embeddings.calls)
+        assert len(embeddings.calls) == 6
+        assert embeddings.max_active == 2
+
+    async def test_rate_limit_pauses_and_retries(self, fake_client):
+        embeddings = fake_client(failures=[
+            api_error(RateLimitError, 429, {"retry-after": "0"})
+        ])
+        pipeline = EmbeddingPipeline(base_delay=0.01)
+
+        results = await pipeline.embed(["abc"])
+
+        assert results == [[3.0]]
+        assert pipeline.rate_limited == 1
+        assert pipeline.retries == 1
+        assert embeddings.calls == [["abc"], ["abc"]]
+        # Success resets the adaptive delay
+        assert pipeline._rate_limit_delay == pipeline.base_delay
+
+    async def test_rejected_input_is_isolated(self, fake_client):
+        fake_client(reject="bad")
+        pipeline = EmbeddingPipeline(base_delay=0)
+
+        results = await pipeline.embed(["one", "bad", "three", "four"])
+
+        assert results == [[3.0], None, [5.0], [4.0]]
+
+    async def test_exhausted_retries_return_none(self, fake_client):
+        fake_client(failures=[ConnectionError("down")] * 3)
+        pipeline = EmbeddingPipeline(max_retries=2, base_delay=0)
+
+        assert await pipeline.embed(["abc"]) == [None]
+        assert pipeline.requests == 3
+
+    async def test_cached_texts_skip_the_api(self, fake_client):
+        embeddings = fake_client()
+        cache = EmbeddingCache()
+        cache.set("cached", [9.0])
+        pipeline = EmbeddingPipeline(cache=cache, base_delay=0)
+
+        results = await pipeline.embed(["cached", "fresh"])
+
+        assert results == [[9.0], [5.0]]
+        assert embeddings.calls == [["fresh"]]
+        assert cache.get("fresh") == [5.0]
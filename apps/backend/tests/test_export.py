@@ -0,0 +1,96 @@
+"""
+Tests for streaming CSV/JSONL exports.
+"""
+
+import json
+from datetime import date
+
+import pytest
+from sqlalchemy import Column, Date, Integer, String, create_engine, event, select
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from ..core.export import csv_stream, export_response, jsonl_stream, stream_rows
+
+
+Base = declarative_base()
+
+
+class Entry(Base):
+    __tablename__ = "export_entries"
+
+    id = Column(Integer, primary_key=True)
+    label = Column(String(50), nullable=False)
+    booked_on = Column(Date, nullable=False)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        Entry(id=i, label=f"entry, {i}", booked_on=date(2024, 1, i)) for i in range(1, 6)
+    ])
+    session.commit()
+    session.close()
+    return engine
+
+
+class TestStreamRows:
+    """Test reading export rows from a server-side cursor."""
+
+    def test_rows_are_read_lazily_on_their_own_session(self, engine):
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        rows = stream_rows(engine, select(Entry.id, Entry.label).order_by(Entry.id), batch_size=2)
+        assert statements == []
+
+        assert next(rows) == {"id": 1, "label": "entry, 1"}
+        assert [row["id"] for row in rows] == [2, 3, 4, 5]
+        assert len(statements) == 1
+
+    def test_closing_early_releases_the_session(self, engine):
+        checked_in = []
+        event.listen(engine, "checkin", lambda *args: checked_in.append(args))
+
+        rows = stream_rows(engine, select(Entry.id), batch_size=2)
+        next(rows)
+        assert checked_in == []
+
+        rows.close()
+        assert len(checked_in) == 1
+
+
+class TestEncoders:
+    """Test row-by-row CSV and JSONL encoding."""
+
+    def test_csv_chunk_per_row(self):
+        chunks = list(csv_stream([{"id": 1, "label": "a, b"}, {"id": 2, "label": "c"}]))
+
+        assert chunks == [b'id,label\r\n1,"a, b"\r\n', b"2,c\r\n"]
+
+    def test_empty_csv_keeps_header(self):
+        assert b"".join(csv_stream([], fieldnames=["id", "label"])) == b"id,label\r\n"
+        assert list(csv_stream([])) == []
+
+    def test_jsonl_serializes_dates(self):
+        lines = list(jsonl_stream([{"id": 1, "on": date(2024, 1, 2)}]))
+
+        assert [json.loads(line) for line in lines] == [{"id": 1, "on": "2024-01-02"}]
+
+    async def test_export_response_streams_query(self, engine):
+        response = export_response(
+            stream_rows(engine, select(Entry.label, Entry.booked_on).order_by(Entry.id)),
+            "csv", "entries"
+        )
+        body = b"".join([chunk async for chunk in response.body_iterator])
+
+        assert response.media_type == "text/csv"
+        assert response.headers["content-disposition"] == "attachment; filename=entries.csv"
+        assert body.decode().splitlines()[:2] == ["label,booked_on", '"entry, 1",2024-01-01']
+
+    def test_unknown_format_is_rejected(self):
+        with pytest.raises(ValueError):
+            export_response([], "xlsx", "entries")
@@ -0,0 +1,115 @@
+"""
+Tests for the promoted job search columns.
+"""
+
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.attributes import flag_modified
+
+from ..db.business_models import Project, Team, User, project_members, project_search
+from ..db.models import Base
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(
+        engine, tables=[User.__table__, Team.__table__, Project.__table__, project_members]
+    )
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def owner(db):
+    user = User(id=uuid.uuid4(), email="office@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def make_job(db, owner, name, customer, address, **meta):
+    job = Project(
+        name=name,
+        project_type="roofing",
+        owner_id=owner.id,
+        meta_data={"customer": {"name": customer}, "property_address": address, **meta}
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+def search(db, term):
+    match, ordering = project_search(term, db.get_bind().dialect.name)
+    return [job.customer_name for job in db.query(Project).filter(match).order_by(*ordering, Project.name)]
+
+
+class TestProjectFieldSync:
+    """Test that the columns follow meta_data on write."""
+
+    def test_fields_are_copied_on_insert(self, db, owner):
+        foreman_id = uuid.uuid4()
+        job = make_job(
+            db, owner, "Reroof - Dana Whitfield", "Dana Whitfield", "12 Elm St, Denver",
+            phase="initial_contact", assigned_foreman_id=str(foreman_id)
+        )
+
+        assert job.phase == "initial_contact"
+        assert job.assigned_foreman_id == str(foreman_id)
+        assert job.customer_name == "Dana Whitfield"
+        assert job.property_address == "12 Elm St, Denver"
+        assert job.search_text == "reroof - dana whitfield\ndana whitfield\n12 elm st, denver"
+
+    def test_fields_follow_meta_data_updates(self, db, owner):
+        job = make_job(db, owner, "Repair", "Lee", "1 Main St", phase="initial_contact")
+
+        job.meta_data["phase"] = "installation"
+        job.meta_data["customer"]["name"] = "Lee Okafor"
+        flag_modified(job, "meta_data")
+        db.commit()
+
+        db.expire_all()
+        assert job.phase == "installation"
+        assert "lee okafor" in job.search_text
+
+    def test_missing_fields_are_null(self, db, owner):
+        job = Project(name="Internal", owner_id=owner.id)
+        db.add(job)
+        db.commit()
+
+        assert job.phase is None and job.customer_name is None
+        assert job.search_text == "internal"
+
+    def test_indexes_are_created(self, db):
+        names = {index["name"] for index in inspect(db.get_bind()).get_indexes("projects")}
+        assert {"idx_project_type_phase", "idx_project_foreman"} <= names
+        # The trigram index only exists on PostgreSQL
+        assert "idx_project_search_trgm" not in names
+
+
+class TestProjectSearch:
+    """Test matching and relevance ordering."""
+
+    @pytest.fixture(autouse=True)
+    def jobs(self, db, owner):
+        make_job(db, owner, "Gutter - Parker", "Parker", "9 Maple Ave")
+        make_job(db, owner, "Reroof - Mapleton HOA", "Mapleton HOA", "300 Oak Rd")
+        make_job(db, owner, "Repair - Ann Smith", "Ann Smith", "41 Old Maple Ln")
+        make_job(db, owner, "Repair - Bo", "Bo", "7 Pine St")
+        make_job(db, owner, "Repair - Cy", "Cy", "5 Sugarmaple Ct")
+
+    def test_field_prefixes_rank_first(self, db):
+        # Field prefix, then word prefixes (by name here), then substrings
+        assert search(db, "maple") == ["Mapleton HOA", "Parker", "Ann Smith", "Cy"]
+
+    def test_search_is_case_insensitive(self, db):
+        assert search(db, "  MAPLETON ") == ["Mapleton HOA"]
+
+    def test_like_wildcards_are_literal(self, db):
+        assert search(db, "%") == []
+        assert search(db, "_") == []
@@ -0,0 +1,141 @@
+"""
+Tests for chunked bulk lead import.
+"""
+
+import io
+import json
+import uuid
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from ..db import business_models  # noqa: F401 - defines the users table the lead FKs name
+from ..services.lead_import import (
+    calculate_lead_score, campaign_table, import_leads, iter_upload_rows, lead_table, upload_format
+)
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    lead_table.create(engine)
+    campaign_table.create(engine)
+    session = sessionmaker(bind=engine)()
+    session.statements = []
+    event.listen(
+        engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: session.statements.append(statement)
+    )
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def campaign(db):
+    campaign = SimpleNamespace(id=uuid.uuid4(), name="Spring Storm")
+    db.execute(campaign_table.insert().values(
+        id=campaign.id, name=campaign.name, type="email", start_date=date(2024, 3, 1),
+        created_by=uuid.uuid4(), leads_generated=3
+    ))
+    db.commit()
+    db.statements.clear()
+    return campaign
+
+
+def leads(db):
+    return {row.email: row for row in db.execute(select(lead_table))}
+
+
+class TestImportLeads:
+    """Test set-based dedup and chunked inserts."""
+
+    async def test_statements_per_chunk(self, db, campaign):
+        rows = [{"name": f"Lead {i}", "email": f"lead{i}@acme.com"} for i in range(250)]
+
+        result = await import_leads(db, campaign, rows, uuid.uuid4(), chunk_size=100)
+
+        # A lookup and an upsert per chunk, then the campaign counter
+        kinds = [statement.split()[0].upper() for statement in db.statements]
+        assert kinds == ["SELECT", "INSERT"] * 3 + ["UPDATE"]
+        assert result.imported == 250
+        assert len(leads(db)) == 250
+
+    async def test_duplicates_move_to_campaign(self, db, campaign):
+        other = SimpleNamespace(id=uuid.uuid4(), name="Old")
+        await import_leads(db, other, [{"name": "Ann", "email": "ann@acme.com"}], uuid.uuid4())
+
+        result = await import_leads(db, campaign, [
+            {"name": "Ann Again", "email": "ann@acme.com"},
+            {"name": "Bob", "email": "bob@acme.com"},
+            {"name": "Bob Twice", "email": " bob@acme.com "},
+        ], uuid.uuid4())
+
+        assert (result.imported, result.duplicates) == (1, 2)
+        stored = leads(db)
+        assert stored["ann@acme.com"].name == "Ann"
+        assert stored["ann@acme.com"].campaign_id == campaign.id
+        assert stored["bob@acme.com"].tags == ["campaign:Spring Storm"]
+        counter = db.execute(
+            select(campaign_table.c.leads_generated).where(campaign_table.c.id == campaign.id)
+        ).scalar()
+        assert counter == 4
+
+    async def test_bad_rows_are_reported_and_skipped(self, db, campaign):
+        progress = []
+
+        async def record(result):
+            progress.append((result.status, result.processed))
+
+        result = await import_leads(db, campaign, [
+            {"name": "No Email"},
+            {"email": "noname@acme.com"},
+            {"name": "Fine", "email": "fine@acme.com"},
+        ], uuid.uuid4(), chunk_size=2, on_progress=record)
+
+        assert (result.imported, result.error_count) == (1, 2)
+        assert result.error_details[0] == {"email": None, "error": "Missing required field: email"}
+        assert progress == [("running", 2), ("running", 3), ("completed", 3)]
+
+
+class TestUploads:
+    """Test reading CSV and NDJSON uploads row by row."""
+
+    def test_csv_rows(self):
+        upload = io.BytesIO(b"\xef\xbb\xbfname,email,tags\r\nAnn,ann@acme.com,\"roof,gutter\"\r\n")
+
+        assert list(iter_upload_rows(upload, "csv")) == [
+            {"name": "Ann", "email": "ann@acme.com", "tags": "roof,gutter"}
+        ]
+        assert not upload.closed
+
+    def test_ndjson_bad_lines_become_errors(self):
+        upload = io.BytesIO(
+            json.dumps({"name": "Ann", "email": "ann@acme.com"}).encode() + b"\n\n{oops\n[1]\n"
+        )
+        rows = list(iter_upload_rows(upload, "ndjson"))
+
+        assert rows[0]["email"] == "ann@acme.com"
+        assert [row.get("_error", "").split(":")[0] for row in rows[1:]] == ["line 3", "line 4"]
+
+    def test_format_from_name_or_content_type(self):
+        assert upload_format("leads.CSV", None) == "csv"
+        assert upload_format("export", "application/x-ndjson; charset=utf-8") == "ndjson"
+        assert upload_format("leads.xlsx", "application/octet-stream") is None
+
+
+def test_lead_score():
+    assert calculate_lead_score({
+        "email": "ceo@acme.com", "company": "Acme", "title": "CEO",
+        "source": "referral", "requested_demo": True
+    }) == 100
+    assert calculate_lead_score({"email": "sam@gmail.com", "source": "webinar"}) == 35
@@ -0,0 +1,253 @@
+"""
+Tests for the LLM gateway against a local fake provider.
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from ..core.llm_gateway import (
+    FATAL, RATE_LIMITED, TRANSIENT, CircuitOpenError, GatewayModel, LLMGateway, TokenBucket,
+    classify_error, retry_after_seconds
+)
+
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+class FakeProvider:
+    """Answers after ``latency`` seconds, failing with the scripted errors first."""
+
+    def __init__(self, errors=(), latency=0.0):
+        self.errors = list(errors)
+        self.latency = latency
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def complete(self, model):
+        self.calls.append(model)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if self.errors:
+                raise self.errors.pop(0)
+            return f"{model} reply"
+        finally:
+            self.in_flight -= 1
+
+
+def gateway(**kwargs):
+    kwargs.setdefault("base_delay", 0.001)
+    kwargs.setdefault("max_delay", 0.01)
+    return LLMGateway(**kwargs)
+
+
+class TestErrorClassification:
+    def test_classify(self):
+        assert classify_error(FakeAPIError(429)) == RATE_LIMITED
+        assert classify_error(FakeAPIError(529)) == RATE_LIMITED
+        assert classify_error(FakeAPIError(503)) == TRANSIENT
+        assert classify_error(FakeAPIError(400)) == FATAL
+        assert classify_error(ConnectionResetError()) == TRANSIENT
+        assert classify_error(ValueError("bad")) == FATAL
+
+    def test_retry_after(self):
+        assert retry_after_seconds(FakeAPIError(429, {"retry-after": "2"})) == 2.0
+        assert retry_after_seconds(FakeAPIError(429, {"retry-after-ms": "250"})) == 0.25
+        assert retry_after_seconds(FakeAPIError(429, {"retry-after": "soon"})) is None
+        assert retry_after_seconds(ValueError()) is None
+
+
+class TestTokenBucket:
+    def test_reservations_queue_in_order(self):
+        bucket = TokenBucket(per_minute=60, capacity=2)
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == pytest.approx(1.0, abs=0.01)
+        assert bucket.reserve() == pytest.approx(2.0, abs=0.01)
+
+    def test_refund(self):
+        bucket = TokenBucket(per_minute=600)
+        bucket.reserve(500)
+        bucket.refund(400)
+        assert bucket.wait_time(500) == 0
+
+
+class TestGatewayCall:
+    async def test_rate_limit_waits_for_retry_after(self):
+        provider = FakeProvider([FakeAPIError(429, {"retry-after": "0.05"})])
+        llm = gateway()
+
+        started = time.monotonic()
+        assert await llm.call("m", provider.complete) == "m reply"
+        assert time.monotonic() - started >= 0.05
+        assert llm.stats()["models"]["m"]["rate_limited"] == 1
+        assert len(provider.calls) == 2
+
+    async def test_fatal_errors_are_not_retried(self):
+        provider = FakeProvider([FakeAPIError(400)])
+        with pytest.raises(FakeAPIError):
+            await gateway().call("m", provider.complete)
+        assert len(provider.calls) == 1
+
+    async def test_gives_up_after_max_retries(self):
+        provider = FakeProvider([FakeAPIError(503)] * 5)
+        with pytest.raises(FakeAPIError):
+            await gateway(max_retries=2, failure_threshold=10).call("m", provider.complete)
+        assert len(provider.calls) == 3
+
+    async def test_concurrency_is_capped(self):
+        provider = FakeProvider(latency=0.01)
+        llm = gateway(provider_concurrency=3)
+        llm.configure("m", provider="p", max_concurrency=2)
+        llm.configure("n", provider="p", max_concurrency=2)
+
+        await asyncio.gather(*(llm.call(model, provider.complete) for model in "mn" * 5))
+        assert provider.max_in_flight == 3
+
+    async def test_requests_per_minute(self):
+        provider = FakeProvider()
+        llm = gateway()
+        llm.configure("m", requests_per_minute=600)
+        # Bucket starts full; drain it so the next calls pace at 10/second
+        llm._state("m", None).requests.tokens = 0
+
+        started = time.monotonic()
+        await asyncio.gather(*(llm.call("m", provider.complete) for _ in range(3)))
+        assert time.monotonic() - started >= 0.25
+
+    async def test_circuit_opens_and_recovers(self):
+        provider = FakeProvider([FakeAPIError(500)] * 2)
+        llm = gateway(max_retries=0, failure_threshold=2, reset_timeout=0.05)
+
+        for _ in range(2):
+            with pytest.raises(FakeAPIError):
+                await llm.call("m", provider.complete)
+        with pytest.raises(CircuitOpenError):
+            await llm.call("m", provider.complete)
+        assert len(provider.calls) == 2
+
+        await asyncio.sleep(0.06)
+        assert await llm.call("m", provider.complete) == "m reply"
+        assert llm.stats()["circuits"]["m"] == "closed"
+
+    async def test_falls_back_when_rate_limited_throughout(self):
+        provider = FakeProvider([FakeAPIError(429)] * 2)
+        llm = gateway(max_retries=1)
+        llm.configure("primary", provider="a", fallback="secondary")
+        llm.configure("secondary", provider="b")
+
+        assert await llm.call("primary", provider.complete) == "secondary reply"
+        assert provider.calls == ["primary", "primary", "secondary"]
+
+    async def test_falls_back_when_saturated(self):
+        slow = FakeProvider(latency=0.05)
+        llm = gateway()
+        llm.configure("primary", provider="a", max_concurrency=1, fallback="secondary")
+
+        first = asyncio.ensure_future(llm.call("primary", slow.complete))
+        await asyncio.sleep(0.01)
+        assert await llm.call("primary", slow.complete) == "secondary reply"
+        assert await first == "primary reply"
+
+    async def test_hedged_request_takes_the_faster_reply(self):
+        latencies = [0.2, 0.0]
+        calls = []
+
+        async def complete(model):
+            calls.append(model)
+            await asyncio.sleep(latencies[len(calls) - 1])
+            return f"reply {len(calls)}"
+
+        llm = gateway()
+        llm.configure("m", hedge_after=0.02)
+        started = time.monotonic()
+        assert await llm.call("m", complete) == "reply 2"
+        assert time.monotonic() - started < 0.15
+        assert llm.stats()["models"]["m"]["hedged"] == 1
+
+    async def test_hedges_stay_within_the_concurrency_limit(self):
+        calls = []
+
+        async def complete(model):
+            calls.append(model)
+            await asyncio.sleep(0.05)
+            return "reply"
+
+        llm = gateway()
+        llm.configure("m", hedge_after=0.01, max_concurrency=1)
+        assert await llm.call("m", complete) == "reply"
+        assert len(calls) == 1
+        assert "hedged" not in llm.stats()["models"]["m"]
+
+        llm.configure("m", hedge_after=0.01, max_concurrency=2)
+        await llm.call("m", complete)
+        stats = llm.stats()["models"]["m"]
+        assert stats["hedged"] == 1
+        # The hedge was admitted like any request and its slot was released
+        assert stats["requests"] == 2
+        assert stats["in_flight"] == 0
+
+
+class TestGatewayStream:
+    async def test_retries_before_first_chunk(self):
+        attempts = []
+
+        async def open_stream(model):
+            attempts.append(model)
+            if len(attempts) == 1:
+                raise FakeAPIError(503)
+            for word in ("a", "b", "c"):
+                yield word
+
+        chunks = [chunk async for chunk in gateway().stream("m", open_stream)]
+        assert chunks == ["a", "b", "c"]
+        assert len(attempts) == 2
+
+    async def test_closing_stops_the_provider_stream(self):
+        closed = asyncio.Event()
+
+        async def open_stream(model):
+            try:
+                for i in range(100):
+                    yield i
+            finally:
+                closed.set()
+
+        llm = gateway()
+        stream = llm.stream("m", open_stream)
+        assert await stream.__anext__() == 0
+        await stream.aclose()
+
+        assert closed.is_set()
+        assert llm.stats()["models"]["m"]["in_flight"] == 0
+
+
+class TestGatewayModel:
+    async def test_name_follows_fallback(self):
+        class Agent:
+            def __init__(self, name, error=None):
+                self.name = name
+                self.error = error
+
+            async def generate(self, prompt, temperature=0.7, max_tokens=None):
+                if self.error:
+                    raise self.error
+                return f"{self.name}: {prompt}"
+
+        llm = gateway(max_retries=0)
+        llm.configure("claude", fallback="gpt")
+        model = GatewayModel(
+            "claude", {"claude": Agent("claude", FakeAPIError(429)), "gpt": Agent("codex")}, llm
+        )
+
+        assert await model.generate("hi") == "codex: hi"
+        assert model.name == "codex"
@@ -0,0 +1,147 @@
+"""
+Tests for keyset pagination.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import Column, DateTime, Integer, String, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from ..core.pagination import (
+    count_total, decode_cursor, encode_cursor, keyset_paginate, offset_paginate, sort_keys
+)
+
+
+Base = declarative_base()
+
+
+class Row(Base):
+    __tablename__ = "pagination_rows"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(20), nullable=False)
+    score = Column(Integer, nullable=False)
+    due_date = Column(DateTime, nullable=True)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    start = datetime(2024, 1, 1)
+    session.add_all([
+        Row(
+            id=i,
+            name=f"row-{i}",
+            # Many duplicate scores so the tiebreaker matters
+            score=i % 4,
+            due_date=None if i % 5 == 0 else start + timedelta(days=i % 7)
+        )
+        for i in range(1, 48)
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def walk_forward(query, keys, limit):
+    pages, cursor = [], None
+    while True:
+        page = keyset_paginate(query, keys, limit, cursor)
+        pages.append(page)
+        if not page.next_cursor:
+            return pages
+        cursor = page.next_cursor
+
+
+def expected_order(rows, key, descending):
+    present = sorted(
+        (row for row in rows if key(row) is not None),
+        key=lambda row: (key(row), row.id), reverse=descending
+    )
+    missing = sorted(
+        (row for row in rows if key(row) is None),
+        key=lambda row: row.id, reverse=descending
+    )
+    return [row.id for row in present + missing]
+
+
+class TestKeysetPagination:
+    """Test traversal in both directions and cursor integrity."""
+
+    @pytest.mark.parametrize("descending", [False, True])
+    def test_forward_traversal_matches_full_sort(self, db, descending):
+        keys = sort_keys(Row.score, descending, Row.id)
+        pages = walk_forward(db.query(Row), keys, limit=5)
+
+        seen = [item.id for page in pages for item in page.items]
+        assert seen == expected_order(db.query(Row).all(), lambda r: r.score, descending)
+        assert pages[0].prev_cursor is None
+        assert all(page.prev_cursor for page in pages[1:])
+
+    @pytest.mark.parametrize("descending", [False, True])
+    def test_nullable_column_sorts_nulls_last(self, db, descending):
+        keys = sort_keys(Row.due_date, descending, Row.id, nullable=True)
+        pages = walk_forward(db.query(Row), keys, limit=4)
+
+        seen = [item.id for page in pages for item in page.items]
+        assert seen == expected_order(db.query(Row).all(), lambda r: r.due_date, descending)
+
+    def test_backwards_paging_retraces_pages(self, db):
+        keys = sort_keys(Row.due_date, True, Row.id, nullable=True)
+        pages = walk_forward(db.query(Row), keys, limit=6)
+
+        for previous, current in zip(pages, pages[1:]):
+            back = keyset_paginate(db.query(Row), keys, 6, current.prev_cursor)
+            assert [item.id for item in back.items] == [item.id for item in previous.items]
+            assert back.next_cursor is not None
+
+        first_again = keyset_paginate(db.query(Row), keys, 6, pages[1].prev_cursor)
+        assert first_again.prev_cursor is None
+
+    def test_offset_pages_use_the_same_order(self, db):
+        keys = sort_keys(Row.due_date, False, Row.id, nullable=True)
+        pages = walk_forward(db.query(Row), keys, limit=5)
+
+        for number, page in enumerate(pages):
+            offset_items = offset_paginate(db.query(Row), keys, number * 5, 5)
+            assert [item.id for item in offset_items] == [item.id for item in page.items]
+
+    def test_filters_apply_with_cursor(self, db):
+        query = db.query(Row).filter(Row.score == 2)
+        keys = sort_keys(Row.id, False, Row.id)
+        pages = walk_forward(query, keys, limit=3)
+
+        assert [item.id for page in pages for item in page.items] == [
+            row.id for row in query.order_by(Row.id).all()
+        ]
+
+    def test_tampered_cursor_is_rejected(self, db):
+        keys = sort_keys(Row.score, False, Row.id)
+        page = keyset_paginate(db.query(Row), keys, 5)
+
+        payload, signature = page.next_cursor.split(".")
+        forged = encode_cursor({"f": "x", "d": "n", "k": [0, 0]}).split(".")[0] + "." + signature
+        for cursor in (forged, payload + ".AAAA", "garbage"):
+            with pytest.raises(HTTPException) as error:
+                keyset_paginate(db.query(Row), keys, 5, cursor)
+            assert error.value.status_code == 400
+
+    def test_cursor_is_bound_to_sort_order(self, db):
+        page = keyset_paginate(db.query(Row), sort_keys(Row.score, False, Row.id), 5)
+        with pytest.raises(HTTPException):
+            keyset_paginate(db.query(Row), sort_keys(Row.score, True, Row.id), 5, page.next_cursor)
+
+    def test_cursor_round_trips_typed_values(self):
+        data = {"k": [{"$dt": "2024-01-01T00:00:00"}, 3]}
+        assert decode_cursor(encode_cursor(data)) == data
+
+    def test_count_total_modes(self, db):
+        query = db.query(Row).filter(Row.score == 1)
+        assert count_total(query, "exact") == 12
+        # Planner estimates are PostgreSQL only; other databases count exactly
+        assert count_total(query, "estimate") == 12
+        assert count_total(query, "none") is None
@@ -0,0 +1,116 @@
+"""
+Tests for compiled RBAC permission masks.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from ..core import rbac
+from ..core.rbac import (
+    CUSTOM_ROLE_PERMISSIONS, ROLE_PERMISSIONS, CustomRole, Permission, PermissionContext,
+    RBACService, compile_permissions, permissions_from_mask, user_permission_mask
+)
+from ..db.business_models import UserRole
+
+
+def make_user(role, custom_roles=None):
+    user = SimpleNamespace(role=role)
+    if custom_roles is not None:
+        user.custom_roles = custom_roles
+    return user
+
+
+@pytest.fixture
+def service():
+    return RBACService(db=None)
+
+
+@pytest.fixture
+def recompile():
+    """Restore the compiled masks after a test edits the role mappings."""
+    yield compile_permissions
+    ROLE_PERMISSIONS[UserRole.VIEWER].discard("jobs.*")
+    compile_permissions()
+
+
+class TestPermissionMasks:
+    """Test that masks agree with the role mappings."""
+
+    @pytest.mark.parametrize("role", list(UserRole))
+    def test_masks_match_role_permissions(self, service, role):
+        user = make_user(role)
+        expected = ROLE_PERMISSIONS.get(role, set())
+
+        assert service.get_user_permissions(user) == expected
+        for permission in Permission:
+            assert service.has_permission(user, permission) == (permission in expected)
+            assert service.has_permission(user, permission.value) == (permission in expected)
+
+    def test_custom_roles_are_combined(self, service):
+        user = make_user(UserRole.VIEWER, ["accountant", CustomRole.SAFETY_OFFICER])
+        expected = (
+            ROLE_PERMISSIONS[UserRole.VIEWER]
+            | CUSTOM_ROLE_PERMISSIONS[CustomRole.ACCOUNTANT]
+            | CUSTOM_ROLE_PERMISSIONS[CustomRole.SAFETY_OFFICER]
+        )
+
+        assert permissions_from_mask(user_permission_mask(user)) == expected
+        assert service.has_permission(user, Permission.FINANCE_REPORTS)
+
+    def test_unknown_permissions_are_denied(self, service):
+        user = make_user(UserRole.ADMIN)
+        assert service.has_permission(user, "nonexistent.read") is False
+        # Previously raised ValueError building a wildcard Permission
+        assert service.has_permission(make_user(UserRole.VIEWER), Permission.JOBS_DELETE) is False
+
+    def test_wildcards_are_expanded_at_compile_time(self, service, recompile):
+        viewer = make_user(UserRole.VIEWER)
+        assert not service.has_permission(viewer, Permission.JOBS_SCHEDULE)
+
+        ROLE_PERMISSIONS[UserRole.VIEWER].add("jobs.*")
+        recompile()
+
+        assert service.has_permission(viewer, Permission.JOBS_SCHEDULE)
+        assert service.has_permission(viewer, "jobs.*")
+        assert not service.has_permission(viewer, "finance.*")
+
+    def test_context_checks_still_apply(self, service):
+        user = make_user(UserRole.SUPERVISOR)
+        context = PermissionContext(user, field_filters={"fields": ["profit_margin"]})
+
+        assert service.has_permission(user, Permission.ESTIMATES_READ)
+        assert not service.has_permission(user, Permission.ESTIMATES_READ, context)
+
+    def test_role_combinations_are_memoized(self):
+        rbac.roles_mask.cache_clear()
+        for _ in range(5):
+            user_permission_mask(make_user(UserRole.USER))
+
+        info = rbac.roles_mask.cache_info()
+        assert info.misses == 1 and info.hits == 4
+
+
+class TestFilterResponseFields:
+    """Test field filtering for single records and lists."""
+
+    def test_list_responses_are_filtered(self, service):
+        rows = [
+            {"id": i, "total": 100, "cost_breakdown": {}, "profit_margin": 0.3}
+            for i in range(3)
+        ]
+        result = service.filter_response_fields(make_user(UserRole.USER), "estimates", rows)
+
+        assert result is rows
+        assert rows == [{"id": i, "total": 100} for i in range(3)]
+
+    def test_allowed_roles_see_everything(self, service):
+        row = {"id": 1, "profit_margin": 0.3}
+        service.filter_response_fields(make_user(UserRole.SUPERVISOR), "estimates", row)
+        assert row == {"id": 1, "profit_margin": 0.3}
+
+    def test_single_record(self, service):
+        row = {"email": "a@example.com", "hashed_password": "x"}
+        assert service.filter_response_fields(make_user(UserRole.ADMIN), "users", row) == {
+            "email": "a@example.com"
+        }
@@ -0,0 +1,178 @@
+"""
+Tests for the incrementally maintained analytics rollups.
+"""
+
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import Column, Date, Integer, String, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from ..db import analytics_models
+from ..db.analytics_models import (
+    AnalyticsRollup, Contribution, accumulate, apply_rollup_deltas, expense_contributions,
+    invoice_contributions, new_deltas, opportunity_contributions, register_rollup_source
+)
+from ..services.rollups import metric_total, rollup_months, rollup_series, rollup_totals
+
+
+SourceBase = declarative_base()
+
+
+class Sale(SourceBase):
+    __tablename__ = "rollup_test_sales"
+
+    id = Column(Integer, primary_key=True)
+    sold_on = Column(Date, nullable=False)
+    region = Column(String(20), nullable=False)
+    amount_cents = Column(Integer, nullable=False)
+
+
+def sale_contributions(sale):
+    return [Contribution(sale.sold_on, "sale", sale.region, amount_cents=sale.amount_cents)]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    engine = create_engine("sqlite://")
+    AnalyticsRollup.__table__.create(engine)
+    SourceBase.metadata.create_all(engine)
+    monkeypatch.setattr(analytics_models, "ROLLUP_SOURCES", dict(analytics_models.ROLLUP_SOURCES))
+    register_rollup_source(Sale, ("sold_on", "region", "amount_cents"), sale_contributions)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def write(db, *contributions):
+    deltas = new_deltas()
+    accumulate(deltas, contributions)
+    apply_rollup_deltas(db.connection(), deltas)
+    db.commit()
+
+
+class TestContributions:
+    """Test what each source row adds to the rollups."""
+
+    def test_invoice_excludes_void(self):
+        invoice = SimpleNamespace(
+            invoice_date=date(2024, 3, 5), status="sent", total_cents=10000, amount_paid_cents=2500
+        )
+        contributions = invoice_contributions(invoice)
+
+        assert [(c.metric, c.amount_cents) for c in contributions] == [
+            ("invoice.billed", 10000), ("invoice.collected", 2500)
+        ]
+        invoice.status = "void"
+        assert invoice_contributions(invoice) == []
+
+    def test_expense_counts_as_approved_once_approved(self):
+        expense = SimpleNamespace(
+            expense_date=date(2024, 3, 5), category="materials", amount_cents=500, approved_date=None
+        )
+        assert [c.metric for c in expense_contributions(expense)] == ["expense"]
+
+        expense.approved_date = date(2024, 3, 6)
+        assert [c.metric for c in expense_contributions(expense)] == ["expense", "expense.approved"]
+
+    def test_won_opportunity_records_sales_cycle(self):
+        opportunity = SimpleNamespace(
+            value_cents=20000, probability=50, stage="closed_won", created_at=datetime(2024, 3, 1),
+            expected_close_date=date(2024, 3, 20), closed_date=datetime(2024, 3, 11),
+            is_won=True, is_active=False
+        )
+        [won] = opportunity_contributions(opportunity)
+
+        assert won.metric == "opportunity.won"
+        assert won.day == date(2024, 3, 11)
+        assert won.duration_days == 10
+
+
+class TestRollupQueries:
+    """Test reading totals back across day and month rows."""
+
+    def test_partial_months_read_day_rows(self, db):
+        write(
+            db,
+            Contribution(date(2024, 1, 31), "invoice.billed", amount_cents=100),
+            Contribution(date(2024, 2, 10), "invoice.billed", amount_cents=200),
+            Contribution(date(2024, 3, 2), "invoice.billed", amount_cents=400),
+            Contribution(date(2024, 3, 20), "invoice.billed", amount_cents=800),
+        )
+
+        # Jan 15 - Mar 10: day rows at both edges, the February month row in between
+        totals = rollup_totals(db, ["invoice.billed"], date(2024, 1, 15), date(2024, 3, 10))
+        assert totals["invoice.billed"].amount_cents == 700
+        assert totals["invoice.billed"].count == 3
+
+        totals = rollup_totals(db, ["invoice.billed"], date(2024, 2, 1), date(2024, 3, 31))
+        assert totals["invoice.billed"].amount_cents == 1400
+
+    def test_dimensions_and_series(self, db):
+        write(
+            db,
+            Contribution(date(2024, 1, 3), "expense", "fuel", amount_cents=100),
+            Contribution(date(2024, 2, 3), "expense", "labor", amount_cents=300),
+            Contribution(date(2024, 2, 9), "expense", "fuel", amount_cents=50),
+        )
+
+        totals = rollup_totals(db, ["expense"], date(2024, 1, 1), date(2024, 2, 29), by_dimension=True)
+        assert totals[("expense", "fuel")].amount_cents == 150
+        assert metric_total(totals, "expense").amount_cents == 450
+
+        series = rollup_series(db, ["expense"], date(2024, 1, 1), date(2024, 2, 1))
+        assert series[("expense", date(2024, 1, 1))].amount_cents == 100
+        assert series[("expense", date(2024, 2, 1))].amount_cents == 350
+
+    def test_months_are_clipped_to_the_range(self, db):
+        write(
+            db,
+            Contribution(date(2024, 1, 10), "invoice.billed", amount_cents=100),
+            Contribution(date(2024, 1, 29), "invoice.billed", amount_cents=200),
+            Contribution(date(2024, 2, 2), "invoice.billed", amount_cents=400),
+            Contribution(date(2024, 2, 20), "invoice.billed", amount_cents=800),
+        )
+
+        # A week across the month boundary: only its own days in each bucket
+        months = rollup_months(db, ["invoice.billed"], date(2024, 1, 27), date(2024, 2, 3))
+        assert {month: value.amount_cents for (_, month), value in months.items()} == {
+            date(2024, 1, 1): 200, date(2024, 2, 1): 400
+        }
+
+        months = rollup_months(db, ["invoice.billed"], date(2024, 1, 1), date(2024, 2, 29))
+        assert months[("invoice.billed", date(2024, 1, 1))].amount_cents == 300
+        assert months[("invoice.billed", date(2024, 2, 1))].count == 2
+
+
+class TestIncrementalMaintenance:
+    """Test that flushes keep the rollups in step with the source rows."""
+
+    def test_insert_update_delete(self, db):
+        def totals():
+            return rollup_totals(db, ["sale"], date(2024, 1, 1), date(2024, 12, 31), by_dimension=True)
+
+        sale = Sale(id=1, sold_on=date(2024, 4, 2), region="north", amount_cents=1000)
+        db.add(sale)
+        db.commit()
+        assert totals()[("sale", "north")].amount_cents == 1000
+
+        # Moving the sale moves its contribution rather than adding to it
+        sale.region = "south"
+        sale.amount_cents = 1500
+        db.commit()
+        assert totals()[("sale", "north")].amount_cents == 0
+        assert totals()[("sale", "south")].amount_cents == 1500
+        assert metric_total(totals(), "sale").count == 1
+
+        db.delete(sale)
+        db.commit()
+        assert metric_total(totals(), "sale").count == 0
+        assert metric_total(totals(), "sale").amount_cents == 0
+
+    def test_rollback_discards_rollup_changes(self, db):
+        db.add(Sale(id=2, sold_on=date(2024, 4, 2), region="north", amount_cents=1000))
+        db.flush()
+        db.rollback()
+
+        assert rollup_totals(db, ["sale"], date(2024, 1, 1), date(2024, 12, 31)) == {}
@@ -0,0 +1,177 @@
+"""
+Tests for the in-memory task dependency graph.
+"""
+
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from ..services.task_graph import (
+    DependencyCycleError, DependencyEdge, TaskGraph, TaskNode, dependency_table,
+    get_task_graph, invalidate_task_graph, invalidate_task_graph_for_tasks, linked_project_ids,
+    load_task_graph, task_table
+)
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+A, B, C, D, E = (uuid.UUID(int=i) for i in range(1, 6))
+
+
+def node(task_id, hours, status="todo"):
+    return TaskNode(task_id, f"Task {task_id.int}", status, duration_hours=hours)
+
+
+def graph(*edges, statuses=None):
+    statuses = statuses or {}
+    hours = {A: 8, B: 16, C: 4, D: 8, E: 2}
+    return TaskGraph(
+        [node(task_id, h, statuses.get(task_id, "todo")) for task_id, h in hours.items()],
+        [DependencyEdge(*edge) for edge in edges]
+    )
+
+
+class TestTaskGraph:
+    """Test ordering, cycle checks and blocking."""
+
+    def test_cycle_detection(self):
+        g = graph((A, B), (B, C))
+
+        assert g.would_create_cycle(A, C)
+        assert g.would_create_cycle(A, A)
+        assert not g.would_create_cycle(C, A)
+        assert not g.would_create_cycle(D, C)
+
+    def test_topological_order(self):
+        order = graph((A, B), (B, C), (A, D), (D, C)).topological_order()
+
+        assert order.index(A) < order.index(B) < order.index(C)
+        assert order.index(D) < order.index(C)
+        assert set(order) == {A, B, C, D, E}
+
+    def test_cycles_have_no_order(self):
+        with pytest.raises(DependencyCycleError):
+            graph((A, B), (B, C), (C, A)).topological_order()
+
+    def test_blocking_propagates(self):
+        g = graph((A, B), (B, C), (D, C), statuses={A: "completed", D: "in_progress"})
+
+        assert [edge.predecessor_id for edge in g.unmet_dependencies(C)] == [B, D]
+        assert g.unmet_dependencies(B) == []
+        assert g.blocked_tasks() == {C: {B, D}}
+
+        g = graph((A, B), (B, C))
+        assert g.blocked_tasks() == {B: {A}, C: {A, B}}
+
+
+class TestSchedule:
+    """Test critical path and slack."""
+
+    def test_critical_path_and_slack(self):
+        # A(8) -> B(16) -> C(4) and A -> D(8) -> C: D has 8 hours of slack
+        g = graph((A, B), (B, C), (A, D), (D, C))
+        schedule = g.schedule()
+
+        assert schedule[C].earliest_finish == 28
+        assert schedule[D].slack == 8
+        assert schedule[E].slack == 26
+        assert g.critical_path(schedule) == [A, B, C]
+
+    def test_lags_and_dependency_types(self):
+        g = graph(
+            (A, B, "start_to_start", 2),
+            (B, C, "finish_to_finish", 1),
+            (A, D, "finish_to_start", 4),
+        )
+        schedule = g.schedule()
+
+        assert schedule[B].earliest_start == 2
+        # C (4h) must finish an hour after B finishes at 18
+        assert schedule[C].earliest_finish == 19
+        assert schedule[D].earliest_start == 12
+        # D finishes last, at 20, so C has an hour of slack
+        assert schedule[C].slack == 1
+        assert g.critical_path(schedule) == [A, D]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    task_table.create(engine)
+    dependency_table.create(engine)
+    session = sessionmaker(bind=engine)()
+    session.statements = []
+    event.listen(
+        engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: session.statements.append(statement)
+    )
+    yield session
+    session.close()
+
+
+class TestLoading:
+    """Test loading and caching a project's graph."""
+
+    def add_tasks(self, db, project_id, *task_ids):
+        db.execute(task_table.insert(), [
+            {"id": task_id, "project_id": project_id, "title": f"Task {task_id.int}",
+             "status": "todo", "created_by": uuid.uuid4(), "estimated_hours": 4}
+            for task_id in task_ids
+        ])
+
+    def test_one_bulk_load_with_linked_tasks(self, db):
+        project, other_project = uuid.uuid4(), uuid.uuid4()
+        self.add_tasks(db, project, A, B, C)
+        self.add_tasks(db, other_project, D, E)
+        db.execute(dependency_table.insert(), [
+            {"id": uuid.uuid4(), "predecessor_id": A, "task_id": B, "lag_hours": 0},
+            {"id": uuid.uuid4(), "predecessor_id": D, "task_id": C, "lag_hours": 2},
+            {"id": uuid.uuid4(), "predecessor_id": D, "task_id": E, "lag_hours": 0},
+        ])
+        db.commit()
+        db.statements.clear()
+
+        g = load_task_graph(db, project)
+
+        assert len(db.statements) == 2
+        assert set(g.nodes) == {A, B, C, D}
+        assert g.predecessors[C] == [DependencyEdge(D, C, "finish_to_start", 2)]
+        assert E not in g.successors.get(D, [])
+
+    async def test_cached_until_invalidated(self, db):
+        project = uuid.uuid4()
+        self.add_tasks(db, project, A, B)
+        db.commit()
+        db.statements.clear()
+
+        first = await get_task_graph(db, project)
+        assert await get_task_graph(db, project) is first
+        assert len(db.statements) == 2
+
+        await invalidate_task_graph(project)
+        assert await get_task_graph(db, project) is not first
+
+    async def test_linked_projects_are_invalidated_too(self, db):
+        project, other_project, unrelated = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        self.add_tasks(db, project, A, B)
+        self.add_tasks(db, other_project, C, D)
+        self.add_tasks(db, unrelated, E)
+        db.execute(dependency_table.insert(), [
+            {"id": uuid.uuid4(), "predecessor_id": C, "task_id": A, "lag_hours": 0},
+        ])
+        db.commit()
+
+        assert linked_project_ids(db, [C]) == {project, other_project}
+        assert linked_project_ids(db, [D]) == {other_project}
+
+        first = await get_task_graph(db, project)
+        # A change to C in the other project reaches the graph that includes it
+        await invalidate_task_graph_for_tasks(db, C)
+        assert await get_task_graph(db, project) is not first
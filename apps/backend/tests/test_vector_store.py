@@ -0,0 +1,338 @@
+"""
+Tests for the matrix-backed vector store.
+"""
+
+import numpy as np
+import pytest
+
+from ..memory.vector_store import VectorStore
+
+
+def brute_force(vectors, query, top_k, threshold):
+    """Reference cosine ranking computed one pair at a time."""
+    scored = []
+    for key, vector in vectors.items():
+        similarity = float(
+            np.dot(query, vector) / (np.linalg.norm(query) * np.linalg.norm(vector))
+        )
+        if similarity >= threshold:
+            scored.append((key, similarity))
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return scored[:top_k]
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(7)
+    return {f"doc-{i}": rng.normal(size=16) for i in range(200)}
+
+
+class TestVectorStore:
+    """Test search, deletion and compaction."""
+
+    async def test_search_matches_brute_force(self, vectors):
+        store = VectorStore(initial_capacity=8)
+        for key, vector in vectors.items():
+            await store.add_embedding(key, vector.tolist(), {"key": key})
+
+        query = np.random.default_rng(1).normal(size=16)
+        results = await store.search(query.tolist(), top_k=5, threshold=0.0)
+        expected = brute_force(vectors, query, 5, 0.0)
+
+        assert [r["key"] for r in results] == [key for key, _ in expected]
+        for result, (_, similarity) in zip(results, expected):
+            assert result["similarity"] == pytest.approx(similarity, abs=1e-5)
+        assert results[0]["metadata"]["key"] == results[0]["key"]
+
+    async def test_threshold_filters_results(self):
+        store = VectorStore()
+        await store.add_embedding("x", [1.0, 0.0])
+        await store.add_embedding("y", [0.0, 1.0])
+
+        results = await store.search([1.0, 0.1], top_k=10, threshold=0.7)
+        assert [r["key"] for r in results] == ["x"]
+
+    async def test_search_many_matches_single_queries(self, vectors):
+        store = VectorStore()
+        await store.add_embeddings(list(vectors), np.stack(list(vectors.values())))
+
+        queries = np.random.default_rng(2).normal(size=(4, 16))
+        batched = await store.search_many(queries, top_k=3, threshold=-1.0)
+
+        assert len(batched) == 4
+        for query, results in zip(queries, batched):
+            single = await store.search(query, top_k=3, threshold=-1.0)
+            assert [r["key"] for r in results] == [r["key"] for r in single]
+
+    async def test_overwrite_updates_row_in_place(self):
+        store = VectorStore()
+        await store.add_embedding("x", [1.0, 0.0])
+        await store.add_embedding("x", [0.0, 2.0])
+
+        assert len(store) == 1
+        assert (await store.get_embedding("x"))["embedding"] == pytest.approx([0.0, 2.0])
+        results = await store.search([0.0, 1.0], top_k=1)
+        assert results[0]["key"] == "x"
+
+    async def test_deleted_rows_are_never_returned(self, vectors):
+        store = VectorStore(compact_ratio=0.5)
+        for key, vector in vectors.items():
+            await store.add_embedding(key, vector)
+
+        target = vectors["doc-3"]
+        assert (await store.search(target, top_k=1))[0]["key"] == "doc-3"
+
+        assert await store.delete_embedding("doc-3") is True
+        assert await store.delete_embedding("doc-3") is False
+        assert store._tombstones == 1
+        results = await store.search(target, top_k=200, threshold=-1.0)
+        assert "doc-3" not in [r["key"] for r in results]
+        assert len(results) == 199
+
+    async def test_compaction_reclaims_tombstones(self, vectors):
+        store = VectorStore(compact_ratio=0.25)
+        for key, vector in vectors.items():
+            await store.add_embedding(key, vector)
+
+        for i in range(60):
+            await store.delete_embedding(f"doc-{i}")
+
+        assert store._tombstones < 60
+        store.compact()
+        assert store._tombstones == 0
+        assert len(store) == 140
+
+        query = vectors["doc-150"]
+        remaining = {k: v for k, v in vectors.items() if int(k.split("-")[1]) >= 60}
+        results = await store.search(query, top_k=5, threshold=-1.0)
+        assert [r["key"] for r in results] == [k for k, _ in brute_force(remaining, query, 5, -1.0)]
+        assert (await store.get_embedding("doc-150"))["embedding"] == pytest.approx(
+            vectors["doc-150"].tolist(), abs=1e-5
+        )
+
+    async def test_dimension_mismatch_raises(self):
+        store = VectorStore()
+        await store.add_embedding("x", [1.0, 0.0, 0.0])
+        with pytest.raises(ValueError):
+            await store.add_embedding("y", [1.0, 0.0])
+
+    async def test_clear_resets_dimension(self):
+        store = VectorStore()
+        await store.add_embedding("x", [1.0, 0.0, 0.0])
+        await store.clear()
+
+        assert len(store) == 0
+        assert await store.search([1.0, 0.0]) == []
+        await store.add_embedding("y", [1.0, 0.0])
+        assert store.dimension == 2
+
+
+def clustered(n, dim=32, clusters=50, seed=0):
+    """Embeddings grouped around random topics, like real chunk corpora."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(0, clusters, size=n)
+    return (centers[labels] + 0.3 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def recall_at_k(approximate, exact):
+    """Fraction of the exact top-k keys the approximate search returned."""
+    hits = total = 0
+    for approx_results, exact_results in zip(approximate, exact):
+        expected = {r["key"] for r in exact_results}
+        hits += len(expected & {r["key"] for r in approx_results})
+        total += len(expected)
+    return hits / total
+
+
+class TestIVFIndex:
+    """Test the approximate index against exact search."""
+
+    async def build_store(self, n=2000, **index_kwargs):
+        vectors = clustered(n)
+        store = VectorStore()
+        await store.add_embeddings([f"doc-{i}" for i in range(n)], vectors)
+        store.build_index(**index_kwargs)
+        return store, vectors
+
+    async def test_recall_improves_with_nprobe(self):
+        store, _ = await self.build_store(nlist=40)
+        queries = clustered(50, seed=1)
+        exact = await store.search_many(queries, top_k=10, threshold=-1.0, exact=True)
+
+        low = recall_at_k(await store.search_many(queries, top_k=10, threshold=-1.0, nprobe=1), exact)
+        high = recall_at_k(await store.search_many(queries, top_k=10, threshold=-1.0, nprobe=8), exact)
+        full = recall_at_k(await store.search_many(queries, top_k=10, threshold=-1.0, nprobe=40), exact)
+
+        assert low <= high
+        assert high >= 0.9
+        assert full == 1.0
+
+    async def test_incremental_inserts_are_searchable(self):
+        store, _ = await self.build_store(n=500, nlist=10)
+        new_vector = np.ones(32, dtype=np.float32)
+        await store.add_embedding("fresh", new_vector)
+
+        results = await store.search(new_vector, top_k=1, threshold=0.0, nprobe=1)
+        assert results[0]["key"] == "fresh"
+
+    async def test_deletes_and_compaction_keep_index_consistent(self):
+        store, vectors = await self.build_store(n=500, nlist=10)
+        for i in range(200):
+            await store.delete_embedding(f"doc-{i}")
+        store.compact()
+
+        results = await store.search(vectors[300], top_k=5, threshold=-1.0, nprobe=10)
+        keys = [r["key"] for r in results]
+        assert keys[0] == "doc-300"
+        assert all(int(key.split("-")[1]) >= 200 for key in keys)
+
+    async def test_save_and_load_round_trip(self, tmp_path):
+        store, vectors = await self.build_store(n=500, nlist=10, nprobe=3)
+        path = tmp_path / "index.npz"
+        store.save_index(str(path))
+
+        queries = clustered(20, seed=2)
+        before = await store.search_many(queries, top_k=5, threshold=-1.0)
+
+        store.drop_index()
+        index = store.load_index(str(path))
+        assert index.nlist == 10 and index.nprobe == 3
+        assert await store.search_many(queries, top_k=5, threshold=-1.0) == before
+
+    @pytest.mark.slow
+    async def test_recall_benchmark(self):
+        """Recall and latency of IVF against brute force on 100k vectors."""
+        import time
+
+        n, dim = 100_000, 128
+        store = VectorStore()
+        await store.add_embeddings(
+            [f"doc-{i}" for i in range(n)], clustered(n, dim=dim, clusters=500)
+        )
+        store.build_index()
+        queries = clustered(100, dim=dim, clusters=500, seed=3)
+
+        started = time.perf_counter()
+        exact = [await store.search(q, top_k=10, threshold=-1.0, exact=True) for q in queries]
+        exact_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+        report = {}
+        for nprobe in (1, 4, 16, 64):
+            started = time.perf_counter()
+            approximate = [await store.search(q, top_k=10, threshold=-1.0, nprobe=nprobe) for q in queries]
+            report[nprobe] = (
+                recall_at_k(approximate, exact),
+                (time.perf_counter() - started) * 1000 / len(queries)
+            )
+
+        print(f"\nexact: {exact_ms:.2f} ms/query")
+        for nprobe, (recall, latency) in report.items():
+            print(f"nprobe={nprobe}: recall@10={recall:.3f} {latency:.2f} ms/query")
+
+        # Latency is printed rather than asserted to keep CI deterministic
+        assert report[64][0] >= 0.9
+        assert report[1][0] <= report[64][0]
+
+
+class TestPersistentStore:
+    """Test the memory-mapped segment directory behind VectorStore.open."""
+
+    async def test_flush_and_reopen(self, tmp_path, vectors):
+        store = VectorStore.open(str(tmp_path))
+        for key, vector in vectors.items():
+            await store.add_embedding(key, vector, {"source": "test"})
+        assert store.flush() == "segment-000001.emb"
+        assert store.flush() is None
+
+        reopened = VectorStore.open(str(tmp_path), readonly=True)
+        assert len(reopened) == len(vectors)
+        assert isinstance(reopened._matrix, np.memmap)
+        assert reopened.metadata["doc-5"]["source"] == "test"
+        assert reopened.metadata["doc-5"]["created_at"] == store.metadata["doc-5"]["created_at"]
+        assert (await reopened.get_embedding("doc-5"))["embedding"] == pytest.approx(
+            vectors["doc-5"].tolist(), abs=1e-5
+        )
+
+        query = vectors["doc-9"]
+        assert await reopened.search(query, top_k=3) == await store.search(query, top_k=3)
+
+    async def test_later_segments_win(self, tmp_path):
+        store = VectorStore.open(str(tmp_path))
+        await store.add_embedding("a", [1.0, 0.0])
+        await store.add_embedding("b", [0.0, 1.0])
+        store.flush()
+
+        await store.add_embedding("a", [0.0, 3.0])
+        await store.delete_embedding("b")
+        await store.add_embedding("c", [1.0, 1.0])
+        store.flush()
+
+        reopened = VectorStore.open(str(tmp_path))
+        assert sorted(reopened._key_rows) == ["a", "c"]
+        assert (await reopened.get_embedding("a"))["embedding"] == pytest.approx([0.0, 3.0])
+        # Gathered from two segments, so loaded into memory
+        assert not isinstance(reopened._matrix, np.memmap)
+
+    async def test_merge_collapses_segments(self, tmp_path):
+        store = VectorStore.open(str(tmp_path), max_segments=3)
+        for i in range(5):
+            await store.add_embedding(f"k{i}", [float(i), 1.0])
+            store.flush()
+
+        files = sorted(path.name for path in tmp_path.glob("*.emb"))
+        assert len(files) <= 3
+
+        store.merge()
+        assert [path.name for path in tmp_path.glob("*.emb")] == store._segments.segment_names
+        reopened = VectorStore.open(str(tmp_path))
+        assert isinstance(reopened._matrix, np.memmap)
+        assert sorted(reopened._key_rows) == [f"k{i}" for i in range(5)]
+
+    async def test_writes_after_open_copy_the_map(self, tmp_path):
+        store = VectorStore.open(str(tmp_path))
+        await store.add_embedding("a", [1.0, 0.0])
+        store.merge()
+
+        reopened = VectorStore.open(str(tmp_path))
+        await reopened.add_embedding("a", [0.0, 1.0])
+        assert (await reopened.get_embedding("a"))["embedding"] == pytest.approx([0.0, 1.0])
+        # The file on disk is untouched until the next flush
+        assert (await VectorStore.open(str(tmp_path)).get_embedding("a"))["embedding"] == pytest.approx([1.0, 0.0])
+
+    async def test_readonly_store_cannot_flush(self, tmp_path):
+        store = VectorStore.open(str(tmp_path))
+        await store.add_embedding("a", [1.0, 0.0])
+        store.flush()
+
+        reader = VectorStore.open(str(tmp_path), readonly=True)
+        await reader.add_embedding("b", [0.0, 1.0])
+        with pytest.raises(PermissionError):
+            reader.flush()
+
+        with pytest.raises(FileNotFoundError):
+            VectorStore.open(str(tmp_path / "missing"), readonly=True)
+
+    async def test_float16_storage(self, tmp_path, vectors):
+        store = VectorStore.open(str(tmp_path), dtype="float16")
+        await store.add_embeddings(list(vectors), np.stack(list(vectors.values())))
+        store.flush()
+
+        reopened = VectorStore.open(str(tmp_path))
+        assert reopened._matrix.dtype == np.float16
+        query = vectors["doc-42"]
+        results = await reopened.search(query, top_k=5, threshold=-1.0)
+        expected = await store.search(query, top_k=5, threshold=-1.0)
+        assert [r["key"] for r in results] == [r["key"] for r in expected]
+
+    async def test_index_is_persisted_with_the_store(self, tmp_path):
+        store = VectorStore.open(str(tmp_path))
+        await store.add_embeddings([f"doc-{i}" for i in range(300)], clustered(300))
+        store.build_index(nlist=8, nprobe=2)
+        store.flush()
+
+        reopened = VectorStore.open(str(tmp_path), readonly=True)
+        assert reopened.index is not None
+        assert reopened.index.nprobe == 2
+        query = clustered(1, seed=5)[0]
+        assert await reopened.search(query, top_k=5) == await store.search(query, top_k=5)
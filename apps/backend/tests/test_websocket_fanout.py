@@ -0,0 +1,199 @@
+"""
+Tests for queued WebSocket fan-out and the cross-worker message bus.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from ..core import websocket as websocket_module
+from ..core.local_redis import LocalRedis
+from ..core.message_bus import InProcessBus, RedisMessageBus
+from ..core.websocket import SLOW_CONSUMER_CLOSE_CODE, ConnectionManager
+
+
+class FakeWebSocket:
+    """Records sent frames; a blocked socket never finishes a send."""
+
+    def __init__(self, blocked=False):
+        self.sent = []
+        self.closed_with = None
+        self.unblocked = asyncio.Event()
+        if not blocked:
+            self.unblocked.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await self.unblocked.wait()
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+    def messages(self, message_type="room_message"):
+        return [m for m in self.sent if m.get("type") == message_type]
+
+
+async def settle():
+    """Let writer tasks drain their queues."""
+    await asyncio.sleep(0.02)
+
+
+@pytest.fixture
+async def managers():
+    """Build managers that are shut down after the test."""
+    created = []
+
+    def build(**kwargs):
+        manager = ConnectionManager(**kwargs)
+        created.append(manager)
+        return manager
+
+    yield build
+    for manager in created:
+        await manager.shutdown()
+
+
+async def join(manager, client_id, room="room", blocked=False):
+    websocket = FakeWebSocket(blocked=blocked)
+    assert await manager.connect(websocket, client_id)
+    manager.join_room(client_id, room)
+    return websocket
+
+
+def room_message(n):
+    return {"type": "room_message", "n": n}
+
+
+class TestConnectionManagerFanout:
+    """Test per-connection queues and slow consumer handling."""
+
+    async def test_broadcast_serializes_once(self, managers, monkeypatch):
+        manager = managers()
+        sockets = [await join(manager, f"c{i}") for i in range(5)]
+        calls = []
+        original = websocket_module.encode_message
+        monkeypatch.setattr(
+            websocket_module, "encode_message", lambda m: calls.append(m) or original(m)
+        )
+
+        await manager.broadcast_to_room("room", room_message(1))
+        await settle()
+
+        assert len(calls) == 1
+        assert all(ws.messages() == [room_message(1)] for ws in sockets)
+
+    async def test_slow_client_does_not_stall_the_room(self, managers):
+        manager = managers(queue_size=64)
+        stuck = await join(manager, "tablet", blocked=True)
+        fast = await join(manager, "office")
+
+        await asyncio.wait_for(
+            asyncio.gather(*(manager.broadcast_to_room("room", room_message(n)) for n in range(20))),
+            timeout=1
+        )
+        await settle()
+
+        assert [m["n"] for m in fast.messages()] == list(range(20))
+        assert stuck.messages() == []
+        assert manager.is_connected("tablet")
+
+    async def test_drop_oldest_keeps_latest_messages(self, managers):
+        manager = managers(queue_size=3, slow_consumer_policy="drop_oldest")
+        stuck = await join(manager, "tablet", blocked=True)
+        # The writer is now stuck sending the welcome message
+        await settle()
+
+        for n in range(10):
+            await manager.broadcast_to_room("room", room_message(n))
+        stuck.unblocked.set()
+        await settle()
+
+        assert [m["n"] for m in stuck.messages()] == [7, 8, 9]
+        assert manager.dropped_messages == 7
+
+    async def test_close_policy_disconnects_slow_client(self, managers):
+        manager = managers(queue_size=2, slow_consumer_policy="close")
+        stuck = await join(manager, "tablet", blocked=True)
+        fast = await join(manager, "office")
+
+        for n in range(6):
+            await manager.broadcast_to_room("room", room_message(n))
+            await settle()
+
+        assert not manager.is_connected("tablet")
+        assert "tablet" not in manager.get_room_members("room")
+        assert stuck.closed_with == SLOW_CONSUMER_CLOSE_CODE
+        assert len(fast.messages()) == 6
+        assert manager.stats()["slow_consumers_closed"] == 1
+
+    async def test_send_timeout_evicts_offline_client(self, managers):
+        manager = managers(send_timeout=0.05)
+        offline = await join(manager, "tablet", blocked=True)
+
+        await asyncio.sleep(0.1)
+
+        assert not manager.is_connected("tablet")
+        assert offline.closed_with == SLOW_CONSUMER_CLOSE_CODE
+
+    async def test_stale_disconnect_keeps_reconnected_client(self, managers):
+        manager = managers()
+        old = await join(manager, "tablet")
+        new = await join(manager, "tablet")
+
+        manager.disconnect("tablet", old)
+        assert manager.is_connected("tablet")
+        manager.disconnect("tablet", new)
+        assert not manager.is_connected("tablet")
+
+    def test_unknown_policy_is_rejected(self):
+        with pytest.raises(ValueError):
+            ConnectionManager(slow_consumer_policy="block")
+
+
+@pytest.fixture(params=["in_process", "local_redis"])
+def shared_bus(request):
+    if request.param == "in_process":
+        return lambda: InProcessBus()
+    client = LocalRedis()
+    return lambda: RedisMessageBus(client)
+
+
+class TestCrossWorkerFanout:
+    """Test that rooms span managers sharing a bus."""
+
+    async def test_room_messages_reach_other_workers(self, managers, shared_bus):
+        bus = shared_bus()
+        # Separate RedisMessageBus instances model separate worker processes
+        worker_a = managers(bus=bus)
+        worker_b = managers(bus=bus if isinstance(bus, InProcessBus) else shared_bus())
+        on_a = await join(worker_a, "a1")
+        on_b = await join(worker_b, "b1")
+        outsider = await join(worker_b, "b2", room="other")
+
+        await worker_a.broadcast_to_room("room", room_message(1))
+        await worker_b.send_personal_message({"type": "direct"}, "a1")
+        await settle()
+
+        assert on_a.messages() == [room_message(1)]
+        assert on_b.messages() == [room_message(1)]
+        assert outsider.messages() == []
+        assert on_a.messages("direct") == [{"type": "direct"}]
+
+        await worker_a.shutdown()
+        assert on_a.closed_with == 1001
+
+    async def test_exclude_applies_across_workers(self, managers, shared_bus):
+        bus = shared_bus()
+        worker_a = managers(bus=bus)
+        worker_b = managers(bus=bus if isinstance(bus, InProcessBus) else shared_bus())
+        await join(worker_a, "sender")
+        receiver = await join(worker_b, "receiver")
+
+        await worker_a.broadcast({"type": "broadcast"}, exclude_client="receiver")
+        await settle()
+
+        assert receiver.messages("broadcast") == []